@@ -110,6 +110,24 @@ done
 
 cd ..
 
+# Buckets (Roh + Verdichtung), Aufbewahrung und Tasks laut config.ini anlegen (idempotent)
+CONFIG_FILE=""
+for candidate in config.ini config/config.ini config/config.ini.example; do
+    if [ -f "$candidate" ]; then
+        CONFIG_FILE="$candidate"
+        break
+    fi
+done
+PYTHON=python3
+if [ -x venv/bin/python ]; then
+    PYTHON=venv/bin/python
+fi
+echo ""
+echo "🗄️ InfluxDB Provisionierung ($CONFIG_FILE)..."
+if ! $PYTHON src/provisioning.py --config "$CONFIG_FILE"; then
+    echo "⚠️ Provisionierung fehlgeschlagen - später erneut: $PYTHON src/provisioning.py --config $CONFIG_FILE"
+fi
+
 echo ""
 echo "🎉 DEPLOYMENT ERFOLGREICH!"
 echo ""
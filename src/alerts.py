@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Alarm-Regeln im Sensor Reader
+===================================================
+
+Prüft je Lese-Zyklus konfigurierte Regeln gegen die neuen Messwerte und
+sendet Alarme sofort per MQTT - unabhängig von InfluxDB, MQTT Bridge und
+Home Assistant. Eine Sektion je Regel:
+
+    [alert:frost_heizraum]
+    sensor = dht22
+    type = below
+    threshold = 5
+    hysteresis = 1
+    severity = critical
+
+Typen: above/below vergleichen die Temperatur, rate_above/rate_below die
+geglättete Änderungsrate (K/h), stale die Zeit seit der letzten gültigen
+Messung (threshold als Dauer, z.B. 5m). Ein Alarm endet erst, wenn der
+Wert die Schwelle um hysteresis in Gegenrichtung überschreitet - kein
+Flattern bei Werten an der Schwelle.
+
+MQTT Topics (Präfix aus [mqtt] topic_prefix):
+
+    <prefix>/alert/<regel>/state    Zustand je Regel (retained)
+    <prefix>/alert/event            Ereignis bei jedem Wechsel
+    <prefix>/reader/status          online/offline (Last Will)
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from derived import RateOfChange
+from downsampling import parse_duration
+from mqtt_publish import MQTT_AVAILABLE, MqttConnection
+
+logger = logging.getLogger(__name__)
+
+RULE_TYPES = ('above', 'below', 'rate_above', 'rate_below', 'stale')
+SECTION_PREFIX = 'alert:'
+
+
+class AlertRule:
+    """Schwellwert-, Änderungsraten- oder Stale-Regel für einen Sensor mit Hysterese"""
+
+    def __init__(self, name: str, sensor: str, rule_type: str, threshold: float,
+                 hysteresis: float = 0.0, severity: str = 'warning', smoothing: float = 300.0,
+                 label: Optional[str] = None):
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"[alert:{name}] type: {rule_type!r} ({', '.join(RULE_TYPES)})")
+        if hysteresis < 0:
+            raise ValueError(f"[alert:{name}] hysteresis muss >= 0 sein")
+        self.name = name
+        self.sensor = sensor
+        self.rule_type = rule_type
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.severity = severity
+        self.label = label or name
+        self.rate = RateOfChange(smoothing) if rule_type.startswith('rate_') else None
+
+        self.firing = False
+        self.since: Optional[float] = None      # Zeitpunkt des letzten Wechsels
+        self.value: Optional[float] = None
+        self.last_seen: Optional[float] = None  # stale: letzte gültige Messung
+
+    def __repr__(self):
+        return f"AlertRule({self.name}: {self.sensor} {self.rule_type} {self.threshold})"
+
+    def _exceeds(self, value: float) -> bool:
+        """Hysterese: Auslösen an der Schwelle, Beenden erst hysteresis dahinter"""
+        upward = self.rule_type in ('above', 'rate_above', 'stale')
+        if self.firing:
+            return value > self.threshold - self.hysteresis if upward else value < self.threshold + self.hysteresis
+        return value > self.threshold if upward else value < self.threshold
+
+    def check(self, temperature: Optional[float], acquired: Optional[float], now: float) -> Optional[Dict]:
+        """Regel gegen die Messung eines Zyklus prüfen - gibt bei Zustandswechsel ein Ereignis zurück"""
+        if self.rule_type == 'stale':
+            if temperature is not None:
+                self.last_seen = max(self.last_seen or 0.0, acquired)
+            elif self.last_seen is None:
+                self.last_seen = now        # seit Start ohne Messung
+            value = now - self.last_seen
+            timestamp = now
+        else:
+            if temperature is None:
+                return None                 # fehlende Messung: Zustand bleibt (dafür gibt es stale)
+            value = temperature
+            if self.rate is not None:
+                value = self.rate.update(acquired, temperature)
+                if value is None:
+                    return None
+            timestamp = acquired
+
+        self.value = value
+        firing = self._exceeds(value)
+        if firing == self.firing:
+            return None
+        self.firing = firing
+        self.since = timestamp
+        return self.event()
+
+    def event(self) -> Dict:
+        """Zustand der Regel als Ereignis/State-Payload"""
+        return {
+            'rule': self.name,
+            'label': self.label,
+            'sensor': self.sensor,
+            'type': self.rule_type,
+            'state': 'firing' if self.firing else 'ok',
+            'severity': self.severity,
+            'value': self.value,
+            'threshold': self.threshold,
+            'since': self.since
+        }
+
+
+def load_rules(config) -> List[AlertRule]:
+    """Regeln aus allen [alert:<name>] Sektionen"""
+    rules = []
+    for section in config.sections():
+        if not section.startswith(SECTION_PREFIX):
+            continue
+        name = section[len(SECTION_PREFIX):]
+        rule_type = config.get(section, 'type', fallback='above')
+        raw_threshold = config.get(section, 'threshold')
+        threshold = parse_duration(raw_threshold) if rule_type == 'stale' else float(raw_threshold)
+        rules.append(AlertRule(
+            name,
+            sensor=config.get(section, 'sensor'),
+            rule_type=rule_type,
+            threshold=threshold,
+            hysteresis=config.getfloat(section, 'hysteresis', fallback=0.0),
+            severity=config.get(section, 'severity', fallback='warning'),
+            smoothing=config.getfloat(section, 'smoothing', fallback=300.0),
+            label=config.get(section, 'label', fallback=None)
+        ))
+    return rules
+
+
+class AlertEngine:
+    """Alle Regeln je Lese-Zyklus prüfen"""
+
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = rules
+        self.stats = {'evaluations': 0, 'fired': 0, 'resolved': 0}
+
+    @classmethod
+    def from_config(cls, config) -> Optional["AlertEngine"]:
+        """Regeln laut [alert:<name>] Sektionen (keine Regeln: None)"""
+        rules = load_rules(config)
+        if not rules:
+            return None
+        logger.info(f"🚨 {len(rules)} Alarm-Regeln: " + ", ".join(rule.name for rule in rules))
+        return cls(rules)
+
+    def evaluate(self, sensor_data: Dict, now: float) -> List[Dict]:
+        """Messwerte eines Zyklus prüfen - gibt die Zustandswechsel zurück"""
+        temperatures = sensor_data.get('temperatures', {})
+        acquired = sensor_data.get('acquired', {})
+        events = []
+        self.stats['evaluations'] += 1
+        for rule in self.rules:
+            event = rule.check(temperatures.get(rule.sensor), acquired.get(rule.sensor, now), now)
+            if event is None:
+                continue
+            events.append(event)
+            if event['state'] == 'firing':
+                self.stats['fired'] += 1
+                logger.warning(f"🚨 Alarm {rule.label}: {rule.sensor} {rule.rule_type} {rule.threshold} "
+                               f"(Wert {event['value']:.1f})")
+            else:
+                self.stats['resolved'] += 1
+                logger.info(f"✅ Alarm beendet {rule.label}: {rule.sensor} (Wert {event['value']:.1f})")
+        return events
+
+    def active(self) -> List[Dict]:
+        """Aktuell ausgelöste Regeln"""
+        return [rule.event() for rule in self.rules if rule.firing]
+
+
+class AlertPublisher(MqttConnection):
+    """
+    Eigene MQTT Verbindung des Readers für Alarme
+
+    Zustände je Regel werden retained gesendet; bei getrenntem Broker
+    hält der Offline-Puffer den neuesten Zustand je Regel und alle
+    Ereignisse (begrenzte FIFO) bis zum Reconnect.
+    """
+
+    def __init__(self, broker: str, port: int = 1883, prefix: str = 'pi5_heizung',
+                 username: str = '', password: str = '', qos: int = 1):
+        super().__init__(broker, port, username=username, password=password, qos=qos,
+                         status_topic=f"{prefix}/reader/status", label='Alarm')
+        self.prefix = prefix
+
+    def start(self) -> bool:
+        if not super().start():
+            return False
+        logger.info(f"🚨 Alarm MQTT: {self.broker}:{self.port} → {self.prefix}/alert/...")
+        return True
+
+    def publish(self, events: List[Dict]):
+        """Zustandswechsel senden: Zustand je Regel (retained) und Ereignis"""
+        for event in events:
+            payload = dict(event)
+            if payload['since'] is not None:
+                payload['since'] = datetime.fromtimestamp(payload['since'], timezone.utc).isoformat(timespec='seconds')
+            if payload['value'] is not None:
+                payload['value'] = round(payload['value'], 2)
+            message = json.dumps(payload)
+            self.send(f"{self.prefix}/alert/{event['rule']}/state", message, retain=True, topic_class='alert')
+            self.send(f"{self.prefix}/alert/event", message, retain=False, topic_class='alert', coalesce=False)
+
+
+def start_alert_publisher(config) -> Optional[AlertPublisher]:
+    """MQTT Verbindung für Alarme laut [mqtt] starten ([alerts] mqtt = false oder ohne paho: None)"""
+    if not config.getboolean('alerts', 'mqtt', fallback=True):
+        return None
+    if not MQTT_AVAILABLE:
+        logger.warning("⚠️ Alarme ohne MQTT - pip install paho-mqtt")
+        return None
+
+    publisher = AlertPublisher(config.get('mqtt', 'broker', fallback='localhost'),
+                               port=config.getint('mqtt', 'port', fallback=1883),
+                               prefix=config.get('mqtt', 'topic_prefix', fallback='pi5_heizung'),
+                               username=config.get('mqtt', 'username', fallback=''),
+                               password=config.get('mqtt', 'password', fallback=''),
+                               qos=config.getint('alerts', 'qos', fallback=1))
+    return publisher if publisher.start() else None
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Brenner-Takte aus der Vorlauftemperatur
+=============================================================
+
+Erkennt Brenner Start/Stop inkrementell aus dem Anstieg der Kessel-
+Vorlauftemperatur ([burner] sensor): steigt die geglättete Änderungsrate
+über start_rate (K/h), läuft der Brenner; fällt sie unter stop_rate, ist
+er aus. Die beiden Schwellen bilden eine Hysterese - Plateaus bei
+modulierendem Betrieb beenden keinen Lauf.
+
+Die geglättete Rate erkennt einen Wechsel erst einige Messungen später.
+Als Zeitpunkt eines Ereignisses gilt daher der Wendepunkt der
+Vorlauftemperatur: das Minimum vor dem Anstieg (Start) bzw. das Maximum
+vor dem Abfall (Stop) - Laufzeiten werden dadurch nicht um die
+Erkennungsverzögerung verlängert.
+
+Laufende Kennzahlen mit konstantem Speicher statt Flux Fensterabfragen
+über Wochen:
+
+    starts_today        Starts seit Mitternacht (lokale Zeit)
+    starts_per_day      Mittel über alle abgeschlossenen Tage
+    mean_run_time       mittlere Laufzeit (s)
+    short_cycles        Läufe kürzer als short_cycle
+    short_cycle_ratio   Anteil kurzer Läufe an allen Läufen (0-1)
+
+Ereignisse sendet der Reader sofort bei der Erkennung über eine eigene
+MQTT Verbindung ([burner] mqtt) - ihr Zeitpunkt liegt oft Minuten vor der
+Erkennung, eine Zeitfenster-Abfrage der Bridge würde sie verpassen:
+
+    <prefix>/burner/event       Start/Stop (nicht retained, je Ereignis eine Nachricht)
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from derived import RateOfChange
+from downsampling import parse_duration
+from mqtt_publish import MQTT_AVAILABLE, MqttConnection
+
+logger = logging.getLogger(__name__)
+
+
+class BurnerDetector:
+    """Zustandsautomat Brenner an/aus mit laufenden Takt-Kennzahlen"""
+
+    def __init__(self, sensor_id: str, start_rate: float = 30.0, stop_rate: float = -10.0,
+                 smoothing: float = 60.0, short_cycle: float = 600.0):
+        if stop_rate >= start_rate:
+            raise ValueError(f"[burner] stop_rate ({stop_rate}) muss kleiner als start_rate ({start_rate}) sein")
+        self.sensor_id = sensor_id
+        self.start_rate = start_rate
+        self.stop_rate = stop_rate
+        self.short_cycle = short_cycle
+        self.rate = RateOfChange(smoothing)
+
+        self.running = False
+        self.run_started: Optional[float] = None
+        self.last_stop: Optional[float] = None
+        # Wendepunkt seit dem letzten Ereignis: Minimum (aus) bzw. Maximum (an)
+        self._turn_value: Optional[float] = None
+        self._turn_time: Optional[float] = None
+
+        # Laufende Zähler
+        self.starts_total = 0
+        self.runs_completed = 0
+        self.run_seconds_total = 0.0
+        self.short_cycles = 0
+        self.starts_today = 0
+        self._day: Optional[int] = None         # Ordinal des aktuellen Tags
+        self._days_completed = 0
+        self._starts_completed_days = 0
+
+    @classmethod
+    def from_config(cls, config) -> Optional["BurnerDetector"]:
+        """Erkennung laut [burner] (ohne sensor: None)"""
+        sensor_id = config.get('burner', 'sensor', fallback='').strip()
+        if not sensor_id:
+            return None
+        detector = cls(sensor_id,
+                       start_rate=config.getfloat('burner', 'start_rate', fallback=30.0),
+                       stop_rate=config.getfloat('burner', 'stop_rate', fallback=-10.0),
+                       smoothing=config.getfloat('burner', 'smoothing', fallback=60.0),
+                       short_cycle=parse_duration(config.get('burner', 'short_cycle', fallback='10m')))
+        logger.info(f"🔥 Brenner-Erkennung: {sensor_id} (Start ab {detector.start_rate:+.0f} K/h, "
+                    f"Stop ab {detector.stop_rate:+.0f} K/h)")
+        return detector
+
+    @property
+    def starts_per_day(self) -> float:
+        if self._days_completed:
+            return self._starts_completed_days / self._days_completed
+        return float(self.starts_today)
+
+    @property
+    def mean_run_time(self) -> Optional[float]:
+        if not self.runs_completed:
+            return None
+        return self.run_seconds_total / self.runs_completed
+
+    @property
+    def short_cycle_ratio(self) -> Optional[float]:
+        if not self.runs_completed:
+            return None
+        return self.short_cycles / self.runs_completed
+
+    def _roll_day(self, timestamp: float):
+        day = datetime.fromtimestamp(timestamp).toordinal()
+        if self._day is not None and day > self._day:
+            # Tage ohne Messung zählen mit 0 Starts
+            self._starts_completed_days += self.starts_today
+            self._days_completed += day - self._day
+            self.starts_today = 0
+        if self._day is None or day > self._day:
+            self._day = day
+
+    def add(self, timestamp: float, temperature: float) -> List[Dict]:
+        """Messung der Vorlauftemperatur übernehmen - gibt erkannte Ereignisse zurück"""
+        if self.rate.timestamp is not None and timestamp <= self.rate.timestamp:
+            return []       # Messung schon übernommen
+        rate = self.rate.update(timestamp, temperature)
+        # Bei gleichen Werten gilt der spätere Zeitpunkt (Plateau bis zum Abfall gehört zum Lauf)
+        if (self._turn_value is None or (temperature >= self._turn_value if self.running
+                                         else temperature <= self._turn_value)):
+            self._turn_value = temperature
+            self._turn_time = timestamp
+        if rate is None:
+            self._roll_day(timestamp)
+            return []
+
+        events = []
+        if not self.running and rate >= self.start_rate:
+            self._roll_day(self._turn_time)
+            self.running = True
+            self.run_started = self._turn_time
+            self.starts_total += 1
+            self.starts_today += 1
+            event = {'event': 'start', 'timestamp': self._turn_time, 'temperature': self._turn_value}
+            if self.last_stop is not None:
+                event['pause'] = self._turn_time - self.last_stop
+            logger.info(f"🔥 Brenner Start bei {self._turn_value:.1f}°C ({rate:+.0f} K/h)")
+            events.append(event)
+            self._turn_value, self._turn_time = temperature, timestamp
+
+        elif self.running and rate <= self.stop_rate:
+            run_time = self._turn_time - self.run_started
+            short = run_time < self.short_cycle
+            self.running = False
+            self.last_stop = self._turn_time
+            self.runs_completed += 1
+            self.run_seconds_total += run_time
+            if short:
+                self.short_cycles += 1
+            logger.info(f"🧯 Brenner Stop bei {self._turn_value:.1f}°C nach {run_time / 60:.1f} min"
+                        f"{' (Kurztakt)' if short else ''}")
+            events.append({'event': 'stop', 'timestamp': self._turn_time, 'temperature': self._turn_value,
+                           'run_time': run_time, 'short_cycle': short})
+            self._turn_value, self._turn_time = temperature, timestamp
+
+        self._roll_day(timestamp)
+        return events
+
+    def update(self, sensor_data: Dict, now: float) -> Optional[Dict]:
+        """
+        Werte eines Lese-Zyklus übernehmen
+
+        Returns:
+            Zustand und Kennzahlen mit den Ereignissen dieses Zyklus
+            ("events") - None ohne gültigen Wert des Vorlauf-Sensors
+        """
+        temperature = sensor_data.get('temperatures', {}).get(self.sensor_id)
+        if temperature is None:
+            return None
+        acquired = sensor_data.get('acquired', {}).get(self.sensor_id, now)
+        events = self.add(acquired, temperature)
+        return dict(self.state(), events=events, acquired=acquired)
+
+    def state(self) -> Dict:
+        """Aktueller Zustand und laufende Kennzahlen"""
+        return {
+            'running': self.running,
+            'rate': self.rate.rate,
+            'starts_today': self.starts_today,
+            'starts_total': self.starts_total,
+            'starts_per_day': self.starts_per_day,
+            'mean_run_time': self.mean_run_time,
+            'short_cycles': self.short_cycles,
+            'short_cycle_ratio': self.short_cycle_ratio
+        }
+
+
+def event_message(event: Dict) -> str:
+    """Ereignis als MQTT Payload (Zeitpunkt als ISO 8601, Werte auf 0.1 gerundet)"""
+    payload = {key: (round(value, 1) if isinstance(value, float) else value)
+               for key, value in event.items() if key != 'timestamp'}
+    payload['time'] = datetime.fromtimestamp(event['timestamp'], timezone.utc).isoformat(timespec='seconds')
+    return json.dumps(payload)
+
+
+class BurnerPublisher(MqttConnection):
+    """
+    Eigene MQTT Verbindung des Readers für Brenner-Ereignisse
+
+    Jedes Ereignis wird bei der Erkennung gesendet; bei getrenntem Broker
+    hält der Offline-Puffer alle Ereignisse (begrenzte FIFO) bis zum
+    Reconnect.
+    """
+
+    def __init__(self, broker: str, port: int = 1883, prefix: str = 'pi5_heizung',
+                 username: str = '', password: str = '', qos: int = 1):
+        super().__init__(broker, port, username=username, password=password, qos=qos, label='Brenner')
+        self.topic = f"{prefix}/burner/event"
+
+    def start(self) -> bool:
+        if not super().start():
+            return False
+        logger.info(f"🔥 Brenner MQTT: {self.broker}:{self.port} → {self.topic}")
+        return True
+
+    def publish(self, events: List[Dict]):
+        """Ereignisse eines Zyklus senden (je Ereignis eine Nachricht)"""
+        for event in events:
+            self.send(self.topic, event_message(event), retain=False, topic_class='burner', coalesce=False)
+
+
+def start_burner_publisher(config) -> Optional[BurnerPublisher]:
+    """MQTT Verbindung für Brenner-Ereignisse laut [mqtt] starten ([burner] mqtt = false oder ohne paho: None)"""
+    if not config.getboolean('burner', 'mqtt', fallback=True):
+        return None
+    if not MQTT_AVAILABLE:
+        logger.warning("⚠️ Brenner-Ereignisse ohne MQTT - pip install paho-mqtt")
+        return None
+
+    publisher = BurnerPublisher(config.get('mqtt', 'broker', fallback='localhost'),
+                                port=config.getint('mqtt', 'port', fallback=1883),
+                                prefix=config.get('mqtt', 'topic_prefix', fallback='pi5_heizung'),
+                                username=config.get('mqtt', 'username', fallback=''),
+                                password=config.get('mqtt', 'password', fallback=''),
+                                qos=config.getint('burner', 'qos', fallback=1))
+    return publisher if publisher.start() else None
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Abgeleitete Heizkreis-Werte
+=================================================
+
+Ordnet Vorlauf- und Rücklauf-Sensoren Heizkreisen zu ([circuits]) und
+berechnet je Lese-Zyklus inkrementell:
+
+    delta_t        Spreizung Vorlauf - Rücklauf (K)
+    supply_rate    Änderung der Vorlauftemperatur (K/h, geglättet)
+    return_rate    Änderung der Rücklauftemperatur (K/h, geglättet)
+
+Die Änderungsraten sind exponentiell geglättet (Zeitkonstante
+[circuits] smoothing, Standard 300s) - die 0.0625°C Auflösung der DS18B20
+würde sonst bei 30s Intervall Sprünge von ±7.5 K/h erzeugen. Der Zustand
+je Heizkreis ist konstant (letzter Wert, Zeitpunkt, Rate); Grafana und
+Home Assistant lesen die Werte als eigene Serie statt per Join.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import logging
+import math
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateOfChange:
+    """Geglättete Änderungsrate einer Messreihe in Einheiten pro Stunde"""
+
+    __slots__ = ('time_constant', 'value', 'timestamp', 'rate')
+
+    def __init__(self, time_constant: float = 300.0):
+        self.time_constant = time_constant
+        self.value: Optional[float] = None
+        self.timestamp: Optional[float] = None
+        self.rate: Optional[float] = None
+
+    def update(self, timestamp: float, value: float) -> Optional[float]:
+        """Neue Messung übernehmen - gibt die Rate zurück (None bis zur zweiten Messung)"""
+        if self.timestamp is not None:
+            elapsed = timestamp - self.timestamp
+            if elapsed <= 0:
+                return self.rate    # gleiche Messung (z.B. Cache-Treffer)
+            instant = (value - self.value) / elapsed * 3600
+            if self.rate is None or self.time_constant <= 0:
+                self.rate = instant
+            else:
+                self.rate += (1 - math.exp(-elapsed / self.time_constant)) * (instant - self.rate)
+        self.value = value
+        self.timestamp = timestamp
+        return self.rate
+
+
+class Circuit:
+    """Heizkreis: Vorlauf- und Rücklauf-Sensor"""
+
+    def __init__(self, circuit_id: str, name: str, supply: str, return_sensor: str):
+        self.circuit_id = circuit_id
+        self.name = name
+        self.supply = supply
+        self.return_sensor = return_sensor
+
+    def __repr__(self):
+        return f"Circuit({self.circuit_id}: {self.supply} → {self.return_sensor})"
+
+
+def load_circuits(config) -> List[Circuit]:
+    """
+    Heizkreise laut [circuits]: <id> = <vorlauf_sensor>, <ruecklauf_sensor>[, <Anzeigename>]
+
+    Optionen ohne zwei Sensor-IDs (z.B. smoothing) werden übersprungen.
+    """
+    circuits = []
+    if not config.has_section('circuits'):
+        return circuits
+    for circuit_id, value in config.items('circuits'):
+        parts = [part.strip() for part in value.split(',')]
+        if len(parts) < 2 or not all(parts[:2]):
+            continue
+        name = parts[2] if len(parts) > 2 and parts[2] else circuit_id.upper()
+        circuits.append(Circuit(circuit_id, name, parts[0], parts[1]))
+    return circuits
+
+
+class DerivedMetrics:
+    """Spreizung und Änderungsraten aller Heizkreise je Lese-Zyklus"""
+
+    def __init__(self, circuits: List[Circuit], smoothing: float = 300.0):
+        self.circuits = circuits
+        self._rates: Dict[str, RateOfChange] = {}
+        for circuit in circuits:
+            self._rates.setdefault(circuit.supply, RateOfChange(smoothing))
+            self._rates.setdefault(circuit.return_sensor, RateOfChange(smoothing))
+
+    @classmethod
+    def from_config(cls, config) -> Optional["DerivedMetrics"]:
+        """Heizkreise laut [circuits] (keine Heizkreise: None)"""
+        circuits = load_circuits(config)
+        if not circuits:
+            return None
+        logger.info(f"🔥 {len(circuits)} Heizkreise: " + ", ".join(c.name for c in circuits))
+        return cls(circuits, config.getfloat('circuits', 'smoothing', fallback=300.0))
+
+    def update(self, sensor_data: Dict, now: float) -> Dict[str, Dict]:
+        """
+        Werte eines Lese-Zyklus übernehmen
+
+        Returns:
+            {circuit_id: {"name", "supply", "return", "delta_t", "supply_rate",
+                          "return_rate", "acquired"}} - nur Heizkreise mit beiden Werten
+        """
+        temperatures = sensor_data.get('temperatures', {})
+        acquired = sensor_data.get('acquired', {})
+
+        # Raten je Sensor einmal aktualisieren (ein Sensor kann in mehreren Kreisen stehen)
+        rates = {}
+        for sensor_id, rate in self._rates.items():
+            if temperatures.get(sensor_id) is not None:
+                rates[sensor_id] = rate.update(acquired.get(sensor_id, now), temperatures[sensor_id])
+
+        derived = {}
+        for circuit in self.circuits:
+            supply = temperatures.get(circuit.supply)
+            return_value = temperatures.get(circuit.return_sensor)
+            if supply is None or return_value is None:
+                continue
+            derived[circuit.circuit_id] = {
+                'name': circuit.name,
+                'supply': supply,
+                'return': return_value,
+                'delta_t': supply - return_value,
+                'supply_rate': rates.get(circuit.supply),
+                'return_rate': rates.get(circuit.return_sensor),
+                'acquired': max(acquired.get(circuit.supply, now), acquired.get(circuit.return_sensor, now))
+            }
+        return derived
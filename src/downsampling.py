@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Verdichtung vor dem Schreiben (Downsampling)
+==================================================================
+
+Inkrementelle Aggregation je Sensor und Zeitfenster direkt im Reader:
+pro Stufe (z.B. 1m, 1h) wird je Sensor nur das laufende Fenster gehalten
+(min, max, Summe, Anzahl) - O(1) Speicher und Rechenzeit je Messung.
+Ist ein Fenster abgeschlossen, wird es als ein Punkt mit den Feldern
+min/max/mean/count in den Bucket der Stufe geschrieben:
+
+    temperature,sensor_id=28-…,name=HK1\\ Vorlauf min=41.2,max=43.0,mean=42.1,count=2i <Fensterbeginn>
+
+Jede Stufe hat einen eigenen Bucket mit eigener Aufbewahrung
+([downsampling] bucket_<stufe>, retention_<stufe>) - Grafana Jahresansichten
+lesen dann die vorverdichteten Daten statt aller Rohpunkte.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+_DURATION = re.compile(r'^(\d+)([smhdw])$')
+
+
+def parse_duration(text: str) -> int:
+    """Dauer wie "1m", "1h", "90d" in Sekunden ("0" = unbegrenzt)"""
+    text = text.strip()
+    if text == '0':
+        return 0
+    match = _DURATION.match(text)
+    if not match:
+        raise ValueError(f"Ungültige Dauer: {text!r} (z.B. 30s, 1m, 1h, 90d)")
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def downsampling_mode(config) -> Optional[str]:
+    """
+    "edge" (Reader verdichtet vor dem Schreiben), "task" (InfluxDB Tasks
+    verdichten den Roh-Bucket, siehe provisioning.py) oder None (aus)
+    """
+    if not config.getboolean('downsampling', 'enabled', fallback=False):
+        return None
+    mode = config.get('downsampling', 'mode', fallback='edge')
+    if mode not in ('edge', 'task'):
+        raise ValueError(f"[downsampling] mode: {mode!r} (edge oder task)")
+    return mode
+
+
+def load_tiers(config) -> List["Tier"]:
+    """
+    Stufen laut [downsampling] tiers
+
+    Bucket je Stufe: bucket_<stufe> (Standard "<bucket>_<stufe>"), Aufbewahrung:
+    retention_<stufe>. Liegt eine Stufe im Roh-Bucket, bekommt das
+    Measurement den Suffix "_<stufe>".
+    """
+    raw_bucket = config.get('database', 'bucket', fallback='sensors')
+    tiers = []
+    for name in config.get('downsampling', 'tiers', fallback='1m, 1h').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        bucket = config.get('downsampling', f'bucket_{name}', fallback=f"{raw_bucket}_{name}")
+        retention = parse_duration(config.get('downsampling', f'retention_{name}', fallback='0'))
+        suffix = f"_{name}" if bucket == raw_bucket else ''
+        tiers.append(Tier(name, bucket, retention, suffix))
+    return tiers
+
+
+class Tier:
+    """Verdichtungsstufe: Fensterlänge, Ziel-Bucket und Aufbewahrung"""
+
+    def __init__(self, name: str, bucket: str, retention: int = 0, measurement_suffix: str = ''):
+        self.name = name
+        self.seconds = parse_duration(name)
+        self.bucket = bucket
+        self.retention = retention                  # Sekunden, 0 = unbegrenzt
+        self.measurement_suffix = measurement_suffix
+
+    def __repr__(self):
+        return f"Tier({self.name}, bucket={self.bucket})"
+
+
+class Aggregate:
+    """Laufendes bzw. abgeschlossenes Fenster eines Sensors"""
+
+    __slots__ = ('tier', 'measurement', 'sensor_id', 'start', 'count', 'min', 'max', 'sum', 'last_timestamp')
+
+    def __init__(self, tier: Tier, measurement: str, sensor_id: str, start: int):
+        self.tier = tier
+        self.measurement = measurement
+        self.sensor_id = sensor_id
+        self.start = start          # Fensterbeginn (Unix-Zeit, auf die Fensterlänge ausgerichtet)
+        self.count = 0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.sum = 0.0
+        self.last_timestamp = float('-inf')
+
+    def add(self, timestamp: float, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.last_timestamp = timestamp
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count
+
+
+class Downsampler:
+    """
+    Aggregation aller Sensoren über alle Stufen
+
+    add() liefert die Fenster, die durch die neue Messung abgeschlossen
+    wurden; flush() beim Beenden die angefangenen Fenster.
+    """
+
+    def __init__(self, tiers: List[Tier]):
+        self.tiers = tiers
+        self._windows: Dict[Tuple[str, str, str], Aggregate] = {}
+        self.stats = {'samples': 0, 'closed': 0}
+
+    @classmethod
+    def from_config(cls, config) -> Optional["Downsampler"]:
+        """Verdichtung im Reader laut [downsampling] (None: aus oder mode = task)"""
+        if downsampling_mode(config) != 'edge':
+            return None
+        tiers = load_tiers(config)
+        return cls(tiers) if tiers else None
+
+    def add(self, measurement: str, sensor_id: str, timestamp: float, value: float) -> List[Aggregate]:
+        """Messung in alle Stufen übernehmen - gibt abgeschlossene Fenster zurück"""
+        closed = []
+        self.stats['samples'] += 1
+        for tier in self.tiers:
+            key = (tier.name, measurement, sensor_id)
+            start = int(timestamp // tier.seconds) * tier.seconds
+            window = self._windows.get(key)
+            if window is not None and timestamp <= window.last_timestamp:
+                continue    # Messung schon übernommen (z.B. DHT22 Cache-Treffer)
+            if window is None or start > window.start:
+                if window is not None:
+                    closed.append(window)
+                window = self._windows[key] = Aggregate(tier, measurement, sensor_id, start)
+            window.add(timestamp, value)
+        self.stats['closed'] += len(closed)
+        return closed
+
+    def add_cycle(self, sensor_data: Dict, now: float) -> List[Aggregate]:
+        """Gültige Werte eines Lese-Zyklus übernehmen (Zeitstempel: Messzeitpunkt je Sensor)"""
+        closed = []
+        acquired = sensor_data.get('acquired', {})
+        for measurement, values in (('temperature', sensor_data.get('temperatures', {})),
+                                    ('humidity', sensor_data.get('humidity', {}))):
+            for sensor_id, value in values.items():
+                if value is not None:
+                    closed.extend(self.add(measurement, sensor_id, acquired.get(sensor_id, now), float(value)))
+        return closed
+
+    def flush(self) -> List[Aggregate]:
+        """Angefangene Fenster abschließen (beim Beenden des Readers)"""
+        windows = list(self._windows.values())
+        self._windows.clear()
+        self.stats['closed'] += len(windows)
+        return windows
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Ausreißer-Filter je Sensor
+================================================
+
+Filterkette je Messreihe zwischen dem Auslesen und allen weiteren Stufen
+(Heizkreise, Brenner, Alarme, Historie, InfluxDB). Jede Stufe prüft eine
+Messung mit O(1) bzw. O(window) Aufwand - ohne erneutes Lesen des Sensors:
+
+    reset85             DS18B20 Power-On Wert 85.0°C ohne passende Vorgeschichte
+                        (nach 3 Ablehnungen in Folge gilt der nächste als echte Messung)
+    slope:<K/min>       Sprung schneller als erlaubt (nach 3 gleichgerichteten
+                        Ablehnungen gilt der neue Wert als echte Änderung)
+    median:<n>:<K>      Abweichung vom gleitenden Median der letzten n Werte
+    ewma:<s>            Glättung mit Zeitkonstante (ersetzt den Wert)
+
+Konfiguration ([filters]): Ketten für alle DS18B20 (ds18b20), DHT22
+Temperatur (dht22) und Luftfeuchtigkeit (dht22_humidity) sowie je
+Sensor-ID. action = drop verwirft Ausreißer, action = flag schreibt sie
+zusätzlich als Measurement "outlier" - in den Messwerten fehlen sie in
+beiden Fällen.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DS18B20_POWER_ON = 85.0
+
+
+class FilterStage:
+    """Basisklasse: check() gibt (Wert, None) oder (None, Grund) zurück"""
+
+    name = 'stage'
+    transform = False       # ersetzt den Wert (nur für angenommene Messungen)
+
+    def check(self, timestamp: float, value: float) -> Tuple[Optional[float], Optional[str]]:
+        raise NotImplementedError
+
+    def accept(self, timestamp: float, value: float):
+        """Von der Kette angenommene Messung (Vorgeschichte der Stufe)"""
+
+    def reject(self, timestamp: float, value: float, reason: str):
+        """Von der Kette abgelehnte Messung"""
+
+
+class PowerOnResetFilter(FilterStage):
+    """DS18B20 meldet nach Spannungseinbruch 85.0°C bis zur ersten Konvertierung"""
+
+    name = 'reset85'
+
+    def __init__(self, max_jump: float = 2.0, max_repeats: int = 3):
+        self.max_jump = max_jump
+        self.max_repeats = int(max_repeats)
+        self.last: Optional[float] = None
+        self._repeats = 0
+
+    def check(self, timestamp, value):
+        if value == DS18B20_POWER_ON and (self.last is None or abs(value - self.last) > self.max_jump):
+            # Reset liefert einzelne Werte - bleibt der Sensor bei 85.0°C (z.B. Vorlauf
+            # ab Start), gilt der Wert nach max_repeats Ablehnungen in Folge als echt
+            self._repeats += 1
+            if self._repeats <= self.max_repeats:
+                return None, self.name
+        self._repeats = 0
+        return value, None
+
+    def accept(self, timestamp, value):
+        self.last = value
+
+
+class SlopeGate(FilterStage):
+    """Maximale Änderung je Minute gegenüber dem letzten angenommenen Wert"""
+
+    name = 'slope'
+
+    def __init__(self, max_per_minute: float, max_rejects: int = 3):
+        self.max_per_minute = max_per_minute
+        self.max_rejects = max_rejects
+        self.last: Optional[Tuple[float, float]] = None
+        self._rejected = 0
+        self._direction = 0
+
+    def check(self, timestamp, value):
+        if self.last is None:
+            return value, None
+        last_timestamp, last_value = self.last
+        elapsed = max(timestamp - last_timestamp, 1.0)
+        change = value - last_value
+        if abs(change) <= self.max_per_minute * elapsed / 60:
+            self._rejected = 0
+            return value, None
+
+        # Echter Sprung (z.B. Sensor umgesteckt, Brenner nach langer Pause):
+        # mehrere Ablehnungen in dieselbe Richtung → neuer Wert wird übernommen
+        direction = 1 if change > 0 else -1
+        self._rejected = self._rejected + 1 if direction == self._direction else 1
+        self._direction = direction
+        if self._rejected > self.max_rejects:
+            self._rejected = 0
+            return value, None
+        return None, self.name
+
+    def accept(self, timestamp, value):
+        self.last = (timestamp, value)
+
+
+class RollingMedian(FilterStage):
+    """Abweichung vom Median der letzten window angenommenen Werte (O(window) je Messung)"""
+
+    name = 'median'
+
+    def __init__(self, window: int = 5, max_deviation: float = 3.0):
+        self.window = deque(maxlen=max(3, window))
+        self.max_deviation = max_deviation
+
+    @property
+    def median(self) -> Optional[float]:
+        if len(self.window) < 3:
+            return None
+        ordered = sorted(self.window)
+        middle = len(ordered) // 2
+        return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+    def check(self, timestamp, value):
+        median = self.median
+        if median is not None and abs(value - median) > self.max_deviation:
+            return None, self.name
+        return value, None
+
+    def accept(self, timestamp, value):
+        self.window.append(value)
+
+    def reject(self, timestamp, value, reason):
+        # Abgelehnte Werte gehen ins Fenster - eine echte Stufe setzt sich nach window/2 Messungen
+        # durch. Ausnahme: 85°C Power-On Werte (Häufung würde den Median verschieben)
+        if reason != PowerOnResetFilter.name:
+            self.window.append(value)
+
+
+class Ewma(FilterStage):
+    """Exponentielle Glättung mit Zeitkonstante (Sekunden) - ersetzt den Wert"""
+
+    name = 'ewma'
+    transform = True
+
+    def __init__(self, time_constant: float = 60.0):
+        self.time_constant = time_constant
+        self.value: Optional[float] = None
+        self.timestamp: Optional[float] = None
+
+    def check(self, timestamp, value):
+        if self.value is None or self.time_constant <= 0:
+            smoothed = value
+        else:
+            weight = 1 - math.exp(-max(timestamp - self.timestamp, 0.0) / self.time_constant)
+            smoothed = self.value + weight * (value - self.value)
+        self.value, self.timestamp = smoothed, timestamp
+        return smoothed, None
+
+
+def parse_stage(spec: str) -> FilterStage:
+    """Stufe aus Spezifikation wie "reset85", "reset85:2:3", "slope:5", "median:5:3", "ewma:60" """
+    parts = [part.strip() for part in spec.strip().split(':')]
+    name, params = parts[0], [float(part) for part in parts[1:]]
+    try:
+        if name == 'reset85':
+            return PowerOnResetFilter(*params)
+        if name == 'slope':
+            return SlopeGate(params[0], *(int(p) for p in params[1:]))
+        if name == 'median':
+            return RollingMedian(int(params[0]) if params else 5, *params[1:])
+        if name == 'ewma':
+            return Ewma(*params)
+    except (IndexError, TypeError) as e:
+        raise ValueError(f"Ungültiger Filter {spec!r}: {e}")
+    raise ValueError(f"Unbekannter Filter {spec!r} (reset85, slope:<K/min>, median:<n>:<K>, ewma:<s>)")
+
+
+class FilterChain:
+    """
+    Filterstufen einer Messreihe
+
+    Alle prüfenden Stufen sehen jede Messung (auch abgelehnte - sonst
+    könnte sich eine echte Stufe in Median und Anstiegs-Sperre nie
+    durchsetzen); Grund ist die erste ablehnende Stufe. Glättende Stufen
+    laufen nur für angenommene Messungen.
+    """
+
+    def __init__(self, stages: List[FilterStage]):
+        self.stages = stages
+        self.last_timestamp: Optional[float] = None
+        self.last_result: Tuple[Optional[float], Optional[str]] = (None, None)
+
+    def process(self, timestamp: float, value: float) -> Tuple[Optional[float], Optional[str]]:
+        """Messung prüfen - (Wert, None) oder (None, Grund)"""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return self.last_result     # Messung schon geprüft (DHT22 Cache-Treffer)
+        result, reason = value, None
+        for stage in self.stages:
+            if stage.transform:
+                if not reason:
+                    result, _ = stage.check(timestamp, result)
+                continue
+            _, rejected = stage.check(timestamp, value)
+            reason = reason or rejected
+        if reason:
+            result = None
+            for stage in self.stages:
+                stage.reject(timestamp, value, reason)
+        else:
+            for stage in self.stages:
+                stage.accept(timestamp, value)  # Vorgeschichte der Prüfungen: ungeglätteter Wert
+        self.last_timestamp = timestamp
+        self.last_result = (result, reason)
+        return self.last_result
+
+
+class SampleFilter:
+    """
+    Filterketten aller Sensoren
+
+    Schlüssel wie in der Historie: Sensor-ID für Temperaturen,
+    "<sensor_id>_humidity" für Luftfeuchtigkeit.
+    """
+
+    def __init__(self, specs: Dict[str, str], flag: bool = False):
+        self.specs = specs
+        self.flag = flag
+        self._chains: Dict[str, Optional[FilterChain]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}      # Schlüssel → {Grund: Anzahl}
+        for spec in specs.values():
+            self._build(spec)       # Konfigurationsfehler beim Start melden
+
+    @classmethod
+    def from_config(cls, config) -> Optional["SampleFilter"]:
+        """Filter laut [filters] (enabled = false oder ohne Sektion: None)"""
+        if not config.getboolean('filters', 'enabled', fallback=False):
+            return None
+        specs = {key: value for key, value in config.items('filters') if key not in ('enabled', 'action')}
+        action = config.get('filters', 'action', fallback='drop')
+        if action not in ('drop', 'flag'):
+            raise ValueError(f"[filters] action: {action!r} (drop oder flag)")
+        logger.info(f"🧹 Ausreißer-Filter ({action}): " + "; ".join(f"{k} = {v}" for k, v in specs.items()))
+        return cls(specs, flag=action == 'flag')
+
+    @staticmethod
+    def _build(spec: str) -> Optional[FilterChain]:
+        stages = [parse_stage(part) for part in spec.split(',') if part.strip()]
+        return FilterChain(stages) if stages else None
+
+    def _spec_for(self, key: str) -> Optional[str]:
+        if key in self.specs:
+            return self.specs[key]
+        if key.endswith('_humidity'):
+            return self.specs.get('dht22_humidity')
+        return self.specs.get('dht22' if key == 'dht22' else 'ds18b20')
+
+    def chain(self, key: str) -> Optional[FilterChain]:
+        if key not in self._chains:
+            spec = self._spec_for(key)
+            self._chains[key] = self._build(spec) if spec else None
+        return self._chains[key]
+
+    def apply(self, sensor_data: Dict, now: float) -> Dict[str, Dict]:
+        """
+        Werte eines Lese-Zyklus filtern (in sensor_data, abgelehnte Werte werden None)
+
+        Returns:
+            {schlüssel: {"sensor_id", "measurement", "value", "reason", "acquired"}} der Ausreißer
+        """
+        outliers = {}
+        acquired = sensor_data.get('acquired', {})
+        for measurement, values in (('temperature', sensor_data.get('temperatures', {})),
+                                    ('humidity', sensor_data.get('humidity', {}))):
+            for sensor_id, value in values.items():
+                if value is None:
+                    continue
+                key = sensor_id if measurement == 'temperature' else f"{sensor_id}_humidity"
+                chain = self.chain(key)
+                if chain is None:
+                    continue
+                timestamp = acquired.get(sensor_id, now)
+                repeated = chain.last_timestamp is not None and timestamp <= chain.last_timestamp
+                result, reason = chain.process(timestamp, value)
+                values[sensor_id] = result
+                if reason and not repeated:
+                    counts = self.stats.setdefault(key, {})
+                    counts[reason] = counts.get(reason, 0) + 1
+                    outliers[key] = {'sensor_id': sensor_id, 'measurement': measurement,
+                                     'value': value, 'reason': reason, 'acquired': timestamp}
+                    logger.warning(f"🧹 Ausreißer {key}: {value} ({reason})")
+        return outliers
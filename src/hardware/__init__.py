@@ -1,5 +1,7 @@
 # Hardware Sensoren Modul
 from .ds18b20_sensor import DS18B20Reader
 from .dht22_sensor import DHT22Reader
+from .simulation import SimulatedHardware, VirtualClock
+from .replay import ReplayHardware, SessionRecorder
 
-__all__ = ['DS18B20Reader', 'DHT22Reader']
+__all__ = ['DS18B20Reader', 'DHT22Reader', 'SimulatedHardware', 'VirtualClock', 'ReplayHardware', 'SessionRecorder']
@@ -12,13 +12,23 @@ Autor: Pi5 Heizungs Messer Project
 import time
 import logging
 from typing import Dict, Optional
-import board
-import digitalio
+
+# Blinka (board/digitalio) nur auf dem Pi verfügbar - ohne Blinka bleibt
+# der Reader mit einem simulierten Device (hardware.simulation) nutzbar
+try:
+    import board
+    import digitalio
+    BOARD_AVAILABLE = True
+except (ImportError, NotImplementedError, RuntimeError):
+    board = None
+    digitalio = None
+    BOARD_AVAILABLE = False
 
 try:
     import adafruit_dht
     DHT_AVAILABLE = True
-except ImportError:
+except (ImportError, NotImplementedError, RuntimeError):
+    adafruit_dht = None
     DHT_AVAILABLE = False
     print("❌ DHT Library nicht verfügbar - installiere: pip install adafruit-circuitpython-dht")
 
@@ -31,19 +41,36 @@ class DHT22Reader:
     Temperatur und Luftfeuchtigkeit
     """
     
-    def __init__(self, gpio_pin: int = 18):
+    def __init__(self, gpio_pin: int = 18, device=None, clock=None):
         """
         Initialisiere DHT22 Reader
         
         Args:
             gpio_pin: GPIO Pin Nummer (Board Pinout)
+            device: Fertiges Sensor-Objekt mit temperature/humidity/exit()
+                    (z.B. SimulatedDHT22) statt adafruit_dht am GPIO
+            clock: Uhr für Cache und Pausen (Standard: time Modul,
+                   z.B. hardware.simulation.VirtualClock für Dauertests)
         """
         self.gpio_pin = gpio_pin
+        self.clock = clock or time
         self.dht_device = None
         self.last_reading = None
         self.last_reading_time = 0
         self.min_read_interval = 2.0  # DHT22 benötigt mindestens 2s zwischen Messungen
         
+        # Lese-Statistik (für Metriken)
+        self.stats = {'reads': 0, 'errors': 0, 'out_of_range': 0, 'cache_hits': 0}
+        self.last_read_duration: Optional[float] = None   # None: letzter Aufruf aus dem Cache
+        
+        # Optionale Rohdaten-Aufzeichnung (hardware.replay.SessionRecorder)
+        self.recorder = None
+        
+        if device is not None:
+            self.dht_device = device
+            logger.info(f"✅ DHT22 Device übernommen: {type(device).__name__}")
+            return
+        
         if not DHT_AVAILABLE:
             logger.error("❌ DHT Library nicht verfügbar!")
             return
@@ -52,6 +79,10 @@ class DHT22Reader:
     
     def _initialize_sensor(self):
         """DHT22 Sensor initialisieren"""
+        if board is None:
+            logger.error("❌ Blinka (board) nicht verfügbar - DHT22 nur auf dem Raspberry Pi")
+            return
+        
         try:
             # GPIO Pin zu Board Pin konvertieren
             pin_map = {
@@ -92,37 +123,48 @@ class DHT22Reader:
         if not self.dht_device:
             return None
         
+        self.stats['reads'] += 1
+        started = time.perf_counter()
         try:
             # DHT22 auslesen
             temperature = self.dht_device.temperature
             humidity = self.dht_device.humidity
+            if self.recorder:
+                self.recorder.record_dht22(temperature, humidity, time.perf_counter() - started)
             
             # Plausibilitätsprüfung
             if temperature is None or humidity is None:
+                self.stats['errors'] += 1
                 return None
             
             # Temperatur Bereich: -40°C bis +80°C
             if temperature < -40 or temperature > 80:
                 logger.warning(f"⚠️ Temperatur außerhalb Bereich: {temperature}°C")
+                self.stats['out_of_range'] += 1
                 return None
             
             # Luftfeuchtigkeit Bereich: 0-100%
             if humidity < 0 or humidity > 100:
                 logger.warning(f"⚠️ Luftfeuchtigkeit außerhalb Bereich: {humidity}%")
+                self.stats['out_of_range'] += 1
                 return None
             
             return {
                 'temperature': round(temperature, 1),
                 'humidity': round(humidity, 1),
-                'timestamp': time.time()
+                'timestamp': self.clock.time()
             }
             
         except RuntimeError as e:
             # DHT Sensoren können gelegentlich Lesefehler haben
+            if self.recorder:
+                self.recorder.record_dht22(None, None, time.perf_counter() - started, error=str(e))
             logger.debug(f"DHT22 Lesefehler (normal): {e}")
+            self.stats['errors'] += 1
             return None
         except Exception as e:
             logger.error(f"❌ DHT22 Unerwarteter Fehler: {e}")
+            self.stats['errors'] += 1
             return None
     
     def read_sensor(self, use_cache: bool = True) -> Optional[Dict[str, float]]:
@@ -135,17 +177,21 @@ class DHT22Reader:
         Returns:
             Dict mit temperature, humidity, timestamp oder None bei Fehler
         """
-        current_time = time.time()
+        current_time = self.clock.time()
         
         # Cache prüfen
         if (use_cache and 
             self.last_reading and 
             (current_time - self.last_reading_time) < self.min_read_interval):
             logger.debug(f"DHT22 Cache verwendet (vor {current_time - self.last_reading_time:.1f}s)")
+            self.stats['cache_hits'] += 1
+            self.last_read_duration = None
             return self.last_reading
         
         # Neue Messung
+        started = time.perf_counter()
         data = self._read_sensor_raw()
+        self.last_read_duration = time.perf_counter() - started
         
         if data:
             self.last_reading = data
@@ -170,7 +216,7 @@ class DHT22Reader:
             
             if attempt < max_retries - 1:
                 logger.debug(f"DHT22 Versuch {attempt + 1} fehlgeschlagen, wiederhole...")
-                time.sleep(retry_delay)
+                self.clock.sleep(retry_delay)
         
         logger.warning(f"⚠️ DHT22: Alle {max_retries} Versuche fehlgeschlagen")
         return None
@@ -206,7 +252,7 @@ class DHT22Reader:
             else:
                 logger.warning(f"   Messung {i+1}: Fehlgeschlagen")
             
-            time.sleep(2.5)  # DHT22 benötigt Pause zwischen Messungen
+            self.clock.sleep(2.5)  # DHT22 benötigt Pause zwischen Messungen
         
         success_rate = (successful_reads / total_attempts) * 100
         logger.info(f"📊 DHT22 Test: {successful_reads}/{total_attempts} erfolgreich ({success_rate:.0f}%)")
@@ -24,12 +24,36 @@ class DS18B20Reader:
     Optimiert für Raspberry Pi 5 Hardware
     """
     
-    def __init__(self, config: configparser.ConfigParser = None):
-        """Initialisiere DS18B20 Reader"""
+    DEFAULT_W1_DEVICE_PATH = "/sys/bus/w1/devices/"
+    
+    def __init__(self, config: configparser.ConfigParser = None, w1_device_path: Optional[str] = None,
+                 clock=None):
+        """
+        Initialisiere DS18B20 Reader
+        
+        Args:
+            config: Konfiguration ([hardware] ds18b20_sensors, w1_device_path)
+            w1_device_path: 1-Wire Device-Verzeichnis (überschreibt die Konfiguration,
+                            z.B. simulierter Bus)
+            clock: Uhr für Messzeitpunkte und Pausen (Standard: time Modul)
+        """
         self.config = config
-        self.w1_device_path = "/sys/bus/w1/devices/"
+        self.clock = clock or time
+        if w1_device_path is None and config is not None:
+            w1_device_path = config.get('hardware', 'w1_device_path', fallback=None)
+        self.w1_device_path = os.path.join(w1_device_path or self.DEFAULT_W1_DEVICE_PATH, '')
         self.sensor_ids = []
         
+        # Lese-Statistik je Sensor (für Metriken, ohne Zusatzkosten im Hot-Path)
+        self.stats = {}
+        self.last_read_durations = {}
+        self.last_read_started = {}
+        
+        self.retry_delay = 0.1   # Pause zwischen Leseversuchen in Sekunden
+        
+        # Optionale Rohdaten-Aufzeichnung (hardware.replay.SessionRecorder)
+        self.recorder = None
+        
         # 1-Wire Interface prüfen
         if not self._check_w1_interface():
             logger.warning("⚠️ 1-Wire Interface nicht verfügbar")
@@ -40,7 +64,7 @@ class DS18B20Reader:
         """1-Wire Interface verfügbarkeit prüfen"""
         try:
             # Prüfe ob 1-Wire aktiviert ist
-            w1_masters = "/sys/bus/w1/devices/w1_bus_master1"
+            w1_masters = os.path.join(self.w1_device_path, "w1_bus_master1")
             if not os.path.exists(w1_masters):
                 logger.error("❌ 1-Wire Interface nicht aktiviert!")
                 logger.error("   Aktiviere mit: sudo raspi-config → Interface Options → 1-Wire")
@@ -110,18 +134,41 @@ class DS18B20Reader:
             logger.error(f"❌ Fehler bei Sensor-Erkennung: {e}")
             logger.error(f"   Prüfe 1-Wire Interface und Sensor-Verkabelung")
     
+    def _sensor_stats(self, sensor_id: str) -> Dict[str, int]:
+        """Statistik-Eintrag für Sensor (reads, crc_errors, errors, retries, failures)"""
+        stats = self.stats.get(sensor_id)
+        if stats is None:
+            stats = self.stats[sensor_id] = {
+                'reads': 0, 'crc_errors': 0, 'errors': 0, 'retries': 0, 'failures': 0
+            }
+        return stats
+    
     def read_temperature(self, sensor_id: str) -> Optional[float]:
         """Temperatur von spezifischem Sensor lesen"""
+        stats = self._sensor_stats(sensor_id)
+        stats['reads'] += 1
+        temp = self._read_temperature(sensor_id)
+        if temp is None:
+            stats['errors'] += 1
+        return temp
+    
+    def _read_temperature(self, sensor_id: str) -> Optional[float]:
+        """Sensor-Datei lesen und auswerten"""
         try:
             sensor_file = f"{self.w1_device_path}{sensor_id}/w1_slave"
             
             if not os.path.exists(sensor_file):
                 logger.error(f"❌ Sensor-Datei nicht gefunden: {sensor_file}")
+                if self.recorder:
+                    self.recorder.record_w1(sensor_id, None, 0.0, error="not found")
                 return None
             
             # Sensor-Datei lesen
+            started = time.perf_counter()
             with open(sensor_file, 'r') as f:
                 content = f.read()
+            if self.recorder:
+                self.recorder.record_w1(sensor_id, content, time.perf_counter() - started)
             
             # Daten validieren
             lines = content.strip().split('\n')
@@ -131,6 +178,7 @@ class DS18B20Reader:
             
             # CRC prüfen
             if 'YES' not in lines[0]:
+                self._sensor_stats(sensor_id)['crc_errors'] += 1
                 logger.warning(f"⚠️ CRC Fehler bei Sensor {sensor_id}")
                 return None
             
@@ -170,8 +218,10 @@ class DS18B20Reader:
             
             if attempt < max_retries - 1:
                 logger.warning(f"⚠️ Leseversuch {attempt + 1} fehlgeschlagen für {sensor_id}, wiederhole...")
-                time.sleep(0.1)  # Kurze Pause zwischen Versuchen
+                self._sensor_stats(sensor_id)['retries'] += 1
+                self.clock.sleep(self.retry_delay)  # Kurze Pause zwischen Versuchen
         
+        self._sensor_stats(sensor_id)['failures'] += 1
         logger.error(f"❌ Alle {max_retries} Leseversuche für {sensor_id} fehlgeschlagen")
         return None
     
@@ -180,7 +230,10 @@ class DS18B20Reader:
         temperatures = {}
         
         for sensor_id in self.sensor_ids:
+            self.last_read_started[sensor_id] = self.clock.time()
+            started = time.perf_counter()
             temp = self.read_temperature_with_retry(sensor_id)
+            self.last_read_durations[sensor_id] = time.perf_counter() - started
             if temp is not None:
                 temperatures[sensor_id] = temp
             else:
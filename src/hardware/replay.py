@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Aufzeichnung und Wiedergabe von Sensor-Sitzungen
+================================================
+
+SessionRecorder zeichnet je Lese-Zyklus die Rohdaten der Hardware auf:
+w1_slave Inhalte (Scratchpad-Text inkl. CRC-Zeile) jedes Leseversuchs,
+DHT22 Rohwerte bzw. Fehlermeldungen sowie die Dauer jedes Zugriffs.
+Format: NDJSON, erste Zeile Header, danach eine Zeile pro Zyklus:
+
+    {"type": "header", "format": "pi5-capture", "version": 1, ...}
+    {"type": "cycle", "cycle": 0, "started": 1700000000.1, "duration": 1.6,
+     "ds18b20": {"28-...": [{"content": "72 01 ... t=23125\\n", "duration": 0.75}]},
+     "dht22": [{"temperature": 21.3, "humidity": 55.0, "duration": 0.005}],
+     "status": "ok"}
+
+ReplayHardware spielt eine Aufzeichnung über denselben Weg wie die
+Simulation ab (1-Wire FIFO-Baum + DHT22 Device) - die komplette Pipeline
+inkl. CRC-Prüfung, Wiederholungen und Plausibilitätsprüfung läuft mit
+den aufgezeichneten Rohdaten. Zugriffszeiten und Zyklus-Abstände werden
+um den Faktor speed (1 bis 1000) verkürzt.
+
+Aktiviert im Sensor Reader mit [capture] file = ... bzw.
+[hardware] backend = replay und [replay] file/speed.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .simulation import SimulatedW1Bus
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_FORMAT = 'pi5-capture'
+CAPTURE_VERSION = 1
+MAX_SPEED = 1000.0
+
+
+class SessionRecorder:
+    """
+    Rohdaten-Aufzeichnung je Lese-Zyklus
+
+    DS18B20Reader und DHT22Reader melden jeden Hardware-Zugriff über
+    record_w1() bzw. record_dht22(); der Sensor Reader klammert jeden
+    Zyklus mit begin_cycle()/end_cycle().
+    """
+
+    def __init__(self, path: str, metadata: Optional[Dict] = None):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._cycle: Optional[Dict] = None
+        self.cycles = 0
+
+        header = {'type': 'header', 'format': CAPTURE_FORMAT, 'version': CAPTURE_VERSION,
+                  'created': time.time()}
+        header.update(metadata or {})
+        self._write(header)
+        logger.info(f"⏺️ Aufzeichnung der Rohdaten: {path}")
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def begin_cycle(self):
+        with self._lock:
+            self._cycle = {'type': 'cycle', 'cycle': self.cycles, 'started': time.time(),
+                           'ds18b20': {}, 'dht22': []}
+            self._t0 = time.perf_counter()
+
+    def record_w1(self, sensor_id: str, content: Optional[str], duration: float,
+                  error: Optional[str] = None):
+        """Ein w1_slave Lesevorgang (content None: Datei nicht lesbar)"""
+        entry = {'content': content, 'duration': round(duration, 6)}
+        if error:
+            entry['error'] = error
+        with self._lock:
+            if self._cycle is not None:
+                self._cycle['ds18b20'].setdefault(sensor_id, []).append(entry)
+
+    def record_dht22(self, temperature: Optional[float], humidity: Optional[float], duration: float,
+                     error: Optional[str] = None):
+        """Ein DHT22 Rohzugriff (error: Meldung des RuntimeError)"""
+        entry = {'temperature': temperature, 'humidity': humidity, 'duration': round(duration, 6)}
+        if error:
+            entry['error'] = error
+        with self._lock:
+            if self._cycle is not None:
+                self._cycle['dht22'].append(entry)
+
+    def end_cycle(self, status: str = 'ok'):
+        with self._lock:
+            if self._cycle is None:
+                return
+            self._cycle['duration'] = round(time.perf_counter() - self._t0, 6)
+            self._cycle['status'] = status
+            self._write(self._cycle)
+            self._cycle = None
+            self.cycles += 1
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+        logger.info(f"⏹️ Aufzeichnung beendet: {self.cycles} Zyklen in {self.path}")
+
+
+def load_capture(path: str) -> Dict:
+    """
+    Aufzeichnung laden
+
+    Returns:
+        {"header": {...}, "cycles": [...]}
+
+    Raises:
+        ValueError: Keine gültige Aufzeichnung
+    """
+    header = None
+    cycles = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: ungültige Zeile ({e})")
+            if record.get('type') == 'header':
+                if record.get('format') != CAPTURE_FORMAT:
+                    raise ValueError(f"{path}: kein {CAPTURE_FORMAT} Format")
+                # Angehängte Aufzeichnungen: erster Header gilt
+                header = header or record
+            elif record.get('type') == 'cycle':
+                cycles.append(record)
+    if header is None:
+        raise ValueError(f"{path}: Header fehlt")
+    return {'header': header, 'cycles': cycles}
+
+
+class _ReplayCursor:
+    """Aktueller Zyklus der Wiedergabe (gemeinsam für alle Replay-Devices)"""
+
+    def __init__(self, cycles: List[Dict], speed: float, sleep: Callable[[float], None]):
+        self.cycles = cycles
+        self.speed = speed
+        self.sleep = sleep
+        self.index = -1
+
+    @property
+    def cycle(self) -> Optional[Dict]:
+        if 0 <= self.index < len(self.cycles):
+            return self.cycles[self.index]
+        return None
+
+    def wait(self, duration: Optional[float]):
+        if duration:
+            self.sleep(duration / self.speed)
+
+
+class ReplayDS18B20:
+    """Aufgezeichnete w1_slave Inhalte eines Sensors (Schnittstelle wie SimulatedDS18B20)"""
+
+    def __init__(self, sensor_id: str, cursor: _ReplayCursor):
+        self.sensor_id = sensor_id
+        self.cursor = cursor
+        self._position = {}
+        self.stats = {'reads': 0, 'exhausted': 0}
+
+    def _first_reading(self) -> Optional[Dict]:
+        for cycle in self.cursor.cycles:
+            readings = cycle['ds18b20'].get(self.sensor_id)
+            if readings:
+                return readings[0]
+        return None
+
+    def next_reading(self) -> str:
+        """Nächster aufgezeichneter Inhalt im aktuellen Zyklus ("" = keine Antwort)"""
+        self.stats['reads'] += 1
+        cycle = self.cursor.cycle
+        if cycle is None:
+            # Lesevorgang außerhalb eines Zyklus (Sensor-Test beim Start)
+            reading = self._first_reading()
+        else:
+            readings = cycle['ds18b20'].get(self.sensor_id, [])
+            position = self._position.get(self.cursor.index, 0)
+            self._position = {self.cursor.index: position + 1}
+            if position < len(readings):
+                reading = readings[position]
+            else:
+                # Mehr Versuche als aufgezeichnet - letzten Inhalt wiederholen
+                self.stats['exhausted'] += 1
+                reading = readings[-1] if readings else None
+
+        if reading is None:
+            return ""
+        self.cursor.wait(reading.get('duration'))
+        return reading.get('content') or ""
+
+
+class ReplayDHT22:
+    """Aufgezeichnete DHT22 Rohwerte (Schnittstelle wie adafruit_dht.DHT22)"""
+
+    def __init__(self, cursor: _ReplayCursor):
+        self.cursor = cursor
+        self._position = {}
+        self._values = (None, None)
+        self.stats = {'measurements': 0, 'failures': 0}
+
+    def _measure(self):
+        cycle = self.cursor.cycle
+        if cycle is None:
+            return
+        readings = cycle.get('dht22', [])
+        position = self._position.get(self.cursor.index, 0)
+        if position >= len(readings):
+            return   # nicht aufgezeichnet (Cache-Treffer) - letzte Werte bleiben stehen
+        self._position = {self.cursor.index: position + 1}
+
+        reading = readings[position]
+        self.stats['measurements'] += 1
+        self.cursor.wait(reading.get('duration'))
+        if reading.get('error'):
+            self.stats['failures'] += 1
+            raise RuntimeError(reading['error'])
+        self._values = (reading.get('temperature'), reading.get('humidity'))
+
+    @property
+    def temperature(self) -> Optional[float]:
+        self._measure()
+        return self._values[0]
+
+    @property
+    def humidity(self) -> Optional[float]:
+        return self._values[1]
+
+    def exit(self):
+        pass
+
+
+class ReplayHardware:
+    """
+    Wiedergabe einer Aufzeichnung als Hardware-Backend
+
+    Schnittstelle wie SimulatedHardware (w1_bus, dht22, start/stop/get_stats),
+    zusätzlich next_cycle()/next_delay() für das Tempo im Sensor Reader.
+    """
+
+    def __init__(self, capture: Dict, speed: float = 1.0, device_path: Optional[str] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.header = capture['header']
+        self.cycles = capture['cycles']
+        self.speed = min(max(float(speed), 1.0), MAX_SPEED)
+        self.sleep = sleep
+        self.cursor = _ReplayCursor(self.cycles, self.speed, sleep)
+
+        sensor_ids = []
+        for cycle in self.cycles:
+            for sensor_id in cycle['ds18b20']:
+                if sensor_id not in sensor_ids:
+                    sensor_ids.append(sensor_id)
+        sensors = [ReplayDS18B20(sensor_id, self.cursor) for sensor_id in sensor_ids]
+        # Zugriffszeiten stecken in der Aufzeichnung - keine zusätzliche Konvertierungszeit
+        self.w1_bus = SimulatedW1Bus(sensors, device_path=device_path, conversion_latency=0.0, sleep=sleep)
+        self.dht22 = ReplayDHT22(self.cursor)
+        self._cycle_started: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, config, sleep: Callable[[float], None] = time.sleep) -> "ReplayHardware":
+        """Wiedergabe aus [replay] Sektion (file, speed, w1_path)"""
+        path = config.get('replay', 'file', fallback='')
+        if not path:
+            raise ValueError("[replay] file fehlt")
+        return cls(load_capture(path),
+                   speed=config.getfloat('replay', 'speed', fallback=1.0),
+                   device_path=config.get('replay', 'w1_path', fallback='') or None,
+                   sleep=sleep)
+
+    def start(self) -> bool:
+        logger.info(f"▶️ Wiedergabe: {len(self.cycles)} Zyklen, {len(self.w1_bus.sensors)} DS18B20, "
+                    f"Tempo x{self.speed:g}")
+        return self.w1_bus.start()
+
+    def stop(self):
+        self.w1_bus.stop()
+
+    def has_next(self) -> bool:
+        """Weitere Zyklen vorhanden"""
+        return self.cursor.index + 1 < len(self.cycles)
+
+    def next_cycle(self) -> bool:
+        """Zum nächsten aufgezeichneten Zyklus wechseln (False: Aufzeichnung zu Ende)"""
+        if not self.has_next():
+            return False
+        self.cursor.index += 1
+        self._cycle_started = time.monotonic()
+        return True
+
+    def next_delay(self) -> float:
+        """Wartezeit bis zum nächsten Zyklus (aufgezeichneter Abstand / speed, abzüglich Laufzeit)"""
+        if not self.has_next() or self.cursor.cycle is None:
+            return 0.0
+        gap = self.cycles[self.cursor.index + 1]['started'] - self.cursor.cycle['started']
+        elapsed = time.monotonic() - (self._cycle_started or time.monotonic())
+        return max(0.0, gap / self.speed - elapsed)
+
+    def get_stats(self) -> Dict:
+        return {
+            'cycles': self.cursor.index + 1,
+            'total_cycles': len(self.cycles),
+            'ds18b20': self.w1_bus.get_stats(),
+            'dht22': dict(self.dht22.stats)
+        }
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Simulierte Hardware für Pi5 Heizungs Messer
+===========================================
+
+Backend für Entwicklung, Benchmarks und Lasttests ohne Raspberry Pi:
+
+- SimulatedW1Bus: 1-Wire Device-Baum wie unter /sys/bus/w1/devices/ in einem
+  (temporären) Verzeichnis. Jede w1_slave Datei ist eine FIFO - ein Lesevorgang
+  blockiert wie beim Kernel-Treiber für die Dauer der Konvertierung und liefert
+  das Scratchpad im Kernel-Format inkl. CRC. CRC-Fehler, Ausfälle
+  (leere Antworten), Power-On Resets (85.0°C mit gültiger CRC) und
+  Einzelspitzen langer Leitungen werden mit einstellbarer Rate erzeugt.
+- SimulatedDHT22: Ersatz für adafruit_dht.DHT22 mit typischer Fehlerrate
+  (Checksum/Timing Fehler als RuntimeError).
+- VirtualClock: Uhr mit der Schnittstelle des time Moduls, sleep() stellt
+  nur die Uhr vor - Dauertests simulieren Wochen in Minuten.
+
+Temperaturverläufe werden über kurze Spezifikationen beschrieben:
+    const:21.5            konstant
+    sine:55:8:1800        Mittelwert, Amplitude, Periode (s)
+    triangle:35:65:1200   Minimum, Maximum, Periode (s) - Brenner-Takt
+    ramp:20:0.01          Startwert, Anstieg pro Sekunde
+
+Aktiviert im Sensor Reader mit [hardware] backend = simulation.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import logging
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Waveform = Callable[[float], float]
+
+
+class VirtualClock:
+    """
+    Virtuelle Uhr (time(), monotonic(), sleep() wie das time Modul)
+
+    Sensor Reader, DHT22Reader, DS18B20Reader und MQTT Bridge erhalten
+    clock=VirtualClock() statt des time Moduls: Zyklus-Pausen, DHT22 Cache
+    und Discovery-Timer laufen dann in virtueller Zeit, sleep() kehrt sofort
+    zurück. Gemessene Laufzeiten (perf_counter) bleiben echt.
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self._start = time.time() if start is None else start
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+        self.sleeps = 0
+
+    @property
+    def elapsed(self) -> float:
+        """Vergangene virtuelle Zeit in Sekunden"""
+        return self._elapsed
+
+    def time(self) -> float:
+        return self._start + self._elapsed
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self.advance(seconds)
+
+    def advance(self, seconds: float):
+        """Uhr vorstellen"""
+        with self._lock:
+            self._elapsed += seconds
+            self.sleeps += 1
+
+
+def parse_waveform(spec: str) -> Waveform:
+    """
+    Temperaturverlauf aus Spezifikation erzeugen (siehe Modul-Doku)
+
+    Raises:
+        ValueError: Unbekannte oder unvollständige Spezifikation
+    """
+    kind, *args = [part.strip() for part in spec.strip().split(':')]
+    values = [float(a) for a in args]
+
+    if kind == 'const' and len(values) == 1:
+        value = values[0]
+        return lambda t: value
+    if kind == 'sine' and len(values) == 3:
+        mean, amplitude, period = values
+        return lambda t: mean + amplitude * math.sin(2 * math.pi * t / period)
+    if kind == 'triangle' and len(values) == 3:
+        low, high, period = values
+
+        def triangle(t):
+            phase = (t % period) / period
+            position = 2 * phase if phase < 0.5 else 2 * (1 - phase)
+            return low + (high - low) * position
+        return triangle
+    if kind == 'ramp' and len(values) == 2:
+        start, slope = values
+        return lambda t: start + slope * t
+
+    raise ValueError(f"Ungültiger Temperaturverlauf: {spec!r}")
+
+
+def w1_crc8(data: bytes) -> int:
+    """Dallas/Maxim CRC8 (1-Wire)"""
+    crc = 0
+    for byte in data:
+        for _ in range(8):
+            mix = (crc ^ byte) & 0x01
+            crc >>= 1
+            if mix:
+                crc ^= 0x8C
+            byte >>= 1
+    return crc
+
+
+def format_w1_slave(temperature: float, crc_ok: bool = True) -> str:
+    """
+    w1_slave Inhalt im Format des Kernel-Treibers (12 Bit Auflösung)
+
+    Beispiel:
+        72 01 4b 46 7f ff 0e 10 57 : crc=57 YES
+        72 01 4b 46 7f ff 0e 10 57 t=23125
+    """
+    raw = int(round(temperature * 16)) & 0xFFFF
+    scratchpad = bytes([raw & 0xFF, raw >> 8, 0x4B, 0x46, 0x7F, 0xFF, 0x10 - (raw & 0x0F), 0x10])
+    crc = w1_crc8(scratchpad)
+    if not crc_ok:
+        crc ^= 0x5A   # Übertragungsfehler: CRC passt nicht zu den Daten
+
+    data = " ".join(f"{b:02x}" for b in scratchpad + bytes([crc]))
+    millidegrees = int((raw - 0x10000 if raw & 0x8000 else raw) * 1000 / 16)   # C-Division wie im Kernel
+    status = "YES" if crc_ok else "NO"
+    return f"{data} : crc={crc:02x} {status}\n{data} t={millidegrees}\n"
+
+
+class SimulatedDS18B20:
+    """Ein simulierter DS18B20 (Messwert, CRC-Fehler, Ausfälle, Glitches)"""
+
+    def __init__(self, sensor_id: str, waveform: Waveform, rng: random.Random,
+                 crc_error_rate: float = 0.0, dropout_rate: float = 0.0,
+                 dropout_reads: int = 5, noise: float = 0.0,
+                 clock: Callable[[], float] = time.time,
+                 reset_rate: float = 0.0, spike_rate: float = 0.0):
+        self.sensor_id = sensor_id
+        self.waveform = waveform
+        self.rng = rng
+        self.crc_error_rate = crc_error_rate
+        self.dropout_rate = dropout_rate
+        self.dropout_reads = dropout_reads
+        self.noise = noise
+        self.clock = clock
+        self.reset_rate = reset_rate
+        self.spike_rate = spike_rate
+
+        self._dropout_remaining = 0
+        self.stats = {'reads': 0, 'crc_errors': 0, 'dropouts': 0, 'resets': 0, 'spikes': 0}
+
+    def temperature(self) -> float:
+        """Aktueller (verrauschter) Sollwert"""
+        value = self.waveform(self.clock())
+        if self.noise:
+            value += self.rng.gauss(0.0, self.noise)
+        return value
+
+    def next_reading(self) -> str:
+        """Inhalt für den nächsten Lesevorgang ("" = Sensor antwortet nicht)"""
+        self.stats['reads'] += 1
+
+        if self._dropout_remaining == 0 and self.rng.random() < self.dropout_rate:
+            self._dropout_remaining = self.dropout_reads
+            self.stats['dropouts'] += 1
+        if self._dropout_remaining > 0:
+            self._dropout_remaining -= 1
+            return ""
+
+        crc_ok = self.rng.random() >= self.crc_error_rate
+        if not crc_ok:
+            self.stats['crc_errors'] += 1
+        temperature = self.temperature()
+        # Glitches mit gültiger CRC (Zufallszahlen nur wenn aktiviert - Fehlerfolgen bleiben reproduzierbar)
+        if self.reset_rate and self.rng.random() < self.reset_rate:
+            self.stats['resets'] += 1
+            temperature = 85.0
+        elif self.spike_rate and self.rng.random() < self.spike_rate:
+            self.stats['spikes'] += 1
+            temperature += self.rng.choice((-1, 1)) * self.rng.uniform(10.0, 30.0)
+        return format_w1_slave(temperature, crc_ok)
+
+
+class SimulatedW1Bus:
+    """
+    Simulierter 1-Wire Device-Baum
+
+    Struktur wie /sys/bus/w1/devices/:
+        <device_path>/w1_bus_master1/
+        <device_path>/28-xxxxxxxxxxxx/w1_slave   (FIFO)
+
+    Pro Sensor bedient ein Thread die FIFO: Öffnet der Reader die Datei,
+    wartet der Thread conversion_latency Sekunden und schreibt den Messwert.
+    Vor dem Schreiben wird eine neue FIFO an den Pfad gelegt - der aktuelle
+    Reader erhält so nach seinem Messwert EOF, der nächste open() landet
+    sicher bei der neuen FIFO (ein Messwert pro open() wie bei sysfs).
+    """
+
+    def __init__(self, sensors: List[SimulatedDS18B20], device_path: Optional[str] = None,
+                 conversion_latency: float = 0.75, sleep: Callable[[float], None] = time.sleep):
+        self.sensors = {sensor.sensor_id: sensor for sensor in sensors}
+        self.conversion_latency = conversion_latency
+        self.sleep = sleep
+
+        self._owns_directory = device_path is None
+        self.device_path = device_path
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        """Device-Baum anlegen und FIFO-Threads starten"""
+        if not hasattr(os, 'mkfifo'):
+            logger.error("❌ Simulierter 1-Wire Bus benötigt FIFOs (Linux/macOS)")
+            return False
+
+        if self.device_path is None:
+            self.device_path = tempfile.mkdtemp(prefix='pi5-w1-')
+        self.device_path = os.path.join(self.device_path, '')
+
+        os.makedirs(os.path.join(self.device_path, 'w1_bus_master1'), exist_ok=True)
+        self._stop.clear()
+
+        for sensor_id, sensor in self.sensors.items():
+            device_dir = os.path.join(self.device_path, sensor_id)
+            os.makedirs(device_dir, exist_ok=True)
+            fifo = os.path.join(device_dir, 'w1_slave')
+            if os.path.exists(fifo):
+                os.remove(fifo)
+            os.mkfifo(fifo)
+
+            thread = threading.Thread(target=self._serve, args=(sensor, fifo),
+                                      name=f"w1-sim-{sensor_id}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"🧪 Simulierter 1-Wire Bus: {len(self.sensors)} DS18B20 unter {self.device_path}")
+        return True
+
+    def _serve(self, sensor: SimulatedDS18B20, fifo: str):
+        """Lesevorgänge eines Sensors bedienen (ein Messwert pro open())"""
+        while not self._stop.is_set():
+            try:
+                fd = os.open(fifo, os.O_WRONLY)   # blockiert bis der Reader öffnet
+            except OSError:
+                if self._stop.is_set():
+                    break
+                self.sleep(0.01)
+                continue
+
+            try:
+                if self._stop.is_set():
+                    break
+                self.sleep(self.conversion_latency)
+                content = sensor.next_reading()
+                self._replace_fifo(fifo)
+                if content:
+                    os.write(fd, content.encode('ascii'))
+            except OSError:
+                pass   # Reader hat vorzeitig geschlossen
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _replace_fifo(fifo: str):
+        """Neue FIFO atomar an den Pfad legen (geöffnete Reader behalten die alte)"""
+        next_fifo = fifo + '.next'
+        if os.path.exists(next_fifo):
+            os.remove(next_fifo)
+        os.mkfifo(next_fifo)
+        os.replace(next_fifo, fifo)
+
+    def stop(self):
+        """Threads beenden und temporären Device-Baum entfernen"""
+        self._stop.set()
+        for sensor_id in self.sensors:
+            # Blockierendes open() der Threads durch einen Leser auflösen
+            fifo = os.path.join(self.device_path or '', sensor_id, 'w1_slave')
+            try:
+                fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+                time.sleep(0.001)
+                os.close(fd)
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=self.conversion_latency + 1.0)
+        self._threads = []
+
+        if self._owns_directory and self.device_path:
+            shutil.rmtree(self.device_path, ignore_errors=True)
+            self.device_path = None
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Simulations-Statistik je Sensor"""
+        return {sensor_id: dict(sensor.stats) for sensor_id, sensor in self.sensors.items()}
+
+
+class SimulatedDHT22:
+    """
+    Ersatz für adafruit_dht.DHT22 (gleiche Properties und exit())
+
+    Wie die Adafruit Library wird höchstens alle 2 Sekunden neu gemessen
+    (dazwischen bleiben die letzten Werte stehen); fehlgeschlagene Messungen
+    lösen RuntimeError aus.
+    """
+
+    FAILURE_MESSAGES = (
+        "Checksum did not validate. Try again.",
+        "A full buffer was not returned. Try again.",
+        "Received unplausible data. Try again.",
+    )
+
+    def __init__(self, temperature: Waveform, humidity: Waveform, rng: random.Random,
+                 failure_rate: float = 0.15, read_latency: float = 0.0, noise: float = 0.0,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        self.temperature_waveform = temperature
+        self.humidity_waveform = humidity
+        self.rng = rng
+        self.failure_rate = failure_rate
+        self.read_latency = read_latency
+        self.noise = noise
+        self.clock = clock
+        self.sleep = sleep
+
+        self._last_measure = None
+        self._values = (None, None)
+        self.stats = {'measurements': 0, 'failures': 0}
+
+    def _measure(self):
+        now = self.clock()
+        if self._last_measure is not None and now - self._last_measure < 2.0:
+            return
+
+        self._last_measure = now
+        self.stats['measurements'] += 1
+        if self.read_latency:
+            self.sleep(self.read_latency)
+
+        if self.rng.random() < self.failure_rate:
+            self.stats['failures'] += 1
+            raise RuntimeError(self.rng.choice(self.FAILURE_MESSAGES))
+
+        temperature = self.temperature_waveform(now)
+        humidity = self.humidity_waveform(now)
+        if self.noise:
+            temperature += self.rng.gauss(0.0, self.noise)
+            humidity += self.rng.gauss(0.0, self.noise)
+        self._values = (round(temperature, 1), round(min(max(humidity, 0.0), 100.0), 1))
+
+    @property
+    def temperature(self) -> Optional[float]:
+        self._measure()
+        return self._values[0]
+
+    @property
+    def humidity(self) -> Optional[float]:
+        self._measure()
+        return self._values[1]
+
+    def exit(self):
+        pass
+
+
+class SimulatedHardware:
+    """Simulierte DS18B20 + DHT22 laut [simulation] Konfiguration"""
+
+    DEFAULT_WAVEFORMS = "sine:55:8:1800, sine:42:5:1800, triangle:35:65:1200, const:21"
+
+    def __init__(self, w1_bus: SimulatedW1Bus, dht22: Optional[SimulatedDHT22] = None):
+        self.w1_bus = w1_bus
+        self.dht22 = dht22
+
+    @classmethod
+    def from_config(cls, config, clock: Callable[[], float] = time.time,
+                    sleep: Callable[[float], None] = time.sleep) -> "SimulatedHardware":
+        """
+        Simulation aus [simulation] Sektion erzeugen
+
+        Optionen: ds18b20_count, w1_path, conversion_latency, crc_error_rate,
+        dropout_rate, dropout_reads, reset_rate, spike_rate, waveforms, noise, dht22_temperature,
+        dht22_humidity, dht22_failure_rate, dht22_latency, seed
+        """
+        section = 'simulation'
+
+        def option(key, fallback):
+            return config.get(section, key, fallback=fallback) if config else fallback
+
+        seed = option('seed', '')
+        rng = random.Random(int(seed) if str(seed).strip() else None)
+
+        count = int(option('ds18b20_count', 4))
+        waveform_specs = [s for s in str(option('waveforms', cls.DEFAULT_WAVEFORMS)).split(',') if s.strip()]
+        noise = float(option('noise', 0.05))
+
+        sensors = []
+        for index in range(count):
+            sensor_id = f"28-{0x3C01D6070000 + index * 0x1F3 + rng.randrange(0x100):012x}"
+            waveform = parse_waveform(waveform_specs[index % len(waveform_specs)])
+            sensors.append(SimulatedDS18B20(
+                sensor_id, waveform, random.Random(rng.random()),
+                crc_error_rate=float(option('crc_error_rate', 0.01)),
+                dropout_rate=float(option('dropout_rate', 0.001)),
+                dropout_reads=int(option('dropout_reads', 5)),
+                noise=noise, clock=clock,
+                reset_rate=float(option('reset_rate', 0.0)),
+                spike_rate=float(option('spike_rate', 0.0))))
+
+        w1_bus = SimulatedW1Bus(
+            sensors, device_path=option('w1_path', '') or None,
+            conversion_latency=float(option('conversion_latency', 0.75)), sleep=sleep)
+
+        dht22 = SimulatedDHT22(
+            parse_waveform(option('dht22_temperature', 'sine:21:1.5:86400')),
+            parse_waveform(option('dht22_humidity', 'sine:55:8:86400')),
+            random.Random(rng.random()),
+            failure_rate=float(option('dht22_failure_rate', 0.15)),
+            read_latency=float(option('dht22_latency', 0.005)),
+            noise=noise, clock=clock, sleep=sleep)
+
+        return cls(w1_bus, dht22)
+
+    def start(self) -> bool:
+        return self.w1_bus.start()
+
+    def stop(self):
+        self.w1_bus.stop()
+
+    def get_stats(self) -> Dict:
+        """Simulations-Statistik (DS18B20 je Sensor und DHT22)"""
+        return {
+            'ds18b20': self.w1_bus.get_stats(),
+            'dht22': dict(self.dht22.stats) if self.dht22 else {}
+        }
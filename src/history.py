@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Messwert-Historie im Speicher
+===================================================
+
+Ringpuffer fester Kapazität je Sensor für die letzten Stunden:
+Zeitstempel (ms, array('q')) und Werte (array('d')) liegen kompakt in
+zwei Arrays - 16 Byte je Messung, unabhängig von der Laufzeit.
+
+Auswertungen (min, max, mean, Anstieg je Stunde) laufen über Slices der
+Arrays mit den C-Schleifen von min/max/sum/map - ohne InfluxDB Abfrage
+und ohne Python-Schleife je Messwert.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from operator import mul, sub
+from typing import Dict, List, Optional, Tuple
+
+
+class RingBuffer:
+    """Zeitstempel/Wert-Paare mit fester Kapazität (älteste Einträge werden überschrieben)"""
+
+    ITEM_BYTES = 16     # array('q') + array('d')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('q', bytes(8 * capacity))   # Unix-Zeit in ms
+        self.values = array('d', bytes(8 * capacity))
+        self._start = 0         # Index des ältesten Eintrags
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * self.ITEM_BYTES
+
+    @property
+    def latest_timestamp(self) -> Optional[float]:
+        """Zeitpunkt der neuesten Messung (Unix-Zeit)"""
+        with self._lock:
+            if not self._count:
+                return None
+            return self.timestamps[(self._start + self._count - 1) % self.capacity] / 1000
+
+    def append(self, timestamp: float, value: float) -> bool:
+        """
+        Messung anhängen (Unix-Zeit in Sekunden)
+
+        Nicht neuere Zeitstempel (z.B. DHT22 Cache-Treffer) werden ignoriert -
+        die Zeitstempel bleiben sortiert und per Binärsuche durchsuchbar.
+        """
+        timestamp_ms = int(timestamp * 1000)
+        with self._lock:
+            if self._count and timestamp_ms <= self.timestamps[(self._start + self._count - 1) % self.capacity]:
+                return False
+            index = (self._start + self._count) % self.capacity
+            if self._count == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._count += 1
+            self.timestamps[index] = timestamp_ms
+            self.values[index] = value
+        return True
+
+    def window(self, since: Optional[float] = None) -> Tuple[array, array]:
+        """Zeitstempel (ms) und Werte in zeitlicher Reihenfolge, optional ab since (Unix-Zeit)"""
+        with self._lock:
+            end = self._start + self._count
+            if end <= self.capacity:
+                timestamps = self.timestamps[self._start:end]
+                values = self.values[self._start:end]
+            else:
+                wrapped = end - self.capacity
+                timestamps = self.timestamps[self._start:] + self.timestamps[:wrapped]
+                values = self.values[self._start:] + self.values[:wrapped]
+
+        if since is not None:
+            first = bisect_left(timestamps, int(since * 1000))
+            timestamps, values = timestamps[first:], values[first:]
+        return timestamps, values
+
+    def stats(self, since: Optional[float] = None) -> Optional[Dict]:
+        """
+        Kennzahlen über das Fenster ab since
+
+        Returns:
+            count, min, max, mean, latest, slope_per_hour (Ausgleichsgerade),
+            first/last (Unix-Zeit) - oder None ohne Messungen
+        """
+        timestamps, values = self.window(since)
+        count = len(values)
+        if not count:
+            return None
+
+        # Anstieg über Zeiten relativ zur ersten Messung (vermeidet Auslöschung bei ms-Zeitstempeln)
+        offsets = array('d', map(sub, timestamps, repeat(timestamps[0])))
+        sum_x = sum(offsets)
+        sum_y = sum(values)
+        denominator = count * sum(map(mul, offsets, offsets)) - sum_x * sum_x
+        slope = 0.0
+        if denominator:
+            slope = (count * sum(map(mul, offsets, values)) - sum_x * sum_y) / denominator * 3_600_000
+
+        return {
+            'count': count,
+            'min': min(values),
+            'max': max(values),
+            'mean': sum_y / count,
+            'latest': values[-1],
+            'slope_per_hour': slope,
+            'first': timestamps[0] / 1000,
+            'last': timestamps[-1] / 1000
+        }
+
+
+class SensorHistory:
+    """
+    Ringpuffer je Sensor für die letzten hours Stunden
+
+    Die Kapazität ergibt sich aus hours und dem Zyklus-Intervall; der
+    Speicherbedarf ist damit je Sensor fest (24h à 30s: 2880 Messungen, 45 KiB).
+    Schlüssel: Sensor-ID für Temperaturen, "<sensor_id>_humidity" für Luftfeuchtigkeit.
+    """
+
+    def __init__(self, hours: float = 24.0, interval: float = 30.0):
+        self.hours = hours
+        self.capacity = max(1, math.ceil(hours * 3600 / interval))
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["SensorHistory"]:
+        """Historie laut [history] (hours = 0 deaktiviert)"""
+        hours = config.getfloat('history', 'hours', fallback=24.0)
+        if hours <= 0:
+            return None
+        return cls(hours, config.getfloat('history', 'interval', fallback=30.0))
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._buffers)
+
+    @property
+    def nbytes(self) -> int:
+        """Reservierter Speicher aller Ringpuffer"""
+        with self._lock:
+            return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def buffer(self, key: str) -> Optional[RingBuffer]:
+        with self._lock:
+            return self._buffers.get(key)
+
+    def add(self, key: str, timestamp: float, value: float) -> bool:
+        """Messung eines Sensors anhängen (Ringpuffer wird beim ersten Wert angelegt)"""
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = RingBuffer(self.capacity)
+        return buffer.append(timestamp, value)
+
+    def add_cycle(self, sensor_data: Dict, now: float):
+        """Gültige Werte eines Lese-Zyklus übernehmen (Zeitstempel: Messzeitpunkt je Sensor)"""
+        acquired = sensor_data.get('acquired', {})
+        for sensor_id, temperature in sensor_data.get('temperatures', {}).items():
+            if temperature is not None:
+                self.add(sensor_id, acquired.get(sensor_id, now), temperature)
+        for sensor_id, humidity in sensor_data.get('humidity', {}).items():
+            if humidity is not None:
+                self.add(f"{sensor_id}_humidity", acquired.get(sensor_id, now), humidity)
+
+    def stats(self, key: str, minutes: Optional[float] = None) -> Optional[Dict]:
+        """Kennzahlen eines Sensors über die letzten minutes Minuten (bis zur neuesten Messung)"""
+        buffer = self.buffer(key)
+        latest = buffer.latest_timestamp if buffer else None
+        if latest is None:
+            return None
+        return buffer.stats(latest - minutes * 60 if minutes is not None else None)
+
+    def summary(self, minutes: Optional[float] = None) -> Dict[str, Dict]:
+        """Kennzahlen aller Sensoren"""
+        return {key: self.stats(key, minutes) for key in self.keys()}
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Aktuelle Messwerte per HTTP
+=================================================
+
+Lokaler JSON-Endpunkt /latest für Wandtablet, Skripte und Dashboards:
+liefert den letzten Lese-Zyklus direkt aus dem Speicher - ohne Flux
+Abfrage und ohne auf MQTT zu warten.
+
+- Der JSON-Body wird einmal pro Zyklus erzeugt; ein Abruf kopiert nur Bytes
+- ETag / Last-Modified je Zyklus, If-None-Match / If-Modified-Since → 304
+- Long-Polling: GET /latest?wait=30 mit If-None-Match antwortet erst mit
+  dem nächsten Zyklus (oder 304 nach Ablauf der Wartezeit)
+
+    curl -i http://127.0.0.1:9103/latest
+    curl -H 'If-None-Match: "…"' 'http://127.0.0.1:9103/latest?wait=60'
+
+Zusätzlich Push-Stream als Server-Sent Events (LiveStream, /stream): ein
+asyncio Event-Loop bedient alle Clients; jeder Client hat ein Fach für
+den nächsten Frame - langsame Clients überspringen Zwischenstände statt
+Puffer aufzubauen.
+
+    curl -N http://127.0.0.1:9104/stream
+    new EventSource("http://pi5:9104/stream").addEventListener("reading", ...)
+
+Konfiguration: [api] enabled/host/port/max_wait, stream/stream_port
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+class LatestSnapshot:
+    """
+    Letzter Lese-Zyklus als fertig serialisierter JSON-Body
+
+    publish() wird vom Lese-Zyklus aufgerufen, wait_for_change() von den
+    HTTP-Threads (Long-Polling). Jeder Zyklus bekommt eine neue Version;
+    das ETag enthält zusätzlich eine Kennung des Prozesses, damit nach
+    einem Neustart kein altes ETag zu einem 304 führt.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._instance = f"{os.getpid():x}{int(time.time()):x}"
+        self.version = 0
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.modified: Optional[float] = None     # Unix-Zeit des Zyklus
+        self.last_modified: Optional[str] = None  # HTTP-Datum
+        self.closed = False
+        self._listeners: List[Callable[[bytes, str], None]] = []
+
+    def subscribe(self, listener: Callable[[bytes, str], None]):
+        """listener(body, etag) wird nach jedem publish() aufgerufen (Thread des Lese-Zyklus)"""
+        self._listeners.append(listener)
+
+    def publish(self, payload: Dict, modified: float):
+        """Neuen Zyklus übernehmen und wartende Long-Poll Anfragen wecken"""
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        with self._condition:
+            self.version += 1
+            self.body = body
+            self.etag = f'"{self._instance}-{self.version}"'
+            self.modified = modified
+            self.last_modified = formatdate(modified, usegmt=True)
+            etag = self.etag
+            self._condition.notify_all()
+        for listener in self._listeners:
+            listener(body, etag)
+
+    def current(self) -> Tuple[Optional[bytes], Optional[str], Optional[str], Optional[float]]:
+        """(body, etag, last_modified, modified) des letzten Zyklus"""
+        with self._condition:
+            return self.body, self.etag, self.last_modified, self.modified
+
+    def wait_for_change(self, etag: Optional[str], timeout: float) -> bool:
+        """
+        Warten bis ein Zyklus mit anderem ETag vorliegt
+
+        Returns:
+            True: neuer Zyklus vorhanden, False: Zeit abgelaufen bzw. geschlossen
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.closed or (self.body is not None and self.etag != etag),
+                timeout) and not self.closed
+
+    def close(self):
+        """Wartende Anfragen freigeben (Reader wird beendet)"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def _etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in header.split(','))
+
+
+def _not_modified_since(header: Optional[str], modified: Optional[float]) -> bool:
+    if not header or modified is None:
+        return False
+    try:
+        return int(modified) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+class _LiveApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # Keep-Alive für pollende Clients
+    disable_nagle_algorithm = True  # Header und Body sofort senden (sonst ~40ms Delayed-ACK)
+    snapshot: LatestSnapshot = None
+    max_wait: float = 60.0
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in ('/latest', '/'):
+            self._send(404, b'{"error":"not found"}')
+            return
+
+        query = parse_qs(url.query)
+        try:
+            wait = min(max(float(query.get('wait', ['0'])[0]), 0.0), self.max_wait)
+        except ValueError:
+            self._send(400, b'{"error":"wait: Sekunden erwartet"}')
+            return
+
+        if_none_match = self.headers.get('If-None-Match')
+        body, etag, last_modified, modified = self.snapshot.current()
+        fresh = _etag_matches(if_none_match, etag) if if_none_match else \
+            _not_modified_since(self.headers.get('If-Modified-Since'), modified)
+
+        # Long-Polling: auf den nächsten (bzw. ersten) Zyklus warten
+        if wait and (body is None or fresh):
+            if self.snapshot.wait_for_change(etag, wait):
+                body, etag, last_modified, modified = self.snapshot.current()
+                fresh = False
+
+        if body is None:
+            self._send(503, b'{"error":"noch kein Lese-Zyklus"}', {'Retry-After': '5'})
+        elif fresh:
+            self._send(304, None, {'ETag': etag, 'Last-Modified': last_modified})
+        else:
+            self._send(200, body, {'ETag': etag, 'Last-Modified': last_modified})
+
+    def _send(self, status: int, body: Optional[bytes], headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"api: {format % args}")
+
+
+class LiveApiServer:
+    """HTTP-Endpunkt /latest in einem Hintergrund-Thread"""
+
+    def __init__(self, snapshot: LatestSnapshot, host: str = '127.0.0.1', port: int = 9103,
+                 max_wait: float = 60.0):
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self.max_wait = max_wait
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Server starten (False wenn Port belegt o.ä.)"""
+        handler = type("LiveApiHandler", (_LiveApiHandler,),
+                       {"snapshot": self.snapshot, "max_wait": self.max_wait})
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        except OSError as e:
+            logger.error(f"❌ API-Endpunkt {self.host}:{self.port} nicht verfügbar: {e}")
+            return False
+
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="live-api-server", daemon=True)
+        self._thread.start()
+        logger.info(f"🌐 Aktuelle Messwerte verfügbar: http://{self.host}:{self.port}/latest")
+        return True
+
+    def stop(self):
+        self.snapshot.close()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def start_live_api(config, snapshot: LatestSnapshot) -> Optional[LiveApiServer]:
+    """API-Endpunkt laut [api] Konfiguration starten (enabled = false: None)"""
+    if not config.getboolean('api', 'enabled', fallback=False):
+        return None
+
+    server = LiveApiServer(snapshot,
+                           host=config.get('api', 'host', fallback='127.0.0.1'),
+                           port=config.getint('api', 'port', fallback=9103),
+                           max_wait=config.getfloat('api', 'max_wait', fallback=60.0))
+    return server if server.start() else None
+
+
+class _StreamClient:
+    """Ein SSE Client: Fach für den nächsten Frame (neuere Frames ersetzen ältere)"""
+
+    def __init__(self, peer):
+        self.peer = peer
+        self.pending: Optional[bytes] = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, frame: bytes) -> bool:
+        """Frame hinterlegen (False: vorheriger Frame noch nicht gesendet und verworfen)"""
+        dropped = self.pending is not None
+        if dropped:
+            self.dropped += 1
+        self.pending = frame
+        self.ready.set()
+        return not dropped
+
+
+class LiveStream:
+    """
+    Server-Sent Events Stream /stream in einem asyncio Event-Loop (eigener Thread)
+
+    Jeder Zyklus wird einmal als SSE-Frame formatiert ("event: reading",
+    id = ETag des Zyklus) und per call_soon_threadsafe an alle Clients
+    verteilt. Backpressure je Client: solange writer.drain() auf einen
+    langsamen Client wartet, ersetzt jeder neue Zyklus den noch nicht
+    gesendeten - der Client bekommt danach direkt den aktuellen Stand.
+    Clients, die write_timeout lang gar nichts abnehmen, werden getrennt.
+    """
+
+    def __init__(self, snapshot: LatestSnapshot, host: str = '127.0.0.1', port: int = 9104,
+                 keepalive: float = 15.0, write_timeout: float = 30.0, max_clients: int = 256,
+                 send_buffer: int = 16384):
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.write_timeout = write_timeout
+        self.max_clients = max_clients
+        self.send_buffer = send_buffer
+        self.clients: List[_StreamClient] = []
+        self.stats = {'connections': 0, 'rejected': 0, 'frames_sent': 0, 'frames_dropped': 0,
+                      'disconnected_slow': 0}
+        self._latest: Optional[bytes] = None
+        self._latest_id: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Event-Loop Thread und Server starten (False wenn Port belegt o.ä.)"""
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="live-stream", daemon=True)
+        self._thread.start()
+        started.wait()
+        if self._server is None:
+            return False
+
+        self.snapshot.subscribe(self.publish)
+        body, etag, _, _ = self.snapshot.current()
+        if body is not None:
+            self.publish(body, etag)
+        logger.info(f"📡 Live-Stream verfügbar: http://{self.host}:{self.port}/stream")
+        return True
+
+    def _run(self, started: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port))
+        except OSError as e:
+            logger.error(f"❌ Stream-Endpunkt {self.host}:{self.port} nicht verfügbar: {e}")
+            started.set()
+            self._loop.close()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    def publish(self, body: bytes, etag: str):
+        """Zyklus an alle Clients verteilen (aus dem Thread des Lese-Zyklus)"""
+        event_id = etag.strip('"')
+        frame = b"id: " + event_id.encode() + b"\nevent: reading\ndata: " + body + b"\n\n"
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._broadcast, frame, event_id)
+            except RuntimeError:
+                pass    # Loop wird gerade beendet
+
+    def _broadcast(self, frame: bytes, event_id: str):
+        self._latest, self._latest_id = frame, event_id
+        for client in self.clients:
+            if not client.offer(frame):
+                self.stats['frames_dropped'] += 1
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            lines = head.decode('latin-1').split("\r\n")
+            parts = lines[0].split()
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if len(parts) < 2 or parts[0] != 'GET' or urlsplit(parts[1]).path != '/stream':
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            if len(self.clients) >= self.max_clients:
+                self.stats['rejected'] += 1
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 10\r\n"
+                             b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+
+            await self._stream(writer, _StreamClient(peer), headers.get('last-event-id'))
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            pass    # stop(): Verbindung regulär beenden
+        finally:
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, client: _StreamClient, last_event_id: Optional[str]):
+        # Kleine Sendepuffer (asyncio und Kernel): Backpressure greift nach wenigen
+        # Frames, statt Zwischenstände für langsame Clients zu sammeln
+        writer.transport.set_write_buffer_limits(high=4096)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\nretry: 3000\n\n")
+        # Neuer Client bekommt sofort den aktuellen Stand (außer er kennt ihn schon)
+        if self._latest is not None and last_event_id != self._latest_id:
+            client.offer(self._latest)
+
+        self.clients.append(client)
+        self.stats['connections'] += 1
+        logger.debug(f"📡 Stream-Client verbunden: {client.peer} ({len(self.clients)} aktiv)")
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(client.ready.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    # Kommentarzeile hält Proxies/Browser bei Zyklus-Pausen verbunden
+                    writer.write(b": keepalive\n\n")
+                else:
+                    frame, client.pending = client.pending, None
+                    client.ready.clear()
+                    writer.write(frame)
+                    client.sent += 1
+                    self.stats['frames_sent'] += 1
+
+                try:
+                    await asyncio.wait_for(writer.drain(), timeout=self.write_timeout)
+                except asyncio.TimeoutError:
+                    self.stats['disconnected_slow'] += 1
+                    logger.warning(f"⚠️ Stream-Client {client.peer} nimmt keine Daten ab - getrennt")
+                    raise
+        finally:
+            self.clients.remove(client)
+            logger.debug(f"📡 Stream-Client getrennt: {client.peer} ({client.sent} gesendet, "
+                         f"{client.dropped} übersprungen)")
+
+    def stop(self):
+        """Server schließen, Clients trennen, Event-Loop beenden"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        async def shutdown():
+            self._server.close()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop)
+        except RuntimeError:
+            return
+        self._thread.join(timeout=5)
+        self._loop = None
+
+
+def start_live_stream(config, snapshot: LatestSnapshot) -> Optional[LiveStream]:
+    """SSE Stream laut [api] starten (enabled und stream = true)"""
+    if not (config.getboolean('api', 'enabled', fallback=False)
+            and config.getboolean('api', 'stream', fallback=True)):
+        return None
+
+    stream = LiveStream(snapshot,
+                        host=config.get('api', 'host', fallback='127.0.0.1'),
+                        port=config.getint('api', 'stream_port', fallback=9104),
+                        keepalive=config.getfloat('api', 'stream_keepalive', fallback=15.0))
+    return stream if stream.start() else None
@@ -0,0 +1,6 @@
+# Monitoring Modul (Metriken, Timing Spans)
+from .metrics import REGISTRY, Registry, Counter, Gauge, Histogram, MetricsServer, start_metrics_server
+from .tracing import TRACER, Tracer, install_toggle_signal
+
+__all__ = ['REGISTRY', 'Registry', 'Counter', 'Gauge', 'Histogram', 'MetricsServer', 'start_metrics_server',
+           'TRACER', 'Tracer', 'install_toggle_signal']
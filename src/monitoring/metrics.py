@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Metriken (Prometheus Format)
+==================================================
+
+Schlanke Counter/Gauge/Histogram Implementierung ohne externe Abhängigkeiten
+und ein lokaler HTTP-Endpunkt /metrics im Prometheus Text-Format.
+
+Der Hot-Path kostet nur ein Lock und eine Addition pro Messwert. Zähler,
+die ohnehin in den Hardware-Klassen geführt werden, werden erst beim
+Abruf über Collector-Funktionen eingesammelt.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Standard-Buckets für Laufzeiten in Sekunden (1-Wire Konvertierung ~750ms)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Labels im Prometheus Format ({a="1",b="2"})"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricFamily:
+    """Metrik-Familie (HELP/TYPE + Samples) - Rückgabewert von Collector-Funktionen"""
+
+    def __init__(self, name: str, metric_type: str, documentation: str):
+        self.name = name
+        self.type = metric_type
+        self.documentation = documentation
+        self.samples: List[Tuple[str, Dict[str, str], float]] = []
+
+    def add(self, labels: Dict[str, str], value: float, suffix: str = ""):
+        """Sample hinzufügen"""
+        self.samples.append((self.name + suffix, labels, value))
+        return self
+
+    def add_histogram(self, labels: Dict[str, str], histogram):
+        """
+        Histogramm-Samples hinzufügen
+
+        Erwartet ein Objekt mit buckets, counts (je Bucket + Inf), sum und count -
+        passt auf HistogramChild und mqtt_publish.LatencyHistogram.
+        """
+        cumulative = 0
+        bounds = list(histogram.buckets) + [float('inf')]
+        for bound, count in zip(bounds, histogram.counts):
+            cumulative += count
+            self.add(dict(labels, le=_format_value(bound)), cumulative, "_bucket")
+        self.add(labels, histogram.sum, "_sum")
+        self.add(labels, histogram.count, "_count")
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples:
+            lines.append(f"{name}{format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class _Metric:
+    """Basisklasse: Metrik mit optionalen Labels"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> object:
+        """Kind-Metrik für die Label-Werte (wird zwischengespeichert)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: erwartet Labels {self.labelnames}, erhalten {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name}: Labels erforderlich {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type_name, self.documentation)
+        for key, child in list(self._children.items()):
+            self._add_child(family, dict(zip(self.labelnames, key)), child)
+        return family
+
+    def _add_child(self, family: MetricFamily, labels, child):
+        family.add(labels, child.value)
+
+
+class _ValueChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monoton steigender Zähler"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Momentanwert"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+
+class HistogramChild:
+    """Histogramm-Werte einer Label-Kombination"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    """Verteilung von Messwerten (z.B. Laufzeiten)"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _add_child(self, family: MetricFamily, labels, child):
+        family.add_histogram(labels, child)
+
+
+class Registry:
+    """Sammlung aller Metriken eines Prozesses"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Mehrfache Definition (z.B. mehrere Instanzen) liefert dieselbe Metrik
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], List[MetricFamily]]):
+        """Funktion registrieren, die beim Abruf Metrik-Familien liefert"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], List[MetricFamily]]):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        """Alle Metrik-Familien (gleichnamige Familien mehrerer Collector zusammengeführt)"""
+        families: Dict[str, MetricFamily] = {}
+        for metric in list(self._metrics.values()):
+            families[metric.name] = metric.collect()
+        for collector in list(self._collectors):
+            try:
+                for family in collector():
+                    existing = families.get(family.name)
+                    if existing is None:
+                        families[family.name] = family
+                    else:
+                        existing.samples.extend(family.samples)
+            except Exception as e:
+                logger.error(f"❌ Metrik-Collector Fehler: {e}")
+        return list(families.values())
+
+    def render(self) -> str:
+        """Alle Metriken im Prometheus Text-Format"""
+        lines = []
+        for family in self.collect():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Prozessweite Standard-Registry
+REGISTRY = Registry()
+
+
+def collector_family(name: str, metric_type: str, documentation: str,
+                     samples: Iterable[Tuple[Dict[str, str], float]] = ()) -> MetricFamily:
+    """Hilfsfunktion für Collector: Metrik-Familie aus (labels, wert) Paaren"""
+    family = MetricFamily(name, metric_type, documentation)
+    for labels, value in samples:
+        family.add(labels, value)
+    return family
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics: {format % args}")
+
+
+class MetricsServer:
+    """HTTP-Endpunkt /metrics in einem Hintergrund-Thread"""
+
+    def __init__(self, registry: Registry = REGISTRY, host: str = '127.0.0.1', port: int = 9101):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Server starten (False wenn Port belegt o.ä.)"""
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        except OSError as e:
+            logger.error(f"❌ Metrik-Endpunkt {self.host}:{self.port} nicht verfügbar: {e}")
+            return False
+
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"📈 Metriken verfügbar: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_servers: Dict[Tuple[str, int], MetricsServer] = {}
+
+
+def start_metrics_server(config, port_option: str, default_port: int,
+                         registry: Registry = REGISTRY) -> Optional[MetricsServer]:
+    """
+    Metrik-Endpunkt laut [monitoring] Konfiguration starten (einmal pro Port)
+
+    Args:
+        config: ConfigParser
+        port_option: Name der Port-Option (z.B. "reader_metrics_port")
+        default_port: Standard-Port
+    """
+    if not config.getboolean('monitoring', 'metrics_enabled', fallback=False):
+        return None
+
+    host = config.get('monitoring', 'metrics_host', fallback='127.0.0.1')
+    port = config.getint('monitoring', port_option, fallback=default_port)
+
+    key = (host, port)
+    if key not in _servers:
+        server = MetricsServer(registry, host, port)
+        if not server.start():
+            return None
+        _servers[key] = server
+    return _servers[key]
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Timing Spans
+==================================
+
+Zeitmessung der einzelnen Stufen eines Zyklus (DS18B20 Konvertierung,
+DHT22, Line-Protocol Kodierung, InfluxDB Schreiben/Abfrage, MQTT Publish).
+
+Spans werden je nach Modus als NDJSON Trace-Records in eine Datei
+geschrieben und/oder in das Histogramm pi5_span_seconds{span} einsortiert
+(sichtbar unter /metrics). Abgeschaltet liefert span() ein gemeinsames
+No-Op Objekt - es fällt keine Zeitmessung und keine Allokation an.
+
+Umschalten zur Laufzeit: SIGUSR2 an den Prozess (an/aus) oder
+TRACER.configure(...).
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import REGISTRY, Registry
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'histogram', 'ndjson', 'both')
+
+# Feinere Buckets als DEFAULT_BUCKETS - Kodierung/Publish liegen im µs-Bereich
+SPAN_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0)
+
+
+class _NoopSpan:
+    """Span-Ersatz bei abgeschaltetem Tracing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Aktueller Trace (trace_id, sampled) - ContextVar statt threading.local, damit
+# parallele asyncio Tasks getrennt bleiben und asyncio.to_thread den Trace erbt
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('pi5_trace', default=(None, True))
+
+
+class _Span:
+    """Zeitmessung einer Stufe (Context Manager)"""
+
+    __slots__ = ("tracer", "name", "attrs", "start", "_t0")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._finish(self.name, self.start, duration, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attribute nachträglich ergänzen (z.B. Anzahl Punkte)"""
+        self.attrs.update(attrs)
+
+
+class _Trace(_Span):
+    """Wurzel-Span eines Zyklus - alle Spans im selben Kontext erhalten dessen trace_id"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        trace = (next(self.tracer._trace_ids), random.random() < self.tracer.sample_rate)
+        self._token = _current_trace.set(trace)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        result = super().__exit__(exc_type, exc, tb)
+        _current_trace.reset(self._token)
+        self.tracer._flush()
+        return result
+
+
+class Tracer:
+    """
+    Timing Spans mit NDJSON- und/oder Histogramm-Ausgabe
+
+    Verwendung:
+        with TRACER.trace('reader.cycle'):
+            with TRACER.span('dht22.read'):
+                ...
+    """
+
+    def __init__(self, registry: Registry = REGISTRY):
+        self.mode = 'off'
+        self.trace_file: Optional[str] = None
+        self.sample_rate = 1.0
+        self._enabled = False
+        self._histogram_enabled = False
+        self._ndjson_enabled = False
+        self._last_mode = 'histogram'   # Ziel-Modus beim Einschalten per Signal
+
+        self._histogram = registry.histogram(
+            'pi5_span_seconds', 'Dauer der Verarbeitungsstufen (Timing Spans)', ['span'],
+            buckets=SPAN_BUCKETS)
+        self._max: Dict[str, float] = {}
+
+        self._file = None
+        self._file_lock = threading.RLock()   # reentrant: Umschalten per Signal im Haupt-Thread
+        self._trace_ids = itertools.count(int(time.time() * 1000))
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def configure(self, mode: str = 'off', trace_file: Optional[str] = None, sample_rate: float = 1.0) -> bool:
+        """
+        Tracing (um)konfigurieren - auch zur Laufzeit möglich
+
+        Args:
+            mode: off, histogram, ndjson oder both
+            trace_file: Ziel-Datei für NDJSON Records
+            sample_rate: Anteil der Zyklen, die als NDJSON geschrieben werden (0..1)
+        """
+        if mode not in MODES:
+            logger.error(f"❌ Unbekannter Tracing-Modus: {mode} (erlaubt: {', '.join(MODES)})")
+            return False
+
+        writes_ndjson = mode in ('ndjson', 'both')
+        if writes_ndjson and not trace_file and not self.trace_file:
+            logger.error("❌ Tracing-Modus ndjson benötigt trace_file")
+            return False
+
+        with self._file_lock:
+            if trace_file and trace_file != self.trace_file:
+                self._close_file()
+                self.trace_file = trace_file
+            if writes_ndjson and self._file is None:
+                try:
+                    directory = os.path.dirname(self.trace_file)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.trace_file, 'a', encoding='utf-8')
+                except OSError as e:
+                    logger.error(f"❌ Trace-Datei {self.trace_file} nicht beschreibbar: {e}")
+                    return False
+            elif not writes_ndjson:
+                self._close_file()
+
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.mode = mode
+        self._histogram_enabled = mode in ('histogram', 'both')
+        self._ndjson_enabled = writes_ndjson
+        self._enabled = mode != 'off'
+        if self._enabled:
+            self._last_mode = mode
+
+        logger.info(f"⏱️ Tracing: {mode}" + (f" → {self.trace_file}" if writes_ndjson else ""))
+        return True
+
+    def configure_from(self, config) -> bool:
+        """Tracing laut [monitoring] Konfiguration einrichten"""
+        return self.configure(
+            mode=config.get('monitoring', 'tracing', fallback='off'),
+            trace_file=config.get('monitoring', 'trace_file', fallback=None),
+            sample_rate=config.getfloat('monitoring', 'trace_sample_rate', fallback=1.0))
+
+    def toggle(self) -> bool:
+        """Tracing an/aus schalten (an: zuletzt aktiver Modus)"""
+        return self.configure('off' if self._enabled else self._last_mode)
+
+    def span(self, name: str, **attrs):
+        """Span für eine Stufe (No-Op bei abgeschaltetem Tracing)"""
+        if not self._enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, attrs)
+
+    def trace(self, name: str, **attrs):
+        """Wurzel-Span für einen Zyklus"""
+        if not self._enabled:
+            return _NOOP_SPAN
+        return _Trace(self, name, attrs)
+
+    def record(self, name: str, duration: float, start: Optional[float] = None, **attrs):
+        """Bereits gemessene Dauer als Span übernehmen (z.B. aus Hardware-Klassen)"""
+        if not self._enabled:
+            return
+        if start is None:
+            start = time.time() - duration
+        self._finish(name, start, duration, attrs)
+
+    def _finish(self, name: str, start: float, duration: float, attrs: Dict):
+        if self._histogram_enabled:
+            self._histogram.labels(name).observe(duration)
+            if duration > self._max.get(name, 0.0):
+                self._max[name] = duration
+
+        trace_id, sampled = _current_trace.get()
+        if self._ndjson_enabled and sampled:
+            record = {
+                'ts': round(start, 6),
+                'trace_id': trace_id,
+                'span': name,
+                'duration_ms': round(duration * 1000, 3),
+                'thread': threading.current_thread().name
+            }
+            if attrs:
+                record.update(attrs)
+            line = json.dumps(record, default=str) + "\n"
+            with self._file_lock:
+                if self._file:
+                    self._file.write(line)
+
+    def _flush(self):
+        with self._file_lock:
+            if self._file:
+                self._file.flush()
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Histogramm-Auswertung je Span (count, mean_ms, max_ms)"""
+        result = {}
+        for span in sorted(self._max):
+            child = self._histogram.labels(span)
+            if child.count:
+                result[span] = {
+                    'count': child.count,
+                    'mean_ms': round(child.sum / child.count * 1000, 3),
+                    'max_ms': round(self._max[span] * 1000, 3)
+                }
+        return result
+
+    def log_summary(self):
+        """Span-Auswertung ins Log schreiben"""
+        for span, stats in self.summary().items():
+            logger.info(f"⏱️ {span}: n={stats['count']} Ø {stats['mean_ms']:.1f}ms max {stats['max_ms']:.1f}ms")
+
+    def close(self):
+        with self._file_lock:
+            self._close_file()
+
+
+# Prozessweiter Tracer
+TRACER = Tracer()
+
+
+def install_toggle_signal(tracer: Tracer = TRACER, signum: Optional[int] = None) -> bool:
+    """
+    Signal-Handler zum Umschalten des Tracings installieren (Standard: SIGUSR2)
+
+    Nur im Haupt-Thread möglich. Beim Ausschalten wird die Auswertung geloggt.
+    """
+    if signum is None:
+        signum = getattr(signal, 'SIGUSR2', None)
+    if signum is None:
+        return False
+
+    def _toggle(received, frame):
+        if tracer.enabled:
+            tracer.log_summary()
+        tracer.toggle()
+
+    try:
+        signal.signal(signum, _toggle)
+        return True
+    except ValueError:
+        logger.warning("⚠️ Tracing-Signal nur im Haupt-Thread verfügbar")
+        return False
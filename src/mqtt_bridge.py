@@ -14,10 +14,19 @@ import time
 import logging
 import os
 import sys
-from datetime import datetime
-from typing import Dict, List, Optional
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 import configparser
 
+from mqtt_publish import OfflinePublishQueue, PublishTracker
+from alerts import load_rules
+from burner import event_message
+from derived import load_circuits
+from monitoring.metrics import REGISTRY, collector_family, start_metrics_server
+from monitoring.tracing import TRACER, install_toggle_signal
+
 try:
     from influxdb_client import InfluxDBClient
     INFLUXDB_AVAILABLE = True
@@ -35,22 +44,57 @@ except ImportError:
 # =============================================================================
 # LOGGING SETUP
 # =============================================================================
+# Log-Datei nur wenn das Verzeichnis existiert (z.B. nicht auf Entwicklungsrechnern)
+_log_handlers = [logging.StreamHandler()]
+try:
+    _log_handlers.append(logging.FileHandler('/home/pi/pi5-sensors/mqtt_bridge.log'))
+except OSError:
+    pass
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('/home/pi/pi5-sensors/mqtt_bridge.log')
-    ]
+    handlers=_log_handlers
 )
 logger = logging.getLogger(__name__)
 
+# Metriken der Bridge
+INFLUX_QUERY_SECONDS = REGISTRY.histogram(
+    'pi5_bridge_influxdb_query_seconds', 'Dauer der InfluxDB Abfragen der Bridge')
+INFLUX_QUERIES_TOTAL = REGISTRY.counter(
+    'pi5_bridge_influxdb_queries_total', 'InfluxDB Abfragen der Bridge nach Ergebnis', ['status'])
+
+
+class MqttState:
+    """Zustände der MQTT Verbindung (Zustandsautomat)"""
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    READY = "ready"
+
 
 class Pi5MqttBridge:
     """MQTT Bridge für Pi5 Heizungs Messer → Home Assistant"""
     
-    def __init__(self, config_file='config.ini'):
-        """Initialisiere MQTT Bridge"""
+    # Standard-QoS je Topic-Klasse (überschreibbar via [mqtt] qos_<klasse>)
+    DEFAULT_QOS = {
+        'state': 0,
+        'discovery': 1,
+        'status': 1
+    }
+    
+    def __init__(self, config_file='config.ini', mqtt_section='mqtt', clock=None):
+        """
+        Initialisiere MQTT Bridge
+        
+        Args:
+            config_file: Pfad zur Konfigurationsdatei
+            mqtt_section: Config-Sektion des Brokers (z.B. "mqtt:zweitbroker"),
+                          fehlende Werte werden aus [mqtt] übernommen
+            clock: Uhr für Übertragungs- und Discovery-Timer (Standard: time Modul,
+                   hardware.simulation.VirtualClock für Dauertests)
+        """
+        self.clock = clock or time
+        self.running = False
         self.config = configparser.ConfigParser()
         
         # Config-Datei suchen
@@ -75,18 +119,23 @@ class Pi5MqttBridge:
             sys.exit(1)
         
         # MQTT Konfiguration
-        self.mqtt_broker = self.config.get('mqtt', 'broker', fallback='localhost')
-        self.mqtt_port = self.config.getint('mqtt', 'port', fallback=1883)
-        self.mqtt_username = self.config.get('mqtt', 'username', fallback='')
-        self.mqtt_password = self.config.get('mqtt', 'password', fallback='')
-        self.mqtt_prefix = self.config.get('mqtt', 'topic_prefix', fallback='pi5_heizung')
+        self.mqtt_section = mqtt_section
+        self.mqtt_broker = self._mqtt_option('broker', 'localhost')
+        self.mqtt_port = int(self._mqtt_option('port', 1883))
+        self.mqtt_username = self._mqtt_option('username', '')
+        self.mqtt_password = self._mqtt_option('password', '')
+        self.mqtt_prefix = self._mqtt_option('topic_prefix', 'pi5_heizung')
         
         # Home Assistant Konfiguration
         self.ha_ip = self.config.get('homeassistant', 'ip', fallback='192.168.1.100')
         self.ha_discovery = self.config.getboolean('homeassistant', 'mqtt_discovery', fallback=True)
+        # Optionale Verfügbarkeit je Sensor (aus dem Sensor-Health des Readers)
+        self.sensor_availability = self.config.getboolean('homeassistant', 'sensor_availability', fallback=False)
         
         # InfluxDB Konfiguration
-        self.influx_url = f"http://{self.config.get('database', 'host', fallback='localhost')}:8086"
+        self.influx_url = (f"http://{self.config.get('database', 'host', fallback='localhost')}"
+                           f":{self.config.getint('database', 'port', fallback=8086)}")
+        self.influx_timeout = self.config.getfloat('database', 'timeout', fallback=10.0)
         self.influx_token = self.config.get('database', 'token', fallback='pi5-token-2024')
         self.influx_org = self.config.get('database', 'org', fallback='pi5org')
         self.influx_bucket = self.config.get('database', 'bucket', fallback='sensors')
@@ -96,10 +145,74 @@ class Pi5MqttBridge:
         if self.config.has_section('labels'):
             self.sensor_labels = dict(self.config.items('labels'))
         
+        # Heizkreise: Spreizung/Änderungsraten (vom Sensor Reader als Measurement "circuit" geschrieben)
+        self.circuits = load_circuits(self.config)
+        
+        # Brenner-Takte (vom Sensor Reader als Measurement "burner"/"burner_event" geschrieben),
+        # Ereignisse sendet der Reader selbst - die Bridge nur mit [burner] mqtt = false
+        self.burner_sensor = self.config.get('burner', 'sensor', fallback='').strip()
+        self.burner_events = not self.config.getboolean('burner', 'mqtt', fallback=True)
+        self._burner_events_since = self.clock.time()     # Zeitpunkt des zuletzt gesendeten Ereignisses
+        
+        # Alarm-Regeln: Zustände sendet der Sensor Reader selbst, die Bridge nur die Discovery
+        self.alert_rules = load_rules(self.config)
+        
         # MQTT Client
         self.mqtt_client = None
         self.influx_client = None
         
+        # Verbindungs-Zustandsautomat
+        # Callbacks laufen im paho Netzwerk-Thread und dürfen nicht blockieren.
+        # Discovery und erste Datenübertragung übernimmt der Worker-Thread.
+        self.mqtt_state = MqttState.DISCONNECTED
+        self.connected_event = threading.Event()   # Broker hat CONNACK gesendet
+        self.ready_event = threading.Event()       # Discovery + erste Daten gesendet
+        self._state_lock = threading.Lock()
+        self._connection_generation = 0
+        self._worker_queue = queue.Queue()
+        self._worker_thread = None
+        # Abfrage-Zyklen von Worker (nach Connect) und Hauptschleife nie gleichzeitig -
+        # beide ändern den Stand gesendeter Brenner-Ereignisse und Verfügbarkeiten
+        self._cycle_lock = threading.RLock()
+        self._resend_availability = False
+        
+        # Offline-Puffer: neueste Nachricht je Topic bis zum Reconnect - mindestens
+        # ein Platz je State-Topic, sonst fallen bei vielen Sensoren Werte heraus.
+        # Brenner-Ereignisse werden nicht zusammengefasst (eigener FIFO)
+        state_topics = len(self.sensor_labels) + (1 if 'dht22' in self.sensor_labels else 0) + len(self.circuits)
+        if self.burner_sensor:
+            state_topics += 1
+        if self.sensor_availability:
+            state_topics *= 2
+        self.offline_queue = OfflinePublishQueue(
+            max_topics=max(int(self._mqtt_option('offline_queue_size', 1000)), state_topics),
+            max_events=int(self._mqtt_option('offline_queue_events', 100))
+        )
+        self._offline_lock = threading.Lock()
+        
+        # QoS je Topic-Klasse und In-Flight Fenster (QoS>0 Nachrichten ohne Ack)
+        self.topic_qos = {
+            topic_class: int(self._mqtt_option(f'qos_{topic_class}', default))
+            for topic_class, default in self.DEFAULT_QOS.items()
+        }
+        self.max_inflight = int(self._mqtt_option('max_inflight', 20))
+        self.max_queued = int(self._mqtt_option('max_queued', 1000))
+        self.publish_tracker = PublishTracker(max_inflight=self.max_inflight)
+        
+        # Messzeitpunkt (UTC, ISO 8601) als "acquired" in State-Payloads aufnehmen
+        self.payload_timestamps = str(self._mqtt_option('payload_timestamps', 'false')).lower() in ('1', 'true', 'yes', 'on')
+        
+        # Zuletzt gesendete Verfügbarkeit (Bridge-Status und je Sensor),
+        # gesendet wird nur bei Änderung - "offline" bei Absturz via Last Will
+        self.status_topic = f"{self.mqtt_prefix}/status"
+        self._published_status = None
+        self._published_sensor_availability = {}
+        self.connect_count = 0
+        
+        # Metrik-Endpunkt (/metrics) laut [monitoring] - ein Endpunkt für alle Bridges
+        REGISTRY.add_collector(self._collect_metrics)
+        self.metrics_server = start_metrics_server(self.config, 'bridge_metrics_port', 9102)
+        
         # Home Assistant Device Info
         self.device_info = {
             "identifiers": ["pi5_heizungs_messer"],
@@ -109,7 +222,7 @@ class Pi5MqttBridge:
             "sw_version": "1.0.0"
         }
         
-        logger.info("🌡️ Pi5 MQTT Bridge initialisiert")
+        logger.info(f"🌡️ Pi5 MQTT Bridge initialisiert [{self.mqtt_section}]")
         logger.info(f"   📡 MQTT Broker: {self.mqtt_broker}:{self.mqtt_port}")
         logger.info(f"   🏠 Home Assistant: {self.ha_ip}")
         logger.info(f"   🗄️ InfluxDB: {self.influx_url}")
@@ -119,6 +232,11 @@ class Pi5MqttBridge:
         else:
             logger.info("   🔓 MQTT Auth: Keine")
     
+    def _mqtt_option(self, key: str, fallback=None):
+        """MQTT Option aus der Broker-Sektion lesen (Fallback: [mqtt])"""
+        default = self.config.get('mqtt', key, fallback=fallback)
+        return self.config.get(self.mqtt_section, key, fallback=default)
+    
     def setup_mqtt(self):
         """MQTT Client setup"""
         if not MQTT_AVAILABLE:
@@ -131,15 +249,15 @@ class Pi5MqttBridge:
             # Callback functions
             self.mqtt_client.on_connect = self.on_mqtt_connect
             self.mqtt_client.on_disconnect = self.on_mqtt_disconnect
-            self.mqtt_client.on_publish = self.on_mqtt_publish
+            self.configure_client(self.mqtt_client)
             
-            # Authentication falls konfiguriert
-            if self.mqtt_username and self.mqtt_password:
-                self.mqtt_client.username_pw_set(self.mqtt_username, self.mqtt_password)
-                logger.info("🔐 MQTT Authentifizierung aktiviert")
+            # Worker-Thread für Discovery und Datenübertragung starten
+            self._start_worker()
             
-            # Verbinden
+            # Verbinden (Reconnects übernimmt der paho Netzwerk-Thread)
             logger.info(f"🔌 Verbinde zu MQTT Broker {self.mqtt_broker}:{self.mqtt_port}")
+            self._set_state(MqttState.CONNECTING)
+            self.mqtt_client.reconnect_delay_set(min_delay=1, max_delay=60)
             self.mqtt_client.connect(self.mqtt_broker, self.mqtt_port, 60)
             self.mqtt_client.loop_start()
             
@@ -147,8 +265,98 @@ class Pi5MqttBridge:
             
         except Exception as e:
             logger.error(f"❌ MQTT Setup fehlgeschlagen: {e}")
+            self._set_state(MqttState.DISCONNECTED)
             return False
     
+    def configure_client(self, client):
+        """Gemeinsame Client-Einstellungen (Sync- und Asyncio-Modus)"""
+        client.on_publish = self.on_mqtt_publish
+        
+        # In-Flight Fenster und paho-interne Queue begrenzen - bei voller Queue
+        # lehnt publish() ab und die Nachricht landet im Offline-Puffer
+        client.max_inflight_messages_set(self.max_inflight)
+        client.max_queued_messages_set(self.max_queued)
+        
+        # Last Will: Broker meldet "offline" sobald die Bridge ohne sauberes
+        # Disconnect verschwindet (Absturz, Netzwerk) - spätestens nach Keepalive
+        client.will_set(self.status_topic, "offline",
+                        qos=self.topic_qos.get('status', 1), retain=True)
+        
+        # Authentication falls konfiguriert
+        if self.mqtt_username and self.mqtt_password:
+            client.username_pw_set(self.mqtt_username, self.mqtt_password)
+            logger.info("🔐 MQTT Authentifizierung aktiviert")
+    
+    def _set_state(self, state: str):
+        """Zustand des Verbindungsautomaten setzen"""
+        with self._state_lock:
+            if self.mqtt_state != state:
+                logger.debug(f"MQTT Zustand: {self.mqtt_state} → {state}")
+            self.mqtt_state = state
+    
+    def _start_worker(self):
+        """Worker-Thread für blockierende Arbeit nach dem Verbinden starten"""
+        if self._worker_thread and self._worker_thread.is_alive():
+            return
+        self._worker_thread = threading.Thread(
+            target=self._worker_loop,
+            name="mqtt-bridge-worker",
+            daemon=True
+        )
+        self._worker_thread.start()
+    
+    def _stop_worker(self):
+        """Worker-Thread beenden"""
+        if self._worker_thread and self._worker_thread.is_alive():
+            self._worker_queue.put(None)
+            self._worker_thread.join(timeout=5)
+        self._worker_thread = None
+    
+    def _worker_loop(self):
+        """Abarbeitung der Verbindungs-Ereignisse außerhalb des Netzwerk-Threads"""
+        while True:
+            generation = self._worker_queue.get()
+            if generation is None:
+                break
+            
+            # Veraltete Ereignisse überspringen (Verbindung inzwischen erneut getrennt)
+            with self._state_lock:
+                if generation != self._connection_generation or self.mqtt_state != MqttState.CONNECTED:
+                    continue
+            
+            try:
+                self.on_connection_ready()
+            except Exception as e:
+                logger.error(f"❌ Fehler nach Verbindungsaufbau: {e}")
+            
+            self._mark_ready(generation)
+    
+    def on_connection_ready(self):
+        """Discovery und erste Datenübertragung nach (Re-)Connect (Worker-Thread)"""
+        with self._cycle_lock:
+            if self.ha_discovery:
+                self.publish_discovery()
+            if self.influx_client:
+                self.run_once()
+    
+    def is_connected(self) -> bool:
+        """Prüfen ob der Broker die Verbindung bestätigt hat"""
+        return self.connected_event.is_set()
+    
+    def wait_until_connected(self, timeout: float = 10.0) -> bool:
+        """Auf CONNACK des Brokers warten statt fester Pausen"""
+        if self.connected_event.wait(timeout):
+            return True
+        logger.warning(f"⚠️ MQTT Verbindung nach {timeout:.0f}s nicht bestätigt")
+        return False
+    
+    def wait_until_ready(self, timeout: float = 30.0) -> bool:
+        """Warten bis Discovery und erste Daten nach dem Connect gesendet wurden"""
+        if self.ready_event.wait(timeout):
+            return True
+        logger.warning(f"⚠️ MQTT Bridge nach {timeout:.0f}s nicht bereit")
+        return False
+    
     def setup_influxdb(self):
         """InfluxDB Client setup"""
         if not INFLUXDB_AVAILABLE:
@@ -159,7 +367,8 @@ class Pi5MqttBridge:
             self.influx_client = InfluxDBClient(
                 url=self.influx_url,
                 token=self.influx_token,
-                org=self.influx_org
+                org=self.influx_org,
+                timeout=int(self.influx_timeout * 1000)
             )
             
             # Health Check
@@ -169,45 +378,255 @@ class Pi5MqttBridge:
                 return True
             else:
                 logger.error(f"❌ InfluxDB Health Check fehlgeschlagen: {health.status}")
-                return False
                 
         except Exception as e:
             logger.error(f"❌ InfluxDB Setup fehlgeschlagen: {e}")
-            return False
+        
+        # Client des Fehlversuchs schließen - sonst bleibt je Versuch ein Verbindungs-Pool offen
+        if self.influx_client:
+            self.influx_client.close()
+            self.influx_client = None
+        return False
+    
+    def _mark_connected(self) -> int:
+        """CONNACK im Zustandsautomaten vermerken, liefert die Verbindungs-Generation"""
+        with self._state_lock:
+            self._connection_generation += 1
+            self.connect_count += 1
+            self.mqtt_state = MqttState.CONNECTED
+            self.ready_event.clear()
+            self.connected_event.set()
+            return self._connection_generation
+    
+    def _mark_ready(self, generation: int) -> bool:
+        """Verbindung als bereit markieren, sofern sie noch aktuell ist"""
+        with self._state_lock:
+            if generation != self._connection_generation or self.mqtt_state != MqttState.CONNECTED:
+                return False
+            self.mqtt_state = MqttState.READY
+            self.ready_event.set()
+            return True
+    
+    def _mark_disconnected(self, reconnecting: bool):
+        """Verbindungsabbruch im Zustandsautomaten vermerken"""
+        with self._state_lock:
+            self._connection_generation += 1
+            self.connected_event.clear()
+            self.ready_event.clear()
+            self.mqtt_state = MqttState.CONNECTING if reconnecting else MqttState.DISCONNECTED
+    
+    @staticmethod
+    def log_connack_error(rc: int):
+        """Fehlgeschlagenen Verbindungsaufbau (CONNACK rc) protokollieren"""
+        logger.error(f"❌ MQTT Verbindung fehlgeschlagen: {rc}")
+        if rc == 1:
+            logger.error("   → Falsche Protokoll-Version")
+        elif rc == 2:
+            logger.error("   → Ungültige Client-ID")
+        elif rc == 3:
+            logger.error("   → Server nicht verfügbar")
+        elif rc == 4:
+            logger.error("   → Falsche Anmeldedaten")
+        elif rc == 5:
+            logger.error("   → Nicht autorisiert")
+    
+    def _handle_connack(self) -> int:
+        """Erfolgreichen Connect verarbeiten (nicht blockierend), liefert die Generation"""
+        # Status einmal pro Verbindung senden (überschreibt den Last Will)
+        self.publish_status("online", force=True)
+        # Sensor-Verfügbarkeit im nächsten Zyklus erneut senden (zurückgesetzt wird im Zyklus)
+        self._resend_availability = True
+        
+        # Während des Ausfalls gepufferte Werte nachsenden, bevor die Verbindung als
+        # verbunden gilt - publish_message anderer Threads wartet am Lock, ein neuer
+        # Wert kann so nicht vor dem älteren gepufferten desselben Topics ankommen
+        with self._offline_lock:
+            self.flush_offline_queue()
+            return self._mark_connected()
     
     def on_mqtt_connect(self, client, userdata, flags, rc):
-        """MQTT Connect Callback"""
+        """MQTT Connect Callback (paho Netzwerk-Thread - nicht blockieren!)"""
         if rc == 0:
             logger.info("✅ MQTT Broker verbunden")
-            # Status senden
-            self.mqtt_client.publish(f"{self.mqtt_prefix}/status", "online", retain=True)
-            # Home Assistant Auto-Discovery senden
-            logger.info("🏠 Sende Home Assistant Auto-Discovery...")
-            self.publish_discovery()
+            
+            # Discovery und erste Daten im Worker-Thread senden
+            self._worker_queue.put(self._handle_connack())
         else:
-            logger.error(f"❌ MQTT Verbindung fehlgeschlagen: {rc}")
-            if rc == 1:
-                logger.error("   → Falsche Protokoll-Version")
-            elif rc == 2:
-                logger.error("   → Ungültige Client-ID")
-            elif rc == 3:
-                logger.error("   → Server nicht verfügbar")
-            elif rc == 4:
-                logger.error("   → Falsche Anmeldedaten")
-            elif rc == 5:
-                logger.error("   → Nicht autorisiert")
+            self._set_state(MqttState.DISCONNECTED)
+            self.log_connack_error(rc)
     
     def on_mqtt_disconnect(self, client, userdata, rc):
         """MQTT Disconnect Callback"""
+        # Bei unerwarteter Trennung verbindet paho automatisch neu
+        self._mark_disconnected(reconnecting=rc != 0)
+        
         if rc != 0:
             logger.warning(f"⚠️ MQTT Verbindung getrennt: {rc}")
         else:
             logger.info("👋 MQTT Verbindung sauber getrennt")
 
     def on_mqtt_publish(self, client, userdata, mid):
-        """MQTT Publish Callback"""
+        """MQTT Publish Callback (QoS 0: gesendet, QoS 1/2: vom Broker bestätigt)"""
+        self.publish_tracker.on_ack(mid)
         logger.debug(f"📤 MQTT Nachricht gesendet: {mid}")
     
+    def publish_message(self, topic: str, payload: str, retain: bool = False,
+                        topic_class: str = 'state', queue_offline: bool = True,
+                        sensor_id: Optional[str] = None, acquired: Optional[float] = None,
+                        coalesce: bool = True) -> bool:
+        """
+        Nachricht senden bzw. bei getrennter Verbindung puffern
+        
+        Args:
+            topic: MQTT Topic
+            payload: Nachricht
+            retain: Retained Flag
+            topic_class: Topic-Klasse für QoS und Statistik (state, discovery, status)
+            queue_offline: Bei Broker-Ausfall neueste Nachricht je Topic puffern
+            sensor_id: Sensor für die Ende-zu-Ende Latenz
+            acquired: Messzeitpunkt des Werts (Unix) für die Ende-zu-Ende Latenz
+            coalesce: False für Ereignisse - im Offline-Puffer bleibt jede Nachricht erhalten
+            
+        Returns:
+            True wenn die Nachricht an den Client übergeben wurde
+        """
+        qos = self.topic_qos.get(topic_class, 0)
+        
+        if queue_offline:
+            # Prüfung und Puffern unter Lock - sonst könnte die Nachricht
+            # nach dem Flush eines gleichzeitigen Reconnects hängen bleiben
+            with self._offline_lock:
+                if not self.is_connected():
+                    self.offline_queue.put(topic, payload, qos=qos, retain=retain, topic_class=topic_class,
+                                           sensor_id=sensor_id, acquired=acquired, coalesce=coalesce)
+                    logger.debug(f"📦 Offline gepuffert: {topic}")
+                    return False
+        
+        started = self.publish_tracker.clock()
+        result = self.mqtt_client.publish(topic, payload, qos=qos, retain=retain)
+        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.publish_tracker.track(result.mid, topic_class, qos, started, sensor_id, acquired)
+            return True
+        
+        self.publish_tracker.reject(result.rc)
+        if queue_offline and result.rc in (mqtt.MQTT_ERR_NO_CONN, mqtt.MQTT_ERR_QUEUE_SIZE):
+            self.offline_queue.put(topic, payload, qos=qos, retain=retain, topic_class=topic_class,
+                                   sensor_id=sensor_id, acquired=acquired, coalesce=coalesce)
+            logger.debug(f"📦 Offline gepuffert: {topic} ({result.rc})")
+        else:
+            logger.error(f"❌ MQTT Publish Fehler: {result.rc}")
+        return False
+    
+    def publish_status(self, status: str, force: bool = False) -> bool:
+        """Bridge-Verfügbarkeit (retained) senden - nur bei Änderung"""
+        if status == self._published_status and not force:
+            return True
+        if self.publish_message(self.status_topic, status, retain=True,
+                                topic_class='status', queue_offline=False):
+            self._published_status = status
+            return True
+        return False
+    
+    def publish_sensor_availability(self, availability_id: str, available: bool):
+        """Verfügbarkeit eines einzelnen Sensors (retained) senden - nur bei Änderung"""
+        if self._published_sensor_availability.get(availability_id) == available:
+            return
+        payload = "online" if available else "offline"
+        topic = f"{self.mqtt_prefix}/{availability_id}/availability"
+        self.publish_message(topic, payload, retain=True, topic_class='status')
+        self._published_sensor_availability[availability_id] = available
+        if not available:
+            logger.warning(f"⚠️ Sensor nicht verfügbar: {self.sensor_labels.get(availability_id, availability_id)}")
+    
+    def get_publish_stats(self) -> Dict:
+        """Backpressure-, Latenz- und Puffer-Statistik der Bridge"""
+        stats = self.publish_tracker.get_stats()
+        stats['topic_qos'] = dict(self.topic_qos)
+        stats['offline_queue'] = self.offline_queue.get_stats()
+        return stats
+    
+    def _collect_metrics(self) -> List:
+        """Publish-Statistik beim Metrik-Abruf einsammeln (Label: prefix)"""
+        stats = self.get_publish_stats()
+        prefix = {'prefix': self.mqtt_prefix}
+        families = []
+        
+        families.append(collector_family('pi5_mqtt_connected', 'gauge', 'MQTT Broker verbunden (1) oder nicht (0)',
+                                      [(prefix, self.is_connected())]))
+        families.append(collector_family('pi5_mqtt_connects_total', 'counter', 'Erfolgreiche MQTT Verbindungen (inkl. Reconnects)',
+                                      [(prefix, self.connect_count)]))
+        families.append(collector_family('pi5_mqtt_published_total', 'counter', 'An den MQTT Client übergebene Nachrichten', [
+            (dict(prefix, topic_class=cls), count) for cls, count in stats['published'].items()
+        ]))
+        families.append(collector_family('pi5_mqtt_acked_total', 'counter', 'Bestätigte MQTT Nachrichten (on_publish)', [
+            (dict(prefix, topic_class=cls), count) for cls, count in stats['acked'].items()
+        ]))
+        families.append(collector_family('pi5_mqtt_rejected_total', 'counter', 'Vom MQTT Client abgelehnte Nachrichten nach rc', [
+            (dict(prefix, rc=str(rc)), count) for rc, count in stats['rejected'].items()
+        ]))
+        families.append(collector_family('pi5_mqtt_unacked_total', 'counter', 'Ohne Bestätigung verworfene MQTT Nachrichten',
+                                      [(prefix, stats['unacked'])]))
+        families.append(collector_family('pi5_mqtt_inflight', 'gauge', 'Unbestätigte QoS>0 Nachrichten',
+                                      [(prefix, stats['inflight'])]))
+        families.append(collector_family('pi5_mqtt_offline_queue_pending', 'gauge', 'Topics im Offline-Puffer',
+                                      [(prefix, stats['offline_queue']['pending'])]))
+        families.append(collector_family('pi5_mqtt_offline_queue_dropped_total', 'counter', 'Wegen voller Offline-Puffer verworfene Topics',
+                                      [(prefix, stats['offline_queue']['dropped'])]))
+        
+        latency = collector_family('pi5_mqtt_publish_ack_seconds', 'histogram',
+                                   'Latenz publish() bis on_publish je Topic-Klasse')
+        for topic_class, histogram in list(self.publish_tracker.latency.items()):
+            latency.add_histogram(dict(prefix, topic_class=topic_class), histogram)
+        families.append(latency)
+        
+        e2e = collector_family('pi5_e2e_latency_seconds', 'histogram',
+                               'Ende-zu-Ende Latenz Sensor-Messung bis MQTT Zustellung je Sensor')
+        for sensor_id, histogram in list(self.publish_tracker.e2e_latency.items()):
+            e2e.add_histogram(dict(prefix, sensor=sensor_id), histogram)
+        families.append(e2e)
+        return families
+    
+    def log_publish_stats(self):
+        """Publish-Statistik protokollieren (für Broker-Dimensionierung)"""
+        stats = self.get_publish_stats()
+        logger.info(f"📈 MQTT In-Flight: {stats['inflight']}/{stats['max_inflight']} "
+                    f"(Peak {stats['inflight_peak']}), unbestätigt: {stats['unacked']}, "
+                    f"abgelehnt: {sum(stats['rejected'].values())}, "
+                    f"Offline-Puffer: {stats['offline_queue']['pending']}")
+        for topic_class, latency in stats['latency'].items():
+            logger.info(f"   ⏱️ {topic_class} (QoS {self.topic_qos.get(topic_class, 0)}): "
+                        f"{latency['count']} Acks, p50 {latency['p50'] * 1000:.0f}ms, "
+                        f"p99 {latency['p99'] * 1000:.0f}ms, max {latency['max'] * 1000:.0f}ms")
+        for sensor_id, latency in stats['e2e_latency'].items():
+            logger.info(f"   🕒 {sensor_id} Messung→Zustellung: p50 {latency['p50']:.1f}s, "
+                        f"p99 {latency['p99']:.1f}s, max {latency['max']:.1f}s")
+    
+    def flush_offline_queue(self) -> int:
+        """Gepufferte Nachrichten nach dem Reconnect senden"""
+        messages = self.offline_queue.drain()
+        if not messages:
+            return 0
+        
+        sent = 0
+        for message in messages:
+            started = self.publish_tracker.clock()
+            result = self.mqtt_client.publish(message.topic, message.payload,
+                                              qos=message.qos, retain=message.retain)
+            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                self.publish_tracker.track(result.mid, message.topic_class, message.qos, started,
+                                           message.sensor_id, message.acquired)
+                sent += 1
+            else:
+                # Verbindung erneut verloren - beim nächsten Connect nachsenden
+                self.publish_tracker.reject(result.rc)
+                self.offline_queue.put(message.topic, message.payload, qos=message.qos,
+                                       retain=message.retain, topic_class=message.topic_class,
+                                       sensor_id=message.sensor_id, acquired=message.acquired,
+                                       coalesce=message.coalesce)
+        
+        logger.info(f"📦 {sent}/{len(messages)} gepufferte MQTT Nachrichten nachgesendet")
+        return sent
+    
     def publish_discovery(self):
         """Home Assistant Auto-Discovery konfigurieren"""
         try:
@@ -223,7 +642,8 @@ class Pi5MqttBridge:
                         device_class="temperature",
                         unit_of_measurement="°C",
                         value_template="{{ value_json.temperature }}",
-                        icon="mdi:thermometer"
+                        icon="mdi:thermometer",
+                        availability_id="dht22"
                     )
                     
                     # DHT22 Luftfeuchtigkeit
@@ -233,7 +653,8 @@ class Pi5MqttBridge:
                         device_class="humidity",
                         unit_of_measurement="%",
                         value_template="{{ value_json.humidity }}",
-                        icon="mdi:water-percent"
+                        icon="mdi:water-percent",
+                        availability_id="dht22"
                     )
                     
                     if success1 and success2:
@@ -252,23 +673,94 @@ class Pi5MqttBridge:
                     if success:
                         discovery_count += 1
             
-            logger.info(f"✅ {discovery_count} Discovery-Nachrichten gesendet")
+            # Heizkreise: ein State-Topic je Kreis, je Wert eine Entität
+            for circuit in self.circuits:
+                for key, label, unit, icon in (
+                    ('delta_t', 'Spreizung', 'K', 'mdi:thermometer-lines'),
+                    ('supply_rate', 'Vorlauf Änderung', 'K/h', 'mdi:chart-line'),
+                    ('return_rate', 'Rücklauf Änderung', 'K/h', 'mdi:chart-line'),
+                ):
+                    if self.publish_sensor_discovery(
+                        sensor_id=f"circuit_{circuit.circuit_id}_{key}",
+                        sensor_name=f"{circuit.name} {label}",
+                        device_class=None,
+                        unit_of_measurement=unit,
+                        value_template=f"{{{{ value_json.{key} }}}}",
+                        icon=icon,
+                        availability_id=circuit.supply,
+                        state_id=f"circuit_{circuit.circuit_id}",
+                        state_class="measurement"
+                    ):
+                        discovery_count += 1
             
-            # Kurz warten und dann erste Daten senden
-            time.sleep(1)
-            self.run_once()
+            # Brenner: Zustand (binary_sensor) und Takt-Kennzahlen auf einem State-Topic
+            if self.burner_sensor:
+                for key, label, unit, template, icon, state_class, component in (
+                    ('running', 'Brenner', None, "{{ 'ON' if value_json.running else 'OFF' }}",
+                     'mdi:fire', None, 'binary_sensor'),
+                    ('starts_today', 'Brenner Starts heute', None, "{{ value_json.starts_today }}",
+                     'mdi:counter', 'total_increasing', 'sensor'),
+                    ('starts_per_day', 'Brenner Starts pro Tag', None, "{{ value_json.starts_per_day }}",
+                     'mdi:counter', 'measurement', 'sensor'),
+                    ('mean_run_time', 'Brenner Laufzeit Mittel', 'min', "{{ value_json.mean_run_time }}",
+                     'mdi:timer-outline', 'measurement', 'sensor'),
+                    ('short_cycle_ratio', 'Brenner Kurztakt-Anteil', '%', "{{ value_json.short_cycle_ratio }}",
+                     'mdi:sync-alert', 'measurement', 'sensor'),
+                ):
+                    if self.publish_sensor_discovery(
+                        sensor_id=f"burner_{key}",
+                        sensor_name=label,
+                        device_class="running" if component == 'binary_sensor' else None,
+                        unit_of_measurement=unit,
+                        value_template=template,
+                        icon=icon,
+                        availability_id=self.burner_sensor,
+                        state_id="burner",
+                        state_class=state_class,
+                        component=component
+                    ):
+                        discovery_count += 1
+            
+            # Alarm-Regeln: Problem-Sensoren auf den Topics des Readers (Verfügbarkeit: Reader-Status)
+            for rule in self.alert_rules:
+                if self.publish_sensor_discovery(
+                    sensor_id=f"alert_{rule.name}",
+                    sensor_name=f"Alarm {rule.label}",
+                    device_class="problem",
+                    unit_of_measurement=None,
+                    value_template="{{ 'ON' if value_json.state == 'firing' else 'OFF' }}",
+                    icon="mdi:alert",
+                    state_id=f"alert/{rule.name}",
+                    component='binary_sensor',
+                    availability_topic=f"{self.mqtt_prefix}/reader/status",
+                    expire_after=None
+                ):
+                    discovery_count += 1
+            
+            logger.info(f"✅ {discovery_count} Discovery-Nachrichten gesendet")
             
         except Exception as e:
             logger.error(f"❌ Fehler bei Auto-Discovery: {e}")
     
     def publish_sensor_discovery(self, sensor_id: str, sensor_name: str, 
                                 device_class: str, unit_of_measurement: str,
-                                value_template: str, icon: str = None):
-        """Einzelnen Sensor für Home Assistant Discovery konfigurieren"""
+                                value_template: str, icon: str = None,
+                                availability_id: str = None, state_id: str = None,
+                                state_class: str = None, component: str = 'sensor',
+                                availability_topic: str = None, expire_after: Optional[int] = 300):
+        """
+        Einzelnen Sensor für Home Assistant Discovery konfigurieren
+        
+        state_id: gemeinsames State-Topic mehrerer Entitäten (z.B. Heizkreis), Standard sensor_id
+        component: Home Assistant Plattform (sensor, binary_sensor)
+        availability_topic: Status-Topic des sendenden Dienstes, Standard Bridge-Status
+                            (eigenes Topic: ohne Sensor-Verfügbarkeit der Bridge)
+        expire_after: Sekunden ohne Update bis "nicht verfügbar" (None: nur bei Änderung gesendete Zustände)
+        """
         
         try:
-            discovery_topic = f"homeassistant/sensor/{self.mqtt_prefix}_{sensor_id}/config"
-            state_topic = f"{self.mqtt_prefix}/{sensor_id}/state"
+            discovery_topic = f"homeassistant/{component}/{self.mqtt_prefix}_{sensor_id}/config"
+            state_topic = f"{self.mqtt_prefix}/{state_id or sensor_id}/state"
             
             discovery_payload = {
                 "name": sensor_name,
@@ -280,29 +772,42 @@ class Pi5MqttBridge:
                 "device": self.device_info,
                 "availability": [
                     {
-                        "topic": f"{self.mqtt_prefix}/status",
+                        "topic": availability_topic or self.status_topic,
                         "payload_available": "online",
                         "payload_not_available": "offline"
                     }
-                ],
-                "expire_after": 300  # Sensor als offline nach 5 Minuten ohne Update
+                ]
             }
+            if expire_after:
+                discovery_payload["expire_after"] = expire_after  # Sensor als offline ohne Update (Standard 5 Minuten)
+            
+            # Sensor-Verfügbarkeit zusätzlich zum Bridge-Status (beide müssen online sein)
+            if self.sensor_availability and availability_topic is None:
+                discovery_payload["availability"].append({
+                    "topic": f"{self.mqtt_prefix}/{availability_id or sensor_id}/availability",
+                    "payload_available": "online",
+                    "payload_not_available": "offline"
+                })
+                discovery_payload["availability_mode"] = "all"
             
             if icon:
                 discovery_payload["icon"] = icon
+            if device_class is None:
+                # Differenzen/Raten: keine Temperatur-Entität (HA würde K als absolute Temperatur umrechnen)
+                del discovery_payload["device_class"]
+            if unit_of_measurement is None:
+                del discovery_payload["unit_of_measurement"]
+            if state_class:
+                discovery_payload["state_class"] = state_class
             
             # Discovery-Nachricht senden
-            result = self.mqtt_client.publish(
-                discovery_topic,
-                json.dumps(discovery_payload),
-                retain=True
-            )
-            
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            # (nicht puffern - Discovery wird nach jedem Connect erneut gesendet)
+            if self.publish_message(discovery_topic, json.dumps(discovery_payload),
+                                    retain=True, topic_class='discovery', queue_offline=False):
                 logger.info(f"📡 Discovery OK: {sensor_name} → {discovery_topic}")
                 return True
             else:
-                logger.error(f"❌ Discovery FEHLER: {sensor_name} → {result.rc}")
+                logger.error(f"❌ Discovery FEHLER: {sensor_name} → {discovery_topic}")
                 return False
                 
         except Exception as e:
@@ -312,125 +817,316 @@ class Pi5MqttBridge:
     def get_latest_sensor_data(self) -> Dict[str, float]:
         """Aktuelle Sensor-Daten aus InfluxDB lesen"""
         try:
-            query_api = self.influx_client.query_api()
-            
-            # Query für alle Temperatursensoren
-            temp_query = f'''
-            from(bucket: "{self.influx_bucket}")
-              |> range(start: -5m)
-              |> filter(fn: (r) => r["_measurement"] == "temperature")
-              |> group(columns: ["name"])
-              |> last()
-            '''
+            sensor_data = self.map_sensor_data(self.query_latest_values())
+            logger.info(f"📊 {len(sensor_data)} Sensoren gelesen")
+            return sensor_data
             
-            # Query für Luftfeuchtigkeit
-            humidity_query = f'''
+        except Exception as e:
+            logger.error(f"❌ Fehler beim Lesen der Sensor-Daten: {e}")
+            return {}
+    
+    def query_latest_values(self) -> Dict[str, Dict[str, float]]:
+        """
+        Letzte Werte je Sensor-Name aus InfluxDB abfragen
+        
+        Returns:
+            {"temperature": {name: wert}, "humidity": {name: wert}}
+        """
+        query_api = self.influx_client.query_api()
+        latest = {}
+        started = time.perf_counter()
+        try:
+            with TRACER.span('influx.query', bucket=self.influx_bucket):
+                self._query_latest_values(query_api, latest)
+        except Exception:
+            INFLUX_QUERIES_TOTAL.labels('error').inc()
+            raise
+        INFLUX_QUERY_SECONDS.observe(time.perf_counter() - started)
+        INFLUX_QUERIES_TOTAL.labels('ok').inc()
+        return latest
+    
+    def _query_latest_values(self, query_api, latest: Dict):
+        """Flux Abfragen für query_latest_values ausführen"""
+        for measurement in ("temperature", "humidity"):
+            query = f'''
             from(bucket: "{self.influx_bucket}")
               |> range(start: -5m)
-              |> filter(fn: (r) => r["_measurement"] == "humidity")
+              |> filter(fn: (r) => r["_measurement"] == "{measurement}")
               |> group(columns: ["name"])
               |> last()
             '''
             
-            sensor_data = {}
-            
-            # Temperaturen lesen
-            temp_result = query_api.query(temp_query)
-            for table in temp_result:
+            values = {}
+            acquired = latest.setdefault("acquired", {})
+            for table in query_api.query(query):
                 for record in table.records:
-                    sensor_name = record.values["name"]
-                    temperature = record.values["_value"]
-                    
-                    # Sensor-ID aus Label-Mapping finden
-                    sensor_id = None
-                    for id, name in self.sensor_labels.items():
-                        if name == sensor_name:
-                            sensor_id = id
-                            break
-                    
-                    if sensor_id:
-                        sensor_data[sensor_id] = {"temperature": temperature}
-            
-            # Luftfeuchtigkeit lesen  
-            humidity_result = query_api.query(humidity_query)
-            for table in humidity_result:
-                for record in table.records:
-                    sensor_name = record.values["name"]
-                    humidity = record.values["_value"]
-                    
-                    # DHT22 Sensor
-                    if sensor_name == self.sensor_labels.get('dht22', ''):
-                        if 'dht22' in sensor_data:
-                            sensor_data['dht22']['humidity'] = humidity
-                        else:
-                            sensor_data['dht22'] = {"humidity": humidity}
-            
-            logger.info(f"📊 {len(sensor_data)} Sensoren gelesen")
-            return sensor_data
-            
-        except Exception as e:
-            logger.error(f"❌ Fehler beim Lesen der Sensor-Daten: {e}")
-            return {}
+                    name = record.values["name"]
+                    values[name] = record.values["_value"]
+                    # Zeitstempel des Punkts = Messzeitpunkt im Sensor Reader
+                    acquired[name] = max(acquired.get(name, 0.0), record.get_time().timestamp())
+            latest[measurement] = values
+        
+        if self.circuits:
+            latest["circuit"] = self.query_circuits(query_api, acquired)
+        
+        if self.burner_sensor:
+            latest["burner"], latest["burner_events"] = self.query_burner(query_api)
+        
+        if self.sensor_availability:
+            latest["available"] = self.query_sensor_health(query_api)
+    
+    def query_circuits(self, query_api, acquired: Dict) -> Dict[str, Dict[str, float]]:
+        """Letzte abgeleitete Werte je Heizkreis (Measurement "circuit" des Sensor Readers)"""
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: -5m)
+          |> filter(fn: (r) => r["_measurement"] == "circuit")
+          |> group(columns: ["circuit", "_field"])
+          |> last()
+        '''
+        
+        circuits = {}
+        for table in query_api.query(query):
+            for record in table.records:
+                circuit_id = record.values["circuit"]
+                circuits.setdefault(circuit_id, {})[record.values["_field"]] = record.values["_value"]
+                key = f"circuit_{circuit_id}"
+                acquired[key] = max(acquired.get(key, 0.0), record.get_time().timestamp())
+        return circuits
+    
+    def query_burner(self, query_api) -> Tuple[Dict, List[Dict]]:
+        """
+        Brenner-Kennzahlen (letzter Zyklus) und Start/Stop-Ereignisse seit dem zuletzt gesendeten
+        
+        Ereignisse tragen den Zeitpunkt des Wendepunkts und werden oft Minuten später geschrieben -
+        ein festes Zeitfenster würde sie verpassen.
+        
+        Returns:
+            ({feld: wert, "acquired": zeitpunkt}, [{"event", "timestamp", feld: wert}] zeitlich sortiert)
+        """
+        state = {}
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: -5m)
+          |> filter(fn: (r) => r["_measurement"] == "burner")
+          |> group(columns: ["_field"])
+          |> last()
+        '''
+        for table in query_api.query(query):
+            for record in table.records:
+                state[record.values["_field"]] = record.values["_value"]
+                state["acquired"] = max(state.get("acquired", 0.0), record.get_time().timestamp())
+        
+        if not self.burner_events:
+            return state, []
+        
+        # Ereignisse: je Feld eine Tabelle, über Zeitpunkt und Art zusammenführen
+        events = {}
+        since = datetime.fromtimestamp(self._burner_events_since, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: time(v: "{since}"))
+          |> filter(fn: (r) => r["_measurement"] == "burner_event")
+          |> group(columns: ["_field"])
+        '''
+        for table in query_api.query(query):
+            for record in table.records:
+                timestamp = record.get_time().timestamp()
+                event = events.setdefault((timestamp, record.values["event"]),
+                                          {"event": record.values["event"], "timestamp": timestamp})
+                event[record.values["_field"]] = record.values["_value"]
+        return state, [events[key] for key in sorted(events)]
+    
+    def query_sensor_health(self, query_api) -> Dict[str, bool]:
+        """Sensor-Verfügbarkeit (vom Sensor Reader geschrieben) je Sensor-ID abfragen"""
+        query = f'''
+        from(bucket: "{self.influx_bucket}")
+          |> range(start: -5m)
+          |> filter(fn: (r) => r["_measurement"] == "sensor_health" and r["_field"] == "available")
+          |> group(columns: ["sensor_id"])
+          |> last()
+        '''
+        
+        available = {}
+        for table in query_api.query(query):
+            for record in table.records:
+                available[record.values["sensor_id"]] = bool(record.values["_value"])
+        return available
+    
+    def map_sensor_data(self, latest: Dict[str, Dict[str, float]]) -> Dict[str, Dict]:
+        """Abgefragte Werte (nach Sensor-Name) den Sensor-IDs dieser Bridge zuordnen"""
+        sensor_data = {}
+        acquired = latest.get("acquired", {})
+        
+        # Sensor-ID aus Label-Mapping finden
+        name_to_id = {}
+        for sensor_id, name in self.sensor_labels.items():
+            name_to_id.setdefault(name, sensor_id)
+        
+        # Temperaturen
+        for sensor_name, temperature in latest.get("temperature", {}).items():
+            sensor_id = name_to_id.get(sensor_name)
+            if sensor_id:
+                sensor_data[sensor_id] = {"temperature": temperature}
+                if sensor_name in acquired:
+                    sensor_data[sensor_id]["acquired"] = acquired[sensor_name]
+        
+        # Luftfeuchtigkeit (DHT22 Sensor)
+        dht22_name = self.sensor_labels.get('dht22', '')
+        for sensor_name, humidity in latest.get("humidity", {}).items():
+            if sensor_name == dht22_name:
+                sensor_data.setdefault('dht22', {})['humidity'] = humidity
+                if sensor_name in acquired:
+                    sensor_data['dht22'].setdefault("acquired", acquired[sensor_name])
+        
+        # Heizkreise (nur konfigurierte)
+        configured = {circuit.circuit_id for circuit in self.circuits}
+        for circuit_id, values in latest.get("circuit", {}).items():
+            if circuit_id in configured:
+                key = f"circuit_{circuit_id}"
+                sensor_data[key] = {"circuit": values}
+                if key in acquired:
+                    sensor_data[key]["acquired"] = acquired[key]
+        
+        # Brenner: Kennzahlen und noch nicht gesendete Ereignisse
+        if latest.get("burner"):
+            sensor_data["burner"] = {
+                "burner": latest["burner"],
+                "events": [event for event in latest.get("burner_events", [])
+                           if event["timestamp"] > self._burner_events_since],
+                "acquired": latest["burner"].get("acquired")
+            }
+        
+        # Sensor-Verfügbarkeit: ohne aktuellen Health-Eintrag gilt ein Sensor als offline
+        if "available" in latest:
+            for sensor_id in self.sensor_labels:
+                available = latest["available"].get(sensor_id, False)
+                sensor_data.setdefault(sensor_id, {})['available'] = available
+        
+        return sensor_data
     
     def publish_sensor_data(self, sensor_data: Dict):
         """Sensor-Daten via MQTT senden"""
+        with TRACER.span('mqtt.publish', prefix=self.mqtt_prefix) as span:
+            published_count = self._publish_sensor_values(sensor_data)
+            span.set(messages=published_count)
         
-        # Status als "online" senden
-        self.mqtt_client.publish(f"{self.mqtt_prefix}/status", "online", retain=True)
-        
+        logger.info(f"✅ {published_count} MQTT Updates erfolgreich gesendet")
+        if len(self.offline_queue):
+            logger.info(f"📦 {len(self.offline_queue)} Topics im Offline-Puffer (Broker nicht verbunden)")
+    
+    def _publish_sensor_values(self, sensor_data: Dict) -> int:
+        """State (und Verfügbarkeit) je Sensor senden - gibt Anzahl gesendeter Werte zurück"""
         published_count = 0
+        if self._resend_availability:
+            self._resend_availability = False
+            self._published_sensor_availability = {}
         
         for sensor_id, data in sensor_data.items():
             try:
-                if sensor_id == 'dht22':
+                if 'available' in data:
+                    self.publish_sensor_availability(sensor_id, data['available'])
+                
+                acquired = data.get('acquired')
+                if 'burner' in data:
+                    published_count += self._publish_burner(data, acquired)
+                elif 'circuit' in data:
+                    # Heizkreis - ein Topic mit Spreizung und Änderungsraten
+                    topic = f"{self.mqtt_prefix}/{sensor_id}/state"
+                    payload = {key: round(data['circuit'][key], 2)
+                               for key in ('delta_t', 'supply_rate', 'return_rate') if key in data['circuit']}
+                    if self.payload_timestamps and acquired is not None:
+                        payload["acquired"] = datetime.fromtimestamp(acquired, timezone.utc).isoformat(timespec='milliseconds')
+                    if self.publish_message(topic, json.dumps(payload), sensor_id=sensor_id, acquired=acquired):
+                        logger.info(f"📤 {sensor_id}: ΔT {payload.get('delta_t')} K → {topic}")
+                        published_count += 1
+                elif sensor_id == 'dht22':
                     # DHT22 - separate Topics für Temperatur und Luftfeuchtigkeit
                     if 'temperature' in data:
                         topic = f"{self.mqtt_prefix}/dht22_temperature/state"
-                        payload = {"temperature": round(data['temperature'], 1)}
-                        result = self.mqtt_client.publish(topic, json.dumps(payload))
-                        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                        payload = self._state_payload("temperature", data['temperature'], acquired)
+                        if self.publish_message(topic, json.dumps(payload),
+                                                sensor_id='dht22_temperature', acquired=acquired):
                             logger.info(f"📤 DHT22 Temp: {payload['temperature']}°C → {topic}")
                             published_count += 1
-                        else:
-                            logger.error(f"❌ MQTT Publish Fehler: {result.rc}")
                         
                     if 'humidity' in data:
                         topic = f"{self.mqtt_prefix}/dht22_humidity/state"
-                        payload = {"humidity": round(data['humidity'], 1)}
-                        result = self.mqtt_client.publish(topic, json.dumps(payload))
-                        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                        payload = self._state_payload("humidity", data['humidity'], acquired)
+                        if self.publish_message(topic, json.dumps(payload),
+                                                sensor_id='dht22_humidity', acquired=acquired):
                             logger.info(f"📤 DHT22 Hum: {payload['humidity']}% → {topic}")
                             published_count += 1
-                        else:
-                            logger.error(f"❌ MQTT Publish Fehler: {result.rc}")
                 else:
                     # DS18B20 Temperatursensoren
                     if 'temperature' in data:
                         sensor_name = self.sensor_labels.get(sensor_id, sensor_id)
                         topic = f"{self.mqtt_prefix}/{sensor_id}/state"
-                        payload = {"temperature": round(data['temperature'], 1)}
-                        result = self.mqtt_client.publish(topic, json.dumps(payload))
-                        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                        payload = self._state_payload("temperature", data['temperature'], acquired)
+                        if self.publish_message(topic, json.dumps(payload),
+                                                sensor_id=sensor_id, acquired=acquired):
                             logger.info(f"📤 {sensor_name}: {payload['temperature']}°C → {topic}")
                             published_count += 1
-                        else:
-                            logger.error(f"❌ MQTT Publish Fehler: {result.rc}")
                             
             except Exception as e:
                 logger.error(f"❌ Fehler beim Senden von {sensor_id}: {e}")
         
-        logger.info(f"✅ {published_count} MQTT Updates erfolgreich gesendet")
+        return published_count
+    
+    def _publish_burner(self, data: Dict, acquired: Optional[float]) -> int:
+        """Brenner-Ereignisse (nicht retained, je Ereignis eine Nachricht) und Kennzahlen senden"""
+        published_count = 0
+        topic = f"{self.mqtt_prefix}/burner/event"
+        for event in data['events']:
+            if self.publish_message(topic, event_message(event), sensor_id='burner', acquired=event['timestamp'],
+                                    coalesce=False):
+                logger.info(f"🔥 Brenner {event['event']} → {topic}")
+                published_count += 1
+            self._burner_events_since = max(self._burner_events_since, event['timestamp'])
+        
+        values = data['burner']
+        payload = {'running': bool(values.get('running'))}
+        for key in ('starts_today', 'starts_total', 'short_cycles'):
+            if key in values:
+                payload[key] = int(values[key])
+        if 'starts_per_day' in values:
+            payload['starts_per_day'] = round(values['starts_per_day'], 1)
+        if 'mean_run_time' in values:
+            payload['mean_run_time'] = round(values['mean_run_time'] / 60, 1)      # Minuten
+        if 'short_cycle_ratio' in values:
+            payload['short_cycle_ratio'] = round(values['short_cycle_ratio'] * 100, 1)     # Prozent
+        if self.payload_timestamps and acquired is not None:
+            payload["acquired"] = datetime.fromtimestamp(acquired, timezone.utc).isoformat(timespec='milliseconds')
+        topic = f"{self.mqtt_prefix}/burner/state"
+        if self.publish_message(topic, json.dumps(payload), sensor_id='burner', acquired=acquired):
+            logger.info(f"📤 Brenner: {'an' if payload['running'] else 'aus'}, "
+                        f"{payload.get('starts_today', 0)} Starts heute → {topic}")
+            published_count += 1
+        return published_count
+    
+    def _state_payload(self, key: str, value: float, acquired: Optional[float]) -> Dict:
+        """State-Payload (optional mit Messzeitpunkt für die Latenz-Auswertung in Home Assistant)"""
+        payload = {key: round(value, 1)}
+        if self.payload_timestamps and acquired is not None:
+            payload["acquired"] = datetime.fromtimestamp(acquired, timezone.utc).isoformat(timespec='milliseconds')
+        return payload
     
     def run_once(self):
-        """Einmalige Datenübertragung"""
-        logger.info("🔄 Lese Sensor-Daten...")
-        sensor_data = self.get_latest_sensor_data()
+        """Einmalige Datenübertragung (nie gleichzeitig mit dem Zyklus des Worker-Threads)"""
+        with self._cycle_lock:
+            logger.info("🔄 Lese Sensor-Daten...")
+            with TRACER.trace('bridge.cycle', prefix=self.mqtt_prefix):
+                self.publish_cycle(self.get_latest_sensor_data())
+    
+    def publish_cycle(self, sensor_data: Dict):
+        """Ergebnis eines Abfrage-Zyklus senden (oder Status offline bei fehlenden Daten)"""
         if sensor_data:
+            self.publish_status("online")
             self.publish_sensor_data(sensor_data)
         else:
             logger.warning("⚠️ Keine Sensor-Daten verfügbar")
-            # Status als offline senden wenn keine Daten
-            self.mqtt_client.publish(f"{self.mqtt_prefix}/status", "offline", retain=True)
+            # Status als offline senden wenn keine Daten (nur bei Änderung)
+            self.publish_status("offline")
     
     def run_continuous(self, interval: int = 30):
         """Kontinuierliche Datenübertragung"""
@@ -438,36 +1134,70 @@ class Pi5MqttBridge:
         
         # Discovery alle 10 Minuten erneut senden (für Robustheit)
         discovery_interval = 600  # 10 Minuten
-        last_discovery = 0
+        self.running = True
+        
+        # Erste Discovery + Daten sendet der Worker sobald der Broker bestätigt - auch bei langsamem
+        # Verbindungsaufbau nicht zusätzlich aus der Schleife (sonst doppelt über den Offline-Puffer)
+        ready = self.wait_until_ready(timeout=interval)
+        last_discovery = self.clock.time()
+        next_run = last_discovery + interval if ready else last_discovery
         
         try:
-            while True:
-                current_time = time.time()
+            while self.running:
+                current_time = self.clock.time()
                 
-                # Regelmäßige Discovery (alle 10 Minuten)
-                if current_time - last_discovery > discovery_interval:
-                    logger.info("🔄 Sende Auto-Discovery erneut...")
-                    self.publish_discovery()
-                    last_discovery = current_time
+                if current_time >= next_run:
+                    with self._cycle_lock:
+                        # Regelmäßige Discovery (alle 10 Minuten)
+                        if current_time - last_discovery > discovery_interval:
+                            logger.info("🔄 Sende Auto-Discovery erneut...")
+                            self.publish_discovery()
+                            self.log_publish_stats()
+                            TRACER.log_summary()
+                            last_discovery = current_time
+                        
+                        # Normale Datenübertragung
+                        self.run_once()
+                    next_run = current_time + interval
                 
-                # Normale Datenübertragung
-                self.run_once()
-                time.sleep(interval)
+                self.clock.sleep(max(0.0, next_run - self.clock.time()))
                 
         except KeyboardInterrupt:
             logger.info("👋 MQTT Bridge beendet durch Benutzer")
         except Exception as e:
             logger.error(f"❌ Fehler in kontinuierlicher Schleife: {e}")
         finally:
-            # Cleanup
-            if self.mqtt_client:
-                logger.info("🧹 MQTT Cleanup...")
-                self.mqtt_client.publish(f"{self.mqtt_prefix}/status", "offline", retain=True)
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
-            if self.influx_client:
-                logger.info("🧹 InfluxDB Cleanup...")
-                self.influx_client.close()
+            self.shutdown()
+    
+    def shutdown(self):
+        """Verbindungen sauber beenden"""
+        self._stop_worker()
+        if self.mqtt_client:
+            logger.info("🧹 MQTT Cleanup...")
+            # Sauberes Disconnect löst den Last Will nicht aus - Status selbst senden
+            self.publish_status("offline", force=True)
+            # disconnect() vor loop_stop(): ausstehende Nachrichten werden noch gesendet
+            self.mqtt_client.disconnect()
+            self.mqtt_client.loop_stop()
+        self._set_state(MqttState.DISCONNECTED)
+        REGISTRY.remove_collector(self._collect_metrics)
+        if self.influx_client:
+            logger.info("🧹 InfluxDB Cleanup...")
+            self.influx_client.close()
+
+
+def load_bridges(config_file='config.ini', primary: Optional[Pi5MqttBridge] = None) -> List[Pi5MqttBridge]:
+    """
+    Bridges für alle konfigurierten Broker erzeugen
+    
+    Neben [mqtt] wird für jede Sektion [mqtt:<name>] eine weitere Bridge
+    angelegt (z.B. zweiter Broker oder anderes topic_prefix).
+    """
+    bridges = [primary or Pi5MqttBridge(config_file)]
+    for section in bridges[0].config.sections():
+        if section.startswith('mqtt:'):
+            bridges.append(Pi5MqttBridge(config_file, mqtt_section=section))
+    return bridges
 
 
 def test_mqtt_connection(bridge):
@@ -479,31 +1209,25 @@ def test_mqtt_connection(bridge):
         logger.error("❌ MQTT Setup fehlgeschlagen!")
         return False
     
-    # Warten auf Verbindung
-    logger.info("⏳ Warte auf MQTT Verbindung...")
-    time.sleep(3)
-    
-    # Discovery Test
-    logger.info("🧪 Teste Auto-Discovery...")
-    bridge.publish_discovery()
+    # Warten auf Verbindung - Discovery sendet der Worker nach dem Connect
+    logger.info("⏳ Warte auf MQTT Verbindung und Auto-Discovery...")
+    if not bridge.wait_until_ready(timeout=10):
+        bridge.shutdown()
+        return False
     
-    # Test-Daten senden
+    # Test-Daten für alle konfigurierten Sensoren senden (passend zur Discovery)
     logger.info("🧪 Sende Test-Daten...")
     test_data = {
-        'ds18b20_1': {'temperature': 21.5},
-        'ds18b20_2': {'temperature': 45.2},
-        'dht22': {'temperature': 23.1, 'humidity': 65.3}
+        sensor_id: {'temperature': round(20.0 + index * 5.5 % 50, 1)}
+        for index, sensor_id in enumerate(bridge.sensor_labels) if sensor_id != 'dht22'
     }
+    test_data['dht22'] = {'temperature': 23.1, 'humidity': 65.3}
     bridge.publish_sensor_data(test_data)
     
     logger.info("✅ MQTT Test abgeschlossen!")
-    time.sleep(2)
     
     # Cleanup
-    if bridge.mqtt_client:
-        bridge.mqtt_client.publish(f"{bridge.mqtt_prefix}/status", "offline", retain=True)
-        bridge.mqtt_client.loop_stop()
-        bridge.mqtt_client.disconnect()
+    bridge.shutdown()
     
     return True
 
@@ -520,6 +1244,10 @@ def main():
     # Bridge initialisieren
     bridge = Pi5MqttBridge()
     
+    # Timing Spans laut [monitoring] tracing (zur Laufzeit per SIGUSR2 umschaltbar)
+    TRACER.configure_from(bridge.config)
+    install_toggle_signal()
+    
     # Ausführungsmodus prüfen
     if len(sys.argv) > 1:
         mode = sys.argv[1].lower()
@@ -532,8 +1260,14 @@ def main():
             if not bridge.setup_mqtt():
                 print("❌ MQTT Setup fehlgeschlagen!")
                 sys.exit(1)
-            time.sleep(2)
-            bridge.run_once()
+            # Erste Datenübertragung erfolgt im Worker direkt nach dem Connect
+            bridge.wait_until_ready()
+            bridge.shutdown()
+            
+        elif mode == "async":
+            print("⚡ Asyncio-Modus: Alle konfigurierten Broker in einem Event-Loop")
+            from mqtt_bridge_async import run_async_bridges
+            run_async_bridges(load_bridges(primary=bridge))
             
         elif mode == "mqtt-test":
             print("🧪 MQTT Test-Modus: Verbindung und Discovery testen")
@@ -544,31 +1278,33 @@ def main():
             if not bridge.setup_mqtt():
                 print("❌ MQTT Setup fehlgeschlagen!")
                 sys.exit(1)
-            time.sleep(2)
-            bridge.publish_discovery()
-            time.sleep(2)
+            if not bridge.wait_until_connected():
+                print("❌ MQTT Verbindung fehlgeschlagen!")
+                sys.exit(1)
+            if not bridge.ha_discovery:
+                bridge.publish_discovery()
+            bridge.wait_until_ready()
+            bridge.shutdown()
             
         else:
             print(f"❌ Unbekannter Modus: {mode}")
-            print("   Verfügbare Modi: test, mqtt-test, discovery")
+            print("   Verfügbare Modi: test, mqtt-test, discovery, async")
             sys.exit(1)
     else:
         # Kontinuierlicher Modus
         print("🔄 Kontinuierlicher Modus")
         
-        # Verbindungen setup
-        if not bridge.setup_mqtt():
-            print("❌ MQTT Setup fehlgeschlagen!")
-            sys.exit(1)
-            
+        # Verbindungen setup - InfluxDB zuerst, damit der Worker nach dem
+        # Connect direkt die ersten Daten senden kann
         if not bridge.setup_influxdb():
             print("❌ InfluxDB Setup fehlgeschlagen!")
             sys.exit(1)
+            
+        if not bridge.setup_mqtt():
+            print("❌ MQTT Setup fehlgeschlagen!")
+            sys.exit(1)
         
-        # Warten bis MQTT verbunden
-        time.sleep(2)
-        
-        # Kontinuierlich laufen
+        # Kontinuierlich laufen (wartet selbst auf die Bereitschaft)
         bridge.run_continuous()
 
 
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer → Home Assistant MQTT Bridge (asyncio)
+==========================================================
+
+Asyncio-Modus der MQTT Bridge: InfluxDB Abfrage, MQTT Publishing und
+Zeitsteuerung laufen als kooperierende Tasks in einem Event-Loop.
+Der paho Socket wird direkt vom Event-Loop bedient (kein loop_start Thread),
+Reconnects erfolgen mit exponentiellem Backoff inkl. Jitter.
+
+Mehrere Broker bzw. Topic-Präfixe ([mqtt:<name>] Sektionen) laufen in
+einem Prozess und teilen sich InfluxDB Client und Abfrage pro Zyklus.
+Ist InfluxDB nicht erreichbar, folgen weitere Verbindungsversuche
+demselben Backoff wie die MQTT Reconnects.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import asyncio
+import logging
+import random
+import signal
+import time
+from typing import Dict, List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+from mqtt_bridge import Pi5MqttBridge, MqttState, load_bridges
+from monitoring.tracing import TRACER, install_toggle_signal
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    """Exponentieller Backoff mit Jitter für Reconnect-Versuche"""
+    
+    def __init__(self, base: float = 1.0, cap: float = 60.0, factor: float = 2.0):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempts = 0
+    
+    def next_delay(self) -> float:
+        """Nächste Wartezeit (obere Hälfte zufällig, verhindert synchrone Reconnect-Wellen)"""
+        delay = min(self.cap, self.base * (self.factor ** self.attempts))
+        self.attempts += 1
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def reset(self):
+        """Nach erfolgreicher Verbindung zurücksetzen"""
+        self.attempts = 0
+
+
+class _PahoAsyncioAdapter:
+    """Bindet den Socket eines paho Clients an den asyncio Event-Loop"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: mqtt.Client):
+        self.loop = loop
+        self.client = client
+        self._fd = None
+        self._misc_task = None
+        
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+    
+    def call_in_loop(self, func, *args):
+        """Funktion im Event-Loop ausführen (paho Callbacks kommen ggf. aus Executor-Threads)"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        
+        if running is self.loop:
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+    
+    def _on_socket_open(self, client, userdata, sock):
+        self.call_in_loop(self._register, sock.fileno())
+    
+    def _on_socket_close(self, client, userdata, sock):
+        self.call_in_loop(self._unregister)
+    
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.call_in_loop(self._register_write)
+    
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.call_in_loop(self._unregister_write)
+    
+    def _register(self, fd: int):
+        self._unregister()
+        if fd < 0:
+            return
+        self._fd = fd
+        self.loop.add_reader(fd, self.client.loop_read)
+        self._misc_task = self.loop.create_task(self._misc_loop())
+    
+    def _unregister(self):
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self.loop.remove_writer(self._fd)
+            self._fd = None
+        if self._misc_task:
+            self._misc_task.cancel()
+            self._misc_task = None
+    
+    def _register_write(self):
+        if self._fd is not None:
+            self.loop.add_writer(self._fd, self.client.loop_write)
+    
+    def _unregister_write(self):
+        if self._fd is not None:
+            self.loop.remove_writer(self._fd)
+    
+    async def _misc_loop(self):
+        """Keepalive/Ping Verwaltung von paho"""
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+
+class SharedInfluxQuery:
+    """
+    Gemeinsamer InfluxDB Zugriff für mehrere Bridges
+    
+    Bridges mit derselben Datenbank teilen sich einen Client, und
+    gleichzeitige Abfragen eines Zyklus werden zu einer zusammengefasst.
+    Nach einem fehlgeschlagenen Verbindungsaufbau wartet der nächste
+    Versuch laut Backoff - Zyklen dazwischen laufen ohne Sensor-Daten.
+    """
+    
+    def __init__(self, max_age: float = 5.0, clock=time.monotonic):
+        self.max_age = max_age
+        self.clock = clock
+        self._clients: Dict[Tuple, object] = {}
+        self._queries: Dict[Tuple, Tuple[float, asyncio.Future]] = {}
+        self._retries: Dict[Tuple, Tuple[Backoff, float]] = {}     # Schlüssel → (Backoff, nächster Versuch)
+    
+    async def ensure_client(self, bridge: Pi5MqttBridge) -> bool:
+        """InfluxDB Client für die Bridge bereitstellen (blockierender Health Check im Thread)"""
+        if bridge.influx_client:
+            return True
+        
+        key = (bridge.influx_url, bridge.influx_token, bridge.influx_org)
+        if key in self._clients:
+            bridge.influx_client = self._clients[key]
+            return True
+        
+        backoff, retry_at = self._retries.get(key, (None, 0.0))
+        if self.clock() < retry_at:
+            return False
+        
+        # setup_influxdb schließt den Client eines Fehlversuchs selbst
+        if await asyncio.to_thread(bridge.setup_influxdb):
+            self._clients[key] = bridge.influx_client
+            self._retries.pop(key, None)
+            return True
+        
+        bridge.influx_client = None
+        backoff = backoff or Backoff()
+        delay = backoff.next_delay()
+        self._retries[key] = (backoff, self.clock() + delay)
+        logger.warning(f"⏳ InfluxDB {bridge.influx_url}: nächster Versuch in {delay:.1f}s")
+        return False
+    
+    async def get_sensor_data(self, bridge: Pi5MqttBridge) -> Dict:
+        """Aktuelle Sensor-Daten für die Bridge (Abfrage ggf. mit anderen Bridges geteilt)"""
+        loop = asyncio.get_running_loop()
+        key = (bridge.influx_url, bridge.influx_org, bridge.influx_bucket)
+        now = loop.time()
+        
+        entry = self._queries.get(key)
+        if entry is None or self._is_stale(entry, now):
+            future = asyncio.ensure_future(asyncio.to_thread(bridge.query_latest_values))
+            entry = (now, future)
+            self._queries[key] = entry
+        
+        latest = await asyncio.shield(entry[1])
+        return bridge.map_sensor_data(latest)
+    
+    def _is_stale(self, entry: Tuple[float, asyncio.Future], now: float) -> bool:
+        started, future = entry
+        if not future.done():
+            return False
+        if future.cancelled() or future.exception() is not None:
+            return True
+        return now - started >= self.max_age
+    
+    def close(self):
+        """Alle InfluxDB Clients schließen"""
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+
+
+class AsyncMqttBridge:
+    """Asyncio Betrieb einer Pi5MqttBridge (ein Broker / Topic-Präfix)"""
+    
+    def __init__(self, bridge: Pi5MqttBridge, influx: SharedInfluxQuery,
+                 interval: float = 30, discovery_interval: float = 600,
+                 connect_timeout: float = 10, keepalive: int = 60):
+        self.bridge = bridge
+        self.influx = influx
+        self.interval = interval
+        self.discovery_interval = discovery_interval
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+        self.backoff = Backoff()
+        
+        self.name = f"{bridge.mqtt_section} ({bridge.mqtt_broker}:{bridge.mqtt_port}/{bridge.mqtt_prefix})"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._adapter: Optional[_PahoAsyncioAdapter] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._connected = asyncio.Event()
+        self._disconnected = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._generation = 0
+    
+    # -------------------------------------------------------------------------
+    # paho Callbacks (werden in den Event-Loop umgeleitet)
+    # -------------------------------------------------------------------------
+    
+    def _on_connect(self, client, userdata, flags, rc):
+        self._adapter.call_in_loop(self._handle_connect, rc)
+    
+    def _on_disconnect(self, client, userdata, rc):
+        self._adapter.call_in_loop(self._handle_disconnect, rc)
+    
+    def _handle_connect(self, rc: int):
+        if rc != 0:
+            self.bridge.log_connack_error(rc)
+            return
+        
+        logger.info(f"✅ MQTT Broker verbunden: {self.name}")
+        self._generation = self.bridge._handle_connack()
+        self.backoff.reset()
+        self._disconnected.clear()
+        self._connected.set()
+        self._wakeup.set()
+    
+    def _handle_disconnect(self, rc: int):
+        stopping = self._stop is not None and self._stop.is_set()
+        self.bridge._mark_disconnected(reconnecting=not stopping)
+        self._connected.clear()
+        self._disconnected.set()
+        
+        if rc != 0:
+            logger.warning(f"⚠️ MQTT Verbindung getrennt: {self.name} ({rc})")
+        else:
+            logger.info(f"👋 MQTT Verbindung sauber getrennt: {self.name}")
+    
+    # -------------------------------------------------------------------------
+    # Tasks
+    # -------------------------------------------------------------------------
+    
+    async def run(self, stop: asyncio.Event):
+        """Verbindungs- und Publish-Task bis zum Stop-Signal betreiben"""
+        self._loop = asyncio.get_running_loop()
+        self._stop = stop
+        self._setup_client()
+        
+        stop_waiter = asyncio.create_task(self._wake_on_stop())
+        tasks = [
+            asyncio.create_task(self._connection_loop(), name=f"mqtt-conn {self.name}"),
+            asyncio.create_task(self._publish_loop(), name=f"mqtt-publish {self.name}"),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            stop_waiter.cancel()
+            for task in tasks:
+                task.cancel()
+            await self._shutdown()
+    
+    def _setup_client(self):
+        client = mqtt.Client()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        self.bridge.configure_client(client)
+        
+        self._adapter = _PahoAsyncioAdapter(self._loop, client)
+        # Nur Parameter setzen - der eigentliche Verbindungsaufbau erfolgt im Executor
+        client.connect_async(self.bridge.mqtt_broker, self.bridge.mqtt_port, self.keepalive)
+        self.bridge.mqtt_client = client
+    
+    async def _wake_on_stop(self):
+        await self._stop.wait()
+        self._wakeup.set()
+        self._disconnected.set()
+        self._connected.set()
+    
+    async def _connection_loop(self):
+        """Verbindung aufbauen und nach Abbruch mit Backoff wiederherstellen"""
+        client = self.bridge.mqtt_client
+        
+        while not self._stop.is_set():
+            self.bridge._set_state(MqttState.CONNECTING)
+            self._disconnected.clear()
+            logger.info(f"🔌 Verbinde zu MQTT Broker {self.name}")
+            
+            try:
+                # DNS + TCP Connect blockieren - daher im Executor
+                await self._loop.run_in_executor(None, client.reconnect)
+                await asyncio.wait_for(self._wait_connack(), timeout=self.connect_timeout)
+            except Exception as e:
+                logger.error(f"❌ MQTT Verbindung fehlgeschlagen: {self.name}: {e or type(e).__name__}")
+                self._abort_connection()
+            
+            if self._stop.is_set():
+                break
+            
+            if self._connected.is_set():
+                # Verbunden - bis zur Trennung warten
+                await self._disconnected.wait()
+                if self._stop.is_set():
+                    break
+            
+            delay = self.backoff.next_delay()
+            logger.info(f"⏳ Reconnect zu {self.name} in {delay:.1f}s")
+            await self._sleep_until_stop(delay)
+    
+    async def _wait_connack(self):
+        waiters = [asyncio.ensure_future(self._connected.wait()),
+                   asyncio.ensure_future(self._disconnected.wait())]
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if not self._connected.is_set():
+            raise ConnectionError("Verbindung vom Broker abgelehnt")
+    
+    def _abort_connection(self):
+        """Halb offene Verbindung (kein CONNACK) verwerfen"""
+        self._connected.clear()
+        if self.bridge.mqtt_client.socket() is not None:
+            self.bridge.mqtt_client.disconnect()
+    
+    async def _sleep_until_stop(self, delay: float):
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _sleep_until_wakeup(self, delay: float):
+        """Warten bis zum nächsten Zyklus, neuer Verbindung oder Stop"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+    
+    async def _publish_loop(self):
+        """Zyklische Abfrage und Übertragung, sofort nach jedem (Re-)Connect"""
+        handled_generation = None
+        last_discovery = 0.0
+        
+        while not self._stop.is_set():
+            if not self._connected.is_set():
+                await self._connected.wait()
+                continue
+            
+            generation = self._generation
+            now = self._loop.time()
+            new_connection = generation != handled_generation
+            
+            try:
+                # Discovery nach jedem Connect und regelmäßig alle 10 Minuten
+                if self.bridge.ha_discovery and (new_connection or now - last_discovery > self.discovery_interval):
+                    self.bridge.publish_discovery()
+                    self.bridge.log_publish_stats()
+                    TRACER.log_summary()
+                    last_discovery = now
+                
+                with TRACER.trace('bridge.cycle', prefix=self.bridge.mqtt_prefix):
+                    sensor_data = {}
+                    if await self.influx.ensure_client(self.bridge):
+                        try:
+                            sensor_data = await self.influx.get_sensor_data(self.bridge)
+                            logger.info(f"📊 {len(sensor_data)} Sensoren gelesen ({self.name})")
+                        except Exception as e:
+                            logger.error(f"❌ Fehler beim Lesen der Sensor-Daten: {e}")
+                    
+                    if self._connected.is_set() and generation == self._generation:
+                        self.bridge.publish_cycle(sensor_data)
+                        if new_connection:
+                            self.bridge._mark_ready(generation)
+                            handled_generation = generation
+            except Exception as e:
+                # Ein fehlerhafter Zyklus beendet die Bridge nicht
+                logger.error(f"❌ Fehler im Publish-Zyklus ({self.name}): {e}")
+            
+            await self._sleep_until_wakeup(self.interval)
+    
+    async def _shutdown(self):
+        """Status offline senden und Verbindung sauber trennen"""
+        client = self.bridge.mqtt_client
+        if client is None:
+            return
+        
+        if self.bridge.is_connected():
+            logger.info(f"🧹 MQTT Cleanup: {self.name}")
+            self._disconnected.clear()
+            # Sauberes Disconnect löst den Last Will nicht aus - Status selbst senden
+            self.bridge.publish_status("offline", force=True)
+            client.disconnect()
+            try:
+                await asyncio.wait_for(self._disconnected.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ MQTT Disconnect Timeout: {self.name}")
+        
+        self._adapter._unregister()
+        self.bridge._set_state(MqttState.DISCONNECTED)
+
+
+async def run_bridges(bridges: List[Pi5MqttBridge], interval: float = 30,
+                      stop: Optional[asyncio.Event] = None):
+    """Alle Bridges in einem Event-Loop betreiben bis SIGINT/SIGTERM"""
+    loop = asyncio.get_running_loop()
+    stop = stop or asyncio.Event()
+    
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # z.B. Windows oder nicht im Haupt-Thread
+    
+    influx = SharedInfluxQuery(max_age=min(5.0, interval / 2))
+    runners = [AsyncMqttBridge(bridge, influx, interval=interval) for bridge in bridges]
+    logger.info(f"⚡ Asyncio MQTT Bridge: {len(runners)} Broker/Präfixe, Intervall {interval}s")
+    
+    try:
+        await asyncio.gather(*(runner.run(stop) for runner in runners))
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+        logger.info("🧹 InfluxDB Cleanup...")
+        influx.close()
+        logger.info("👋 Asyncio MQTT Bridge beendet")
+
+
+def run_async_bridges(bridges: List[Pi5MqttBridge], interval: float = 30):
+    """Synchroner Einstiegspunkt für den asyncio-Modus"""
+    try:
+        asyncio.run(run_bridges(bridges, interval=interval))
+    except KeyboardInterrupt:
+        logger.info("👋 MQTT Bridge beendet durch Benutzer")
+
+
+def main():
+    """Hauptfunktion"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Pi5 Heizungs Messer - MQTT Bridge (asyncio)')
+    parser.add_argument('--config', default='config.ini', help='Konfigurationsdatei')
+    parser.add_argument('--interval', type=int, default=30, help='Übertragungs-Intervall in Sekunden')
+    
+    args = parser.parse_args()
+    bridges = load_bridges(args.config)
+    if bridges:
+        TRACER.configure_from(bridges[0].config)
+        install_toggle_signal()
+    run_async_bridges(bridges, interval=args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - MQTT Publish Hilfsklassen
+===============================================
+
+Offline-Puffer für MQTT Nachrichten während Broker-Ausfällen, Verfolgung
+von In-Flight Nachrichten, Publish→Ack Latenzen und der Ende-zu-Ende
+Latenz (Sensor-Messung → MQTT Zustellung) je Sensor sowie die eigene
+MQTT Verbindung des Readers (Alarme, Ausgaben).
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional
+
+# Externe Dependencies (Optional)
+try:
+    import paho.mqtt.client as mqtt
+    MQTT_AVAILABLE = True
+except ImportError:
+    MQTT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedMessage(NamedTuple):
+    """Gepufferte MQTT Nachricht"""
+    topic: str
+    payload: str
+    qos: int
+    retain: bool
+    topic_class: str
+    sensor_id: Optional[str] = None      # für Ende-zu-Ende Latenz
+    acquired: Optional[float] = None     # Messzeitpunkt (Unix)
+    coalesce: bool = True                # False: Ereignis, wird nicht zusammengefasst
+
+
+class OfflinePublishQueue:
+    """
+    Begrenzter, zusammenfassender Puffer für ausgehende MQTT Nachrichten
+
+    Pro Topic wird nur die neueste Nachricht gehalten - der Speicherbedarf
+    wächst mit der Anzahl Topics, nicht mit der Dauer des Ausfalls.
+    Ist der Puffer voll, wird das am längsten nicht aktualisierte Topic verworfen.
+
+    Ereignisse (coalesce=False, z.B. Brenner Start/Stop) werden nicht
+    zusammengefasst, sondern als FIFO mit höchstens max_events Einträgen
+    gehalten - bei vollem Puffer fällt das älteste Ereignis heraus.
+    """
+
+    def __init__(self, max_topics: int = 1000, max_events: int = 100):
+        self.max_topics = max_topics
+        self.max_events = max_events
+        # Schlüssel: Topic bzw. (Topic, Nummer) für Ereignisse - Reihenfolge = Sendereihenfolge
+        self._messages: "OrderedDict[object, QueuedMessage]" = OrderedDict()
+        self._events: deque = deque()
+        self._event_number = 0
+        self._lock = threading.Lock()
+
+        # Statistik
+        self.queued_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self.flushed_count = 0
+
+    def put(self, topic: str, payload: str, qos: int = 0, retain: bool = False,
+            topic_class: str = 'state', sensor_id: Optional[str] = None,
+            acquired: Optional[float] = None, coalesce: bool = True):
+        """Nachricht puffern (ersetzt ältere Nachricht desselben Topics, Ereignisse werden angehängt)"""
+        message = QueuedMessage(topic, payload, qos, retain, topic_class, sensor_id, acquired, coalesce)
+        with self._lock:
+            if not coalesce:
+                if len(self._events) >= self.max_events:
+                    del self._messages[self._events.popleft()]
+                    self.dropped_count += 1
+                self._event_number += 1
+                key = (topic, self._event_number)
+                self._events.append(key)
+            else:
+                key = topic
+                if topic in self._messages:
+                    del self._messages[topic]
+                    self.coalesced_count += 1
+                elif len(self._messages) - len(self._events) >= self.max_topics:
+                    oldest = next(k for k in self._messages if not isinstance(k, tuple))
+                    del self._messages[oldest]
+                    self.dropped_count += 1
+
+            self._messages[key] = message
+            self.queued_count += 1
+
+    def drain(self) -> List[QueuedMessage]:
+        """Alle gepufferten Nachrichten entnehmen (älteste zuerst)"""
+        with self._lock:
+            messages = list(self._messages.values())
+            self._messages.clear()
+            self._events.clear()
+            self.flushed_count += len(messages)
+            return messages
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Puffer-Statistik zurückgeben"""
+        return {
+            'pending': len(self._messages),
+            'max_topics': self.max_topics,
+            'events': len(self._events),
+            'max_events': self.max_events,
+            'queued': self.queued_count,
+            'coalesced': self.coalesced_count,
+            'dropped': self.dropped_count,
+            'flushed': self.flushed_count
+        }
+
+
+class LatencyHistogram:
+    """Einfaches Latenz-Histogramm mit festen Bucket-Grenzen (Sekunden)"""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # letzter Bucket: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Messwert einsortieren"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Quantil abschätzen (obere Bucket-Grenze, höchstens Maximalwert)"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def get_stats(self) -> Dict[str, float]:
+        """Zusammenfassung zurückgeben"""
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'max': round(self.max, 6)
+        }
+
+
+class PublishTracker:
+    """
+    Verfolgt gesendete MQTT Nachrichten bis zur Bestätigung (on_publish)
+
+    QoS 0: Bestätigung = Nachricht in den Socket geschrieben
+    QoS 1/2: Bestätigung = PUBACK/PUBCOMP vom Broker
+
+    Liefert In-Flight Stand, Publish→Ack Latenz je Topic-Klasse,
+    Backpressure-Zähler (vom Client abgelehnte bzw. unbestätigte Nachrichten)
+    und die Ende-zu-Ende Latenz je Sensor (Messzeitpunkt → Bestätigung).
+    Die Ende-zu-Ende Latenz nutzt die Wanduhr - Reader und Bridge sollten
+    dieselbe (NTP-synchrone) Uhr verwenden.
+    """
+
+    # Ende-zu-Ende: Reader-Intervall + Bridge-Intervall + Abfrage liegen im Bereich Sekunden bis Minuten
+    E2E_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 300.0)
+
+    def __init__(self, max_inflight: int = 20, ack_timeout: float = 60.0, clock=time.monotonic,
+                 wall_clock=time.time):
+        self.max_inflight = max_inflight
+        self.ack_timeout = ack_timeout
+        self.clock = clock
+        self.wall_clock = wall_clock
+
+        self._pending: Dict[int, tuple] = {}       # mid → (topic_class, qos, t_publish, sensor_id, acquired)
+        self._early_acks: Dict[int, tuple] = {}    # Ack vor Registrierung (Netzwerk-Thread schneller)
+        self._lock = threading.Lock()
+
+        self.inflight = 0                          # unbestätigte QoS>0 Nachrichten (Fenster + paho-Queue)
+        self.inflight_peak = 0
+        self.published: Dict[str, int] = {}
+        self.acked: Dict[str, int] = {}
+        self.rejected: Dict[int, int] = {}         # paho rc → Anzahl
+        self.unacked = 0
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.e2e_latency: Dict[str, LatencyHistogram] = {}
+
+    def track(self, mid: int, topic_class: str, qos: int, started: float,
+              sensor_id: Optional[str] = None, acquired: Optional[float] = None):
+        """
+        Erfolgreich übergebene Nachricht registrieren
+
+        Args:
+            mid: Message-ID aus MQTTMessageInfo
+            topic_class: Topic-Klasse (state, discovery, status, ...)
+            qos: verwendete QoS Stufe
+            started: clock() Zeitpunkt vor dem publish() Aufruf
+            sensor_id: Sensor für die Ende-zu-Ende Latenz (optional)
+            acquired: Messzeitpunkt des Werts als Unix-Zeit (optional)
+        """
+        with self._lock:
+            self.published[topic_class] = self.published.get(topic_class, 0) + 1
+
+            early = self._early_acks.pop(mid, None)
+            if early is not None:
+                acked_at, acked_wall = early
+                self._record_ack(topic_class, max(0.0, acked_at - started), sensor_id, acquired, acked_wall)
+                return
+
+            self._pending[mid] = (topic_class, qos, started, sensor_id, acquired)
+            if qos > 0:
+                self.inflight += 1
+                if self.inflight > self.inflight_peak:
+                    self.inflight_peak = self.inflight
+
+            if len(self._pending) > 4 * max(self.max_inflight, 1) + 100:
+                self._expire(self.clock())
+
+    def reject(self, rc: int):
+        """Vom Client abgelehnte Nachricht zählen (z.B. Queue voll, keine Verbindung)"""
+        with self._lock:
+            self.rejected[rc] = self.rejected.get(rc, 0) + 1
+
+    def on_ack(self, mid: int):
+        """on_publish Callback (paho Netzwerk-Thread)"""
+        now = self.clock()
+        wall = self.wall_clock()
+        with self._lock:
+            entry = self._pending.pop(mid, None)
+            if entry is None:
+                self._early_acks[mid] = (now, wall)
+                if len(self._early_acks) > 1000:
+                    self._early_acks.clear()
+                return
+            topic_class, qos, started, sensor_id, acquired = entry
+            if qos > 0:
+                self.inflight -= 1
+            self._record_ack(topic_class, now - started, sensor_id, acquired, wall)
+
+    def _record_ack(self, topic_class: str, latency: float, sensor_id: Optional[str],
+                    acquired: Optional[float], acked_wall: float):
+        self.acked[topic_class] = self.acked.get(topic_class, 0) + 1
+        histogram = self.latency.get(topic_class)
+        if histogram is None:
+            histogram = self.latency[topic_class] = LatencyHistogram()
+        histogram.observe(latency)
+
+        if sensor_id is not None and acquired is not None:
+            histogram = self.e2e_latency.get(sensor_id)
+            if histogram is None:
+                histogram = self.e2e_latency[sensor_id] = LatencyHistogram(self.E2E_BUCKETS)
+            histogram.observe(max(0.0, acked_wall - acquired))
+
+    def _expire(self, now: float):
+        """Nicht bestätigte Nachrichten nach ack_timeout als verloren zählen"""
+        expired = [mid for mid, entry in self._pending.items() if now - entry[2] > self.ack_timeout]
+        for mid in expired:
+            if self._pending.pop(mid)[1] > 0:
+                self.inflight -= 1
+        self.unacked += len(expired)
+
+    def get_stats(self) -> Dict:
+        """Backpressure- und Latenz-Statistik zurückgeben"""
+        with self._lock:
+            self._expire(self.clock())
+            return {
+                'inflight': self.inflight,
+                'inflight_peak': self.inflight_peak,
+                'max_inflight': self.max_inflight,
+                'pending_acks': len(self._pending),
+                'published': dict(self.published),
+                'acked': dict(self.acked),
+                'rejected': dict(self.rejected),
+                'unacked': self.unacked,
+                'latency': {cls: hist.get_stats() for cls, hist in self.latency.items()},
+                'e2e_latency': {sensor: hist.get_stats() for sensor, hist in self.e2e_latency.items()}
+            }
+
+
+class MqttConnection:
+    """
+    Eigene MQTT Verbindung des Readers (ohne Umweg über InfluxDB und Bridge)
+
+    Bei getrenntem Broker hält ein Offline-Puffer die neueste Nachricht je
+    Topic bis zum Reconnect, Ereignisse (coalesce=False) vollständig in
+    einer begrenzten FIFO. Mit status_topic: online/offline (retained)
+    inkl. Last Will.
+    """
+
+    def __init__(self, broker: str, port: int = 1883, username: str = '', password: str = '',
+                 qos: int = 1, status_topic: Optional[str] = None, label: str = 'MQTT'):
+        self.broker = broker
+        self.port = port
+        self.qos = qos
+        self.status_topic = status_topic
+        self.label = label
+        self.offline_queue = OfflinePublishQueue()
+        self._lock = threading.Lock()
+        self._connected = False
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        if status_topic:
+            self.client.will_set(status_topic, "offline", qos=qos, retain=True)
+        if username and password:
+            self.client.username_pw_set(username, password)
+
+    def start(self) -> bool:
+        """Verbinden (Reconnects übernimmt der paho Netzwerk-Thread)"""
+        try:
+            self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+            self.client.connect_async(self.broker, self.port, 60)
+            self.client.loop_start()
+            return True
+        except Exception as e:
+            logger.error(f"❌ {self.label} MQTT Setup fehlgeschlagen: {e}")
+            return False
+
+    def stop(self):
+        """Status offline senden und trennen"""
+        with self._lock:
+            if self._connected and self.status_topic:
+                self.client.publish(self.status_topic, "offline", qos=self.qos, retain=True)
+            self._connected = False
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            logger.error(f"❌ {self.label} MQTT Verbindung abgelehnt: {rc}")
+            return
+        # Status und Puffer unter Lock - send() puffert sonst nach dem Flush weiter
+        with self._lock:
+            self._connected = True
+            if self.status_topic:
+                client.publish(self.status_topic, "online", qos=self.qos, retain=True)
+            for message in self.offline_queue.drain():
+                client.publish(message.topic, message.payload, qos=message.qos, retain=message.retain)
+        logger.info(f"✅ {self.label} MQTT verbunden")
+
+    def _on_disconnect(self, client, userdata, rc):
+        with self._lock:
+            self._connected = False
+        if rc != 0:
+            logger.warning(f"⚠️ {self.label} MQTT Verbindung getrennt: {rc}")
+
+    def send(self, topic: str, payload: str, retain: bool = False, topic_class: str = 'state',
+             coalesce: bool = True) -> bool:
+        """Senden oder (getrennt) puffern - True wenn an paho übergeben"""
+        with self._lock:
+            if self._connected:
+                result = self.client.publish(topic, payload, qos=self.qos, retain=retain)
+                if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                    return True
+            self.offline_queue.put(topic, payload, qos=self.qos, retain=retain, topic_class=topic_class,
+                                   coalesce=coalesce)
+            return False
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Mehrprozess-Pipeline
+==========================================
+
+Trennt die Erfassung von Speicherung, MQTT und Auswertung ([pipeline]
+enabled = true): Der Reader-Prozess liest nur noch die Sensoren und legt
+jeden Zyklus in einen Ringpuffer im Shared Memory. Worker-Prozesse lesen
+den Ring unabhängig voneinander:
+
+    storage     Filter, Heizkreise, Brenner, Alarme, Verdichtung → InfluxDB
+    mqtt        Filter und Alarm-Regeln → Alarme per MQTT
+    analytics   Filter, Heizkreise, Brenner, Alarme, Verlauf → /latest, /stream
+
+Schreiben in den Ring blockiert nie: GC-Pausen, eine hängende InfluxDB
+oder Log-Flushes eines Workers verschieben weder die DHT22 Abfrage noch
+die w1 Konvertierung. Liegt ein Worker mehr als slots Zyklen zurück,
+verliert er die ältesten (gezählt je Worker). Zustandsbehaftete Stufen
+(Filter, Raten, Brenner) rechnet jeder Worker aus demselben Datenstrom
+selbst - gleiche Ergebnisse ohne Abhängigkeit zwischen den Workern.
+
+Aufbau des Shared Memory (little endian):
+
+    Kopf        write_seq (u64), closed (u64)
+    Leser       je Worker: read_seq (u64), lost (u64)
+    Slots       je Slot: seq (u64), Länge (u32), CRC32 (u32), Zyklus als JSON
+
+Ein Slot wird mit seq = 0 beschrieben und danach mit seiner Nummer
+freigegeben. Leser prüfen seq vor und nach dem Kopieren sowie die CRC -
+kein Lock zwischen den Prozessen.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import json
+import logging
+import multiprocessing
+import signal
+import struct
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORKER_ROLES = ('storage', 'mqtt', 'analytics')
+MAX_WORKERS = 8
+
+_SEQ = struct.Struct('<Q')
+_HEADER = struct.Struct('<QQ')      # write_seq, closed
+_READER = struct.Struct('<QQ')      # read_seq, lost
+_SLOT = struct.Struct('<QII')       # seq, Länge, CRC32
+_READERS_OFFSET = _HEADER.size
+_SLOTS_OFFSET = _READERS_OFFSET + MAX_WORKERS * _READER.size
+
+
+class SampleRing:
+    """Ringpuffer fester Größe für Lese-Zyklen im Shared Memory (ein Schreiber, mehrere Leser)"""
+
+    def __init__(self, memory: shared_memory.SharedMemory, slots: int, slot_size: int, owner: bool = False):
+        self.memory = memory
+        self.slots = slots
+        self.slot_size = slot_size
+        self.owner = owner
+        self.stats = {'written': 0, 'oversize': 0}
+
+    @classmethod
+    def create(cls, slots: int = 64, slot_size: int = 8192) -> "SampleRing":
+        """Neuen Ring anlegen (Reader-Prozess)"""
+        if slots < 2 or slot_size <= _SLOT.size:
+            raise ValueError(f"[pipeline] slots >= 2 und slot_size > {_SLOT.size} erforderlich")
+        size = _SLOTS_OFFSET + slots * slot_size
+        memory = shared_memory.SharedMemory(create=True, size=size)    # mit Nullen gefüllt
+        return cls(memory, slots, slot_size, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_size: int) -> "SampleRing":
+        """Vorhandenen Ring öffnen (Worker-Prozess)"""
+        return cls(shared_memory.SharedMemory(name=name), slots, slot_size)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @property
+    def write_seq(self) -> int:
+        return _HEADER.unpack_from(self.memory.buf, 0)[0]
+
+    @property
+    def closed(self) -> bool:
+        return bool(_HEADER.unpack_from(self.memory.buf, 0)[1])
+
+    def _slot_offset(self, seq: int) -> int:
+        return _SLOTS_OFFSET + (seq % self.slots) * self.slot_size
+
+    def put(self, record: Dict) -> bool:
+        """Zyklus ablegen - überschreibt den ältesten Slot, wartet nie auf Leser"""
+        data = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.slot_size - _SLOT.size:
+            self.stats['oversize'] += 1
+            logger.error(f"❌ Zyklus zu groß für den Ring: {len(data)} Bytes ([pipeline] slot_size)")
+            return False
+        seq = self.write_seq + 1
+        offset = self._slot_offset(seq)
+        crc = zlib.crc32(data)
+        buffer = self.memory.buf
+        _SLOT.pack_into(buffer, offset, 0, len(data), crc)
+        buffer[offset + _SLOT.size:offset + _SLOT.size + len(data)] = data
+        _SLOT.pack_into(buffer, offset, seq, len(data), crc)
+        _SEQ.pack_into(buffer, 0, seq)
+        self.stats['written'] += 1
+        return True
+
+    def read(self, seq: int) -> Optional[Dict]:
+        """Zyklus seq lesen - None wenn der Slot inzwischen überschrieben wurde"""
+        offset = self._slot_offset(seq)
+        buffer = self.memory.buf
+        stored, length, crc = _SLOT.unpack_from(buffer, offset)
+        if stored != seq:
+            return None
+        length = min(length, self.slot_size - _SLOT.size)
+        data = bytes(buffer[offset + _SLOT.size:offset + _SLOT.size + length])
+        if _SEQ.unpack_from(buffer, offset)[0] != seq or zlib.crc32(data) != crc:
+            return None     # während des Kopierens überschrieben
+        return json.loads(data)
+
+    def reader_state(self, index: int) -> Tuple[int, int]:
+        """(read_seq, lost) des Workers index"""
+        return _READER.unpack_from(self.memory.buf, _READERS_OFFSET + index * _READER.size)
+
+    def set_reader_state(self, index: int, read_seq: int, lost: int):
+        _READER.pack_into(self.memory.buf, _READERS_OFFSET + index * _READER.size, read_seq, lost)
+
+    def close(self):
+        """Keine weiteren Zyklen - Worker verarbeiten den Rest und beenden sich"""
+        _SEQ.pack_into(self.memory.buf, _SEQ.size, 1)
+
+    def release(self):
+        """Shared Memory freigeben (Reader-Prozess: auch entfernen)"""
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class RingReader:
+    """Lese-Position eines Workers - liegt im Shared Memory (Rückstand für die Metriken des Readers)"""
+
+    def __init__(self, ring: SampleRing, index: int):
+        if not 0 <= index < MAX_WORKERS:
+            raise ValueError(f"Höchstens {MAX_WORKERS} Worker")
+        self.ring = ring
+        self.index = index
+
+    def next(self) -> Optional[Dict]:
+        """Nächster Zyklus (None: kein neuer) - überschriebene Zyklen zählen als verloren"""
+        head = self.ring.write_seq
+        position, lost = self.ring.reader_state(self.index)
+        record = None
+        while record is None and position < head:
+            if head - position > self.ring.slots:
+                lost += head - position - self.ring.slots
+                position = head - self.ring.slots
+            position += 1
+            record = self.ring.read(position)
+            if record is None:
+                lost += 1
+        self.ring.set_reader_state(self.index, position, lost)
+        return record
+
+
+def run_worker(config_file: str, overrides: Dict[str, Dict[str, str]], ring_name: str, slots: int,
+               slot_size: int, index: int, role: str, poll_interval: float):
+    """Worker-Prozess: Zyklen aus dem Ring verarbeiten, bis der Reader den Ring schließt"""
+    # Ctrl+C trifft die ganze Prozessgruppe - beendet wird über den Ring (Rest wird noch verarbeitet)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from sensor_reader import Pi5SensorReader   # erst im Worker (sensor_reader importiert dieses Modul)
+
+    ring = SampleRing.attach(ring_name, slots, slot_size)
+    position = RingReader(ring, index)
+    parent = multiprocessing.parent_process()
+    reader = Pi5SensorReader(config_file, overrides=overrides, role=role)
+    logger.info(f"⚙️ Pipeline Worker {role} gestartet")
+    try:
+        while True:
+            closed = ring.closed
+            record = position.next()
+            if record is not None:
+                reader.process_record(record)
+                continue
+            if closed or (parent is not None and not parent.is_alive()):
+                break
+            time.sleep(poll_interval)
+    finally:
+        reader.stop()
+        ring.release()
+
+
+class Pipeline:
+    """Ring und Worker-Prozesse des Readers: starten, überwachen (Neustart), beenden"""
+
+    def __init__(self, config_file: str, overrides: Optional[Dict[str, Dict[str, str]]], roles: List[str],
+                 slots: int = 64, slot_size: int = 8192, metrics_port: int = 9111,
+                 poll_interval: float = 0.1, stop_timeout: float = 30.0):
+        for role in roles:
+            if role not in WORKER_ROLES:
+                raise ValueError(f"[pipeline] workers: {role!r} ({', '.join(WORKER_ROLES)})")
+        if len(set(roles)) != len(roles) or len(roles) > MAX_WORKERS:
+            raise ValueError(f"[pipeline] workers: jede Rolle einmal, höchstens {MAX_WORKERS}")
+        self.config_file = config_file
+        self.overrides = overrides or {}
+        self.roles = roles
+        self.slots = slots
+        self.slot_size = slot_size
+        self.metrics_port = metrics_port
+        self.poll_interval = poll_interval
+        self.stop_timeout = stop_timeout
+        self.ring: Optional[SampleRing] = None
+        self.processes: List = [None] * len(roles)
+        self.restarts = [0] * len(roles)
+        # spawn statt fork: der Reader hat bereits Threads (Metriken, API, Writer)
+        self._context = multiprocessing.get_context('spawn')
+
+    @classmethod
+    def from_config(cls, config, config_file: str,
+                    overrides: Optional[Dict[str, Dict[str, str]]] = None) -> "Pipeline":
+        """Worker laut [pipeline]"""
+        roles = [role.strip() for role in
+                 config.get('pipeline', 'workers', fallback=', '.join(WORKER_ROLES)).split(',') if role.strip()]
+        return cls(config_file, overrides, roles,
+                   slots=config.getint('pipeline', 'slots', fallback=64),
+                   slot_size=config.getint('pipeline', 'slot_size', fallback=8192),
+                   metrics_port=config.getint('monitoring', 'worker_metrics_port', fallback=9111),
+                   poll_interval=config.getfloat('pipeline', 'poll_interval', fallback=0.1),
+                   stop_timeout=config.getfloat('pipeline', 'stop_timeout', fallback=30.0))
+
+    def start(self):
+        """Ring anlegen und alle Worker starten"""
+        self.ring = SampleRing.create(self.slots, self.slot_size)
+        for index in range(len(self.roles)):
+            self._spawn(index)
+        logger.info(f"⚙️ Pipeline: Ring {self.slots} x {self.slot_size} Bytes, Worker: {', '.join(self.roles)}")
+
+    def _spawn(self, index: int):
+        role = self.roles[index]
+        # Eigener Metrik-Port je Worker (der Reader-Prozess behält reader_metrics_port)
+        overrides = {section: dict(values) for section, values in self.overrides.items()}
+        overrides.setdefault('monitoring', {})['reader_metrics_port'] = str(self.metrics_port + index)
+        process = self._context.Process(
+            target=run_worker, name=f"pi5-{role}", daemon=True,
+            args=(self.config_file, overrides, self.ring.name, self.slots, self.slot_size,
+                  index, role, self.poll_interval))
+        process.start()
+        self.processes[index] = process
+
+    def publish(self, sensor_data: Dict, sensor_health: Dict, now: float) -> bool:
+        """Erfassten Zyklus mit Sensor-Health und Zykluszeit in den Ring legen"""
+        return self.ring.put(dict(sensor_data, health=sensor_health, cycle_time=now))
+
+    def check(self):
+        """Beendete Worker neu starten (setzen an ihrer Lese-Position fort)"""
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                self.restarts[index] += 1
+                logger.warning(f"⚠️ Pipeline Worker {self.roles[index]} beendet (Exit {process.exitcode}) "
+                               f"- Neustart #{self.restarts[index]}")
+                self._spawn(index)
+
+    @property
+    def cycles_written(self) -> int:
+        return self.ring.stats['written'] if self.ring else 0
+
+    def worker_stats(self) -> List[Dict]:
+        """Je Worker: Rolle, läuft, Rückstand (Zyklen), verlorene Zyklen, Neustarts"""
+        if self.ring is None:
+            return []
+        head = self.ring.write_seq
+        stats = []
+        for index, role in enumerate(self.roles):
+            read_seq, lost = self.ring.reader_state(index)
+            process = self.processes[index]
+            stats.append({'role': role, 'alive': process is not None and process.is_alive(),
+                          'lag': head - read_seq, 'lost': lost, 'restarts': self.restarts[index]})
+        return stats
+
+    def stop(self):
+        """Ring schließen, Worker den Rest verarbeiten lassen (höchstens stop_timeout)"""
+        if self.ring is None:
+            return
+        self.ring.close()
+        deadline = time.monotonic() + self.stop_timeout
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"⚠️ Pipeline Worker {self.roles[index]} nicht beendet - abgebrochen")
+                process.terminate()
+                process.join(1)
+        self.processes = [None] * len(self.roles)
+        self.ring.release()
+        self.ring = None
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - InfluxDB Provisionierung
+==============================================
+
+Legt Organisation, Roh-Bucket und Verdichtungs-Buckets mit ihrer
+Aufbewahrung über die InfluxDB API an und registriert - bei
+[downsampling] mode = task - je Stufe einen InfluxDB Task, der den
+Roh-Bucket verdichtet. Grundlage ist allein die config.ini:
+
+    [database]      org, bucket, retention (Roh-Bucket)
+    [downsampling]  enabled, mode, tiers, bucket_<stufe>, retention_<stufe>
+
+Idempotent: vorhandene Ressourcen werden nur bei Abweichungen geändert,
+eigene Tasks ("pi5-downsample-<stufe>") ohne passende Stufe gelöscht.
+
+    python src/provisioning.py --config config.ini --dry-run
+    python src/provisioning.py --config config.ini
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import configparser
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from downsampling import Tier, downsampling_mode, load_tiers, parse_duration
+
+# Externe Dependencies (Optional)
+try:
+    from influxdb_client import InfluxDBClient
+    from influxdb_client.domain.bucket_retention_rules import BucketRetentionRules
+    from influxdb_client.domain.task_create_request import TaskCreateRequest
+    from influxdb_client.domain.task_update_request import TaskUpdateRequest
+    INFLUXDB_AVAILABLE = True
+except ImportError:
+    INFLUXDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TASK_PREFIX = 'pi5-downsample-'
+
+
+def downsample_flux(tier: Tier, source_bucket: str, org: str) -> str:
+    """
+    Flux eines Verdichtungs-Tasks: min/max/mean/count je Fenster aus dem Roh-Bucket
+
+    Gleiches Schema wie die Verdichtung im Reader (downsampling.py):
+    Measurement temperature/humidity (+ Suffix), Felder min/max/mean/count,
+    Zeitstempel = Fensterbeginn. now() ist im Task der geplante Zeitpunkt -
+    range(start: -task.every) trifft damit genau ein Fenster.
+    """
+    rename = ""
+    if tier.measurement_suffix:
+        rename = f'\n    |> map(fn: (r) => ({{r with _measurement: r._measurement + "{tier.measurement_suffix}"}}))'
+    offset = max(10, min(tier.seconds // 4, 300))
+    return f'''option task = {{name: "{TASK_PREFIX}{tier.name}", every: {tier.name}, offset: {offset}s}}
+
+data = from(bucket: "{source_bucket}")
+    |> range(start: -task.every)
+    |> filter(fn: (r) => (r._measurement == "temperature" or r._measurement == "humidity") and r._field == "value")
+
+aggregate = (fn, field) => data
+    |> aggregateWindow(every: task.every, fn: fn, timeSrc: "_start", createEmpty: false)
+    |> set(key: "_field", value: field)
+
+union(tables: [aggregate(fn: min, field: "min"), aggregate(fn: max, field: "max"),
+               aggregate(fn: mean, field: "mean"), aggregate(fn: count, field: "count")]){rename}
+    |> to(bucket: "{tier.bucket}", org: "{org}")
+'''
+
+
+def _retention_text(seconds: int) -> str:
+    if not seconds:
+        return "unbegrenzt"
+    return f"{seconds // 86400}d" if seconds % 86400 == 0 else f"{seconds}s"
+
+
+class ProvisioningPlan:
+    """Soll-Zustand aus der Konfiguration: Buckets (Name → Aufbewahrung) und Tasks (Name → Flux)"""
+
+    def __init__(self, org: str, buckets: Dict[str, int], tasks: Dict[str, str]):
+        self.org = org
+        self.buckets = buckets
+        self.tasks = tasks
+
+    @classmethod
+    def from_config(cls, config) -> "ProvisioningPlan":
+        org = config.get('database', 'org', fallback='pi5org')
+        raw_bucket = config.get('database', 'bucket', fallback='sensors')
+        buckets = {raw_bucket: parse_duration(config.get('database', 'retention', fallback='0'))}
+        tasks = {}
+
+        mode = downsampling_mode(config)
+        if mode:
+            for tier in load_tiers(config):
+                if tier.bucket != raw_bucket:
+                    buckets[tier.bucket] = tier.retention
+                if mode == 'task':
+                    tasks[f"{TASK_PREFIX}{tier.name}"] = downsample_flux(tier, raw_bucket, org)
+        return cls(org, buckets, tasks)
+
+
+class Provisioner:
+    """Gleicht den Soll-Zustand mit der InfluxDB ab (Organisation, Buckets, Tasks)"""
+
+    def __init__(self, client, plan: ProvisioningPlan, dry_run: bool = False):
+        self.client = client
+        self.plan = plan
+        self.dry_run = dry_run
+        self.actions: List[Dict] = []
+
+    def _action(self, kind: str, name: str, action: str, detail: str = ''):
+        self.actions.append({'kind': kind, 'name': name, 'action': action, 'detail': detail})
+        icon = {'unchanged': '✅', 'created': '🆕', 'updated': '🔧', 'deleted': '🗑️'}.get(action, '📝')
+        prefix = "(dry-run) " if self.dry_run and action != 'unchanged' else ""
+        logger.info(f"{icon} {prefix}{kind} {name}: {action}{' - ' + detail if detail else ''}")
+
+    def run(self) -> List[Dict]:
+        """Abgleich durchführen - gibt die Aktionen zurück (created/updated/deleted/unchanged)"""
+        org_id = self._ensure_org()
+        for name, retention in self.plan.buckets.items():
+            self._ensure_bucket(org_id, name, retention)
+        self._ensure_tasks(org_id)
+        return self.actions
+
+    def _ensure_org(self) -> Optional[str]:
+        orgs = self.client.organizations_api().find_organizations(org=self.plan.org)
+        if orgs:
+            self._action('org', self.plan.org, 'unchanged')
+            return orgs[0].id
+        if self.dry_run:
+            self._action('org', self.plan.org, 'created')
+            return None
+        org = self.client.organizations_api().create_organization(name=self.plan.org)
+        self._action('org', self.plan.org, 'created')
+        return org.id
+
+    def _ensure_bucket(self, org_id: Optional[str], name: str, retention: int):
+        buckets_api = self.client.buckets_api()
+        existing = buckets_api.find_buckets(name=name, org_id=org_id).buckets if org_id else []
+        detail = f"Aufbewahrung {_retention_text(retention)}"
+        if not existing:
+            if not self.dry_run:
+                rules = [BucketRetentionRules(type='expire', every_seconds=retention)] if retention else []
+                buckets_api.create_bucket(bucket_name=name, retention_rules=rules, org=org_id)
+            self._action('bucket', name, 'created', detail)
+            return
+
+        bucket = existing[0]
+        current = bucket.retention_rules[0].every_seconds if bucket.retention_rules else 0
+        if current == retention:
+            self._action('bucket', name, 'unchanged', detail)
+            return
+        if not self.dry_run:
+            # every_seconds 0 = unbegrenzt
+            bucket.retention_rules = [BucketRetentionRules(type='expire', every_seconds=retention)]
+            buckets_api.update_bucket(bucket)
+        self._action('bucket', name, 'updated', f"{detail} (vorher {_retention_text(current)})")
+
+    def _ensure_tasks(self, org_id: Optional[str]):
+        tasks_api = self.client.tasks_api()
+        existing = {task.name: task for task in tasks_api.find_tasks(org_id=org_id)} if org_id else {}
+
+        for name, flux in self.plan.tasks.items():
+            task = existing.get(name)
+            if task is None:
+                if not self.dry_run:
+                    tasks_api.create_task(task_create_request=TaskCreateRequest(
+                        org_id=org_id, flux=flux, status='active', description="Pi5 Verdichtung (provisioning.py)"))
+                self._action('task', name, 'created')
+            elif task.flux.strip() != flux.strip() or task.status != 'active':
+                if not self.dry_run:
+                    tasks_api.update_task_request(task.id, TaskUpdateRequest(flux=flux, status='active'))
+                self._action('task', name, 'updated')
+            else:
+                self._action('task', name, 'unchanged')
+
+        # Eigene Tasks ohne Stufe in der Konfiguration (z.B. mode = edge) entfernen
+        for name, task in existing.items():
+            if name.startswith(TASK_PREFIX) and name not in self.plan.tasks:
+                if not self.dry_run:
+                    tasks_api.delete_task(task.id)
+                self._action('task', name, 'deleted')
+
+
+def provision(config, dry_run: bool = False) -> List[Dict]:
+    """InfluxDB laut Konfiguration provisionieren ([database] host/port/token/org)"""
+    if not INFLUXDB_AVAILABLE:
+        raise RuntimeError("InfluxDB Client nicht verfügbar - pip install influxdb-client")
+
+    host = config.get('database', 'host', fallback='localhost')
+    port = config.getint('database', 'port', fallback=8086)
+    timeout = config.getfloat('database', 'timeout', fallback=10.0)
+    with InfluxDBClient(url=f"http://{host}:{port}",
+                        token=config.get('database', 'token', fallback='pi5-token-2024'),
+                        org=config.get('database', 'org', fallback='pi5org'),
+                        timeout=int(timeout * 1000)) as client:
+        return Provisioner(client, ProvisioningPlan.from_config(config), dry_run=dry_run).run()
+
+
+def main():
+    """Hauptfunktion"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pi5 Heizungs Messer - InfluxDB Provisionierung')
+    parser.add_argument('--config', default='config.ini', help='Konfigurationsdatei')
+    parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts ändern')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    config = configparser.ConfigParser()
+    config.read(args.config)
+
+    try:
+        actions = provision(config, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"❌ Provisionierung fehlgeschlagen: {e}")
+        sys.exit(1)
+
+    changed = sum(1 for action in actions if action['action'] != 'unchanged')
+    logger.info(f"🏁 {len(actions)} Ressourcen geprüft, {changed} {'zu ändern' if args.dry_run else 'geändert'}")
+
+
+if __name__ == "__main__":
+    main()
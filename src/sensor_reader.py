@@ -12,8 +12,7 @@ Autor: Pi5 Heizungs Messer Project
 import time
 import logging
 import configparser
-import threading
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import os
 import sys
@@ -21,6 +20,19 @@ import sys
 # Hardware Module
 from hardware.ds18b20_sensor import DS18B20Reader
 from hardware.dht22_sensor import DHT22Reader
+from alerts import AlertEngine, start_alert_publisher
+from burner import BurnerDetector, start_burner_publisher
+from derived import DerivedMetrics
+from downsampling import Downsampler
+from filters import SampleFilter
+from history import SensorHistory
+from live_api import LatestSnapshot, start_live_api, start_live_stream
+from pipeline import WORKER_ROLES, Pipeline
+from sinks import SinkSet, StdoutSink, build_sinks, sink_types
+
+# Monitoring
+from monitoring.metrics import REGISTRY, collector_family, start_metrics_server
+from monitoring.tracing import TRACER, install_toggle_signal
 
 # Externe Dependencies (Optional)
 try:
@@ -31,17 +43,35 @@ except ImportError:
     INFLUXDB_AVAILABLE = False
     print("⚠️ InfluxDB Client nicht verfügbar - pip install influxdb-client")
 
-# Logging Setup
+# Logging Setup (Log-Datei nur wenn das Verzeichnis existiert, z.B. nicht auf Entwicklungsrechnern)
+_log_handlers = [logging.StreamHandler()]
+try:
+    _log_handlers.append(logging.FileHandler('/home/pi/pi5-sensors/sensor_reader.log'))
+except OSError:
+    pass
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('/home/pi/pi5-sensors/sensor_reader.log')
-    ]
+    handlers=_log_handlers
 )
 logger = logging.getLogger(__name__)
 
+# Metriken der Erfassungs-Pipeline
+SENSOR_READ_SECONDS = REGISTRY.histogram(
+    'pi5_sensor_read_seconds', 'Lesedauer je Sensor inkl. Wiederholungen', ['sensor_id'])
+CYCLE_SECONDS = REGISTRY.histogram(
+    'pi5_reader_cycle_seconds', 'Dauer eines kompletten Lese-Zyklus')
+CYCLES_TOTAL = REGISTRY.counter(
+    'pi5_reader_cycles_total', 'Lese-Zyklen nach Ergebnis', ['status'])
+LAST_CYCLE_TIMESTAMP = REGISTRY.gauge(
+    'pi5_reader_last_cycle_timestamp_seconds', 'Zeitpunkt des letzten Lese-Zyklus (Unix)')
+INFLUX_WRITE_SECONDS = REGISTRY.histogram(
+    'pi5_influxdb_write_seconds', 'Dauer der InfluxDB Schreibvorgänge')
+INFLUX_WRITES_TOTAL = REGISTRY.counter(
+    'pi5_influxdb_writes_total', 'InfluxDB Schreibvorgänge nach Ergebnis', ['status'])
+INFLUX_POINTS_TOTAL = REGISTRY.counter(
+    'pi5_influxdb_points_total', 'In InfluxDB geschriebene Datenpunkte')
+
 
 class Pi5SensorReader:
     """
@@ -49,39 +79,187 @@ class Pi5SensorReader:
     Koordiniert alle Sensoren und Datenfluss
     """
     
-    def __init__(self, config_file='config.ini'):
-        """Initialisiere Sensor Reader"""
+    def __init__(self, config_file='config.ini', overrides: Optional[Dict[str, Dict[str, str]]] = None,
+                 clock=None, role: Optional[str] = None):
+        """
+        Initialisiere Sensor Reader
+        
+        Args:
+            config_file: Pfad zur Konfigurationsdatei
+            overrides: Werte je Sektion, die die Datei überschreiben (z.B. aus der Kommandozeile)
+            clock: Uhr für Zyklus-Pausen, Messzeitpunkte und DHT22 Cache (Standard: time Modul,
+                   hardware.simulation.VirtualClock für Dauertests)
+            role: all (alles in einem Prozess), acquisition (nur Sensoren, Verarbeitung in
+                  Worker-Prozessen) oder eine Worker-Rolle aus pipeline.py (storage, mqtt,
+                  analytics) - Standard: acquisition bei [pipeline] enabled = true, sonst all
+        """
+        self.clock = clock or time
+        self.config_file = config_file
+        self.overrides = overrides
         self.config = configparser.ConfigParser()
         self.config.read(config_file)
+        if overrides:
+            self.config.read_dict(overrides)
+        
+        # Rolle im Mehrprozess-Betrieb ([pipeline], pipeline.py)
+        if role is None:
+            role = 'acquisition' if self.config.getboolean('pipeline', 'enabled', fallback=False) else 'all'
+        if role not in ('all', 'acquisition') + WORKER_ROLES:
+            raise ValueError(f"Unbekannte Rolle: {role} (all, acquisition, {', '.join(WORKER_ROLES)})")
+        self.role = role
+        self.pipeline = None        # Pipeline (Ring und Worker) im Reader-Prozess
+        processing = role != 'acquisition'
+        # Ausgaben dieses Prozesses: MQTT im mqtt Worker, alle anderen im storage Worker
+        self.sink_types = [sink_type for sink_type in sink_types(self.config)
+                           if self._runs('mqtt' if sink_type == 'mqtt' else 'storage')]
+        mqtt_sinks = self.role == 'mqtt' and 'mqtt' in self.sink_types
         
         # Sensor Instanzen
         self.ds18b20_reader = None
         self.dht22_reader = None
         self.influx_client = None
+        self.simulation = None      # SimulatedHardware oder ReplayHardware
+        self.replay = None          # ReplayHardware: Tempo der Zyklen aus der Aufzeichnung
+        self.recorder = None        # SessionRecorder ([capture] file)
         
         # Status Tracking
         self.running = False
         self.last_reading = None
         
+        # Verlauf der letzten Stunden je Sensor im Speicher (Ringpuffer, [history])
+        self.history = SensorHistory.from_config(self.config) if self._runs('analytics') else None
+        
+        # Ausreißer-Filter je Messreihe vor allen weiteren Stufen ([filters])
+        self.filters = SampleFilter.from_config(self.config) if processing else None
+        
+        # Spreizung und Änderungsraten je Heizkreis ([circuits])
+        # (im mqtt Worker nur für den Zyklus der MQTT Ausgaben)
+        self.derived = DerivedMetrics.from_config(self.config) \
+            if self._runs('storage', 'analytics') or mqtt_sinks else None
+        
+        # Brenner Start/Stop aus dem Anstieg der Vorlauftemperatur ([burner]),
+        # Ereignisse gehen aus dem mqtt Worker sofort an den Broker
+        self.burner = BurnerDetector.from_config(self.config) if processing else None
+        self.burner_publisher = None
+        
+        # Alarm-Regeln je Zyklus, Versand direkt per MQTT ([alert:<name>], [alerts])
+        self.alerts = AlertEngine.from_config(self.config) if processing else None
+        self.alert_publisher = None
+        
+        # Verdichtung je Minute/Stunde in eigene Buckets ([downsampling])
+        self.downsampler = Downsampler.from_config(self.config) if self._runs('storage') else None
+        
+        # Letzter Zyklus als JSON für den lokalen Endpunkt /latest ([api])
+        self.snapshot = LatestSnapshot()
+        
+        # Sensor-Health: aufeinanderfolgende Lesefehler je Sensor
+        # (als Measurement "sensor_health" gespeichert, Basis der MQTT Verfügbarkeit)
+        self.sensor_health = {}
+        self.unavailable_after = self.config.getint('hardware', 'unavailable_after', fallback=3)
+        
+        # HTTP Timeout der InfluxDB (auch Wartezeit beim Leeren der Ausgaben)
+        self.influx_timeout = self.config.getfloat('database', 'timeout', fallback=10.0)
+        
         logger.info("🌡️ Pi5 Sensor Reader initialisiert")
         
         # Hardware initialisieren
-        self._setup_sensors()
-        self._setup_database()
+        if self._runs('acquisition'):
+            self._setup_sensors()
+        if self._runs('storage'):
+            self._setup_database()
+        
+        # Ausgaben je Zyklus mit eigenem Puffer und Thread ([sink:<name>], sonst InfluxDB laut [database]):
+        # eine langsame Ausgabe hält weder den Lese-Zyklus noch die anderen Ausgaben auf
+        self.sinks = SinkSet([])
+        if self.sink_types:
+            self.sinks = build_sinks(self.config, self._encode_lines,
+                                     self._write_lines if self.influx_client else None, types=self.sink_types)
+        
+        # Aktuelle Messwerte (/latest) und Live-Stream (/stream) laut [api]
+        self.api_server = None
+        self.stream_server = None
+        if self._runs('analytics'):
+            self.api_server = start_live_api(self.config, self.snapshot)
+            self.stream_server = start_live_stream(self.config, self.snapshot)
+        
+        # Eigene MQTT Verbindung für Alarme (ohne Umweg über InfluxDB und Bridge)
+        if self.alerts and self._runs('mqtt'):
+            self.alert_publisher = start_alert_publisher(self.config)
+        
+        # Eigene MQTT Verbindung für Brenner-Ereignisse (sofort bei der Erkennung)
+        if self.burner and self._runs('mqtt'):
+            self.burner_publisher = start_burner_publisher(self.config)
+        
+        # Metrik-Endpunkt (/metrics) laut [monitoring]
+        REGISTRY.add_collector(self._collect_metrics)
+        self.metrics_server = start_metrics_server(self.config, 'reader_metrics_port', 9101)
+        
+        # Timing Spans laut [monitoring] tracing (zur Laufzeit per SIGUSR2 umschaltbar)
+        TRACER.configure_from(self.config)
+    
+    def _runs(self, *roles: str) -> bool:
+        """Teil der Verarbeitung in diesem Prozess (role = all: alle)"""
+        return self.role == 'all' or self.role in roles
     
     def _setup_sensors(self):
         """Hardware Sensoren einrichten"""
         try:
+            # Hardware-Backend: gpio (Raspberry Pi) oder simulation (hardware.simulation)
+            w1_device_path = None
+            dht22_device = None
+            backend = self.config.get('hardware', 'backend', fallback='gpio')
+            if backend == 'simulation':
+                from hardware.simulation import SimulatedHardware
+                self.simulation = SimulatedHardware.from_config(self.config, clock=self.clock.time,
+                                                                sleep=self.clock.sleep)
+                if self.simulation.start():
+                    w1_device_path = self.simulation.w1_bus.device_path
+                    dht22_device = self.simulation.dht22
+                    logger.info("🧪 Simuliertes Hardware-Backend aktiv")
+                else:
+                    self.simulation = None
+            elif backend == 'replay':
+                from hardware.replay import ReplayHardware
+                self.simulation = ReplayHardware.from_config(self.config)
+                if self.simulation.start():
+                    self.replay = self.simulation
+                    w1_device_path = self.simulation.w1_bus.device_path
+                    dht22_device = self.simulation.dht22
+                else:
+                    self.simulation = None
+            elif backend != 'gpio':
+                logger.error(f"❌ Unbekanntes Hardware-Backend: {backend} (gpio, simulation, replay)")
+            
             # DS18B20 1-Wire Temperatursensoren
             if self.config.getboolean('hardware', 'ds18b20_enabled', fallback=True):
-                self.ds18b20_reader = DS18B20Reader(self.config)
+                self.ds18b20_reader = DS18B20Reader(self.config, w1_device_path=w1_device_path, clock=self.clock)
                 logger.info("✅ DS18B20 Reader initialisiert")
             
             # DHT22 Temperatur/Luftfeuchtigkeit
             if self.config.getboolean('hardware', 'dht22_enabled', fallback=True):
                 dht22_gpio = self.config.getint('hardware', 'dht22_gpio', fallback=17)
-                self.dht22_reader = DHT22Reader(gpio_pin=dht22_gpio)
+                self.dht22_reader = DHT22Reader(gpio_pin=dht22_gpio, device=dht22_device, clock=self.clock)
                 logger.info("✅ DHT22 Reader initialisiert")
+            
+            # Wiedergabe: Wartezeiten der Reader im Tempo der Aufzeichnung verkürzen
+            if self.replay:
+                if self.ds18b20_reader:
+                    self.ds18b20_reader.retry_delay /= self.replay.speed
+                if self.dht22_reader:
+                    self.dht22_reader.min_read_interval /= self.replay.speed
+            
+            # Rohdaten-Aufzeichnung für spätere Wiedergabe (backend = replay)
+            capture_file = self.config.get('capture', 'file', fallback='')
+            if capture_file:
+                from hardware.replay import SessionRecorder
+                self.recorder = SessionRecorder(capture_file, {
+                    'backend': backend,
+                    'sensors': self.ds18b20_reader.get_sensor_ids() if self.ds18b20_reader else [],
+                    'dht22': self.dht22_reader is not None
+                })
+                for sensor_reader in (self.ds18b20_reader, self.dht22_reader):
+                    if sensor_reader:
+                        sensor_reader.recorder = self.recorder
                 
         except Exception as e:
             logger.error(f"❌ Sensor Setup Fehler: {e}")
@@ -99,7 +277,8 @@ class Pi5SensorReader:
             org = self.config.get('database', 'org', fallback='pi5org')
             
             url = f"http://{host}:{port}"
-            self.influx_client = InfluxDBClient(url=url, token=token, org=org)
+            self.influx_client = InfluxDBClient(url=url, token=token, org=org,
+                                                timeout=int(self.influx_timeout * 1000))
             
             # Health Check
             health = self.influx_client.health()
@@ -113,113 +292,414 @@ class Pi5SensorReader:
             self.influx_client = None
     
     def read_all_sensors(self) -> Dict:
-        """Alle Sensoren auslesen"""
+        """Alle Sensoren auslesen und den Zyklus verarbeiten (bzw. an die Worker-Prozesse übergeben)"""
+        cycle_started = time.perf_counter()
+        sensor_data = self.acquire_cycle()
+        if sensor_data['status'] == 'ok':
+            if self.pipeline:
+                # Verarbeitung, Speicherung und MQTT in den Worker-Prozessen
+                self.pipeline.publish(sensor_data, self.sensor_health, self.clock.time())
+            else:
+                self.process_cycle(sensor_data, self.clock.time())
+        
+        CYCLE_SECONDS.observe(time.perf_counter() - cycle_started)
+        CYCLES_TOTAL.labels(sensor_data['status']).inc()
+        LAST_CYCLE_TIMESTAMP.set(self.clock.time())
+        
+        return sensor_data
+    
+    def acquire_cycle(self) -> Dict:
+        """Sensoren eines Zyklus auslesen (Messwerte, Messzeitpunkte, Sensor-Health)"""
         sensor_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(self.clock.time()).isoformat(),
             'temperatures': {},
             'humidity': {},
+            'acquired': {},     # Messzeitpunkt je Sensor (Unix) - Zeitstempel der InfluxDB Punkte
             'status': 'ok'
         }
+        if self.replay:
+            self.replay.next_cycle()
+        if self.recorder:
+            self.recorder.begin_cycle()
         
         try:
             # DS18B20 Temperatursensoren
             if self.ds18b20_reader:
                 temperatures = self.ds18b20_reader.read_all_temperatures()
                 sensor_data['temperatures'].update(temperatures)
+                for sensor_id, temperature in temperatures.items():
+                    self._update_sensor_health(sensor_id, temperature is not None)
+                for sensor_id, duration in self.ds18b20_reader.last_read_durations.items():
+                    started = self.ds18b20_reader.last_read_started.get(sensor_id)
+                    SENSOR_READ_SECONDS.labels(sensor_id).observe(duration)
+                    TRACER.record('ds18b20.convert', duration, start=started,
+                                  sensor_id=sensor_id, ok=temperatures.get(sensor_id) is not None)
+                    if started is not None and temperatures.get(sensor_id) is not None:
+                        # Konvertierung abgeschlossen = Ende des Lesevorgangs
+                        sensor_data['acquired'][sensor_id] = started + duration
                 logger.info(f"📊 DS18B20: {len(temperatures)} Sensoren gelesen")
             
             # DHT22 Umgebungssensor
             if self.dht22_reader:
-                dht_data = self.dht22_reader.read_sensor()
+                with TRACER.span('dht22.read') as span:
+                    dht_data = self.dht22_reader.read_sensor()
+                    span.set(cached=self.dht22_reader.last_read_duration is None, ok=dht_data is not None)
+                if self.dht22_reader.last_read_duration is not None:
+                    SENSOR_READ_SECONDS.labels('dht22').observe(self.dht22_reader.last_read_duration)
+                self._update_sensor_health('dht22', dht_data is not None)
                 if dht_data:
                     sensor_data['temperatures']['dht22'] = dht_data['temperature']
                     sensor_data['humidity']['dht22'] = dht_data['humidity']
+                    # Bei Cache-Treffer gilt der Zeitpunkt der ursprünglichen Messung
+                    sensor_data['acquired']['dht22'] = self.dht22_reader.last_reading_time
                     logger.info(f"📊 DHT22: {dht_data['temperature']:.1f}°C, {dht_data['humidity']:.1f}%")
             
+        except Exception as e:
+            logger.error(f"❌ Sensor Lese-Fehler: {e}")
+            sensor_data['status'] = 'error'
+            sensor_data['error'] = str(e)
+        
+        if self.recorder:
+            self.recorder.end_cycle(sensor_data['status'])
+        
+        return sensor_data
+    
+    def process_cycle(self, sensor_data: Dict, now: float) -> Dict:
+        """Erfassten Zyklus verarbeiten: Filter, Heizkreise, Brenner, Alarme, Verlauf, /latest"""
+        # Sensor-Health und Zykluszeit als Kopie im Zyklus - die Ausgaben schreiben ihn später
+        # in eigenen Threads, während der nächste Lese-Zyklus sensor_health bereits ändert
+        sensor_data['cycle_time'] = now
+        sensor_data['health'] = {sensor_id: dict(health) for sensor_id, health in self.sensor_health.items()}
+        try:
+            if self.filters:
+                # Abgelehnte Werte werden None - der Sensor hat geantwortet, Health bleibt unverändert
+                outliers = self.filters.apply(sensor_data, now)
+                if outliers:
+                    sensor_data['outliers'] = outliers
+            
+            if self.derived:
+                sensor_data['circuits'] = self.derived.update(sensor_data, now)
+            if self.burner:
+                burner = self.burner.update(sensor_data, now)
+                if burner:
+                    sensor_data['burner'] = burner
+                    if burner['events'] and self.burner_publisher:
+                        self.burner_publisher.publish(burner['events'])
+            if self.alerts:
+                alerts = self.alerts.evaluate(sensor_data, now)
+                if alerts:
+                    sensor_data['alerts'] = alerts
+                    if self.alert_publisher:
+                        self.alert_publisher.publish(alerts)
+            
             self.last_reading = sensor_data
+            if self.history:
+                self.history.add_cycle(sensor_data, now)
+            if self.downsampler:
+                # Abgeschlossene Fenster werden mit dem Zyklus geschrieben
+                sensor_data['aggregates'] = self.downsampler.add_cycle(sensor_data, now)
+            self.snapshot.publish(self._latest_payload(sensor_data), now)
             
         except Exception as e:
-            logger.error(f"❌ Sensor Lese-Fehler: {e}")
+            logger.error(f"❌ Sensor Verarbeitungs-Fehler: {e}")
             sensor_data['status'] = 'error'
             sensor_data['error'] = str(e)
         
         return sensor_data
     
-    def save_to_influxdb(self, sensor_data: Dict):
-        """Sensordaten in InfluxDB speichern"""
+    def process_record(self, record: Dict) -> Dict:
+        """Zyklus aus dem Ring der Pipeline verarbeiten und speichern (Worker-Prozess)"""
+        with TRACER.trace(f'pipeline.{self.role}'):
+            self.sensor_health = record.pop('health', {})
+            sensor_data = self.process_cycle(record, record.pop('cycle_time', self.clock.time()))
+            if sensor_data['status'] == 'ok':
+                self.submit_to_sinks(sensor_data)
+        return sensor_data
+    
+    def _update_sensor_health(self, sensor_id: str, ok: bool):
+        """Lese-Ergebnis in den Sensor-Health übernehmen"""
+        health = self.sensor_health.setdefault(sensor_id, {'consecutive_failures': 0, 'last_ok': None})
+        if ok:
+            health['consecutive_failures'] = 0
+            health['last_ok'] = datetime.fromtimestamp(self.clock.time()).isoformat()
+        else:
+            health['consecutive_failures'] += 1
+            if health['consecutive_failures'] == self.unavailable_after:
+                logger.warning(f"⚠️ Sensor {sensor_id}: {self.unavailable_after} Lesefehler in Folge - nicht verfügbar")
+        health['available'] = health['consecutive_failures'] < self.unavailable_after
+    
+    def _latest_payload(self, sensor_data: Dict) -> Dict:
+        """JSON für /latest: Werte je Sensor mit Name, Messzeitpunkt und Verfügbarkeit"""
+        acquired = sensor_data.get('acquired', {})
+        sensors = {}
+        for sensor_id, temperature in sensor_data['temperatures'].items():
+            health = self.sensor_health.get(sensor_id, {})
+            sensors[sensor_id] = {
+                'name': self.config.get('labels', sensor_id, fallback=sensor_id),
+                'temperature': temperature,
+                'acquired': acquired.get(sensor_id),
+                'available': health.get('available', temperature is not None)
+            }
+        for sensor_id, humidity in sensor_data['humidity'].items():
+            sensors.setdefault(sensor_id, {})['humidity'] = humidity
+        payload = {'timestamp': sensor_data['timestamp'], 'status': sensor_data['status'], 'sensors': sensors}
+        if 'circuits' in sensor_data:
+            payload['circuits'] = sensor_data['circuits']
+        if 'burner' in sensor_data:
+            payload['burner'] = sensor_data['burner']
+        if self.alerts:
+            payload['alerts'] = self.alerts.active()
+        return payload
+    
+    def _build_points(self, sensor_data: Dict) -> List:
+        """
+        InfluxDB Datenpunkte für einen Lese-Zyklus erzeugen
+        
+        Zeitstempel ist der Messzeitpunkt des Sensors (UTC) - die MQTT Bridge
+        berechnet daraus die Ende-zu-Ende Latenz bis zur Zustellung. Sensor-Health
+        und Zykluszeit kommen aus dem Zyklus (läuft im Thread der Ausgabe).
+        """
+        points = []
+        now = datetime.fromtimestamp(sensor_data.get('cycle_time', self.clock.time()), timezone.utc)
+        acquired = sensor_data.get('acquired', {})
+        
+        def measured_at(sensor_id):
+            if sensor_id in acquired:
+                return datetime.fromtimestamp(acquired[sensor_id], timezone.utc)
+            return now
+        
+        # Temperaturen schreiben
+        for sensor_id, temperature in sensor_data['temperatures'].items():
+            if temperature is not None:
+                # Sensor Namen aus Config laden
+                sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
+                
+                point = Point("temperature") \
+                    .tag("sensor_id", sensor_id) \
+                    .tag("name", sensor_name) \
+                    .field("value", float(temperature)) \
+                    .time(measured_at(sensor_id))
+                points.append(point)
+        
+        # Luftfeuchtigkeit schreiben
+        for sensor_id, humidity in sensor_data['humidity'].items():
+            if humidity is not None:
+                sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
+                
+                point = Point("humidity") \
+                    .tag("sensor_id", sensor_id) \
+                    .tag("name", sensor_name) \
+                    .field("value", float(humidity)) \
+                    .time(measured_at(sensor_id))
+                points.append(point)
+        
+        # Ausreißer (action = flag): Rohwert mit Grund, getrennt von den Messwerten
+        if self.filters and self.filters.flag:
+            for outlier in sensor_data.get('outliers', {}).values():
+                sensor_id = outlier['sensor_id']
+                point = Point("outlier") \
+                    .tag("sensor_id", sensor_id) \
+                    .tag("name", self.config.get('labels', sensor_id, fallback=sensor_id)) \
+                    .tag("reason", outlier['reason']) \
+                    .field(outlier['measurement'], float(outlier['value'])) \
+                    .time(datetime.fromtimestamp(outlier['acquired'], timezone.utc))
+                points.append(point)
+        
+        # Heizkreise: Spreizung und Änderungsraten als eigene Serie (kein Join in Grafana)
+        for circuit_id, circuit in sensor_data.get('circuits', {}).items():
+            point = Point("circuit") \
+                .tag("circuit", circuit_id) \
+                .tag("name", circuit['name']) \
+                .field("delta_t", float(circuit['delta_t'])) \
+                .field("supply", float(circuit['supply'])) \
+                .field("return", float(circuit['return'])) \
+                .time(datetime.fromtimestamp(circuit['acquired'], timezone.utc))
+            for field in ('supply_rate', 'return_rate'):
+                if circuit[field] is not None:
+                    point.field(field, float(circuit[field]))
+            points.append(point)
+        
+        # Brenner: Zustand und laufende Kennzahlen je Zyklus, Start/Stop als eigene Ereignisse
+        burner = sensor_data.get('burner')
+        if burner:
+            point = Point("burner") \
+                .field("running", burner['running']) \
+                .field("starts_today", burner['starts_today']) \
+                .field("starts_total", burner['starts_total']) \
+                .field("starts_per_day", float(burner['starts_per_day'])) \
+                .field("short_cycles", burner['short_cycles']) \
+                .time(datetime.fromtimestamp(burner['acquired'], timezone.utc))
+            for field in ('rate', 'mean_run_time', 'short_cycle_ratio'):
+                if burner[field] is not None:
+                    point.field(field, float(burner[field]))
+            points.append(point)
+            for event in burner['events']:
+                point = Point("burner_event") \
+                    .tag("event", event['event']) \
+                    .field("temperature", float(event['temperature'])) \
+                    .time(datetime.fromtimestamp(event['timestamp'], timezone.utc))
+                for field in ('run_time', 'pause'):
+                    if field in event:
+                        point.field(field, float(event[field]))
+                if 'short_cycle' in event:
+                    point.field("short_cycle", event['short_cycle'])
+                points.append(point)
+        
+        # Alarm-Wechsel (Verlauf in Grafana)
+        for alert in sensor_data.get('alerts', []):
+            point = Point("alert") \
+                .tag("rule", alert['rule']) \
+                .tag("severity", alert['severity']) \
+                .field("firing", alert['state'] == 'firing') \
+                .field("value", float(alert['value'])) \
+                .time(datetime.fromtimestamp(alert['since'], timezone.utc))
+            points.append(point)
+        
+        # Sensor-Health schreiben (Verfügbarkeit je Sensor für die MQTT Bridge)
+        for sensor_id, health in sensor_data.get('health', {}).items():
+            sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
+            
+            point = Point("sensor_health") \
+                .tag("sensor_id", sensor_id) \
+                .tag("name", sensor_name) \
+                .field("available", health['available']) \
+                .field("consecutive_failures", health['consecutive_failures']) \
+                .time(now)
+            points.append(point)
+        
+        return points
+    
+    def _build_aggregate_lines(self, aggregates: List) -> Dict[str, List[str]]:
+        """Abgeschlossene Fenster als Line Protocol je Ziel-Bucket (Zeitstempel: Fensterbeginn)"""
+        lines = {}
+        for aggregate in aggregates:
+            sensor_name = self.config.get('labels', aggregate.sensor_id, fallback=aggregate.sensor_id)
+            point = Point(aggregate.measurement + aggregate.tier.measurement_suffix) \
+                .tag("sensor_id", aggregate.sensor_id) \
+                .tag("name", sensor_name) \
+                .field("min", aggregate.min) \
+                .field("max", aggregate.max) \
+                .field("mean", aggregate.mean) \
+                .field("count", aggregate.count) \
+                .time(datetime.fromtimestamp(aggregate.start, timezone.utc))
+            lines.setdefault(aggregate.tier.bucket, []).append(point.to_line_protocol())
+        return lines
+    
+    def _encode_lines(self, sensor_data: Dict) -> Dict[str, List[str]]:
+        """Line Protocol je Ziel-Bucket: Rohwerte des Zyklus und abgeschlossene Verdichtungs-Fenster"""
+        bucket = self.config.get('database', 'bucket', fallback='sensors')
+        # Punkte erzeugen und Line Protocol kodieren (getrennt vom HTTP Request messbar)
+        with TRACER.span('influx.encode') as span:
+            batches = {}
+            if 'temperatures' in sensor_data:     # Lese-Zyklus (nicht nur Fenster beim Beenden)
+                batches[bucket] = [point.to_line_protocol() for point in self._build_points(sensor_data)]
+            for tier_bucket, lines in self._build_aggregate_lines(sensor_data.get('aggregates', [])).items():
+                batches.setdefault(tier_bucket, []).extend(lines)
+            span.set(points=sum(len(lines) for lines in batches.values()))
+        return batches
+    
+    def _write_lines(self, batches: Dict[str, List[str]]) -> bool:
+        """Line Protocol in InfluxDB schreiben (ein Request je Bucket)"""
         if not self.influx_client:
             return False
-            
+        
         try:
             write_api = self.influx_client.write_api(write_options=SYNCHRONOUS)
-            bucket = self.config.get('database', 'bucket', fallback='sensors')
-            points = []
-            
-            # Temperaturen schreiben
-            for sensor_id, temperature in sensor_data['temperatures'].items():
-                if temperature is not None:
-                    # Sensor Namen aus Config laden
-                    sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
-                    
-                    point = Point("temperature") \
-                        .tag("sensor_id", sensor_id) \
-                        .tag("name", sensor_name) \
-                        .field("value", float(temperature)) \
-                        .time(datetime.now())
-                    points.append(point)
-            
-            # Luftfeuchtigkeit schreiben
-            for sensor_id, humidity in sensor_data['humidity'].items():
-                if humidity is not None:
-                    sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
-                    
-                    point = Point("humidity") \
-                        .tag("sensor_id", sensor_id) \
-                        .tag("name", sensor_name) \
-                        .field("value", float(humidity)) \
-                        .time(datetime.now())
-                    points.append(point)
-            
-            # Daten schreiben
-            if points:
-                write_api.write(bucket=bucket, record=points)
-                logger.info(f"💾 {len(points)} Datenpunkte in InfluxDB gespeichert")
+            written = 0
+            for target, lines in batches.items():
+                if not lines:
+                    continue
+                started = time.perf_counter()
+                with TRACER.span('influx.write', points=len(lines), bucket=target):
+                    write_api.write(bucket=target, record=lines)
+                INFLUX_WRITE_SECONDS.observe(time.perf_counter() - started)
+                INFLUX_WRITES_TOTAL.labels('ok').inc()
+                INFLUX_POINTS_TOTAL.inc(len(lines))
+                written += len(lines)
+            if written:
+                logger.info(f"💾 {written} Datenpunkte in InfluxDB gespeichert")
                 return True
             
         except Exception as e:
+            INFLUX_WRITES_TOTAL.labels('error').inc()
             logger.error(f"❌ InfluxDB Schreibfehler: {e}")
             return False
         
         return False
     
+    def save_to_influxdb(self, sensor_data: Dict):
+        """Sensordaten (Rohwerte und abgeschlossene Verdichtungs-Fenster) sofort in InfluxDB speichern"""
+        if not self.influx_client:
+            return False
+        try:
+            batches = self._encode_lines(sensor_data)
+        except Exception as e:
+            INFLUX_WRITES_TOTAL.labels('error').inc()
+            logger.error(f"❌ InfluxDB Schreibfehler: {e}")
+            return False
+        return self._write_lines(batches)
+    
+    def submit_to_sinks(self, sensor_data: Dict) -> bool:
+        """
+        Zyklus an alle Ausgaben übergeben - kehrt sofort zurück
+        
+        Geschrieben wird im Thread jeder Ausgabe (mit dem Trace-Kontext des Zyklus).
+        Ist ein Puffer voll, verwirft die Ausgabe laut drop den ältesten oder den neuen Zyklus.
+        """
+        if not self.sinks:
+            return False
+        record = self._latest_payload(sensor_data) if self.sinks.wants_record else None
+        return self.sinks.submit(sensor_data, record)
+    
     def run_once(self):
         """Einmalige Sensor-Ablesung"""
         logger.info("🔄 Einmalige Sensor-Ablesung...")
         
-        sensor_data = self.read_all_sensors()
-        
-        # Daten in InfluxDB speichern
-        if sensor_data['status'] == 'ok':
-            self.save_to_influxdb(sensor_data)
+        with TRACER.trace('reader.cycle'):
+            sensor_data = self.read_all_sensors()
+            
+            # An alle Ausgaben übergeben und warten, bis sie geschrieben sind
+            if sensor_data['status'] == 'ok' and self.submit_to_sinks(sensor_data):
+                self.sinks.flush(self.influx_timeout + 1)
         
-        # Daten ausgeben
-        self._print_sensor_summary(sensor_data)
+        # Daten ausgeben (nicht zwischen NDJSON auf der Standardausgabe)
+        if not any(isinstance(sink, StdoutSink) for sink in self.sinks):
+            self._print_sensor_summary(sensor_data)
         
         return sensor_data
     
+    def start_pipeline(self):
+        """Ring und Worker-Prozesse laut [pipeline] starten (nur role = acquisition)"""
+        if self.role != 'acquisition' or self.pipeline:
+            return
+        self.pipeline = Pipeline.from_config(self.config, self.config_file, self.overrides)
+        self.pipeline.start()
+    
     def run_continuous(self, interval: int = 30):
         """Kontinuierliche Sensor-Ablesung"""
         logger.info(f"🔄 Starte kontinuierliche Ablesung (alle {interval}s)")
         self.running = True
         
         try:
+            self.start_pipeline()
             while self.running:
-                sensor_data = self.read_all_sensors()
+                with TRACER.trace('reader.cycle'):
+                    sensor_data = self.read_all_sensors()
+                    
+                    if sensor_data['status'] == 'ok' and not self.pipeline:
+                        self.submit_to_sinks(sensor_data)
+                if self.pipeline:
+                    self.pipeline.check()
                 
-                if sensor_data['status'] == 'ok':
-                    self.save_to_influxdb(sensor_data)
+                if self.replay:
+                    # Wiedergabe: Abstände der Aufzeichnung (verkürzt um speed)
+                    if not self.replay.has_next():
+                        logger.info(f"⏹️ Wiedergabe beendet: {self.replay.get_stats()['cycles']} Zyklen")
+                        break
+                    self.clock.sleep(self.replay.next_delay())
+                    continue
                     
-                time.sleep(interval)
+                self.clock.sleep(interval)
                 
         except KeyboardInterrupt:
             logger.info("👋 Sensor Reader beendet durch Benutzer")
@@ -228,11 +708,143 @@ class Pi5SensorReader:
         finally:
             self.stop()
     
+    def _collect_metrics(self) -> List:
+        """Zähler der Hardware-Klassen beim Metrik-Abruf einsammeln"""
+        families = []
+        
+        if self.ds18b20_reader:
+            stats = self.ds18b20_reader.stats
+            for key, name, doc in (
+                ('reads', 'pi5_ds18b20_reads_total', 'DS18B20 Leseversuche'),
+                ('crc_errors', 'pi5_ds18b20_crc_errors_total', 'DS18B20 CRC Fehler'),
+                ('retries', 'pi5_ds18b20_retries_total', 'DS18B20 Wiederholungen'),
+                ('failures', 'pi5_ds18b20_failures_total', 'DS18B20 Lesungen ohne Ergebnis nach allen Versuchen'),
+            ):
+                families.append(collector_family(name, 'counter', doc, [
+                    ({'sensor_id': sensor_id}, values[key]) for sensor_id, values in stats.items()
+                ]))
+        
+        if self.dht22_reader:
+            stats = self.dht22_reader.stats
+            families.append(collector_family('pi5_dht22_reads_total', 'counter', 'DHT22 Leseversuche',
+                                          [({}, stats['reads'])]))
+            families.append(collector_family('pi5_dht22_errors_total', 'counter', 'DHT22 Lesefehler nach Art', [
+                ({'kind': 'read'}, stats['errors']),
+                ({'kind': 'out_of_range'}, stats['out_of_range']),
+            ]))
+            families.append(collector_family('pi5_dht22_cache_hits_total', 'counter', 'DHT22 Cache-Treffer',
+                                          [({}, stats['cache_hits'])]))
+        
+        if self.downsampler:
+            families.append(collector_family('pi5_downsampling_windows_total', 'counter',
+                                             'Abgeschlossene Verdichtungs-Fenster',
+                                             [({}, self.downsampler.stats['closed'])]))
+        if self.filters:
+            families.append(collector_family('pi5_filter_rejected_total', 'counter',
+                                             'Vom Ausreißer-Filter abgelehnte Messungen', [
+                ({'series': key, 'reason': reason}, count)
+                for key, counts in self.filters.stats.items() for reason, count in counts.items()
+            ]))
+        if self.burner:
+            families.append(collector_family('pi5_burner_running', 'gauge', 'Brenner läuft (1) oder nicht (0)',
+                                             [({}, self.burner.running)]))
+            families.append(collector_family('pi5_burner_starts_total', 'counter', 'Erkannte Brenner Starts',
+                                             [({}, self.burner.starts_total)]))
+            families.append(collector_family('pi5_burner_short_cycles_total', 'counter',
+                                             'Brenner Läufe kürzer als [burner] short_cycle',
+                                             [({}, self.burner.short_cycles)]))
+        if self.alerts:
+            families.append(collector_family('pi5_alert_firing', 'gauge', 'Alarm-Regel ausgelöst (1) oder nicht (0)', [
+                ({'rule': rule.name, 'severity': rule.severity}, rule.firing) for rule in self.alerts.rules
+            ]))
+            families.append(collector_family('pi5_alert_transitions_total', 'counter', 'Alarm-Wechsel nach Zustand', [
+                ({'state': 'firing'}, self.alerts.stats['fired']),
+                ({'state': 'ok'}, self.alerts.stats['resolved']),
+            ]))
+        if self.history:
+            families.append(collector_family('pi5_history_bytes', 'gauge', 'Reservierter Speicher der Messwert-Historie',
+                                             [({}, self.history.nbytes)]))
+        if self.stream_server:
+            stats = self.stream_server.stats
+            families.append(collector_family('pi5_stream_clients', 'gauge', 'Verbundene Live-Stream Clients',
+                                             [({}, len(self.stream_server.clients))]))
+            families.append(collector_family('pi5_stream_frames_total', 'counter', 'Live-Stream Frames nach Ergebnis', [
+                ({'result': 'sent'}, stats['frames_sent']),
+                ({'result': 'dropped'}, stats['frames_dropped']),
+            ]))
+        if self.pipeline:
+            workers = self.pipeline.worker_stats()
+            families.append(collector_family('pi5_pipeline_cycles_total', 'counter',
+                                             'In den Ring der Pipeline gelegte Zyklen',
+                                             [({}, self.pipeline.cycles_written)]))
+            families.append(collector_family('pi5_pipeline_worker_up', 'gauge', 'Pipeline Worker läuft (1) oder nicht (0)', [
+                ({'worker': worker['role']}, worker['alive']) for worker in workers
+            ]))
+            families.append(collector_family('pi5_pipeline_worker_lag_cycles', 'gauge',
+                                             'Noch nicht verarbeitete Zyklen je Worker', [
+                ({'worker': worker['role']}, worker['lag']) for worker in workers
+            ]))
+            families.append(collector_family('pi5_pipeline_worker_lost_cycles_total', 'counter',
+                                             'Im Ring überschriebene Zyklen je Worker (Worker zu langsam)', [
+                ({'worker': worker['role']}, worker['lost']) for worker in workers
+            ]))
+            families.append(collector_family('pi5_pipeline_worker_restarts_total', 'counter',
+                                             'Neustarts je Worker', [
+                ({'worker': worker['role']}, worker['restarts']) for worker in workers
+            ]))
+        if self.sinks:
+            summaries = {sink.name: sink.summary() for sink in self.sinks}
+            families.append(collector_family('pi5_sink_cycles_total', 'counter', 'Zyklen je Ausgabe nach Ergebnis', [
+                ({'sink': name, 'result': result}, summary[key]) for name, summary in summaries.items()
+                for result, key in (('written', 'written'), ('dropped', 'dropped'), ('error', 'errors'))
+            ]))
+            families.append(collector_family('pi5_sink_queue_depth', 'gauge', 'Zyklen im Puffer je Ausgabe', [
+                ({'sink': name}, summary['queued']) for name, summary in summaries.items()
+            ]))
+            families.append(collector_family('pi5_sink_oldest_age_seconds', 'gauge',
+                                             'Alter des ältesten ungeschriebenen Zyklus je Ausgabe', [
+                ({'sink': name}, summary['oldest_age']) for name, summary in summaries.items()
+            ]))
+        families.append(collector_family('pi5_sensor_available', 'gauge', 'Sensor verfügbar (1) oder nicht (0)', [
+            ({'sensor_id': sensor_id}, health['available']) for sensor_id, health in self.sensor_health.items()
+        ]))
+        return families
+    
     def stop(self):
         """Sensor Reader beenden"""
         self.running = False
+        if self.pipeline:
+            # Worker verarbeiten die restlichen Zyklen im Ring, dann wird er freigegeben
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.stream_server:
+            self.stream_server.stop()
+            self.stream_server = None
+        if self.api_server:
+            self.api_server.stop()
+            self.api_server = None
+        if self.alert_publisher:
+            self.alert_publisher.stop()
+            self.alert_publisher = None
+        if self.burner_publisher:
+            self.burner_publisher.stop()
+            self.burner_publisher = None
+        self.sinks.close(self.influx_timeout + 1)
+        if self.downsampler:
+            # Angefangene Fenster nicht verlieren (Neustart überschreibt sie mit dem neuen Fensterinhalt)
+            aggregates = self.downsampler.flush()
+            if aggregates:
+                self.save_to_influxdb({'aggregates': aggregates})
         if self.influx_client:
             self.influx_client.close()
+        REGISTRY.remove_collector(self._collect_metrics)
+        if self.simulation:
+            self.simulation.stop()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        TRACER.log_summary()
+        TRACER.close()
         logger.info("🛑 Sensor Reader gestoppt")
     
     def _print_sensor_summary(self, sensor_data: Dict):
@@ -242,12 +854,16 @@ class Pi5SensorReader:
         print("="*50)
         
         # Temperaturen
+        outliers = sensor_data.get('outliers', {})
         if sensor_data['temperatures']:
             print("\n🌡️ TEMPERATUREN:")
             for sensor_id, temp in sensor_data['temperatures'].items():
                 if temp is not None:
                     sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
                     print(f"   {sensor_name}: {temp:.1f}°C")
+                elif sensor_id in outliers:
+                    print(f"   {sensor_id}: Ausreißer {outliers[sensor_id]['value']:.1f}°C "
+                          f"({outliers[sensor_id]['reason']})")
                 else:
                     print(f"   {sensor_id}: Fehler")
         
@@ -259,6 +875,30 @@ class Pi5SensorReader:
                     sensor_name = self.config.get('labels', sensor_id, fallback=sensor_id)
                     print(f"   {sensor_name}: {humidity:.1f}%")
         
+        # Heizkreise
+        if sensor_data.get('circuits'):
+            print("\n🔥 HEIZKREISE:")
+            for circuit in sensor_data['circuits'].values():
+                rate = circuit['supply_rate']
+                trend = f", Vorlauf {rate:+.1f} K/h" if rate is not None else ""
+                print(f"   {circuit['name']}: ΔT {circuit['delta_t']:.1f} K{trend}")
+        
+        # Alarme
+        if self.alerts and self.alerts.active():
+            print("\n🚨 ALARME:")
+            for alert in self.alerts.active():
+                print(f"   {alert['label']}: {alert['sensor']} {alert['type']} {alert['threshold']} "
+                      f"(Wert {alert['value']:.1f})")
+        
+        # Brenner
+        burner = sensor_data.get('burner')
+        if burner:
+            print(f"\n🔥 BRENNER: {'an' if burner['running'] else 'aus'}")
+            print(f"   Starts heute: {burner['starts_today']} (Mittel {burner['starts_per_day']:.1f}/Tag)")
+            if burner['mean_run_time'] is not None:
+                print(f"   Laufzeit Mittel: {burner['mean_run_time'] / 60:.1f} min, "
+                      f"Kurztakte: {burner['short_cycle_ratio']:.0%}")
+        
         print("\n" + "="*50)
     
     def get_sensor_status(self) -> Dict:
@@ -270,9 +910,29 @@ class Pi5SensorReader:
             },
             'database': self.influx_client is not None,
             'last_reading': self.last_reading,
+            'sensor_health': self.sensor_health,
             'running': self.running
         }
         
+        if self.history:
+            status['history'] = {
+                'hours': self.history.hours,
+                'bytes': self.history.nbytes,
+                'last_hour': self.history.summary(minutes=60)
+            }
+        
+        if self.burner:
+            status['burner'] = self.burner.state()
+        
+        if self.alerts:
+            status['alerts'] = self.alerts.active()
+        
+        if self.sinks:
+            status['sinks'] = {sink.name: sink.summary() for sink in self.sinks}
+        
+        if self.pipeline:
+            status['pipeline'] = self.pipeline.worker_stats()
+        
         if self.ds18b20_reader:
             status['sensors']['ds18b20_count'] = len(self.ds18b20_reader.get_sensor_ids())
         
@@ -288,21 +948,39 @@ def main():
     parser.add_argument('--once', action='store_true', help='Einmalige Ablesung')
     parser.add_argument('--interval', type=int, default=30, help='Ablesung-Intervall in Sekunden')
     parser.add_argument('--test', action='store_true', help='Test-Modus')
+    parser.add_argument('--capture', help='Rohdaten jedes Zyklus in Datei aufzeichnen (NDJSON)')
+    parser.add_argument('--replay', help='Aufzeichnung statt Hardware abspielen')
+    parser.add_argument('--speed', type=float, default=1.0, help='Tempo der Wiedergabe (1 bis 1000)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Erfassung und Verarbeitung in getrennten Prozessen ([pipeline])')
     
     args = parser.parse_args()
     
+    overrides = {}
+    if args.capture:
+        overrides['capture'] = {'file': args.capture}
+    if args.replay:
+        overrides['hardware'] = {'backend': 'replay'}
+        overrides['replay'] = {'file': args.replay, 'speed': str(args.speed)}
+    if args.pipeline:
+        overrides['pipeline'] = {'enabled': 'true'}
+    
     try:
-        # Sensor Reader initialisieren
-        reader = Pi5SensorReader(config_file=args.config)
+        # Sensor Reader initialisieren (Einzel-Ablesung und Test immer in einem Prozess)
+        reader = Pi5SensorReader(config_file=args.config, overrides=overrides,
+                                 role='all' if args.once or args.test else None)
+        install_toggle_signal()
         
         if args.test:
             print("🧪 Test-Modus: Sensor Status prüfen")
             status = reader.get_sensor_status()
             print(f"Sensors: {status['sensors']}")
             print(f"Database: {status['database']}")
+            reader.stop()
             
         elif args.once:
             reader.run_once()
+            reader.stop()
         else:
             reader.run_continuous(interval=args.interval)
             
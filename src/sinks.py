@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Pi5 Heizungs Messer - Ausgaben je Lese-Zyklus
+=============================================
+
+Jede Ausgabe (Sink) hat einen eigenen begrenzten Puffer und Thread - eine
+langsame Ausgabe (hängende InfluxDB, getrennter Broker, volle SD-Karte)
+hält weder die Erfassung noch die anderen Ausgaben auf. Eine Sektion je
+Ausgabe:
+
+    [sink:influxdb]
+    type = influxdb
+    queue_size = 10
+    batch_size = 5
+    batch_wait = 0
+    drop = oldest
+
+Typen:
+
+    influxdb    Line Protocol über HTTP (Roh- und Verdichtungs-Buckets)
+    mqtt        Zyklus als JSON (Format wie /latest) direkt an den Broker
+    file        Zyklus als NDJSON (format = ndjson) oder Line Protocol (line)
+    stdout      Zyklus als NDJSON auf die Standardausgabe
+    udp         InfluxDB v1 UDP Listener (Line Protocol, Roh-Bucket)
+
+Puffer: queue_size Zyklen; ist er voll, verwirft drop = oldest den
+ältesten gepufferten, drop = newest den neuen Zyklus. Schreiben: bis zu
+batch_size Zyklen je Vorgang; batch_wait wartet höchstens so viele
+Sekunden auf weitere Zyklen (0 = sofort schreiben, was da ist).
+
+Ohne [sink:*] Sektionen gibt es eine Ausgabe "influxdb" laut [database]
+(async_write, write_queue_size).
+
+Im Pipeline-Betrieb laufen MQTT Ausgaben im mqtt Worker, alle anderen im
+storage Worker - MQTT wartet so nicht auf die Verarbeitung der Speicherung.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import contextvars
+import json
+import logging
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from monitoring.metrics import REGISTRY
+from mqtt_publish import MQTT_AVAILABLE, MqttConnection
+
+logger = logging.getLogger(__name__)
+
+SINK_TYPES = ('influxdb', 'mqtt', 'file', 'stdout', 'udp')
+DROP_POLICIES = ('oldest', 'newest')
+SECTION_PREFIX = 'sink:'
+
+SINK_WRITE_SECONDS = REGISTRY.histogram(
+    'pi5_sink_write_seconds', 'Dauer eines Schreibvorgangs je Ausgabe', ['sink'])
+SINK_LAG_SECONDS = REGISTRY.histogram(
+    'pi5_sink_lag_seconds', 'Zeit von der Übergabe bis zum Schreiben je Zyklus und Ausgabe', ['sink'])
+
+# Line Protocol je Ziel-Bucket für einen Zyklus - vom Reader bereitgestellt
+LineEncoder = Callable[[Dict], Dict[str, List[str]]]
+
+
+class Sink:
+    """Basisklasse: eigener Puffer, eigener Thread, write() schreibt einen Stapel Zyklen"""
+
+    kind = 'sink'
+    wants_record = False    # write() braucht das JSON des Zyklus
+
+    def __init__(self, name: str, queue_size: int = 10, batch_size: int = 1, batch_wait: float = 0.0,
+                 drop: str = 'oldest', threaded: bool = True):
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"[sink:{name}] drop: {drop!r} ({', '.join(DROP_POLICIES)})")
+        self.name = name
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.drop = drop
+        self.threaded = threaded
+
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._closing = False
+        self._started: Optional[float] = None
+
+        self.stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'errors': 0, 'batches': 0,
+                      'lag_total': 0.0, 'lag_max': 0.0}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name})"
+
+    def write(self, items: List[Tuple[Dict, Optional[Dict]]]) -> bool:
+        """Stapel (sensor_data, JSON) schreiben - False bei Fehler"""
+        raise NotImplementedError
+
+    def close_output(self):
+        """Verbindung/Datei schließen (nach dem letzten Schreibvorgang)"""
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue) + self._in_flight
+
+    @property
+    def oldest_age(self) -> float:
+        """Alter des ältesten noch nicht geschriebenen Zyklus (s)"""
+        with self._condition:
+            return time.monotonic() - self._queue[0][0] if self._queue else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Geschriebene Zyklen je Sekunde seit der ersten Übergabe"""
+        if self._started is None:
+            return 0.0
+        return self.stats['written'] / max(time.monotonic() - self._started, 1e-9)
+
+    def submit(self, sensor_data: Dict, record: Optional[Dict] = None) -> bool:
+        """Zyklus übergeben - kehrt sofort zurück (False: verworfen)"""
+        item = (time.monotonic(), sensor_data, record, contextvars.copy_context())
+        if self._started is None:
+            self._started = item[0]
+        self.stats['submitted'] += 1
+        if not self.threaded:
+            return self._write_batch([item])
+
+        with self._condition:
+            if self._closing:
+                return False
+            if len(self._queue) >= self.queue_size:
+                self.stats['dropped'] += 1
+                if self.drop == 'newest':
+                    logger.warning(f"⚠️ Ausgabe {self.name}: Puffer voll - neuer Zyklus verworfen")
+                    return False
+                self._queue.popleft()
+                logger.warning(f"⚠️ Ausgabe {self.name}: Puffer voll - ältester Zyklus verworfen")
+            self._queue.append(item)
+            self._condition.notify_all()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+                self._thread.start()
+        return True
+
+    def _next_batch(self) -> List:
+        """Nächster Stapel (leer: beendet) - wartet bis zu batch_wait auf weitere Zyklen"""
+        with self._condition:
+            while not self._queue and not self._closing:
+                self._condition.wait()
+            if self.batch_wait > 0:
+                deadline = self._queue[0][0] + self.batch_wait if self._queue else 0.0
+                while 0 < len(self._queue) < self.batch_size and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+            # Trace-Kontext des (ersten) Zyklus - Spans der Ausgabe hängen am Lese-Zyklus
+            batch[0][3].run(self._write_batch, batch)
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _write_batch(self, batch: List) -> bool:
+        started = time.perf_counter()
+        try:
+            ok = self.write([(sensor_data, record) for _, sensor_data, record, _ in batch])
+        except Exception as e:
+            logger.error(f"❌ Ausgabe {self.name} Fehler: {e}")
+            ok = False
+        finished = time.monotonic()
+        SINK_WRITE_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+        if not ok:
+            self.stats['errors'] += len(batch)
+            return False
+        self.stats['written'] += len(batch)
+        self.stats['batches'] += 1
+        for submitted, *_ in batch:
+            lag = finished - submitted
+            SINK_LAG_SECONDS.labels(self.name).observe(lag)
+            self.stats['lag_total'] += lag
+            self.stats['lag_max'] = max(self.stats['lag_max'], lag)
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Warten, bis alle übergebenen Zyklen geschrieben sind"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None or not self._thread.is_alive():
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """Gepufferte Zyklen schreiben, Thread beenden (max. timeout) und Ausgabe schließen"""
+        with self._condition:
+            if self._closing and self._thread is None:
+                return False    # schon geschlossen
+            self._closing = True
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"⚠️ Ausgabe {self.name} nicht beendet - {self.queued} Zyklen nicht geschrieben")
+                return True
+        self._thread = None
+        self.close_output()
+        return True
+
+    def summary(self) -> Dict:
+        """Kennzahlen: Durchsatz (Zyklen/s), Verzögerung (s), Puffer, Zähler"""
+        written = self.stats['written']
+        return {
+            'type': self.kind,
+            'queued': self.queued,
+            'submitted': self.stats['submitted'],
+            'written': written,
+            'dropped': self.stats['dropped'],
+            'errors': self.stats['errors'],
+            'batches': self.stats['batches'],
+            'throughput': self.throughput,
+            'lag_mean': self.stats['lag_total'] / written if written else None,
+            'lag_max': self.stats['lag_max'],
+            'oldest_age': self.oldest_age
+        }
+
+
+class InfluxDBSink(Sink):
+    """Line Protocol über HTTP - ein Request je Bucket und Stapel"""
+
+    kind = 'influxdb'
+
+    def __init__(self, name: str, encode: LineEncoder, write_lines: Callable[[Dict[str, List[str]]], bool],
+                 **options):
+        super().__init__(name, **options)
+        self.encode = encode
+        self.write_lines = write_lines
+
+    def write(self, items):
+        batches: Dict[str, List[str]] = {}
+        for sensor_data, _ in items:
+            for bucket, lines in self.encode(sensor_data).items():
+                batches.setdefault(bucket, []).extend(lines)
+        if not any(batches.values()):
+            return True
+        return self.write_lines(batches)
+
+
+class UdpSink(Sink):
+    """InfluxDB v1 UDP Listener: Line Protocol des Roh-Buckets in Datagrammen bis max_packet Bytes"""
+
+    kind = 'udp'
+
+    def __init__(self, name: str, encode: LineEncoder, bucket: str, host: str = 'localhost',
+                 port: int = 8089, max_packet: int = 1400, **options):
+        super().__init__(name, **options)
+        self.encode = encode
+        self.bucket = bucket
+        self.address = (host, port)
+        self.max_packet = max_packet
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.packets = 0
+
+    def write(self, items):
+        packet = b''
+        for sensor_data, _ in items:
+            # Verdichtungs-Fenster gehen nur an InfluxDB v2 (eigene Buckets)
+            for line in self.encode(sensor_data).get(self.bucket, []):
+                data = line.encode('utf-8')
+                if packet and len(packet) + 1 + len(data) > self.max_packet:
+                    self._send(packet)
+                    packet = b''
+                packet = packet + b'\n' + data if packet else data
+        if packet:
+            self._send(packet)
+        return True
+
+    def _send(self, packet: bytes):
+        self.socket.sendto(packet, self.address)
+        self.packets += 1
+
+    def close_output(self):
+        self.socket.close()
+
+
+class FileSink(Sink):
+    """Datei (anhängen): NDJSON je Zyklus oder Line Protocol des Roh-Buckets"""
+
+    kind = 'file'
+
+    def __init__(self, name: str, path: str, output_format: str = 'ndjson', encode: Optional[LineEncoder] = None,
+                 bucket: Optional[str] = None, **options):
+        if output_format not in ('ndjson', 'line'):
+            raise ValueError(f"[sink:{name}] format: {output_format!r} (ndjson, line)")
+        super().__init__(name, **options)
+        self.path = path
+        self.output_format = output_format
+        self.wants_record = output_format == 'ndjson'
+        self.encode = encode
+        self.bucket = bucket
+        self._file = None
+
+    def _open(self):
+        return open(self.path, 'a', encoding='utf-8')
+
+    def write(self, items):
+        if self._file is None:
+            self._file = self._open()
+        if self.output_format == 'ndjson':
+            lines = [json.dumps(record, ensure_ascii=False) for _, record in items]
+        else:
+            lines = [line for sensor_data, _ in items for line in self.encode(sensor_data).get(self.bucket, [])]
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+        return True
+
+    def close_output(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StdoutSink(FileSink):
+    """NDJSON je Zyklus auf die Standardausgabe (Logs gehen auf stderr)"""
+
+    kind = 'stdout'
+
+    def __init__(self, name: str, **options):
+        super().__init__(name, '-', **options)
+
+    def _open(self):
+        return sys.stdout
+
+    def close_output(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file = None
+
+
+class MqttSink(Sink):
+    """Zyklus als JSON (Format wie /latest) direkt an den Broker - ohne InfluxDB und Bridge"""
+
+    kind = 'mqtt'
+    wants_record = True
+
+    def __init__(self, name: str, connection: MqttConnection, topic: str, retain: bool = True, **options):
+        super().__init__(name, **options)
+        self.connection = connection
+        self.topic = topic
+        self.retain = retain
+
+    def write(self, items):
+        # Getrennt: neuester Zyklus wartet im Offline-Puffer auf den Reconnect, Fehler wird gezählt
+        sent = True
+        for _, record in items:
+            sent = self.connection.send(self.topic, json.dumps(record), retain=self.retain) and sent
+        return sent
+
+    def close_output(self):
+        self.connection.stop()
+
+
+class SinkSet:
+    """Alle Ausgaben eines Readers"""
+
+    def __init__(self, sinks: List[Sink]):
+        self.sinks = sinks
+        self.wants_record = any(sink.wants_record for sink in sinks)
+
+    def __iter__(self):
+        return iter(self.sinks)
+
+    def __len__(self):
+        return len(self.sinks)
+
+    def __getitem__(self, name: str) -> Sink:
+        for sink in self.sinks:
+            if sink.name == name:
+                return sink
+        raise KeyError(name)
+
+    def submit(self, sensor_data: Dict, record: Optional[Dict] = None) -> bool:
+        """Zyklus an alle Ausgaben übergeben - True wenn keine ihn verworfen hat"""
+        accepted = True
+        for sink in self.sinks:
+            accepted = sink.submit(sensor_data, record) and accepted
+        return accepted
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        return all([sink.flush(max(0.0, deadline - time.monotonic())) for sink in self.sinks])
+
+    def close(self, timeout: float = 10.0):
+        """Alle Ausgaben leeren und schließen - Kennzahlen je Ausgabe loggen"""
+        for sink in self.sinks:
+            if not sink.close(timeout):
+                continue
+            summary = sink.summary()
+            if summary['submitted']:
+                lag = f"Ø {summary['lag_mean']:.2f}s, max {summary['lag_max']:.2f}s" \
+                    if summary['lag_mean'] is not None else "-"
+                logger.info(f"📤 Ausgabe {sink.name}: {summary['written']} Zyklen "
+                            f"({summary['throughput']:.2f}/s), {summary['dropped']} verworfen, "
+                            f"{summary['errors']} Fehler, Verzögerung {lag}")
+
+
+def _queue_options(config, section: str, defaults: Dict) -> Dict:
+    return {
+        'queue_size': config.getint(section, 'queue_size', fallback=defaults.get('queue_size', 10)),
+        'batch_size': config.getint(section, 'batch_size', fallback=defaults.get('batch_size', 1)),
+        'batch_wait': config.getfloat(section, 'batch_wait', fallback=0.0),
+        'drop': config.get(section, 'drop', fallback='oldest'),
+        'threaded': config.getboolean(section, 'threaded', fallback=defaults.get('threaded', True))
+    }
+
+
+def sink_types(config) -> List[str]:
+    """Typen aller konfigurierten Ausgaben (ohne [sink:*] Sektionen: influxdb)"""
+    types = []
+    for section in config.sections():
+        if section.startswith(SECTION_PREFIX):
+            sink_type = config.get(section, 'type', fallback=section[len(SECTION_PREFIX):])
+            if sink_type not in SINK_TYPES:
+                raise ValueError(f"[{section}] type: {sink_type!r} ({', '.join(SINK_TYPES)})")
+            types.append(sink_type)
+    return types or ['influxdb']
+
+
+def build_sinks(config, encode: LineEncoder,
+                write_influx: Optional[Callable[[Dict[str, List[str]]], bool]],
+                types: Optional[List[str]] = None) -> SinkSet:
+    """
+    Ausgaben laut [sink:<name>] Sektionen (ohne Sektionen: InfluxDB laut [database])
+
+    Args:
+        encode: Line Protocol je Ziel-Bucket für einen Zyklus
+        write_influx: Schreibt Line Protocol je Bucket (None: keine InfluxDB Verbindung)
+        types: Nur Ausgaben dieser Typen anlegen (Pipeline-Worker, None: alle)
+    """
+    bucket = config.get('database', 'bucket', fallback='sensors')
+    sections = [section for section in config.sections() if section.startswith(SECTION_PREFIX)]
+    if not sections:
+        if write_influx is None or (types is not None and 'influxdb' not in types):
+            return SinkSet([])
+        return SinkSet([InfluxDBSink('influxdb', encode, write_influx, **_queue_options(config, 'database', {
+            'queue_size': config.getint('database', 'write_queue_size', fallback=10),
+            'threaded': config.getboolean('database', 'async_write', fallback=True)
+        }))])
+
+    sinks = []
+    for section in sections:
+        name = section[len(SECTION_PREFIX):]
+        sink_type = config.get(section, 'type', fallback=name)
+        if types is not None and sink_type not in types:
+            continue
+        options = _queue_options(config, section, {})
+        if sink_type == 'influxdb':
+            if write_influx is None:
+                logger.warning(f"⚠️ Ausgabe {name}: keine InfluxDB Verbindung - übersprungen")
+                continue
+            sinks.append(InfluxDBSink(name, encode, write_influx, **options))
+        elif sink_type == 'udp':
+            sinks.append(UdpSink(name, encode, bucket,
+                                 host=config.get(section, 'host', fallback='localhost'),
+                                 port=config.getint(section, 'port', fallback=8089),
+                                 max_packet=config.getint(section, 'max_packet', fallback=1400), **options))
+        elif sink_type == 'file':
+            sinks.append(FileSink(name, config.get(section, 'path'),
+                                  output_format=config.get(section, 'format', fallback='ndjson'),
+                                  encode=encode, bucket=bucket, **options))
+        elif sink_type == 'stdout':
+            sinks.append(StdoutSink(name, **options))
+        elif sink_type == 'mqtt':
+            if not MQTT_AVAILABLE:
+                logger.warning(f"⚠️ Ausgabe {name} ohne MQTT - pip install paho-mqtt")
+                continue
+            prefix = config.get('mqtt', 'topic_prefix', fallback='pi5_heizung')
+            # Broker und Zugangsdaten aus [mqtt], in der Sektion überschreibbar
+            broker = config.get(section, 'broker', fallback=config.get('mqtt', 'broker', fallback='localhost'))
+            port = config.getint(section, 'port', fallback=config.getint('mqtt', 'port', fallback=1883))
+            connection = MqttConnection(broker, port=port,
+                                        username=config.get('mqtt', 'username', fallback=''),
+                                        password=config.get('mqtt', 'password', fallback=''),
+                                        qos=config.getint(section, 'qos', fallback=0),
+                                        label=f"Ausgabe {name}")
+            if not connection.start():
+                continue
+            sinks.append(MqttSink(name, connection, config.get(section, 'topic', fallback=f"{prefix}/reader/cycle"),
+                                  retain=config.getboolean(section, 'retain', fallback=True), **options))
+        else:
+            raise ValueError(f"[sink:{name}] type: {sink_type!r} ({', '.join(SINK_TYPES)})")
+    logger.info("📤 Ausgaben: " + ", ".join(f"{sink.name} ({sink.kind})" for sink in sinks))
+    return SinkSet(sinks)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Lastgenerator für die MQTT Bridge
+=================================
+
+Treibt Pi5MqttBridge mit synthetischen Sensor-Sets (10 bis 1000 Sensoren)
+gegen den lokalen MQTT Broker Stand-in (tests/support) und misst je Größe:
+
+    discovery       Connect → Bridge bereit → alle Discovery-Configs beim Broker
+    throughput      publish_sensor_data Aufrufe (p50/p99) und zugestellte Nachrichten/s
+    reconnect       Broker trennt alle Clients → Bridge wieder bereit →
+                    im Ausfall gepufferte Werte vollständig zugestellt
+    memory          Speicher einer Bridge (tracemalloc, separater Durchlauf) und RSS
+
+Verwendung:
+    python tests/benchmarks/bench_bridge_load.py --sizes 10,100,500,1000 --output load.json
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import argparse
+import configparser
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mqtt_bridge import Pi5MqttBridge
+from support.mqtt_broker import MqttBrokerStandIn
+from bench_pipeline import describe_environment, percentile
+
+DEFAULT_SIZES = (10, 100, 500, 1000)
+
+
+def rss_kib() -> Optional[int]:
+    """Resident Set Size des Prozesses (Linux /proc, sonst None)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def synthetic_sensor_ids(count: int) -> List[str]:
+    """DS18B20-artige Sensor-IDs"""
+    return [f"28-{0x3C01D6070000 + index:012x}" for index in range(count)]
+
+
+def synthetic_sensor_data(sensor_ids: List[str], cycle: int = 0) -> Dict[str, Dict]:
+    """Sensor-Daten wie von map_sensor_data (Werte je Zyklus leicht verändert)"""
+    now = time.time()
+    data = {
+        sensor_id: {'temperature': 20.0 + (index * 7 + cycle) % 500 / 10, 'acquired': now}
+        for index, sensor_id in enumerate(sensor_ids)
+    }
+    data['dht22'] = {'temperature': 21.0 + cycle % 10 / 10, 'humidity': 55.0, 'acquired': now}
+    return data
+
+
+class BridgeLoad:
+    """Bridge mit synthetischem Sensor-Set gegen den Broker Stand-in"""
+
+    def __init__(self, sensors: int, broker: MqttBrokerStandIn, workdir: str):
+        self.sensors = sensors
+        self.broker = broker
+        self.sensor_ids = synthetic_sensor_ids(sensors)
+        self.prefix = f"load{sensors}"
+
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': self.prefix},
+            'homeassistant': {'mqtt_discovery': 'true'},
+            'monitoring': {'metrics_enabled': 'false', 'tracing': 'off'},
+            'labels': dict({sensor_id: f"Sensor {index + 1}" for index, sensor_id in enumerate(self.sensor_ids)},
+                           dht22='Heizraum')
+        })
+        self.config_path = os.path.join(workdir, f'load-{sensors}.ini')
+        with open(self.config_path, 'w') as f:
+            config.write(f)
+
+        self.bridge = Pi5MqttBridge(config_file=self.config_path)
+
+    @property
+    def messages_per_cycle(self) -> int:
+        return self.sensors + 2    # DHT22: Temperatur und Luftfeuchtigkeit
+
+    def _delivered(self, topic_filter: str, count: int, timeout: float) -> bool:
+        return self.broker.wait_until(lambda broker: broker.count_topics(topic_filter) >= count, timeout)
+
+    def discovery(self, timeout: float) -> Dict:
+        """Connect bis Discovery vollständig beim Broker angekommen ist"""
+        self.broker.reset()
+        started = time.perf_counter()
+        if not self.bridge.setup_mqtt():
+            raise RuntimeError("MQTT Setup fehlgeschlagen")
+        ready = self.bridge.wait_until_ready(timeout)
+        ready_seconds = time.perf_counter() - started
+        delivered = self._delivered("homeassistant/sensor/+/config", self.messages_per_cycle, timeout)
+        return {
+            'ready_seconds': round(ready_seconds, 4),
+            'delivered_seconds': round(time.perf_counter() - started, 4),
+            'messages': self.broker.count_topics("homeassistant/sensor/+/config"),
+            'complete': ready and delivered
+        }
+
+    def throughput(self, rounds: int, timeout: float) -> Dict:
+        """Wiederholte publish_sensor_data Aufrufe bis zur vollständigen Zustellung"""
+        self.broker.reset()
+        expected = rounds * self.messages_per_cycle
+        calls = []
+        started = time.perf_counter()
+        for cycle in range(rounds):
+            data = synthetic_sensor_data(self.sensor_ids, cycle)
+            t0 = time.perf_counter()
+            self.bridge.publish_sensor_data(data)
+            calls.append(time.perf_counter() - t0)
+        delivered = self.broker.wait_for_messages(expected, timeout)
+        elapsed = time.perf_counter() - started
+        return {
+            'rounds': rounds,
+            'messages': self.broker.stats['messages'],
+            'expected': expected,
+            'complete': delivered,
+            'publish_ms': {
+                'p50': round(percentile(calls, 0.50) * 1000, 3),
+                'p99': round(percentile(calls, 0.99) * 1000, 3),
+                'max': round(max(calls) * 1000, 3)
+            },
+            'enqueued_per_s': round(expected / sum(calls), 1),
+            'delivered_per_s': round(self.broker.stats['messages'] / elapsed, 1),
+            'offline_buffered': len(self.bridge.offline_queue)
+        }
+
+    def reconnect(self, timeout: float) -> Dict:
+        """Broker-Ausfall: Werte im Ausfall puffern, Zeit bis alles nachgesendet ist"""
+        self.broker.reset()
+        started = time.perf_counter()
+        self.broker.disconnect_clients()
+        deadline = time.monotonic() + timeout
+        while self.bridge.is_connected() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        disconnected = time.perf_counter() - started
+
+        # Werte während des Ausfalls → Offline-Puffer
+        self.bridge.publish_sensor_data(synthetic_sensor_data(self.sensor_ids, cycle=1000))
+        buffered = len(self.bridge.offline_queue)
+
+        ready = self.bridge.wait_until_ready(timeout)
+        ready_seconds = time.perf_counter() - started
+        delivered = self._delivered(f"{self.prefix}/+/state", self.messages_per_cycle, timeout)
+        return {
+            'detect_seconds': round(disconnected, 4),
+            'ready_seconds': round(ready_seconds, 4),
+            'recovered_seconds': round(time.perf_counter() - started, 4),
+            'buffered': buffered,
+            'complete': ready and delivered
+        }
+
+    def close(self):
+        self.bridge.shutdown()
+
+
+def measure_memory(sensors: int, broker: MqttBrokerStandIn, workdir: str, timeout: float) -> Dict:
+    """Speicher einer Bridge nach Discovery und einem Publish-Zyklus (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        load = BridgeLoad(sensors, broker, workdir)
+        load.discovery(timeout)
+        load.throughput(1, timeout)
+        current, peak = tracemalloc.get_traced_memory()
+        load.close()
+    finally:
+        tracemalloc.stop()
+    return {
+        'bridge_kib': round((current - baseline) / 1024, 1),
+        'peak_kib': round((peak - baseline) / 1024, 1)
+    }
+
+
+def run_load(sizes=DEFAULT_SIZES, rounds: int = 20, timeout: float = 60.0) -> Dict:
+    """Lasttest für alle Sensor-Anzahlen ausführen"""
+    broker = MqttBrokerStandIn()
+    broker.start()
+    results = []
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='pi5-load-') as workdir:
+            for sensors in sizes:
+                rss_before = rss_kib()
+                load = BridgeLoad(sensors, broker, workdir)
+                try:
+                    entry = {
+                        'sensors': sensors,
+                        'discovery': load.discovery(timeout),
+                        'throughput': load.throughput(rounds, timeout),
+                        'reconnect': load.reconnect(timeout)
+                    }
+                finally:
+                    load.close()
+                entry['memory'] = measure_memory(sensors, broker, workdir, timeout)
+                rss_after = rss_kib()
+                if rss_before is not None and rss_after is not None:
+                    entry['memory']['rss_kib'] = rss_after
+                    entry['memory']['rss_delta_kib'] = rss_after - rss_before
+                results.append(entry)
+
+                print(f"  {sensors:>5} Sensoren: Discovery {entry['discovery']['delivered_seconds']:.3f}s  "
+                      f"Publish p50 {entry['throughput']['publish_ms']['p50']:.2f}ms  "
+                      f"{entry['throughput']['delivered_per_s']:.0f} Nachr./s  "
+                      f"Reconnect {entry['reconnect']['recovered_seconds']:.2f}s  "
+                      f"Bridge {entry['memory']['bridge_kib']:.0f} KiB"
+                      + ("" if all(entry[k]['complete'] for k in ('discovery', 'throughput', 'reconnect'))
+                         else "  ❌ unvollständig"))
+    finally:
+        broker.stop()
+
+    return {
+        'meta': describe_environment(),
+        'config': {'sizes': list(sizes), 'rounds': rounds},
+        'results': results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Pi5 Heizungs Messer - MQTT Bridge Lastgenerator')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Sensor-Anzahlen (Komma-getrennt)')
+    parser.add_argument('--rounds', type=int, default=20, help='Publish-Zyklen je Größe')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Max. Wartezeit je Phase in Sekunden')
+    parser.add_argument('--output', default='bridge-load.json', help='JSON Ergebnis-Datei')
+    parser.add_argument('--log-level', default='WARNING', help='Log-Level während der Messung')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    print(f"🏁 MQTT Bridge Last: Sensoren {sizes} | {args.rounds} Zyklen")
+    results = run_load(sizes, args.rounds, args.timeout)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+    incomplete = [r['sensors'] for r in results['results']
+                  if not all(r[k]['complete'] for k in ('discovery', 'throughput', 'reconnect'))]
+    if incomplete:
+        print(f"❌ Nicht alle Nachrichten zugestellt bei {incomplete} Sensoren")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Benchmarks für Pi5 Heizungs Messer - Erfassung, Speicherung, Publish
+===================================================================
+
+Misst die Hauptpfade gegen simulierte Hardware (hardware.simulation) und
+lokale MQTT Broker und InfluxDB Stand-ins (tests/support):
+
+    read_all_temperatures   DS18B20Reader über den simulierten w1-Baum
+    read_all_sensors        Pi5SensorReader Zyklus (DS18B20 + DHT22)
+    build_points            InfluxDB Punkte + Line Protocol (save_to_influxdb ohne HTTP)
+    save_to_influxdb        Schreiben über HTTP zum InfluxDB Stand-in
+    query_latest_values     Flux Abfrage der Bridge gegen den InfluxDB Stand-in
+    publish_sensor_data     Pi5MqttBridge → Broker Stand-in
+
+für Sensor-Anzahlen von 1 bis 200 (Durchsatz, p50/p99 Latenz, Allokationen
+via tracemalloc). Ergebnisse werden als JSON gespeichert und können mit
+--compare gegen einen früheren Lauf verglichen werden.
+
+Verwendung:
+    python tests/benchmarks/bench_pipeline.py --output bench.json
+    python tests/benchmarks/bench_pipeline.py --compare bench.json --threshold 0.2
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import argparse
+import configparser
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests'))
+
+from sensor_reader import Pi5SensorReader
+from mqtt_bridge import Pi5MqttBridge
+from support.influxdb import InfluxDBStandIn
+from support.mqtt_broker import MqttBrokerStandIn
+
+DEFAULT_SIZES = (1, 10, 50, 100, 200)
+BENCHMARKS = ('read_all_temperatures', 'read_all_sensors', 'build_points', 'save_to_influxdb',
+              'query_latest_values', 'publish_sensor_data')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Perzentil (nearest rank) einer Messreihe"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func: Callable[[], object], iterations: int, sensors: int, warmup: int = 2) -> Dict:
+    """Laufzeit je Aufruf messen (ohne tracemalloc)"""
+    for _ in range(warmup):
+        func()
+
+    gc.collect()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    return {
+        'iterations': iterations,
+        'throughput_ops': round(iterations / total, 2),
+        'throughput_sensors': round(iterations * sensors / total, 1),
+        'latency_ms': {
+            'p50': round(percentile(timings, 0.50) * 1000, 4),
+            'p99': round(percentile(timings, 0.99) * 1000, 4),
+            'mean': round(sum(timings) / len(timings) * 1000, 4),
+            'max': round(max(timings) * 1000, 4)
+        }
+    }
+
+
+def measure_allocations(func: Callable[[], object], iterations: int = 5) -> Dict:
+    """Spitzen-Allokation je Aufruf und verbleibender Speicher nach allen Aufrufen"""
+    func()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        peak_per_call = 0
+        for _ in range(iterations):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_per_call = max(peak_per_call, peak - before)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_kib': round(peak_per_call / 1024, 2),
+        'retained_kib_per_call': round(max(0, current - baseline) / 1024 / iterations, 3)
+    }
+
+
+class PipelineFixture:
+    """Simulierte Hardware, Sensor Reader und Bridge für eine Sensor-Anzahl"""
+
+    def __init__(self, sensors: int, broker: MqttBrokerStandIn, influxdb: InfluxDBStandIn,
+                 workdir: str, conversion_latency: float = 0.0):
+        self.sensors = sensors
+        self.broker = broker
+        self.influxdb = influxdb
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'hardware': {'backend': 'simulation', 'dht22_enabled': 'true'},
+            'simulation': {
+                'ds18b20_count': str(sensors), 'conversion_latency': str(conversion_latency),
+                'crc_error_rate': '0', 'dropout_rate': '0', 'dht22_failure_rate': '0',
+                'dht22_latency': '0', 'seed': '1'
+            },
+            'database': {'host': influxdb.host, 'port': str(influxdb.port), 'async_write': 'false'},
+            'mqtt': {'broker': '127.0.0.1', 'port': str(broker.port), 'topic_prefix': 'bench'},
+            'homeassistant': {'mqtt_discovery': 'false'},
+            'monitoring': {'metrics_enabled': 'false', 'tracing': 'off'}
+        })
+        self.config_path = os.path.join(workdir, f'bench-{sensors}.ini')
+        with open(self.config_path, 'w') as f:
+            config.write(f)
+
+        self.reader = Pi5SensorReader(config_file=self.config_path)
+        sensor_ids = self.reader.ds18b20_reader.get_sensor_ids()
+
+        # Labels wie in einer echten Installation (Name je Sensor)
+        config['labels'] = {sensor_id: f"Sensor {index + 1}" for index, sensor_id in enumerate(sensor_ids)}
+        config['labels']['dht22'] = "Heizraum"
+        with open(self.config_path, 'w') as f:
+            config.write(f)
+        self.reader.config.read(self.config_path)
+
+        self.bridge = Pi5MqttBridge(config_file=self.config_path)
+        self.sensor_data = self.reader.read_all_sensors()
+        self.bridge_data = {
+            sensor_id: {'temperature': 40.0 + index % 20, 'acquired': time.time()}
+            for index, sensor_id in enumerate(sensor_ids)
+        }
+        self.bridge_data['dht22'] = {'temperature': 21.0, 'humidity': 55.0, 'acquired': time.time()}
+
+    def connect(self) -> bool:
+        return self.bridge.setup_mqtt() and self.bridge.wait_until_ready(timeout=10)
+
+    def prepare(self, name: str):
+        """Stand-ins vor einem Benchmark zurücksetzen"""
+        self.broker.reset()
+        self.influxdb.reset()
+        if name == 'query_latest_values':
+            # Genau ein Zyklus in der Datenbank - gemessen wird die Bridge, nicht der Stand-in
+            self.reader.save_to_influxdb(self.sensor_data)
+            if not self.bridge.influx_client and not self.bridge.setup_influxdb():
+                raise RuntimeError("InfluxDB Stand-in nicht erreichbar")
+
+    def close(self):
+        self.bridge.shutdown()
+        self.reader.stop()
+
+    def read_all_temperatures(self):
+        return self.reader.ds18b20_reader.read_all_temperatures()
+
+    def read_all_sensors(self):
+        return self.reader.read_all_sensors()
+
+    def build_points(self):
+        return [point.to_line_protocol() for point in self.reader._build_points(self.sensor_data)]
+
+    def save_to_influxdb(self):
+        return self.reader.save_to_influxdb(self.sensor_data)
+
+    def query_latest_values(self):
+        return self.bridge.query_latest_values()
+
+    def publish_sensor_data(self):
+        return self.bridge.publish_sensor_data(self.bridge_data)
+
+    def messages_per_publish(self) -> int:
+        return len(self.bridge_data) + 1   # DHT22: Temperatur und Luftfeuchtigkeit
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, iterations: int = 50, conversion_latency: float = 0.0,
+                   benchmarks=BENCHMARKS, alloc_iterations: int = 5, influx_latency: float = 0.0) -> Dict:
+    """Alle Benchmarks für alle Sensor-Anzahlen ausführen"""
+    broker = MqttBrokerStandIn()
+    broker.start()
+    influxdb = InfluxDBStandIn()
+    influxdb.start()
+    if influx_latency:
+        influxdb.set_faults(latency=influx_latency)
+    results = []
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='pi5-bench-') as workdir:
+            for sensors in sizes:
+                fixture = PipelineFixture(sensors, broker, influxdb, workdir, conversion_latency)
+                try:
+                    if 'publish_sensor_data' in benchmarks and not fixture.connect():
+                        raise RuntimeError("MQTT Stand-in nicht erreichbar")
+
+                    for name in benchmarks:
+                        func = getattr(fixture, name)
+                        fixture.prepare(name)
+                        entry = {'benchmark': name, 'sensors': sensors}
+                        entry.update(measure(func, iterations, sensors))
+                        entry['alloc'] = measure_allocations(func, alloc_iterations)
+
+                        if name == 'publish_sensor_data':
+                            # Zustellung aller gesendeten Nachrichten beim Broker prüfen
+                            expected = (iterations + alloc_iterations + 3) * fixture.messages_per_publish()
+                            entry['delivered'] = broker.wait_for_messages(expected, timeout=30)
+                            entry['messages_per_call'] = fixture.messages_per_publish()
+
+                        results.append(entry)
+                        print(f"  {name:<22} {sensors:>4} Sensoren: "
+                              f"p50 {entry['latency_ms']['p50']:>9.3f}ms  "
+                              f"p99 {entry['latency_ms']['p99']:>9.3f}ms  "
+                              f"{entry['throughput_sensors']:>10.0f} Sensoren/s  "
+                              f"Peak {entry['alloc']['peak_kib']:>8.1f} KiB")
+                finally:
+                    fixture.close()
+    finally:
+        broker.stop()
+        influxdb.stop()
+
+    return {
+        'meta': describe_environment(),
+        'config': {
+            'sizes': list(sizes),
+            'iterations': iterations,
+            'conversion_latency': conversion_latency,
+            'influx_latency': influx_latency
+        },
+        'results': results
+    }
+
+
+def describe_environment() -> Dict:
+    """Umgebung für die Vergleichbarkeit der Ergebnisse"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine()
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.2) -> List[Dict]:
+    """
+    p50 Latenzen zweier Läufe vergleichen
+
+    Returns:
+        Liste je (benchmark, sensors) mit Verhältnis current/baseline und
+        regression=True wenn das Verhältnis 1 + threshold überschreitet
+    """
+    previous = {(r['benchmark'], r['sensors']): r for r in baseline.get('results', [])}
+    comparison = []
+    for result in current.get('results', []):
+        old = previous.get((result['benchmark'], result['sensors']))
+        if not old or not old['latency_ms']['p50']:
+            continue
+        ratio = result['latency_ms']['p50'] / old['latency_ms']['p50']
+        comparison.append({
+            'benchmark': result['benchmark'],
+            'sensors': result['sensors'],
+            'baseline_p50_ms': old['latency_ms']['p50'],
+            'p50_ms': result['latency_ms']['p50'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + threshold
+        })
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Pi5 Heizungs Messer - Benchmarks')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Sensor-Anzahlen (Komma-getrennt)')
+    parser.add_argument('--iterations', type=int, default=50, help='Messungen je Benchmark und Größe')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='Auswahl (Komma-getrennt)')
+    parser.add_argument('--conversion-latency', type=float, default=0.0,
+                        help='Simulierte DS18B20 Konvertierungszeit (0 = nur Software-Overhead)')
+    parser.add_argument('--influx-latency', type=float, default=0.0,
+                        help='Zusätzliche Antwortzeit des InfluxDB Stand-in in Sekunden')
+    parser.add_argument('--output', default='benchmark-results.json', help='JSON Ergebnis-Datei')
+    parser.add_argument('--compare', help='Früheres Ergebnis zum Vergleich (JSON)')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Erlaubte p50 Verschlechterung (0.2 = 20%%)')
+    parser.add_argument('--log-level', default='WARNING', help='Log-Level während der Messung')
+    args = parser.parse_args(argv)
+
+    # Logging der Module (INFO je Nachricht) verfälscht sonst die Messung
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    benchmarks = [b.strip() for b in args.benchmarks.split(',') if b.strip()]
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unbekannte Benchmarks: {', '.join(sorted(unknown))}")
+
+    print(f"🏁 Benchmarks: {', '.join(benchmarks)} | Sensoren: {sizes} | {args.iterations} Iterationen")
+    results = run_benchmarks(sizes, args.iterations, args.conversion_latency, benchmarks,
+                             influx_latency=args.influx_latency)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparison = compare_results(baseline, results, args.threshold)
+        regressions = [c for c in comparison if c['regression']]
+        print(f"\n📊 Vergleich mit {args.compare} ({baseline.get('meta', {}).get('commit')}):")
+        for c in comparison:
+            marker = "❌" if c['regression'] else "✅"
+            print(f"  {marker} {c['benchmark']:<22} {c['sensors']:>4}: "
+                  f"{c['baseline_p50_ms']:.3f}ms → {c['p50_ms']:.3f}ms (x{c['ratio']:.2f})")
+        if regressions:
+            print(f"❌ {len(regressions)} Regressionen über {args.threshold:.0%}")
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Dauertest (Soak) für Sensor Reader und MQTT Bridge
+==================================================
+
+Lässt Pi5SensorReader.run_continuous (simulierte Hardware → InfluxDB
+Stand-in) und Pi5MqttBridge.run_continuous (InfluxDB Stand-in → MQTT Broker
+Stand-in) mit einer virtuellen Uhr laufen: Zyklus-Pausen, DHT22 Cache und
+Discovery-Timer vergehen in virtueller Zeit, 30 Tage Betrieb dauern Minuten.
+
+In gleichmäßigen virtuellen Abständen werden Proben genommen:
+
+    rss_kib         Resident Set Size des Prozesses
+    traced_kib      Python Speicher (tracemalloc) nach gc.collect()
+    cycle_ms        echte Laufzeit je Zyklus (p50/p99 seit der letzten Probe)
+
+Nach der Einschwingphase (--warmup) wird der Trend (Ausgleichsgerade) über
+die Laufzeit bewertet. Der Test schlägt fehl, wenn Speicher oder Zykluszeit
+über die Grenzen wachsen; die am stärksten gewachsenen Allokationen in src/
+stehen im Ergebnis.
+
+Verwendung:
+    python tests/benchmarks/bench_soak.py --days 30 --output soak.json
+    python tests/benchmarks/bench_soak.py --components reader --days 7 --inject-leak 64
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import argparse
+import configparser
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from hardware.simulation import VirtualClock
+from mqtt_bridge import Pi5MqttBridge
+from sensor_reader import Pi5SensorReader
+from support.influxdb import InfluxDBStandIn
+from support.mqtt_broker import MqttBrokerStandIn
+from bench_bridge_load import rss_kib
+from bench_pipeline import describe_environment, percentile
+
+COMPONENTS = ('reader', 'bridge')
+DAY = 86400.0
+
+# Grenzen für das Wachstum über die Laufzeit (nach der Einschwingphase)
+DEFAULT_LIMITS = {
+    'traced_kib': 512.0,        # Python Speicher
+    'rss_kib': 16384.0,         # Prozess-Speicher (inkl. Fragmentierung, Stand-ins)
+    'cycle_time_ratio': 1.5     # Zykluszeit letztes Viertel / erstes Viertel
+}
+
+
+def trend(points: List[Tuple[float, float]]) -> float:
+    """Anstieg der Ausgleichsgeraden durch (x, y) Punkte"""
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+
+
+class SoakMonitor:
+    """Zyklen zählen, Laufzeiten messen und in virtuellen Abständen Proben nehmen"""
+
+    def __init__(self, clock: VirtualClock, duration: float, samples: int = 60,
+                 warmup: float = 0.1, trace: bool = True, inject_leak: int = 0):
+        self.clock = clock
+        self.duration = duration
+        self.sample_interval = duration / max(1, samples)
+        self.warmup = duration * warmup
+        self.trace = trace
+        self.inject_leak = inject_leak
+
+        self.cycles = 0
+        self.samples: List[Dict] = []
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.final: Optional[tracemalloc.Snapshot] = None
+        self._next_sample = self.sample_interval
+        self._window: List[float] = []
+        self._last: Optional[float] = None
+        self._leak: List[bytearray] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.clock.elapsed >= self.duration
+
+    def cycle(self):
+        """Nach jedem Zyklus aufrufen (Laufzeit = Abstand zum vorherigen Aufruf)"""
+        now = time.perf_counter()
+        if self._last is not None:
+            self._window.append(now - self._last)
+        self._last = now
+        self.cycles += 1
+        if self.inject_leak:
+            # Selbsttest: absichtliches Leck je Zyklus muss erkannt werden
+            self._leak.append(bytearray(self.inject_leak))
+
+        if self.clock.elapsed >= self._next_sample or self.finished:
+            self._sample()
+            self._next_sample += self.sample_interval
+            # Zeit für die Probe nicht dem nächsten Zyklus anrechnen
+            self._last = time.perf_counter()
+
+    def _sample(self):
+        gc.collect()
+        sample = {
+            'virtual_days': round(self.clock.elapsed / DAY, 4),
+            'cycles': self.cycles,
+            'rss_kib': rss_kib()
+        }
+        if self.trace and tracemalloc.is_tracing():
+            sample['traced_kib'] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+        if self._window:
+            sample['cycle_ms'] = {
+                'p50': round(percentile(self._window, 0.50) * 1000, 3),
+                'p99': round(percentile(self._window, 0.99) * 1000, 3)
+            }
+            self._window = []
+        self.samples.append(sample)
+
+        if self.trace and tracemalloc.is_tracing():
+            if self.baseline is None and self.clock.elapsed >= self.warmup:
+                self.baseline = tracemalloc.take_snapshot()
+            elif self.finished:
+                self.final = tracemalloc.take_snapshot()
+
+    def top_growth(self, limit: int = 10) -> List[Dict]:
+        """Am stärksten gewachsene Allokationen in src/ (Baseline → Ende)"""
+        if self.baseline is None or self.final is None:
+            return []
+        source = tracemalloc.Filter(True, str(project_root / 'src' / '*'))
+        stats = self.final.filter_traces([source]).compare_to(self.baseline.filter_traces([source]), 'lineno')
+        return [{
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_diff_kib': round(stat.size_diff / 1024, 1),
+            'count_diff': stat.count_diff
+        } for stat in stats[:limit] if stat.size_diff > 0]
+
+    def evaluate(self, limits: Dict[str, float]) -> Dict:
+        """Wachstum nach der Einschwingphase gegen die Grenzen prüfen"""
+        steady = [s for s in self.samples if s['virtual_days'] * DAY >= self.warmup]
+        result = {'samples': len(steady), 'failures': []}
+        if len(steady) < 4:
+            result['failures'].append(f"zu wenige Proben nach der Einschwingphase ({len(steady)})")
+            result['ok'] = False
+            return result
+
+        span_days = steady[-1]['virtual_days'] - steady[0]['virtual_days']
+        for key in ('traced_kib', 'rss_kib'):
+            points = [(s['virtual_days'], s[key]) for s in steady if s.get(key) is not None]
+            if len(points) < 2:
+                continue
+            growth = trend(points) * span_days
+            result[f'{key}_growth'] = round(growth, 1)
+            if growth > limits[key]:
+                result['failures'].append(f"{key} wächst um {growth:.0f} KiB (Grenze {limits[key]:.0f})")
+
+        timed = [s['cycle_ms']['p50'] for s in steady if 'cycle_ms' in s]
+        quarter = max(1, len(timed) // 4)
+        first = sum(timed[:quarter]) / quarter
+        last = sum(timed[-quarter:]) / quarter
+        ratio = last / first if first else 1.0
+        result['cycle_ms_first'] = round(first, 3)
+        result['cycle_ms_last'] = round(last, 3)
+        result['cycle_time_ratio'] = round(ratio, 3)
+        if ratio > limits['cycle_time_ratio']:
+            result['failures'].append(f"Zykluszeit wächst von {first:.2f}ms auf {last:.2f}ms "
+                                      f"(x{ratio:.2f}, Grenze x{limits['cycle_time_ratio']:g})")
+
+        result['ok'] = not result['failures']
+        return result
+
+
+def create_reader(workdir: str, influx: InfluxDBStandIn, sensors: int,
+                  clock: VirtualClock) -> Tuple[Pi5SensorReader, Dict[str, str]]:
+    """Sensor Reader mit simulierter Hardware → InfluxDB Stand-in (gibt Reader und Labels zurück)"""
+    reader = Pi5SensorReader(os.path.join(workdir, 'soak.ini'), overrides={
+        'hardware': {'backend': 'simulation'},
+        'simulation': {'ds18b20_count': str(sensors), 'w1_path': os.path.join(workdir, 'w1'), 'seed': '1'},
+        # Virtuelle Zeit läuft schneller als jeder Schreibvorgang - synchron schreiben,
+        # sonst verwirft der Schreib-Puffer fast alle Zyklen
+        'database': {'host': influx.host, 'port': str(influx.port), 'async_write': 'false'},
+        'monitoring': {'metrics_enabled': 'false', 'tracing': 'off'}
+    }, clock=clock)
+
+    sensor_ids = reader.ds18b20_reader.get_sensor_ids() if reader.ds18b20_reader else []
+    labels = {sensor_id: f"Sensor {index + 1}" for index, sensor_id in enumerate(sensor_ids)}
+    labels['dht22'] = 'Heizraum'
+    reader.config.read_dict({'labels': labels})
+    return reader, labels
+
+
+def soak_reader(monitor: SoakMonitor, workdir: str, influx: InfluxDBStandIn, sensors: int,
+                interval: float) -> Dict:
+    """Sensor Reader run_continuous bis die virtuelle Dauer erreicht ist"""
+    reader, labels = create_reader(workdir, influx, sensors, monitor.clock)
+    read_all_sensors = reader.read_all_sensors
+
+    def cycle():
+        sensor_data = read_all_sensors()
+        monitor.cycle()
+        if monitor.finished:
+            reader.running = False
+        return sensor_data
+
+    reader.read_all_sensors = cycle
+    reader.run_continuous(interval=interval)
+    return {
+        'labels': labels,
+        'points_written': influx.stats['points'],
+        'dht22_cache_hits': reader.dht22_reader.stats['cache_hits'] if reader.dht22_reader else 0
+    }
+
+
+def soak_bridge(monitor: SoakMonitor, workdir: str, influx: InfluxDBStandIn, broker: MqttBrokerStandIn,
+                labels: Dict[str, str], interval: float) -> Dict:
+    """MQTT Bridge run_continuous (Abfrage, Publish, Discovery-Timer) bis zur virtuellen Dauer"""
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 'soak',
+                 'payload_timestamps': 'true'},
+        'homeassistant': {'mqtt_discovery': 'true', 'sensor_availability': 'true'},
+        'database': {'host': influx.host, 'port': str(influx.port)},
+        'monitoring': {'metrics_enabled': 'false', 'tracing': 'off'},
+        'labels': labels
+    })
+    config_path = os.path.join(workdir, 'soak-bridge.ini')
+    with open(config_path, 'w') as f:
+        config.write(f)
+
+    bridge = Pi5MqttBridge(config_file=config_path, clock=monitor.clock)
+    if not bridge.setup_influxdb() or not bridge.setup_mqtt():
+        raise RuntimeError("Bridge Setup fehlgeschlagen")
+    run_once = bridge.run_once
+
+    def cycle():
+        run_once()
+        monitor.cycle()
+        if monitor.finished:
+            bridge.running = False
+
+    bridge.run_once = cycle
+    broker.reset()
+    bridge.run_continuous(interval=interval)
+    return {
+        'messages': broker.stats['messages'],
+        'discovery_messages': sum(count for topic, count in broker.message_counts.items()
+                                  if topic.startswith('homeassistant/'))
+    }
+
+
+def run_soak(days: float = 30.0, interval: float = 30.0, components=COMPONENTS, sensors: int = 4,
+             samples: int = 60, warmup: float = 0.1, trace: bool = True, inject_leak: int = 0,
+             limits: Optional[Dict[str, float]] = None) -> Dict:
+    """Dauertest für alle gewählten Komponenten ausführen"""
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+    influx = InfluxDBStandIn(max_points=200)
+    broker = MqttBrokerStandIn()
+    influx.start()
+    broker.start()
+    results = []
+    labels = None
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='pi5-soak-') as workdir:
+            for component in components:
+                if component == 'bridge' and labels is None:
+                    # Bridge ohne Reader-Lauf: einen Zyklus in den Stand-in schreiben
+                    reader, labels = create_reader(workdir, influx, sensors, VirtualClock())
+                    reader.save_to_influxdb(reader.read_all_sensors())
+                    reader.stop()
+
+                clock = VirtualClock()
+                monitor = SoakMonitor(clock, days * DAY, samples=samples, warmup=warmup,
+                                      trace=trace, inject_leak=inject_leak)
+                if trace:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                try:
+                    if component == 'reader':
+                        details = soak_reader(monitor, workdir, influx, sensors, interval)
+                        labels = details.pop('labels')
+                    elif component == 'bridge':
+                        details = soak_bridge(monitor, workdir, influx, broker, labels, interval)
+                    else:
+                        raise ValueError(f"Unbekannte Komponente: {component}")
+                    entry = {
+                        'component': component,
+                        'virtual_days': round(clock.elapsed / DAY, 3),
+                        'cycles': monitor.cycles,
+                        'wall_seconds': round(time.perf_counter() - started, 1),
+                        'details': details,
+                        'evaluation': monitor.evaluate(limits),
+                        'top_growth': monitor.top_growth(),
+                        'samples': monitor.samples
+                    }
+                finally:
+                    if trace:
+                        tracemalloc.stop()
+                results.append(entry)
+
+                evaluation = entry['evaluation']
+                print(f"  {component:>6}: {entry['virtual_days']:g} Tage, {entry['cycles']} Zyklen "
+                      f"in {entry['wall_seconds']:.0f}s  "
+                      f"Speicher {evaluation.get('traced_kib_growth', 0):+.0f} KiB  "
+                      f"RSS {evaluation.get('rss_kib_growth', 0):+.0f} KiB  "
+                      f"Zyklus x{evaluation.get('cycle_time_ratio', 0):.2f}"
+                      + ("" if evaluation['ok'] else "  ❌ " + "; ".join(evaluation['failures'])))
+    finally:
+        broker.stop()
+        influx.stop()
+
+    return {
+        'meta': describe_environment(),
+        'config': {'days': days, 'interval': interval, 'components': list(components), 'sensors': sensors,
+                   'samples': samples, 'warmup': warmup, 'tracemalloc': trace,
+                   'inject_leak': inject_leak, 'limits': limits},
+        'results': results,
+        'ok': all(entry['evaluation']['ok'] for entry in results)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Pi5 Heizungs Messer - Dauertest mit virtueller Uhr')
+    parser.add_argument('--days', type=float, default=30.0, help='Virtuelle Laufzeit in Tagen')
+    parser.add_argument('--interval', type=float, default=30.0, help='Zyklus-Intervall in Sekunden')
+    parser.add_argument('--components', default=','.join(COMPONENTS), help='reader,bridge')
+    parser.add_argument('--sensors', type=int, default=4, help='Anzahl simulierter DS18B20')
+    parser.add_argument('--samples', type=int, default=60, help='Anzahl Proben über die Laufzeit')
+    parser.add_argument('--warmup', type=float, default=0.1, help='Einschwingphase (Anteil der Laufzeit)')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='Nur RSS und Zykluszeit messen')
+    parser.add_argument('--inject-leak', type=int, default=0, metavar='BYTES',
+                        help='Selbsttest: absichtliches Leck je Zyklus')
+    parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_LIMITS['traced_kib'],
+                        help='Max. Wachstum Python Speicher in KiB')
+    parser.add_argument('--max-rss-growth', type=float, default=DEFAULT_LIMITS['rss_kib'],
+                        help='Max. Wachstum RSS in KiB')
+    parser.add_argument('--max-time-growth', type=float, default=DEFAULT_LIMITS['cycle_time_ratio'],
+                        help='Max. Faktor der Zykluszeit (letztes / erstes Viertel)')
+    parser.add_argument('--output', default='soak.json', help='JSON Ergebnis-Datei')
+    parser.add_argument('--log-level', default='WARNING', help='Log-Level während der Messung')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    components = [c.strip() for c in args.components.split(',') if c.strip()]
+    print(f"🏁 Dauertest: {args.days:g} Tage virtuell, Intervall {args.interval:g}s, {components}")
+    results = run_soak(args.days, args.interval, components, args.sensors, args.samples, args.warmup,
+                       trace=not args.no_tracemalloc, inject_leak=args.inject_leak,
+                       limits={'traced_kib': args.max_memory_growth, 'rss_kib': args.max_rss_growth,
+                               'cycle_time_ratio': args.max_time_growth})
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+    if not results['ok']:
+        for entry in results['results']:
+            for growth in entry['top_growth'][:5]:
+                print(f"   {entry['component']}: {growth['location']} +{growth['size_diff_kib']} KiB")
+        print("❌ Speicher oder Zykluszeit wachsen über die Grenzen")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Test-Hilfen: lokale Stand-ins für Broker und Datenbank (Benchmarks, Lasttests)"""
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Lokaler InfluxDB v2 HTTP Stand-in mit Fehler-Injektion
+======================================================
+
+Spricht genug der InfluxDB v2 API für Sensor Reader und MQTT Bridge:
+
+    GET  /health, /ping        Health Check
+    POST /api/v2/write         Line Protocol (Punkte werden gespeichert)
+    POST /api/v2/query         Flux: range / _measurement / _field Filter,
+                               group(columns: [...]) und last()
+    /api/v2/orgs, /buckets, /tasks
+                               Organisationen, Buckets (Aufbewahrung) und Tasks
+                               anlegen/ändern/löschen (Provisionierung)
+
+Fehlerfälle zur Laufzeit einstellbar (set_faults): zusätzliche Latenz,
+429/503 Antworten mit Retry-After, hängende Requests (Client-Timeout)
+und tröpfelnde Antworten (Body Byte für Byte).
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import gzip
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+WRITE_PATH = '/api/v2/write'
+QUERY_PATH = '/api/v2/query'
+API_PREFIX = '/api/v2/'
+
+_PRECISION_NS = {'ns': 1, 'us': 1_000, 'ms': 1_000_000, 's': 1_000_000_000}
+_DURATION_S = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_UNESCAPE = re.compile(r'\\(.)')
+
+
+def _split(text: str, separator: str, maxsplit: int = -1) -> List[str]:
+    """An separator trennen - außer escaped (\\) oder innerhalb von "..." """
+    parts, current, quoted, escaped = [], [], False, False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == '\\':
+            current.append(char)
+            escaped = True
+        elif char == '"':
+            current.append(char)
+            quoted = not quoted
+        elif char == separator and not quoted and maxsplit != 0:
+            parts.append(''.join(current))
+            current = []
+            maxsplit -= 1
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _unescape(value: str) -> str:
+    return _UNESCAPE.sub(r'\1', value)
+
+
+def _field_value(raw: str):
+    if raw.startswith('"'):
+        return _unescape(raw[1:-1])
+    if raw in ('t', 'T', 'true', 'True', 'TRUE'):
+        return True
+    if raw in ('f', 'F', 'false', 'False', 'FALSE'):
+        return False
+    if raw[-1] in 'iu':
+        return int(raw[:-1])
+    return float(raw)
+
+
+def parse_line_protocol(body: str, precision: str = 'ns') -> List[Dict]:
+    """Line Protocol → [{measurement, tags, fields, time (ns)}]"""
+    points = []
+    now_ns = time.time_ns()
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = _split(line, ' ', 2)
+        series = _split(parts[0], ',')
+        tags = dict(_unescape(tag).split('=', 1) for tag in series[1:])
+        fields = {}
+        for field in _split(parts[1], ','):
+            key, raw = _split(field, '=', 1)
+            fields[_unescape(key)] = _field_value(raw)
+        timestamp = int(parts[2]) * _PRECISION_NS[precision] if len(parts) > 2 and parts[2] else now_ns
+        points.append({'measurement': _unescape(series[0]), 'tags': tags,
+                       'fields': fields, 'time': timestamp})
+    return points
+
+
+def _rfc3339(ns: int) -> str:
+    moment = datetime.fromtimestamp(ns // 1_000_000_000, timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S') + f".{ns % 1_000_000_000:09d}Z"
+
+
+def _datatype(value) -> str:
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'long'
+    if isinstance(value, float):
+        return 'double'
+    return 'string'
+
+
+def _csv_value(value) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    text = str(value)
+    if any(char in text for char in ',"\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "InfluxDB-StandIn/2.7"
+    protocol_version = "HTTP/1.1"   # Keep-Alive wie InfluxDB (Content-Length in jeder Antwort)
+    disable_nagle_algorithm = True  # Header und Body einzeln geschrieben - sonst 40ms Delayed ACK
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._respond(path, 200, json.dumps({
+                "name": "influxdb", "message": "ready for queries and writes",
+                "status": "pass", "checks": [], "version": "2.7.0", "commit": "stand-in"
+            }), 'application/json')
+        elif path == '/ping':
+            self._respond(path, 204)
+        elif path.startswith(API_PREFIX):
+            self._respond_api('GET', path)
+        else:
+            self._respond(path, 404, json.dumps({"code": "not found", "message": "path not found"}),
+                          'application/json')
+
+    def do_HEAD(self):
+        self._respond(urlparse(self.path).path, 204)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+
+        if url.path == WRITE_PATH:
+            self._respond(url.path, 204, on_success=lambda: self.server.stand_in._store(
+                body.decode('utf-8'), params.get('bucket', ''), params.get('precision', 'ns')))
+        elif url.path == QUERY_PATH:
+            query = json.loads(body or b'{}').get('query', '')
+            self._respond(url.path, 200, lambda: self.server.stand_in.query_csv(query),
+                          'text/csv; charset=utf-8')
+        elif url.path.startswith(API_PREFIX):
+            self._respond_api('POST', url.path, body)
+        else:
+            self._respond(url.path, 404, json.dumps({"code": "not found", "message": "path not found"}),
+                          'application/json')
+
+    def do_PATCH(self):
+        path = urlparse(self.path).path
+        self._respond_api('PATCH', path, self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+
+    def do_DELETE(self):
+        self._respond_api('DELETE', urlparse(self.path).path)
+
+    def _respond_api(self, method: str, path: str, body: bytes = b""):
+        """Ressourcen-API (orgs, buckets, tasks) beantworten"""
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        status, result = self.server.stand_in.api(method, path, params, json.loads(body or b'{}'))
+        self._respond(path, status, json.dumps(result) if result is not None else None,
+                      'application/json' if result is not None else None)
+
+    def _respond(self, path: str, status: int, body=None, content_type: Optional[str] = None,
+                 on_success=None):
+        """Antwort unter Berücksichtigung der eingestellten Fehler senden"""
+        stand_in: InfluxDBStandIn = self.server.stand_in
+        faults = stand_in._faults_for(path)
+
+        if faults.get('latency'):
+            time.sleep(faults['latency'])
+        if faults.get('stall'):
+            stand_in._count('stalled', path)
+            stand_in._release.wait()
+            if not stand_in._server:
+                return
+
+        error_status = stand_in._take_error(path, faults)
+        if error_status:
+            status = error_status
+            content_type = 'application/json'
+            body = json.dumps({"code": "too many requests" if status == 429 else "unavailable",
+                               "message": "fault injected by stand-in"})
+        else:
+            if on_success:
+                on_success()
+            if callable(body):
+                body = body()
+
+        stand_in._count('requests', path, status)
+        payload = body.encode('utf-8') if isinstance(body, str) else (body or b"")
+        try:
+            self.send_response(status)
+            if error_status and faults.get('retry_after') is not None:
+                self.send_header('Retry-After', str(faults['retry_after']))
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            drip_delay = faults.get('drip_delay')
+            if drip_delay and payload:
+                for index in range(len(payload)):
+                    self.wfile.write(payload[index:index + 1])
+                    self.wfile.flush()
+                    time.sleep(drip_delay)
+            else:
+                self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class InfluxDBStandIn:
+    """
+    InfluxDB v2 Stand-in
+
+    Verwendung:
+        db = InfluxDBStandIn()
+        db.start()                                  # → [database] host/port
+        db.set_faults(status=503, retry_after=5)    # nächste Requests schlagen fehl
+        db.set_faults(stall=True, paths=['/api/v2/write'])
+        db.clear_faults()
+        db.stop()
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, max_points: Optional[int] = None,
+                 org: str = 'pi5org', bucket: str = 'sensors'):
+        self.host = host
+        self.port = port
+        self.max_points = max_points                # nur die neuesten Punkte behalten (Dauertests)
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Condition()
+        self._release = threading.Event()
+        self._faults: Dict = {}
+
+        self.points: List[Dict] = []
+        self.buckets: Dict[str, int] = {}           # Punkte je Bucket
+
+        # Ressourcen wie nach dem InfluxDB Setup (docker-compose: Organisation + Roh-Bucket)
+        self._ids = itertools.count(1)
+        self.orgs: Dict[str, Dict] = {}
+        self.bucket_resources: Dict[str, Dict] = {}
+        self.tasks: Dict[str, Dict] = {}
+        org_id = self._create('orgs', {'name': org})['id']
+        self._create('bucket_resources', {'name': bucket, 'orgID': org_id, 'retentionRules': []})
+        self.stats = {'requests': {}, 'statuses': {}, 'stalled': {}, 'writes': 0, 'points': 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> int:
+        """Server starten - gibt den Port zurück"""
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.stand_in = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="influxdb-standin", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Hängende Requests freigeben und Server beenden"""
+        self._release.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def set_faults(self, latency: float = 0.0, status: Optional[int] = None,
+                   count: Optional[int] = None, retry_after: Optional[int] = None,
+                   stall: bool = False, drip_delay: float = 0.0,
+                   paths: Optional[Iterable[str]] = None):
+        """
+        Fehlerverhalten einstellen (ersetzt vorherige Einstellung)
+
+        Args:
+            latency: zusätzliche Verzögerung je Request in Sekunden
+            status: Fehler-Status statt der normalen Antwort (z.B. 429, 503)
+            count: Anzahl Requests mit Fehler-Status (None = alle)
+            retry_after: Retry-After Header der Fehler-Antworten (Sekunden)
+            stall: Requests bis release()/stop() nicht beantworten (Client-Timeout)
+            drip_delay: Antwort-Body Byte für Byte mit dieser Pause senden
+            paths: nur diese Pfade betreffen (None = alle)
+        """
+        with self._lock:
+            if stall:
+                self._release.clear()
+            self._faults = {
+                'latency': latency, 'status': status, 'remaining': count,
+                'retry_after': retry_after, 'stall': stall, 'drip_delay': drip_delay,
+                'paths': set(paths) if paths else None
+            }
+
+    def clear_faults(self):
+        """Normalbetrieb - hängende Requests werden freigegeben"""
+        with self._lock:
+            self._faults = {}
+        self._release.set()
+
+    def release(self):
+        """Hängende Requests freigeben (werden dann normal beantwortet)"""
+        self._release.set()
+
+    def reset(self):
+        """Gespeicherte Punkte und Zähler zurücksetzen"""
+        with self._lock:
+            self.points.clear()
+            self.buckets.clear()
+            self.stats = {'requests': {}, 'statuses': {}, 'stalled': {}, 'writes': 0, 'points': 0}
+
+    def wait_for_points(self, count: int, timeout: float = 10.0) -> bool:
+        """Warten bis insgesamt count Punkte geschrieben wurden"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.stats['points'] < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+            return True
+
+    def _faults_for(self, path: str) -> Dict:
+        with self._lock:
+            faults = self._faults
+            if not faults or (faults['paths'] is not None and path not in faults['paths']):
+                return {}
+            return dict(faults)
+
+    def _take_error(self, path: str, faults: Dict) -> Optional[int]:
+        if not faults.get('status'):
+            return None
+        with self._lock:
+            remaining = self._faults.get('remaining')
+            if remaining is None:
+                return faults['status']
+            if remaining <= 0:
+                return None
+            self._faults['remaining'] = remaining - 1
+            return faults['status']
+
+    def _count(self, key: str, path: str, status: Optional[int] = None):
+        with self._lock:
+            self.stats[key][path] = self.stats[key].get(path, 0) + 1
+            if status is not None:
+                self.stats['statuses'][status] = self.stats['statuses'].get(status, 0) + 1
+
+    def _create(self, kind: str, resource: Dict) -> Dict:
+        resource = dict(resource, id=f"{next(self._ids):016x}")
+        getattr(self, kind)[resource['id']] = resource
+        return resource
+
+    @staticmethod
+    def _retention(rules: List[Dict]) -> List[Dict]:
+        # everySeconds 0 = unbegrenzt (wie InfluxDB: keine Regel)
+        return [dict(rule, type='expire') for rule in rules or [] if rule.get('everySeconds')]
+
+    @staticmethod
+    def _task_options(flux: str) -> Dict:
+        """name/every/offset aus "option task = {...}" übernehmen"""
+        match = re.search(r'option\s+task\s*=\s*\{([^}]*)\}', flux)
+        options = dict(re.findall(r'(\w+)\s*:\s*"?([^,"]+)"?', match.group(1))) if match else {}
+        return {key: options[key].strip() for key in ('name', 'every', 'offset', 'cron') if key in options}
+
+    def api(self, method: str, path: str, params: Dict, body: Dict):
+        """
+        Ressourcen-API der InfluxDB v2 (Ausschnitt für die Provisionierung)
+
+        Returns:
+            (status, JSON-Objekt oder None)
+        """
+        kind, _, resource_id = path[len(API_PREFIX):].partition('/')
+        collection = {'orgs': 'orgs', 'buckets': 'bucket_resources', 'tasks': 'tasks'}.get(kind)
+        if collection is None:
+            return 404, {"code": "not found", "message": "path not found"}
+
+        with self._lock:
+            resources = getattr(self, collection)
+            if method == 'GET' and not resource_id:
+                name = params.get('org' if kind == 'orgs' else 'name')
+                found = [r for r in resources.values() if name is None or r['name'] == name]
+                if params.get('orgID'):
+                    found = [r for r in found if r.get('orgID') == params['orgID']]
+                return 200, {kind: found}
+
+            if method == 'POST' and not resource_id:
+                if kind == 'orgs':
+                    return 201, self._create(collection, {'name': body['name']})
+                if kind == 'buckets':
+                    if any(r['name'] == body['name'] and r['orgID'] == body['orgID'] for r in resources.values()):
+                        return 422, {"code": "conflict", "message": "bucket with name already exists"}
+                    return 201, self._create(collection, {
+                        'name': body['name'], 'orgID': body['orgID'], 'description': body.get('description'),
+                        'retentionRules': self._retention(body.get('retentionRules'))})
+                org_id = body.get('orgID') or next(
+                    (org['id'] for org in self.orgs.values() if org['name'] == body.get('org')), None)
+                return 201, self._create(collection, dict(
+                    self._task_options(body['flux']), orgID=org_id, flux=body['flux'],
+                    status=body.get('status') or 'active', description=body.get('description')))
+
+            resource = resources.get(resource_id)
+            if resource is None:
+                return 404, {"code": "not found", "message": f"{kind[:-1]} not found"}
+            if method == 'GET':
+                return 200, resource
+            if method == 'DELETE':
+                del resources[resource_id]
+                return 204, None
+            if method == 'PATCH':
+                if 'retentionRules' in body:
+                    body['retentionRules'] = self._retention(body['retentionRules'])
+                resource.update({key: value for key, value in body.items() if value is not None})
+                if kind == 'tasks' and 'flux' in body:
+                    resource.update(self._task_options(body['flux']))
+                return 200, resource
+        return 405, {"code": "method not allowed", "message": method}
+
+    def _store(self, body: str, bucket: str, precision: str):
+        points = parse_line_protocol(body, precision)
+        for point in points:
+            point['bucket'] = bucket
+        with self._lock:
+            self.points.extend(points)
+            if self.max_points is not None and len(self.points) > self.max_points:
+                del self.points[:len(self.points) - self.max_points]
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + len(points)
+            self.stats['writes'] += 1
+            self.stats['points'] += len(points)
+            self._lock.notify_all()
+
+    def query_csv(self, query: str) -> str:
+        """
+        Flux Abfrage als annotiertes CSV beantworten
+
+        Unterstützt: range(start: -Xm | time(v: "RFC3339")), Filter auf _measurement/_field,
+        group(columns: [...]) und last() - genug für Bridge und Tests.
+        """
+        now_ns = time.time_ns()
+        start_ns = 0
+        match = re.search(r'range\(start:\s*-(\d+)([smhd])', query)
+        if match:
+            start_ns = now_ns - int(match.group(1)) * _DURATION_S[match.group(2)] * 1_000_000_000
+        match = re.search(r'range\(start:\s*time\(v:\s*"([^"]+)"\)', query)
+        if match:
+            start = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+            start_ns = int(start.timestamp()) * 1_000_000_000 + start.microsecond * 1000
+        measurements = set(re.findall(r'r\["_measurement"\]\s*==\s*"([^"]+)"', query))
+        fields = set(re.findall(r'r\["_field"\]\s*==\s*"([^"]+)"', query))
+        match = re.search(r'group\(columns:\s*\[([^\]]*)\]', query)
+        group_columns = re.findall(r'"([^"]+)"', match.group(1)) if match else []
+
+        with self._lock:
+            points = list(self.points)
+
+        # Eine Zeile je Feld (Flux Tabellen-Modell)
+        rows = []
+        for point in points:
+            if point['time'] < start_ns or (measurements and point['measurement'] not in measurements):
+                continue
+            for field, value in point['fields'].items():
+                if fields and field not in fields:
+                    continue
+                rows.append(dict(point['tags'], _time=point['time'], _value=value,
+                                 _field=field, _measurement=point['measurement']))
+
+        tables: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            tables.setdefault(tuple(row.get(column, '') for column in group_columns), []).append(row)
+        if 'last()' in query:
+            tables = {key: [max(group, key=lambda row: row['_time'])] for key, group in tables.items()}
+
+        blocks = []
+        for table_id, (_, group) in enumerate(sorted(tables.items())):
+            blocks.append(self._table_csv(table_id, group, group_columns, start_ns, now_ns))
+        return "\r\n".join(blocks) + "\r\n"
+
+    @staticmethod
+    def _table_csv(table_id: int, rows: List[Dict], group_columns: List[str],
+                   start_ns: int, stop_ns: int) -> str:
+        tag_columns = sorted({key for row in rows for key in row if not key.startswith('_')})
+        columns = ['_start', '_stop', '_time', '_value', '_field', '_measurement'] + tag_columns
+        datatypes = ['dateTime:RFC3339'] * 3 + [_datatype(rows[0]['_value'])] + ['string'] * (len(columns) - 4)
+        lines = [
+            "#datatype,string,long," + ",".join(datatypes),
+            "#group,false,false," + ",".join('true' if c in group_columns else 'false' for c in columns),
+            "#default,_result,," + "," * (len(columns) - 1),
+            ",result,table," + ",".join(columns)
+        ]
+        for row in rows:
+            values = [_rfc3339(start_ns), _rfc3339(stop_ns), _rfc3339(row['_time'])]
+            values += [_csv_value(row.get(column, '')) for column in columns[3:]]
+            lines.append(f",,{table_id}," + ",".join(values))
+        return "\r\n".join(lines) + "\r\n"
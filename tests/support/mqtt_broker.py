@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Lokaler MQTT Broker Stand-in für Tests und Benchmarks
+=====================================================
+
+Minimaler MQTT 3.1.1 Broker im eigenen Thread:
+
+- CONNECT (inkl. Last Will), PUBLISH QoS 0/1/2, PINGREQ, DISCONNECT
+- SUBSCRIBE/UNSUBSCRIBE mit Wildcards (+, #), Weiterleitung an Abonnenten
+  (Zustellung immer mit QoS 0)
+- Retained Nachrichten (bei SUBSCRIBE zugestellt, leerer Payload löscht)
+- Last Will bei Verbindungsabbruch ohne DISCONNECT
+
+Zählt die empfangenen Nachrichten je Topic. Ersetzt für Benchmarks und
+Lasttests einen echten Broker - gemessen wird der Client-Pfad, nicht der
+Broker.
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def _read_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Verbindung geschlossen")
+        data += chunk
+    return data
+
+
+def read_packet(sock: socket.socket):
+    """Ein MQTT Paket lesen → (typ, flags, body)"""
+    first = _read_exact(sock, 1)[0]
+    multiplier, length = 1, 0
+    while True:
+        byte = _read_exact(sock, 1)[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    return first >> 4, first & 0x0F, _read_exact(sock, length) if length else b""
+
+
+def encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    """MQTT Paket mit Fixed Header (Remaining Length) kodieren"""
+    header = bytearray([(packet_type << 4) | flags])
+    length = len(body)
+    while True:
+        byte = length % 128
+        length //= 128
+        header.append(byte | 0x80 if length else byte)
+        if not length:
+            break
+    return bytes(header) + body
+
+
+def _read_string(body: bytes, offset: int):
+    length = struct.unpack("!H", body[offset:offset + 2])[0]
+    return body[offset + 2:offset + 2 + length], offset + 2 + length
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """MQTT Topic-Filter mit + und # prüfen"""
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for index, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if index >= len(topic_levels) or (level != '+' and level != topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class _Session:
+    """Verbindung eines Clients (Abos, Last Will, Sende-Lock)"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.client_id = ""
+        self.subscriptions = set()
+        self.will: Optional[tuple] = None     # (topic, payload, retain)
+        self._send_lock = threading.Lock()
+
+    def send(self, data: bytes):
+        with self._send_lock:
+            self.sock.sendall(data)
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    """Verbindung eines MQTT Clients"""
+
+    def handle(self):
+        broker: MqttBrokerStandIn = self.server.broker
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = _Session(sock)
+        broker._register(session)
+        clean = False
+        try:
+            while True:
+                packet_type, flags, body = read_packet(sock)
+                if packet_type == CONNECT:
+                    self._handle_connect(broker, session, body)
+                elif packet_type == PUBLISH:
+                    self._handle_publish(broker, session, flags, body)
+                elif packet_type == PUBREL:
+                    session.send(bytes([PUBCOMP << 4, 2]) + body[:2])
+                elif packet_type == SUBSCRIBE:
+                    self._handle_subscribe(broker, session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        topic_filter, offset = _read_string(body, offset)
+                        session.subscriptions.discard(topic_filter.decode('utf-8'))
+                    session.send(bytes([UNSUBACK << 4, 2]) + body[:2])
+                elif packet_type == PINGREQ:
+                    session.send(bytes([PINGRESP << 4, 0]))
+                elif packet_type == DISCONNECT:
+                    clean = True
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            broker._unregister(session)
+            if not clean and session.will:
+                # Verbindungsabbruch: Last Will veröffentlichen
+                broker._count('wills')
+                broker._on_publish(*session.will, qos=0)
+
+    @staticmethod
+    def _handle_connect(broker: "MqttBrokerStandIn", session: _Session, body: bytes):
+        _, offset = _read_string(body, 0)          # Protokoll-Name
+        connect_flags = body[offset + 1]
+        offset += 4                                 # Level, Flags, Keepalive
+        client_id, offset = _read_string(body, offset)
+        session.client_id = client_id.decode('utf-8')
+        if connect_flags & 0x04:
+            will_topic, offset = _read_string(body, offset)
+            will_payload, offset = _read_string(body, offset)
+            session.will = (will_topic.decode('utf-8'), will_payload, bool(connect_flags & 0x20))
+        broker._count('connects')
+        session.send(bytes([CONNACK << 4, 2, 0, 0]))
+
+    @staticmethod
+    def _handle_publish(broker: "MqttBrokerStandIn", session: _Session, flags: int, body: bytes):
+        qos = (flags >> 1) & 0x03
+        topic, offset = _read_string(body, 0)
+        packet_id = body[offset:offset + 2]
+        if qos:
+            offset += 2
+        broker._on_publish(topic.decode('utf-8'), body[offset:], bool(flags & 0x01), qos=qos)
+
+        if qos == 1:
+            session.send(bytes([PUBACK << 4, 2]) + packet_id)
+        elif qos == 2:
+            session.send(bytes([PUBREC << 4, 2]) + packet_id)
+
+    @staticmethod
+    def _handle_subscribe(broker: "MqttBrokerStandIn", session: _Session, body: bytes):
+        offset = 2
+        filters = []
+        while offset < len(body):
+            topic_filter, offset = _read_string(body, offset)
+            offset += 1                             # angeforderte QoS (zugestellt wird mit QoS 0)
+            filters.append(topic_filter.decode('utf-8'))
+        session.subscriptions.update(filters)
+        session.send(encode_packet(SUBACK, 0, body[:2] + bytes(len(filters))))
+
+        for topic, payload in broker._retained_for(filters):
+            session.send(broker._publish_packet(topic, payload, retain=True))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MqttBrokerStandIn:
+    """
+    MQTT Broker Stand-in
+
+    Verwendung:
+        broker = MqttBrokerStandIn()
+        broker.start()
+        ... Client verbindet sich mit 127.0.0.1:broker.port ...
+        broker.wait_for_messages(10)
+        broker.disconnect_clients()     # Broker-Ausfall simulieren
+        broker.stop()
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Condition()
+        self._sessions = set()
+
+        self.messages: Dict[str, bytes] = {}        # letzte Nachricht je Topic
+        self.message_counts: Dict[str, int] = {}
+        self.retained: Dict[str, bytes] = {}
+        self.stats = {'connects': 0, 'messages': 0, 'bytes': 0, 'forwarded': 0, 'wills': 0}
+
+    def start(self) -> int:
+        """Server starten - gibt den Port zurück"""
+        self._server = _Server((self.host, self.port), _ClientHandler)
+        self._server.broker = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="mqtt-standin", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Server und alle Client-Verbindungen beenden"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.disconnect_clients()
+
+    @property
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def disconnect_clients(self):
+        """Alle Client-Verbindungen hart trennen (Broker-Ausfall, Last Will wird gesendet)"""
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def reset(self):
+        """Zähler und gespeicherte Nachrichten zurücksetzen (Retained bleiben erhalten)"""
+        with self._lock:
+            self.messages.clear()
+            self.message_counts.clear()
+            self.stats = {key: 0 for key in self.stats}
+
+    def wait_until(self, predicate: Callable[["MqttBrokerStandIn"], bool], timeout: float = 10.0) -> bool:
+        """Warten bis predicate(broker) erfüllt ist (geprüft bei jeder Nachricht)"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while not predicate(self):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+            return True
+
+    def wait_for_messages(self, count: int, timeout: float = 10.0) -> bool:
+        """Warten bis insgesamt count Nachrichten empfangen wurden"""
+        return self.wait_until(lambda broker: broker.stats['messages'] >= count, timeout)
+
+    def count_topics(self, topic_filter: str) -> int:
+        """Anzahl unterschiedlicher Topics (seit reset) passend zum Filter"""
+        return sum(1 for topic in self.messages if topic_matches(topic_filter, topic))
+
+    def _register(self, session: _Session):
+        with self._lock:
+            self._sessions.add(session)
+            self._lock.notify_all()
+
+    def _unregister(self, session: _Session):
+        with self._lock:
+            self._sessions.discard(session)
+            self._lock.notify_all()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+            self._lock.notify_all()
+
+    @staticmethod
+    def _publish_packet(topic: str, payload: bytes, retain: bool = False) -> bytes:
+        encoded = topic.encode('utf-8')
+        return encode_packet(PUBLISH, 0x01 if retain else 0, struct.pack("!H", len(encoded)) + encoded + payload)
+
+    def _retained_for(self, filters):
+        with self._lock:
+            return [(topic, payload) for topic, payload in self.retained.items()
+                    if any(topic_matches(f, topic) for f in filters)]
+
+    def _on_publish(self, topic: str, payload: bytes, retain: bool, qos: int = 0):
+        with self._lock:
+            self.messages[topic] = payload
+            self.message_counts[topic] = self.message_counts.get(topic, 0) + 1
+            self.stats['messages'] += 1
+            self.stats['bytes'] += len(payload)
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            subscribers = [session for session in self._sessions
+                           if any(topic_matches(f, topic) for f in session.subscriptions)]
+            self._lock.notify_all()
+
+        if subscribers:
+            packet = self._publish_packet(topic, payload)
+            for session in subscribers:
+                try:
+                    session.send(packet)
+                    self._count('forwarded')
+                except OSError:
+                    pass
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit Tests für Pi5 Heizungs Messer - Benchmarks
+===============================================
+
+pytest Smoke-Tests für die Benchmark Suite (tests/benchmarks)
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import sys
+from pathlib import Path
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests' / 'benchmarks'))
+
+from bench_bridge_load import run_load
+from bench_pipeline import BENCHMARKS, compare_results, run_benchmarks
+from bench_soak import run_soak
+
+
+class TestBenchmarkSuite:
+    """Tests für bench_pipeline, bench_bridge_load und bench_soak"""
+
+    def test_run_small_sweep(self):
+        """Test alle Benchmarks mit wenigen Sensoren und Iterationen"""
+        results = run_benchmarks(sizes=(1, 3), iterations=3, alloc_iterations=2)
+
+        assert len(results['results']) == 2 * len(BENCHMARKS)
+        for entry in results['results']:
+            assert entry['benchmark'] in BENCHMARKS
+            assert entry['throughput_ops'] > 0
+            assert 0 < entry['latency_ms']['p50'] <= entry['latency_ms']['max']
+            assert entry['alloc']['peak_kib'] > 0
+
+        publish = [r for r in results['results'] if r['benchmark'] == 'publish_sensor_data']
+        assert all(r['delivered'] for r in publish)
+        assert publish[1]['messages_per_call'] == 5   # 3 DS18B20 + DHT22 Temperatur/Feuchte
+
+    def test_compare_detects_regression(self):
+        """Test Vergleich zweier Läufe über die p50 Latenz"""
+        def run(p50):
+            return {'results': [{'benchmark': 'build_points', 'sensors': 10, 'latency_ms': {'p50': p50}}]}
+
+        assert not compare_results(run(1.0), run(1.1), threshold=0.2)[0]['regression']
+        comparison = compare_results(run(1.0), run(1.5), threshold=0.2)
+        assert comparison[0]['regression']
+        assert comparison[0]['ratio'] == 1.5
+
+    def test_bridge_load_small(self):
+        """Test Lastgenerator: Discovery, Durchsatz und Reconnect vollständig zugestellt"""
+        results = run_load(sizes=(5,), rounds=2, timeout=10)
+
+        entry = results['results'][0]
+        assert entry['discovery']['messages'] == 7
+        assert entry['throughput']['messages'] == 14
+        assert entry['reconnect']['buffered'] == 7
+        assert all(entry[phase]['complete'] for phase in ('discovery', 'throughput', 'reconnect'))
+        assert entry['memory']['bridge_kib'] > 0
+    
+    def test_soak_short_run_and_leak_detection(self):
+        """Test Dauertest mit virtueller Uhr: stabiler Lauf besteht, absichtliches Leck wird erkannt"""
+        options = dict(days=0.05, interval=60, samples=8, warmup=0.3,
+                       limits={'traced_kib': 128, 'cycle_time_ratio': 5.0})
+        results = run_soak(components=('reader', 'bridge'), **options)
+        
+        reader, bridge = results['results']
+        # 0.05 Tage à 60s - der Reader verliert je Zyklus die virtuelle Konvertierungszeit
+        assert 65 <= reader['cycles'] <= 72 < bridge['cycles'] <= 74
+        assert reader['details']['points_written'] > 0
+        assert bridge['details']['discovery_messages'] >= 6 * 7   # Discovery alle 10 virtuelle Minuten
+        assert results['ok'], [entry['evaluation']['failures'] for entry in results['results']]
+        
+        leaking = run_soak(components=('reader',), inject_leak=16384, **options)
+        assert not leaking['ok']
+        assert 'traced_kib' in leaking['results'][0]['evaluation']['failures'][0]
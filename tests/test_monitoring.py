@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit Tests für Pi5 Heizungs Messer - Monitoring
+===============================================
+
+pytest Tests für Metriken im Prometheus Format
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import json
+import pytest
+import sys
+from pathlib import Path
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+
+from monitoring.metrics import Registry, collector_family
+from monitoring.tracing import Tracer
+
+
+class TestRegistry:
+    """Tests für Registry Klasse"""
+
+    def test_render_counter_and_histogram(self):
+        """Test Text-Format für Counter mit Labels und Histogramm"""
+        registry = Registry()
+        counter = registry.counter('pi5_test_total', 'Test Zähler', ['status'])
+        counter.labels('ok').inc()
+        counter.labels('ok').inc(2)
+        histogram = registry.histogram('pi5_test_seconds', 'Test Laufzeit', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        text = registry.render()
+        assert '# TYPE pi5_test_total counter' in text
+        assert 'pi5_test_total{status="ok"} 3' in text
+        assert 'pi5_test_seconds_bucket{le="0.1"} 1' in text
+        assert 'pi5_test_seconds_bucket{le="+Inf"} 2' in text
+        assert 'pi5_test_seconds_count 2' in text
+
+    def test_collectors_merge_families(self):
+        """Test gleichnamige Familien mehrerer Collector erscheinen nur einmal"""
+        registry = Registry()
+        for prefix in ('pi5', 'pi5b'):
+            registry.add_collector(lambda prefix=prefix: [collector_family(
+                'pi5_mqtt_connected', 'gauge', 'Verbunden', [({'prefix': prefix}, 1)])])
+
+        text = registry.render()
+        assert text.count('# TYPE pi5_mqtt_connected gauge') == 1
+        assert 'pi5_mqtt_connected{prefix="pi5b"} 1' in text
+
+
+class TestTracer:
+    """Tests für Tracer Klasse"""
+
+    def test_disabled_is_noop(self):
+        """Test abgeschaltet wird nichts aufgezeichnet"""
+        registry = Registry()
+        tracer = Tracer(registry)
+        with tracer.span('dht22.read') as span:
+            span.set(ok=True)
+        tracer.record('ds18b20.convert', 0.75)
+
+        assert tracer.summary() == {}
+        assert 'pi5_span_seconds_count' not in registry.render()
+
+    def test_ndjson_records_share_trace_id(self, tmp_path):
+        """Test NDJSON Records eines Zyklus tragen dieselbe trace_id"""
+        trace_file = tmp_path / 'trace.ndjson'
+        tracer = Tracer(Registry())
+        assert tracer.configure('both', trace_file=str(trace_file))
+
+        with tracer.trace('reader.cycle'):
+            tracer.record('ds18b20.convert', 0.75, sensor_id='28-0000000001')
+            with tracer.span('influx.write', points=3):
+                pass
+        tracer.close()
+
+        records = [json.loads(line) for line in trace_file.read_text().splitlines()]
+        assert [r['span'] for r in records] == ['ds18b20.convert', 'influx.write', 'reader.cycle']
+        assert len({r['trace_id'] for r in records}) == 1
+        assert records[0]['duration_ms'] == 750.0
+        assert records[1]['points'] == 3
+        assert tracer.summary()['ds18b20.convert']['count'] == 1
+
+    def test_toggle_at_runtime(self):
+        """Test Umschalten zur Laufzeit stellt den letzten Modus wieder her"""
+        tracer = Tracer(Registry())
+        assert tracer.configure('histogram')
+        tracer.toggle()
+        assert not tracer.enabled
+        tracer.toggle()
+        assert tracer.mode == 'histogram'
+        assert not tracer.configure('ndjson')   # ohne trace_file
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
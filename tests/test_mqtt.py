@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Unit Tests für Pi5 Heizungs Messer - MQTT
+=========================================
+
+pytest Tests für die MQTT Hilfsklassen der Bridge
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import asyncio
+import configparser
+import json
+import os
+import pytest
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests'))
+
+import mqtt_bridge
+import mqtt_bridge_async
+from alerts import AlertEngine, AlertPublisher, AlertRule, load_rules
+from mqtt_bridge import MqttState, Pi5MqttBridge
+from mqtt_bridge_async import Backoff, SharedInfluxQuery, run_bridges
+from monitoring.metrics import REGISTRY
+from mqtt_publish import OfflinePublishQueue, PublishTracker
+from support.influxdb import InfluxDBStandIn
+from support.mqtt_broker import MqttBrokerStandIn
+
+
+class TestOfflinePublishQueue:
+    """Tests für OfflinePublishQueue Klasse"""
+
+    def test_coalesces_per_topic(self):
+        """Test nur die neueste Nachricht je Topic wird gehalten"""
+        queue = OfflinePublishQueue(max_topics=10)
+        queue.put('pi5/a/state', '{"temperature": 20.0}')
+        queue.put('pi5/a/state', '{"temperature": 21.0}')
+        queue.put('pi5/b/state', '{"temperature": 45.0}')
+
+        assert len(queue) == 2
+        messages = queue.drain()
+        assert [m.topic for m in messages] == ['pi5/a/state', 'pi5/b/state']
+        assert messages[0].payload == '{"temperature": 21.0}'
+        assert queue.get_stats()['coalesced'] == 1
+        assert len(queue) == 0
+
+    def test_bounded_drops_oldest_topic(self):
+        """Test volle Queue verwirft das am längsten nicht aktualisierte Topic"""
+        queue = OfflinePublishQueue(max_topics=2)
+        queue.put('t/1', 'a')
+        queue.put('t/2', 'b')
+        queue.put('t/3', 'c', retain=True)
+
+        messages = queue.drain()
+        assert [m.topic for m in messages] == ['t/2', 't/3']
+        assert messages[1].retain is True
+        assert queue.get_stats()['dropped'] == 1
+        assert queue.get_stats()['flushed'] == 2
+
+    def test_events_kept_in_bounded_fifo(self):
+        """Test Ereignisse werden nicht zusammengefasst, volle FIFO verwirft das älteste Ereignis"""
+        queue = OfflinePublishQueue(max_topics=1, max_events=2)
+        queue.put('t/burner/event', 'start', coalesce=False)
+        queue.put('t/burner/state', 'an')
+        queue.put('t/burner/event', 'stop', coalesce=False)
+        queue.put('t/burner/event', 'start 2', coalesce=False)
+        queue.put('t/burner/state', 'an 2')
+
+        assert len(queue) == 3
+        assert [(m.topic, m.payload) for m in queue.drain()] == [
+            ('t/burner/event', 'stop'), ('t/burner/event', 'start 2'), ('t/burner/state', 'an 2')]
+        stats = queue.get_stats()
+        assert (stats['dropped'], stats['coalesced'], stats['events']) == (1, 1, 0)
+
+    def test_bridge_buffers_every_burner_event(self, tmp_path):
+        """Test alle Brenner-Ereignisse eines Broker-Ausfalls werden nachgesendet, der Zustand nur einmal"""
+        bridge = Pi5MqttBridge(config_file=write_bridge_config(tmp_path, MqttBrokerStandIn()))
+        try:
+            for number, event in enumerate(('start', 'stop', 'start')):
+                bridge.publish_sensor_data({'burner': {
+                    'burner': {'running': event == 'start'}, 'acquired': None,
+                    'events': [{'event': event, 'timestamp': 1_700_000_000.0 + number * 600, 'temperature': 50.0}]}})
+            messages = bridge.offline_queue.drain()
+            assert [json.loads(m.payload)['event'] for m in messages if m.topic == 't/burner/event'] == \
+                ['start', 'stop', 'start']
+            assert [m.topic for m in messages].count('t/burner/state') == 1
+        finally:
+            REGISTRY.remove_collector(bridge._collect_metrics)
+
+
+class TestPublishTracker:
+    """Tests für PublishTracker Klasse"""
+
+    def test_ack_latency_and_inflight(self):
+        """Test In-Flight Zählung und Publish→Ack Latenz"""
+        now = [100.0]
+        tracker = PublishTracker(max_inflight=5, clock=lambda: now[0])
+
+        tracker.track(1, 'discovery', 1, started=100.0)
+        tracker.track(2, 'state', 0, started=100.0)
+        assert tracker.get_stats()['inflight'] == 1
+
+        now[0] = 100.2
+        tracker.on_ack(1)
+        tracker.on_ack(2)
+
+        stats = tracker.get_stats()
+        assert stats['inflight'] == 0
+        assert stats['inflight_peak'] == 1
+        assert stats['acked'] == {'discovery': 1, 'state': 1}
+        assert 0.19 < stats['latency']['discovery']['p50'] <= 0.25
+
+    def test_early_ack_and_timeout(self):
+        """Test Ack vor Registrierung und unbestätigte Nachrichten"""
+        now = [0.0]
+        tracker = PublishTracker(ack_timeout=10, clock=lambda: now[0])
+
+        # Netzwerk-Thread bestätigt bevor track() registriert
+        tracker.on_ack(7)
+        tracker.track(7, 'state', 0, started=0.0)
+        assert tracker.get_stats()['acked'] == {'state': 1}
+
+        tracker.track(8, 'state', 1, started=0.0)
+        tracker.reject(4)
+        now[0] = 11.0
+        stats = tracker.get_stats()
+        assert stats['unacked'] == 1
+        assert stats['inflight'] == 0
+        assert stats['rejected'] == {4: 1}
+
+    def test_end_to_end_latency_per_sensor(self):
+        """Test Ende-zu-Ende Latenz vom Messzeitpunkt bis zur Bestätigung"""
+        now = [10.0]
+        wall = [1000.0]
+        tracker = PublishTracker(clock=lambda: now[0], wall_clock=lambda: wall[0])
+
+        tracker.track(1, 'state', 0, started=10.0, sensor_id='28-0000000001', acquired=970.0)
+        tracker.track(2, 'status', 1, started=10.0)
+        tracker.on_ack(1)
+        tracker.on_ack(2)
+
+        # Ack vor Registrierung: Wanduhr des Acks zählt
+        tracker.on_ack(3)
+        wall[0] = 1005.0
+        tracker.track(3, 'state', 0, started=10.0, sensor_id='dht22_temperature', acquired=990.0)
+
+        e2e = tracker.get_stats()['e2e_latency']
+        assert set(e2e) == {'28-0000000001', 'dht22_temperature'}
+        assert e2e['28-0000000001']['max'] == 30.0
+        assert e2e['dht22_temperature']['max'] == 10.0
+
+
+class TestBridgeWithBrokerStandIn:
+    """Tests für Pi5MqttBridge gegen den lokalen Broker Stand-in"""
+
+    def test_last_will_and_offline_buffer_on_broker_outage(self, tmp_path):
+        """Test Last Will bei Verbindungsabbruch, Nachsenden nach Reconnect"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 't',
+                     'offline_queue_size': '1'},
+            'homeassistant': {'mqtt_discovery': 'true'},
+            'labels': {'28-1': 'HK1 Vorlauf', '28-2': 'HK1 Rücklauf', 'dht22': 'Heizraum'}
+        })
+        config_file = tmp_path / 'config.ini'
+        with open(config_file, 'w') as f:
+            config.write(f)
+
+        bridge = Pi5MqttBridge(config_file=str(config_file))
+        try:
+            # Offline-Puffer hat mindestens einen Platz je State-Topic
+            assert bridge.offline_queue.max_topics == 4
+            assert bridge.setup_mqtt() and bridge.wait_until_ready(timeout=5)
+            assert broker.wait_until(lambda b: b.count_topics('homeassistant/sensor/+/config') == 4, 5)
+            assert broker.retained['t/status'] == b'online'
+
+            broker.disconnect_clients()
+            assert broker.wait_until(lambda b: b.retained['t/status'] == b'offline', 5)
+            assert broker.stats['wills'] == 1
+
+            data = {'28-1': {'temperature': 40.0}, '28-2': {'temperature': 30.0},
+                    'dht22': {'temperature': 21.0, 'humidity': 50.0}}
+            deadline = time.monotonic() + 5
+            while bridge.is_connected() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            bridge.publish_sensor_data(data)
+            assert len(bridge.offline_queue) == 4
+
+            assert bridge.wait_until_ready(timeout=10)
+            assert broker.wait_until(lambda b: b.count_topics('t/+/state') == 4, 5)
+            assert broker.retained['t/status'] == b'online'
+        finally:
+            bridge.shutdown()
+            broker.stop()
+
+    def test_offline_queue_flushed_before_new_values(self, tmp_path):
+        """Test neue Werte anderer Threads warten bis der Offline-Puffer nachgesendet ist"""
+        broker = MqttBrokerStandIn()
+        bridge = Pi5MqttBridge(config_file=write_bridge_config(tmp_path, broker))
+        sent = []
+        producer = threading.Thread(target=bridge.publish_message, args=('t/28-1/state', 'neu'))
+        flush_offline_queue = bridge.flush_offline_queue
+
+        def publish(topic, payload, qos=0, retain=False):
+            sent.append((topic, payload))
+            return SimpleNamespace(rc=0, mid=len(sent))
+
+        def delayed_flush():
+            # Zyklus im Haupt-Thread sendet einen neuen Wert, bevor der paho Thread nachsendet
+            producer.start()
+            time.sleep(0.1)
+            return flush_offline_queue()
+
+        bridge.mqtt_client = SimpleNamespace(publish=publish)
+        bridge.flush_offline_queue = delayed_flush
+        try:
+            assert not bridge.publish_message('t/28-1/state', 'alt')
+            bridge._handle_connack()
+            producer.join(5)
+            assert [payload for topic, payload in sent if topic == 't/28-1/state'] == ['alt', 'neu']
+            assert bridge.is_connected() and len(bridge.offline_queue) == 0
+        finally:
+            REGISTRY.remove_collector(bridge._collect_metrics)
+
+    def test_connection_states_and_reconnect_cycle_serialised(self, tmp_path):
+        """Test Zustandsautomat über einen Reconnect, Worker- und Hauptschleifen-Zyklus nie gleichzeitig"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 't'},
+            'homeassistant': {'mqtt_discovery': 'false'},
+            'labels': {'28-1': 'Kessel Vorlauf'}
+        })
+        config_file = tmp_path / 'config.ini'
+        with open(config_file, 'w') as f:
+            config.write(f)
+
+        bridge = Pi5MqttBridge(config_file=str(config_file))
+        events = [{'event': 'start', 'timestamp': bridge._burner_events_since + 1, 'temperature': 40.0}]
+        running = {'now': 0, 'max': 0}
+        counter = threading.Lock()
+
+        def latest_sensor_data():
+            # Abfrage dauert - ohne Lock würden zwei Zyklen dasselbe Ereignis lesen
+            with counter:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            new_events = [event for event in events if event['timestamp'] > bridge._burner_events_since]
+            time.sleep(0.02)
+            with counter:
+                running['now'] -= 1
+            return {'28-1': {'temperature': 41.0},
+                    'burner': {'burner': {'running': True}, 'events': new_events, 'acquired': None}}
+
+        bridge.get_latest_sensor_data = latest_sensor_data
+        bridge.influx_client = SimpleNamespace(close=lambda: None)
+        try:
+            assert bridge.mqtt_state == MqttState.DISCONNECTED
+            assert bridge.setup_mqtt() and bridge.wait_until_ready(timeout=5)
+            assert (bridge.mqtt_state, bridge.connect_count) == (MqttState.READY, 1)
+            assert broker.wait_until(lambda b: b.message_counts.get('t/burner/event') == 1, 5)
+
+            # Hauptschleife läuft weiter, während der Worker nach dem Reconnect seinen Zyklus sendet
+            events.append({'event': 'stop', 'timestamp': events[0]['timestamp'] + 60, 'temperature': 70.0})
+            stop = threading.Event()
+
+            def main_loop():
+                while not stop.is_set():
+                    bridge.run_once()
+
+            loop_thread = threading.Thread(target=main_loop)
+            loop_thread.start()
+            broker.disconnect_clients()
+            deadline = time.monotonic() + 5
+            while bridge.mqtt_state != MqttState.CONNECTING and time.monotonic() < deadline:
+                time.sleep(0.005)
+            assert bridge.mqtt_state == MqttState.CONNECTING and not bridge.is_connected()
+            assert bridge.wait_until_ready(timeout=10)
+            time.sleep(0.2)
+            stop.set()
+            loop_thread.join(5)
+
+            assert (bridge.mqtt_state, bridge.connect_count) == (MqttState.READY, 2)
+            assert running['max'] == 1
+            assert broker.wait_until(lambda b: b.message_counts.get('t/burner/event') == 2, 5)
+            time.sleep(0.1)
+            assert broker.message_counts['t/burner/event'] == 2
+        finally:
+            bridge.shutdown()
+            broker.stop()
+        assert bridge.mqtt_state == MqttState.DISCONNECTED
+
+    def test_slow_connect_sends_discovery_once(self, tmp_path):
+        """Test CONNACK nach dem ersten Intervall: Discovery nur vom Worker, nicht zusätzlich aus der Schleife"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        bridge = Pi5MqttBridge(config_file=write_bridge_config(tmp_path, broker))
+        bridge.ha_discovery = True
+        bridge.get_latest_sensor_data = lambda: {'28-1': {'temperature': 41.0}}
+        bridge.influx_client = SimpleNamespace(close=lambda: None)
+        on_connect = bridge.on_mqtt_connect
+
+        def slow_connect(*args):
+            time.sleep(1.5)
+            on_connect(*args)
+
+        bridge.on_mqtt_connect = slow_connect
+        loop_thread = threading.Thread(target=bridge.run_continuous, kwargs={'interval': 1})
+        try:
+            assert bridge.setup_mqtt()
+            loop_thread.start()
+            assert bridge.wait_until_ready(timeout=10)
+            assert broker.wait_until(lambda b: b.message_counts.get('t/28-1/state', 0) >= 2, 5)
+            discovery = {topic: count for topic, count in broker.message_counts.items()
+                         if topic.startswith('homeassistant/')}
+            assert discovery and set(discovery.values()) == {1}
+        finally:
+            bridge.running = False
+            loop_thread.join(5)
+            broker.stop()
+
+
+def write_bridge_config(tmp_path, broker, **database) -> str:
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 't'},
+        'homeassistant': {'mqtt_discovery': 'false'},
+        'database': database,
+        'labels': {'28-1': 'Kessel Vorlauf'}
+    })
+    config_file = tmp_path / 'config.ini'
+    with open(config_file, 'w') as f:
+        config.write(f)
+    return str(config_file)
+
+
+class FlakyInfluxClient:
+    """InfluxDBClient Ersatz: Health Check scheitert bis healthy gesetzt ist, merkt sich close()"""
+
+    instances = []
+    healthy = False
+
+    def __init__(self, **kwargs):
+        self.closed = False
+        FlakyInfluxClient.instances.append(self)
+
+    def health(self):
+        if not FlakyInfluxClient.healthy:
+            raise ConnectionError("InfluxDB nicht erreichbar")
+        return SimpleNamespace(status='pass')
+
+    def close(self):
+        self.closed = True
+
+
+class TestAsyncBridge:
+    """Tests für den Asyncio-Modus der Bridge (mqtt_bridge_async.py)"""
+
+    def test_backoff_schedule(self, monkeypatch):
+        """Test Verdopplung bis zur Obergrenze, Jitter in der oberen Hälfte, Reset nach Erfolg"""
+        backoff = Backoff(base=1.0, cap=8.0)
+        monkeypatch.setattr(mqtt_bridge_async.random, 'uniform', lambda low, high: high)
+        assert [backoff.next_delay() for _ in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+        monkeypatch.setattr(mqtt_bridge_async.random, 'uniform', lambda low, high: low)
+        backoff.reset()
+        assert [backoff.next_delay() for _ in range(3)] == [0.5, 1.0, 2.0]
+
+    def test_influxdb_setup_backoff_closes_failed_clients(self, tmp_path, monkeypatch):
+        """Test fehlgeschlagene Clients werden geschlossen, neue Versuche erst nach dem Backoff"""
+        broker = MqttBrokerStandIn()
+        bridge = Pi5MqttBridge(config_file=write_bridge_config(tmp_path, broker))
+        FlakyInfluxClient.instances, FlakyInfluxClient.healthy = [], False
+        monkeypatch.setattr(mqtt_bridge, 'InfluxDBClient', FlakyInfluxClient)
+        monkeypatch.setattr(mqtt_bridge_async.random, 'uniform', lambda low, high: high)
+        now = [100.0]
+        influx = SharedInfluxQuery(clock=lambda: now[0])
+
+        def cycle(at):
+            now[0] = at
+            return asyncio.run(influx.ensure_client(bridge))
+
+        # Versuche bei 100, 101 (+1s) und 103 (+2s) - dazwischen kein neuer Client
+        assert [cycle(at) for at in (100.0, 100.5, 101.0, 102.0, 102.9, 103.0)] == [False] * 6
+        assert len(FlakyInfluxClient.instances) == 3
+        assert all(client.closed for client in FlakyInfluxClient.instances)
+        assert bridge.influx_client is None
+
+        FlakyInfluxClient.healthy = True
+        assert not cycle(106.9) and cycle(107.0)
+        assert len(FlakyInfluxClient.instances) == 4 and not bridge.influx_client.closed
+        influx.close()
+        assert bridge.influx_client.closed
+
+    def test_reconnect_after_broker_restart_and_sigterm(self, tmp_path):
+        """Test Reconnect nach Broker-Neustart, SIGTERM trennt sauber mit Status offline"""
+        influxdb = InfluxDBStandIn()
+        influxdb.start()
+        broker = MqttBrokerStandIn()
+        broker.start()
+        bridge = Pi5MqttBridge(config_file=write_bridge_config(
+            tmp_path, broker, host='127.0.0.1', port=str(influxdb.port)))
+        bridge.query_latest_values = lambda: {'temperature': {'Kessel Vorlauf': 41.0}}
+        restarted = MqttBrokerStandIn(port=broker.port)
+
+        async def scenario():
+            runner = asyncio.create_task(run_bridges([bridge], interval=0.2))
+            assert await asyncio.to_thread(
+                broker.wait_until, lambda b: b.retained.get('t/status') == b'online' and 't/28-1/state' in b.messages, 5)
+
+            broker.stop()
+            assert await asyncio.to_thread(
+                broker.wait_until, lambda b: b.client_count == 0, 5)
+            restarted.start()
+            assert await asyncio.to_thread(
+                restarted.wait_until, lambda b: b.retained.get('t/status') == b'online' and 't/28-1/state' in b.messages, 10)
+            assert bridge.connect_count == 2 and bridge.mqtt_state == MqttState.READY
+
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(runner, timeout=10)
+
+        try:
+            asyncio.run(scenario())
+            assert restarted.retained['t/status'] == b'offline'
+            assert restarted.stats['wills'] == 0
+            assert bridge.mqtt_state == MqttState.DISCONNECTED
+        finally:
+            restarted.stop()
+            broker.stop()
+            influxdb.stop()
+
+
+class TestAlerts:
+    """Tests für die Alarm-Regeln im Reader (alerts.py)"""
+
+    def test_threshold_rate_and_stale_with_hysteresis(self):
+        """Test Auslösen an der Schwelle, Ende erst nach der Hysterese, Stale ohne Messung"""
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'alert:frost': {'sensor': 'dht22', 'type': 'below', 'threshold': '5', 'hysteresis': '1',
+                            'severity': 'critical'},
+            'alert:faellt': {'sensor': '28-1', 'type': 'rate_below', 'threshold': '-30', 'hysteresis': '10',
+                             'smoothing': '0'},
+            'alert:veraltet': {'sensor': '28-1', 'type': 'stale', 'threshold': '2m'},
+        })
+        engine = AlertEngine(load_rules(config))
+        assert [(r.name, r.threshold) for r in engine.rules] == [('frost', 5.0), ('faellt', -30.0),
+                                                                 ('veraltet', 120)]
+
+        def cycle(now, dht22, flow):
+            data = {'temperatures': {'dht22': dht22, '28-1': flow}, 'acquired': {'dht22': now, '28-1': now}}
+            return [(e['rule'], e['state']) for e in engine.evaluate(data, now)]
+
+        assert cycle(0, 6.0, 60.0) == []
+        assert cycle(30, 4.9, 60.0) == [('frost', 'firing')]
+        assert cycle(60, 5.5, 60.0) == []                   # innerhalb der Hysterese
+        assert cycle(90, 6.1, 59.5) == [('frost', 'ok'), ('faellt', 'firing')]     # -60 K/h
+        assert cycle(120, 6.1, 59.26) == []                 # -29 K/h: noch unter -30 + 10
+        assert cycle(150, 6.1, 59.26) == [('faellt', 'ok')]
+        assert cycle(210, 6.1, None) == []
+        assert cycle(300, 6.1, None) == [('veraltet', 'firing')]
+        assert cycle(330, 6.1, 58.9) == [('veraltet', 'ok')]
+        assert [a['rule'] for a in engine.active()] == []
+        assert engine.stats == {'evaluations': 9, 'fired': 3, 'resolved': 3}
+
+        with pytest.raises(ValueError):
+            AlertRule('x', '28-1', 'between', 1.0)
+
+    def test_publisher_sends_immediately_and_buffers_outage(self):
+        """Test retained Zustand + Ereignis, Reader-Status als Last Will, Nachsenden nach Reconnect"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        # QoS 0: paho wiederholt nach dem Reconnect keine unbestätigten Nachrichten (Zählung exakt)
+        publisher = AlertPublisher(broker.host, broker.port, prefix='t', qos=0)
+        rule = AlertRule('frost', 'dht22', 'below', 5.0, hysteresis=1.0)
+        try:
+            assert publisher.start()
+            assert broker.wait_until(lambda b: b.retained.get('t/reader/status') == b'online', 5)
+
+            event = rule.check(4.0, 1_700_000_000.0, 1_700_000_000.0)
+            publisher.publish([event])
+            assert broker.wait_until(lambda b: 't/alert/frost/state' in b.retained and 't/alert/event' in b.messages, 5)
+            state = json.loads(broker.retained['t/alert/frost/state'])
+            assert (state['state'], state['value'], state['since']) == ('firing', 4.0, '2023-11-14T22:13:20+00:00')
+            assert json.loads(broker.messages['t/alert/event'])['rule'] == 'frost'
+
+            broker.disconnect_clients()
+            assert broker.wait_until(lambda b: b.retained['t/reader/status'] == b'offline', 5)
+            deadline = time.monotonic() + 5
+            while publisher.connected and time.monotonic() < deadline:
+                time.sleep(0.01)
+            broker.reset()
+            # Zwei Wechsel während des Ausfalls: Zustand einmal, beide Ereignisse
+            publisher.publish([rule.check(6.5, 1_700_000_060.0, 1_700_000_060.0)])
+            publisher.publish([rule.check(3.0, 1_700_000_120.0, 1_700_000_120.0)])
+            assert len(publisher.offline_queue) == 3
+
+            assert broker.wait_until(lambda b: b.message_counts.get('t/alert/event') == 2, 10)
+            assert json.loads(broker.retained['t/alert/frost/state'])['state'] == 'firing'
+            assert broker.message_counts['t/alert/frost/state'] == 1
+            assert json.loads(broker.messages['t/alert/event'])['state'] == 'firing'
+            assert broker.retained['t/reader/status'] == b'online'
+        finally:
+            publisher.stop()
+            broker.stop()
+        assert broker.retained['t/reader/status'] == b'offline'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -8,6 +8,14 @@ pytest Tests für die Hardware-Sensor Klassen
 Autor: Pi5 Heizungs Messer Project
 """
 
+import configparser
+import http.client
+import json
+import math
+import random
+import socket
+import threading
+import time
 import pytest
 import unittest.mock as mock
 import sys
@@ -19,6 +27,12 @@ sys.path.insert(0, str(project_root / 'src'))
 
 from hardware.ds18b20_sensor import DS18B20Reader
 from hardware.dht22_sensor import DHT22Reader
+from hardware.replay import ReplayHardware, load_capture
+from hardware.simulation import (SimulatedDHT22, SimulatedHardware, format_w1_slave,
+                                 parse_waveform)
+from filters import FilterChain, parse_stage
+from live_api import LatestSnapshot, LiveStream
+from sensor_reader import Pi5SensorReader
 
 
 class TestDS18B20Reader:
@@ -172,5 +186,270 @@ class TestDHT22Reader:
         assert reader.dht_device is None
 
 
+class TestSimulatedHardware:
+    """Tests für das simulierte Hardware-Backend"""
+    
+    def test_w1_slave_format(self):
+        """Test Scratchpad und CRC im Kernel-Format"""
+        content = format_w1_slave(23.125)
+        assert content.splitlines()[0] == "72 01 4b 46 7f ff 0e 10 57 : crc=57 YES"
+        assert content.splitlines()[1].endswith("t=23125")
+        assert "NO" in format_w1_slave(23.125, crc_ok=False).splitlines()[0]
+        assert format_w1_slave(-10.0625).endswith("t=-10062\n")
+    
+    def test_waveforms(self):
+        """Test Temperaturverläufe"""
+        assert parse_waveform("const:21.5")(1000) == 21.5
+        assert parse_waveform("triangle:40:60:100")(50) == 60
+        assert parse_waveform("sine:50:10:100")(25) == pytest.approx(60)
+        with pytest.raises(ValueError):
+            parse_waveform("square:1:2")
+    
+    def test_ds18b20_reader_on_simulated_bus(self, tmp_path):
+        """Test DS18B20Reader liest unverändert aus dem simulierten w1-Baum"""
+        config = configparser.ConfigParser()
+        config.read_dict({'simulation': {
+            'ds18b20_count': '3', 'w1_path': str(tmp_path), 'conversion_latency': '0',
+            'crc_error_rate': '0', 'dropout_rate': '0', 'noise': '0',
+            'waveforms': 'const:45.5, const:-3.25', 'seed': '1'
+        }})
+        simulation = SimulatedHardware.from_config(config)
+        assert simulation.start()
+        try:
+            reader = DS18B20Reader(w1_device_path=simulation.w1_bus.device_path)
+            assert sorted(reader.sensor_ids) == sorted(simulation.w1_bus.sensors)
+            
+            temperatures = reader.read_all_temperatures()
+            assert sorted(temperatures.values()) == [-3.25, 45.5, 45.5]
+            stats = simulation.get_stats()['ds18b20']
+            assert all(s['reads'] == reader.stats[sid]['reads'] for sid, s in stats.items())
+        finally:
+            simulation.stop()
+    
+    def test_dht22_reader_with_simulated_device(self):
+        """Test DHT22Reader mit simuliertem Device (inkl. Lesefehler)"""
+        now = [0.0]
+        device = SimulatedDHT22(parse_waveform("const:21.5"), parse_waveform("const:48"),
+                                random.Random(1), failure_rate=0.0, clock=lambda: now[0])
+        reader = DHT22Reader(device=device)
+        assert reader.read_sensor(use_cache=False)['humidity'] == 48.0
+        
+        device.failure_rate = 1.0
+        now[0] = 3.0
+        assert reader._read_sensor_raw() is None
+        assert reader.stats['errors'] == 1
+
+
+class TestReplay:
+    """Tests für Aufzeichnung und Wiedergabe von Sensor-Sitzungen"""
+    
+    def test_capture_and_replay_reproduce_cycles(self, tmp_path):
+        """Test Wiedergabe liefert je Zyklus dieselben Werte wie die Aufzeichnung (inkl. CRC-Fehler)"""
+        capture = str(tmp_path / 'session.ndjson')
+        recorder = Pi5SensorReader('/nonexistent.ini', overrides={
+            'hardware': {'backend': 'simulation'},
+            'simulation': {'ds18b20_count': '3', 'w1_path': str(tmp_path / 'w1'), 'conversion_latency': '0.005',
+                           'crc_error_rate': '0.3', 'dropout_rate': '0', 'dht22_failure_rate': '0.3',
+                           'dht22_latency': '0', 'seed': '3'},
+            'capture': {'file': capture}
+        })
+        recorder.ds18b20_reader.retry_delay = 0
+        recorder.dht22_reader.min_read_interval = 0
+        recorded = []
+        try:
+            for _ in range(6):
+                data = recorder.read_all_sensors()
+                recorded.append((data['temperatures'], data['humidity']))
+            recorded_stats = {sid: s['crc_errors'] for sid, s in recorder.ds18b20_reader.stats.items()}
+        finally:
+            recorder.stop()
+        
+        session = load_capture(capture)
+        assert session['header']['backend'] == 'simulation'
+        assert len(session['cycles']) == 6
+        assert sum(recorded_stats.values()) > 0
+        
+        player = Pi5SensorReader('/nonexistent.ini', overrides={
+            'hardware': {'backend': 'replay'},
+            'replay': {'file': capture, 'speed': '1000', 'w1_path': str(tmp_path / 'replay')}
+        })
+        try:
+            assert isinstance(player.replay, ReplayHardware)
+            replayed = []
+            while player.replay.has_next():
+                data = player.read_all_sensors()
+                replayed.append((data['temperatures'], data['humidity']))
+            assert replayed == recorded
+            
+            replayed_stats = player.replay.get_stats()
+            assert replayed_stats['cycles'] == 6
+            assert all(s['exhausted'] == 0 for s in replayed_stats['ds18b20'].values())
+            assert sum(s['crc_errors'] for s in player.ds18b20_reader.stats.values()) > 0
+        finally:
+            player.stop()
+
+
+
+class TestOutlierFilter:
+    """Tests für die Ausreißer-Filter je Messreihe (filters.py)"""
+    
+    def test_chain_rejects_glitches_and_follows_real_steps(self):
+        """Test 85°C Reset, Einzelspitze, echte Stufe setzt sich durch, Glättung nur angenommener Werte"""
+        chain = FilterChain([parse_stage(spec) for spec in ('reset85', 'slope:5', 'median:5:3')])
+        values = [50.0, 50.1, 85.0, 50.2, 71.0, 50.2, 50.3, 70.0, 70.1, 70.0, 70.2, 85.0, 70.1]
+        results = [chain.process(30.0 * i, value) for i, value in enumerate(values)]
+        assert [reason for _, reason in results] == [
+            None, None, 'reset85', None, 'slope', None, None, 'slope', 'slope', 'slope', None, 'reset85', None]
+        assert results[-1] == (70.1, None)
+        assert chain.process(30.0 * 12, 99.0) == (70.1, None)      # gleicher Zeitpunkt: Ergebnis wiederholt
+        
+        # 85°C mit passender Vorgeschichte ist ein echter Messwert
+        chain = FilterChain([parse_stage('reset85')])
+        assert chain.process(0, 84.5) == (84.5, None) and chain.process(30, 85.0) == (85.0, None)
+        
+        # Sensor steht ab Start bei 85°C: nach drei Ablehnungen in Folge gilt der Wert als echt
+        chain = FilterChain([parse_stage(spec) for spec in ('reset85', 'slope:5')])
+        results = [chain.process(30.0 * i, value) for i, value in enumerate([85.0, 85.0, 85.0, 85.0, 85.0, 84.9])]
+        assert [reason for _, reason in results] == ['reset85'] * 3 + [None] * 3
+        chain = FilterChain([parse_stage('reset85:2:2')])
+        results = [chain.process(30.0 * i, value) for i, value in enumerate([85.0, 60.0, 85.0, 85.0, 85.0])]
+        assert [reason for _, reason in results] == ['reset85', None, 'reset85', 'reset85', None]
+        
+        smoothed = FilterChain([parse_stage('median:5:3'), parse_stage('ewma:30')])
+        for i, value in enumerate([20.0, 20.0, 20.0, 40.0, 21.0]):
+            result = smoothed.process(30.0 * i, value)
+        assert result[0] == pytest.approx(20.0 + (1 - math.exp(-2)) * 1.0)    # 60s seit dem letzten angenommenen
+        
+        with pytest.raises(ValueError):
+            parse_stage('kalman:3')
+    
+    def test_reader_drops_simulated_glitches(self, tmp_path):
+        """Test Reader: Reset/Spitzen der Simulation erreichen weder Messwerte noch Historie, flag schreibt sie"""
+        reader = Pi5SensorReader('/nonexistent.ini', overrides={
+            'hardware': {'backend': 'simulation'},
+            'simulation': {'ds18b20_count': '2', 'w1_path': str(tmp_path / 'w1'), 'conversion_latency': '0',
+                           'crc_error_rate': '0', 'dropout_rate': '0', 'dht22_failure_rate': '0',
+                           'dht22_latency': '0', 'noise': '0.02', 'waveforms': 'const:45, const:30',
+                           'reset_rate': '0.1', 'spike_rate': '0.1', 'seed': '3'},
+            'filters': {'enabled': 'true', 'action': 'flag', 'ds18b20': 'reset85, slope:5, median:5:3'},
+        })
+        try:
+            outliers = 0
+            for _ in range(40):
+                sensor_data = reader.read_all_sensors()
+                for sensor_id in reader.ds18b20_reader.sensor_ids:
+                    value = sensor_data['temperatures'][sensor_id]
+                    assert value is None or 28 < value < 47
+                outliers += len(sensor_data.get('outliers', {}))
+                if sensor_data.get('outliers'):
+                    flagged = sensor_data
+            
+            glitches = sum(s['resets'] + s['spikes'] for s in reader.simulation.get_stats()['ds18b20'].values())
+            assert outliers == glitches > 0
+            assert all(reader.sensor_health[sid]['available'] for sid in reader.ds18b20_reader.sensor_ids)
+            points = [p for p in reader._build_points(flagged) if p._name == 'outlier']
+            assert len(points) == len(flagged['outliers'])
+            assert sum(sum(counts.values()) for counts in reader.filters.stats.values()) == glitches
+        finally:
+            reader.stop()
+
+
+class TestLiveApi:
+    """Tests für den Endpunkt /latest (aktuelle Messwerte aus dem Speicher)"""
+    
+    def test_conditional_requests_and_long_poll(self, tmp_path):
+        """Test 200 mit ETag, 304 bei unverändertem Zyklus und Long-Polling auf den nächsten Zyklus"""
+        reader = Pi5SensorReader('/nonexistent.ini', overrides={
+            'hardware': {'backend': 'simulation'},
+            'simulation': {'ds18b20_count': '2', 'w1_path': str(tmp_path / 'w1'), 'conversion_latency': '0',
+                           'crc_error_rate': '0', 'dropout_rate': '0', 'dht22_failure_rate': '0',
+                           'dht22_latency': '0', 'seed': '1'},
+            'labels': {'dht22': 'Heizraum'},
+            'api': {'enabled': 'true', 'port': '0', 'max_wait': '5'}
+        })
+        connection = http.client.HTTPConnection('127.0.0.1', reader.api_server.port, timeout=10)
+        
+        def get(path='/latest', **headers):
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            return response, response.read()
+        
+        try:
+            response, _ = get()
+            assert response.status == 503
+            
+            reader.read_all_sensors()
+            response, body = get()
+            assert response.status == 200
+            etag, last_modified = response.getheader('ETag'), response.getheader('Last-Modified')
+            latest = json.loads(body)
+            assert len(latest['sensors']) == 3
+            assert latest['sensors']['dht22']['name'] == 'Heizraum'
+            assert 'humidity' in latest['sensors']['dht22']
+            
+            assert get(**{'If-None-Match': etag})[0].status == 304
+            assert get(**{'If-Modified-Since': last_modified})[0].status == 304
+            # Long-Polling ohne neuen Zyklus: 304 nach Ablauf der Wartezeit
+            assert get('/latest?wait=0.2', **{'If-None-Match': etag})[0].status == 304
+            
+            # Long-Polling: Antwort kommt mit dem nächsten Zyklus
+            timer = threading.Timer(0.2, reader.read_all_sensors)
+            timer.start()
+            response, body = get('/latest?wait=5', **{'If-None-Match': etag})
+            timer.join()
+            assert response.status == 200
+            assert response.getheader('ETag') != etag
+            assert json.loads(body)['sensors'].keys() == latest['sensors'].keys()
+        finally:
+            connection.close()
+            reader.stop()
+    
+    def test_stream_pushes_cycles_and_skips_for_slow_clients(self):
+        """Test SSE Stream: schneller Client bekommt jeden Zyklus, langsamer nur den aktuellen Stand"""
+        snapshot = LatestSnapshot()
+        snapshot.publish({'cycle': 0}, time.time())
+        stream = LiveStream(snapshot, port=0)
+        assert stream.start()
+        
+        def connect(receive_buffer=None):
+            client = socket.socket()
+            if receive_buffer:
+                client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+            client.connect(('127.0.0.1', stream.port))
+            client.sendall(b"GET /stream HTTP/1.1\r\nHost: pi5\r\n\r\n")
+            client.settimeout(5)
+            return client
+        
+        def read_events(client, until):
+            data = b""
+            while until not in data or not data.endswith(b"\n\n"):
+                data += client.recv(65536)
+            return [json.loads(line[6:]) for line in data.split(b"\n") if line.startswith(b"data: ")]
+        
+        fast, slow = connect(), connect(receive_buffer=4096)
+        try:
+            # Aktueller Stand direkt nach dem Verbinden
+            assert read_events(fast, b'{"cycle":0}') == [{'cycle': 0}]
+            deadline = time.monotonic() + 5
+            while len(stream.clients) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            
+            padding = 'x' * 65536
+            for cycle in range(1, 41):
+                snapshot.publish({'cycle': cycle, 'padding': padding}, time.time())
+                # Schneller Client liest jeden Zyklus mit
+                assert [event['cycle'] for event in read_events(fast, b'"cycle":%d,' % cycle)][-1] == cycle
+            
+            # Langsamer Client: Zwischenstände übersprungen, letzter Zyklus kommt an
+            cycles = [event['cycle'] for event in read_events(slow, b'"cycle":40,')]
+            assert cycles[-1] == 40 and len(cycles) < 40
+            assert cycles == sorted(cycles)
+            assert stream.stats['frames_dropped'] >= 40 - len(cycles)
+        finally:
+            fast.close()
+            slow.close()
+            stream.stop()
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
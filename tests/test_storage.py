@@ -0,0 +1,634 @@
+#!/usr/bin/env python3
+"""
+Unit Tests für Pi5 Heizungs Messer - Speicherung
+================================================
+
+pytest Tests für Sensor Reader und MQTT Bridge gegen den lokalen
+InfluxDB Stand-in (tests/support/influxdb.py)
+
+Autor: Pi5 Heizungs Messer Project
+"""
+
+import configparser
+import json
+import pytest
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Projekt Root zum Path hinzufügen
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'src'))
+sys.path.insert(0, str(project_root / 'tests'))
+
+from sensor_reader import Pi5SensorReader
+from burner import BurnerDetector
+from derived import Circuit, DerivedMetrics, RateOfChange, load_circuits
+from downsampling import Downsampler, Tier
+from hardware.simulation import VirtualClock
+from history import RingBuffer, SensorHistory
+from provisioning import TASK_PREFIX, provision
+from mqtt_bridge import Pi5MqttBridge
+from pipeline import RingReader, SampleRing
+from sinks import Sink
+from support.influxdb import InfluxDBStandIn, WRITE_PATH, parse_line_protocol
+from support.mqtt_broker import MqttBrokerStandIn
+
+
+@pytest.fixture
+def influxdb():
+    stand_in = InfluxDBStandIn()
+    stand_in.start()
+    yield stand_in
+    stand_in.stop()
+
+
+def write_config(tmp_path, influxdb, **database) -> str:
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'hardware': {'backend': 'simulation'},
+        'simulation': {'ds18b20_count': '2', 'conversion_latency': '0', 'crc_error_rate': '0',
+                       'dropout_rate': '0', 'dht22_failure_rate': '0', 'dht22_latency': '0', 'seed': '7'},
+        'database': dict({'host': influxdb.host, 'port': str(influxdb.port), 'timeout': '1'}, **database),
+        'labels': {'dht22': 'Heizraum'}
+    })
+    path = tmp_path / 'config.ini'
+    with open(path, 'w') as f:
+        config.write(f)
+    return str(path)
+
+
+class TestInfluxDBStandIn:
+    """Tests für Reader/Bridge gegen den InfluxDB Stand-in"""
+
+    def test_parse_line_protocol(self):
+        """Test Escapes, Feld-Typen und Zeitstempel"""
+        points = parse_line_protocol(
+            'temperature,name=HK1\\ Vorlauf,sensor_id=28-1 value=40.5,n=3i,ok=true,s="a b" 1700000000', 's')
+        assert points == [{'measurement': 'temperature', 'tags': {'name': 'HK1 Vorlauf', 'sensor_id': '28-1'},
+                           'fields': {'value': 40.5, 'n': 3, 'ok': True, 's': 'a b'},
+                           'time': 1_700_000_000_000_000_000}]
+
+    def test_reader_writes_and_bridge_queries(self, tmp_path, influxdb):
+        """Test Reader schreibt Punkte, Bridge liest die letzten Werte je Sensor"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb))
+        try:
+            sensor_data = reader.run_once()
+            assert influxdb.buckets['sensors'] == len(reader._build_points(sensor_data))
+            measurements = {point['measurement'] for point in influxdb.points}
+            assert measurements == {'temperature', 'humidity', 'sensor_health'}
+
+            bridge = Pi5MqttBridge(config_file=write_config(tmp_path, influxdb))
+            bridge.sensor_labels = {sensor_id: sensor_id for sensor_id in reader.ds18b20_reader.sensor_ids}
+            bridge.sensor_labels['dht22'] = 'Heizraum'
+            assert bridge.setup_influxdb()
+
+            latest = bridge.get_latest_sensor_data()
+            for sensor_id in reader.ds18b20_reader.sensor_ids:
+                assert latest[sensor_id]['temperature'] == pytest.approx(sensor_data['temperatures'][sensor_id])
+                assert latest[sensor_id]['acquired'] == pytest.approx(sensor_data['acquired'][sensor_id], abs=1e-3)
+            assert latest['dht22']['humidity'] == pytest.approx(sensor_data['humidity']['dht22'])
+        finally:
+            reader.stop()
+
+    def test_write_errors_are_reported(self, tmp_path, influxdb):
+        """Test 503/429 Antworten und Timeout führen zu False, danach wieder Erfolg"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb))
+        try:
+            sensor_data = reader.read_all_sensors()
+            influxdb.set_faults(status=503, retry_after=5, count=1)
+            assert reader.save_to_influxdb(sensor_data) is False
+            influxdb.set_faults(stall=True, paths=[WRITE_PATH])
+            assert reader.save_to_influxdb(sensor_data) is False
+            influxdb.clear_faults()
+            assert reader.save_to_influxdb(sensor_data) is True
+            assert influxdb.stats['statuses'][503] == 1
+            assert influxdb.stats['stalled'][WRITE_PATH] == 1
+        finally:
+            reader.stop()
+
+    def test_stalled_database_does_not_block_acquisition(self, tmp_path, influxdb):
+        """Test Lese-Zyklen laufen weiter, während der Writer an der Datenbank hängt"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb, write_queue_size='2'))
+        try:
+            influxdb.set_faults(stall=True, paths=[WRITE_PATH])
+            started = time.monotonic()
+            for _ in range(5):
+                sensor_data = reader.read_all_sensors()
+                assert reader.submit_to_sinks(sensor_data)
+            assert time.monotonic() - started < 0.5   # Timeout der Datenbank: 1s je Write
+
+            # Writer hängt am ersten Zyklus, Puffer (2) voll → 2 älteste verworfen
+            assert reader.sinks['influxdb'].stats['dropped'] == 2
+            # Freigegeben: hängender und beide gepufferten Zyklen werden geschrieben
+            influxdb.clear_faults()
+            reader.stop()
+            assert influxdb.stats['writes'] == 3
+        finally:
+            reader.stop()
+
+
+class TestSensorHistory:
+    """Tests für den Ringpuffer-Verlauf (history.py)"""
+
+    def test_ring_buffer_wraps_with_fixed_capacity(self):
+        """Test älteste Messungen werden überschrieben, Speicher bleibt fest"""
+        buffer = RingBuffer(capacity=4)
+        for i in range(10):
+            assert buffer.append(1000.0 + i, float(i))
+
+        assert len(buffer) == 4
+        assert buffer.nbytes == 4 * RingBuffer.ITEM_BYTES
+        timestamps, values = buffer.window()
+        assert list(values) == [6.0, 7.0, 8.0, 9.0]
+        assert list(timestamps) == [1006000, 1007000, 1008000, 1009000]
+        # Nicht neuere Zeitstempel (Cache-Treffer) werden ignoriert
+        assert not buffer.append(1009.0, 99.0)
+        assert buffer.latest_timestamp == 1009.0
+
+    def test_stats_over_window(self):
+        """Test min/max/mean und Anstieg je Stunde, gesamt und für die letzten Minuten"""
+        history = SensorHistory(hours=1, interval=60)
+        start = 1_700_000_000.0
+        for minute in range(60):
+            # 0.5 °C je Minute steigend = 30 °C/h
+            history.add_cycle({'temperatures': {'28-0001': 20.0 + 0.5 * minute, '28-0002': None},
+                               'humidity': {'dht22': 50.0}},
+                              now=start + minute * 60)
+
+        assert sorted(history.keys()) == ['28-0001', 'dht22_humidity']
+        stats = history.stats('28-0001')
+        assert stats['count'] == 60
+        assert stats['min'] == 20.0 and stats['max'] == 49.5
+        assert stats['mean'] == pytest.approx(34.75)
+        assert stats['slope_per_hour'] == pytest.approx(30.0)
+
+        recent = history.stats('28-0001', minutes=10)
+        assert recent['count'] == 11
+        assert recent['min'] == 44.5
+        assert history.summary()['dht22_humidity']['slope_per_hour'] == 0.0
+        assert history.stats('28-0002') is None
+        assert history.nbytes == 2 * 60 * RingBuffer.ITEM_BYTES
+
+
+class TestDownsampling:
+    """Tests für die Verdichtung je Minute/Stunde vor dem Schreiben (downsampling.py)"""
+
+    def test_windows_close_with_min_max_mean_count(self):
+        """Test Fenster schließen beim ersten Wert des nächsten Fensters, doppelte Zeitstempel zählen nicht"""
+        downsampler = Downsampler([Tier('1m', 'sensors_1m'), Tier('1h', 'sensors_1h')])
+        start = 1_700_000_000 - 1_700_000_000 % 3600
+        closed = []
+        for i in range(250):     # 2h 5min à 30s
+            value = 40.0 + i % 4
+            closed += downsampler.add('temperature', '28-0001', start + i * 30, value)
+            closed += downsampler.add('temperature', '28-0001', start + i * 30, 99.0)   # Cache-Treffer
+        
+        minutes = [a for a in closed if a.tier.name == '1m']
+        hours = [a for a in closed if a.tier.name == '1h']
+        assert len(minutes) == 124 and len(hours) == 2
+        assert (minutes[0].start, minutes[0].count, minutes[0].min, minutes[0].max) == (start, 2, 40.0, 41.0)
+        assert hours[1].start == start + 3600
+        assert (hours[1].count, hours[1].min, hours[1].max) == (120, 40.0, 43.0)
+        assert hours[1].mean == pytest.approx(41.5)
+        
+        remaining = downsampler.flush()
+        assert sorted(a.tier.name for a in remaining) == ['1h', '1m']
+        assert downsampler.flush() == []
+
+    def test_reader_writes_tiers_to_own_buckets(self, tmp_path, influxdb):
+        """Test Reader schreibt abgeschlossene Fenster in die Stufen-Buckets, Rest beim Beenden"""
+        clock = VirtualClock(start=1_700_000_000 - 1_700_000_000 % 3600)
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb),
+                                 overrides={'downsampling': {'enabled': 'true', 'tiers': '1m, 1h'}},
+                                 clock=clock)
+        try:
+            reader.dht22_reader.min_read_interval = 0
+            for _ in range(10):                 # 5 virtuelle Minuten
+                assert reader.save_to_influxdb(reader.read_all_sensors())
+                clock.advance(30)
+            
+            # 4 abgeschlossene Minuten × (2 DS18B20 + DHT22 Temperatur + DHT22 Feuchte)
+            assert influxdb.buckets['sensors_1m'] == 4 * 4
+            assert 'sensors_1h' not in influxdb.buckets
+            point = next(p for p in influxdb.points if p['bucket'] == 'sensors_1m'
+                         and p['tags']['sensor_id'] == 'dht22' and p['measurement'] == 'humidity')
+            assert set(point['fields']) == {'min', 'max', 'mean', 'count'}
+            assert point['fields']['count'] == 2
+            assert point['tags']['name'] == 'Heizraum'
+        finally:
+            reader.stop()
+        
+        # Beenden: angefangene Minute und Stunde werden geschrieben
+        assert influxdb.buckets['sensors_1m'] == 5 * 4
+        assert influxdb.buckets['sensors_1h'] == 4
+
+
+class TestProvisioning:
+    """Tests für die InfluxDB Provisionierung (provisioning.py) gegen den Stand-in"""
+
+    def test_buckets_and_tasks_are_idempotent(self, influxdb):
+        """Test Anlegen, zweiter Lauf ohne Änderung, Moduswechsel entfernt eigene Tasks"""
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'database': {'host': influxdb.host, 'port': str(influxdb.port), 'timeout': '2', 'retention': '30d'},
+            'downsampling': {'enabled': 'true', 'mode': 'task', 'tiers': '1m, 1h', 'retention_1m': '90d'}
+        })
+
+        def actions(**kwargs):
+            return {(a['kind'], a['name']): a['action'] for a in provision(config, **kwargs)}
+
+        planned = actions(dry_run=True)
+        assert planned[('bucket', 'sensors_1m')] == 'created'
+        assert len(influxdb.bucket_resources) == 1 and not influxdb.tasks
+
+        first = actions()
+        assert first[('bucket', 'sensors')] == 'updated'
+        assert first[('task', TASK_PREFIX + '1h')] == 'created'
+        retention = {b['name']: b['retentionRules'] for b in influxdb.bucket_resources.values()}
+        assert retention == {'sensors': [{'type': 'expire', 'everySeconds': 30 * 86400}],
+                             'sensors_1m': [{'type': 'expire', 'everySeconds': 90 * 86400}],
+                             'sensors_1h': []}
+        task = next(t for t in influxdb.tasks.values() if t['name'] == TASK_PREFIX + '1m')
+        assert task['every'] == '1m' and 'to(bucket: "sensors_1m"' in task['flux']
+
+        assert set(actions().values()) == {'unchanged'}
+
+        config['downsampling']['mode'] = 'edge'
+        switched = actions()
+        assert switched[('task', TASK_PREFIX + '1m')] == 'deleted'
+        assert not influxdb.tasks and len(influxdb.bucket_resources) == 3
+
+
+class TestDerivedMetrics:
+    """Tests für Spreizung und Änderungsraten je Heizkreis (derived.py)"""
+
+    def test_delta_t_and_smoothed_rate(self):
+        """Test ΔT je Zyklus, Rate in K/h geglättet, fehlender Sensor → kein Kreis-Wert"""
+        config = configparser.ConfigParser()
+        config.read_dict({'circuits': {'hk1': '28-a, 28-b, Heizkreis 1', 'hk2': '28-c,28-d', 'smoothing': '60'}})
+        circuits = load_circuits(config)
+        assert [(c.circuit_id, c.name, c.supply, c.return_sensor) for c in circuits] == [
+            ('hk1', 'Heizkreis 1', '28-a', '28-b'), ('hk2', 'HK2', '28-c', '28-d')]
+
+        derived = DerivedMetrics.from_config(config)
+        start = 1_700_000_000.0
+        for cycle in range(40):
+            # Vorlauf steigt mit 6 K/h (0.05 K je 30s), Rücklauf konstant
+            data = {'temperatures': {'28-a': 40.0 + 0.05 * cycle, '28-b': 35.0, '28-c': 30.0, '28-d': None},
+                    'acquired': {'28-a': start + 30 * cycle, '28-b': start + 30 * cycle + 1}}
+            result = derived.update(data, now=start + 30 * cycle + 2)
+
+        assert list(result) == ['hk1']
+        hk1 = result['hk1']
+        assert hk1['delta_t'] == pytest.approx(6.95)
+        assert hk1['supply_rate'] == pytest.approx(6.0)
+        assert hk1['return_rate'] == pytest.approx(0.0)
+        assert hk1['acquired'] == start + 30 * 39 + 1
+
+        # Wechsel um einen DS18B20 Schritt (0.0625°C = ±7.5 K/h bei 30s) wird geglättet
+        rate = RateOfChange(time_constant=300)
+        assert rate.update(0, 20.0) is None
+        for cycle in range(1, 60):
+            rate.update(30 * cycle, 20.0 + 0.0625 * (cycle % 2))
+        assert abs(rate.rate) < 0.5
+        assert rate.update(30 * 59, 25.0) == rate.rate      # gleicher Zeitpunkt zählt nicht
+
+    def test_reader_writes_and_bridge_publishes_circuits(self, tmp_path, influxdb):
+        """Test Reader schreibt Measurement "circuit", Bridge liest es als eigene Serie"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb))
+        try:
+            supply, return_sensor = reader.ds18b20_reader.sensor_ids[:2]
+            reader.derived = DerivedMetrics([Circuit('hk1', 'Heizkreis 1', supply, return_sensor)])
+            sensor_data = reader.run_once()
+            expected = sensor_data['temperatures'][supply] - sensor_data['temperatures'][return_sensor]
+            assert sensor_data['circuits']['hk1']['delta_t'] == pytest.approx(expected)
+            point = next(p for p in influxdb.points if p['measurement'] == 'circuit')
+            assert point['tags'] == {'circuit': 'hk1', 'name': 'Heizkreis 1'}
+            assert 'supply_rate' not in point['fields']     # erst ab dem zweiten Zyklus
+
+            bridge = Pi5MqttBridge(config_file=write_config(tmp_path, influxdb))
+            bridge.circuits = reader.derived.circuits
+            assert bridge.setup_influxdb()
+            latest = bridge.get_latest_sensor_data()
+            assert latest['circuit_hk1']['circuit']['delta_t'] == pytest.approx(expected)
+            assert latest['circuit_hk1']['acquired'] == pytest.approx(sensor_data['circuits']['hk1']['acquired'],
+                                                                     abs=1e-3)
+        finally:
+            reader.stop()
+
+
+def flow_profile(start: float, segments):
+    """Vorlauf-Messungen à 30s: (Dauer in Minuten, Änderung in K je Messung) je Abschnitt"""
+    timestamp, temperature = start, 50.0
+    for minutes, step in segments:
+        for _ in range(minutes * 2):
+            timestamp += 30
+            temperature += step
+            yield timestamp, temperature
+
+
+class TestBurnerDetector:
+    """Tests für die Brenner-Erkennung aus der Vorlauftemperatur (burner.py)"""
+
+    def test_start_stop_hysteresis_and_counters(self):
+        """Test Start/Stop mit Plateau, Kurztakt, Tageswechsel - Kennzahlen ohne Verlauf"""
+        detector = BurnerDetector('28-kessel', start_rate=30, stop_rate=-10, smoothing=60, short_cycle=600)
+        # 23:00 lokale Zeit, zwei Takte vor und einer nach Mitternacht
+        start = datetime(2024, 1, 15, 23, 0).timestamp()
+        events = []
+        for timestamp, temperature in flow_profile(start, [
+            (10, -0.2),                 # aus: Abkühlung 24 K/h
+            (5, 1.0), (10, 0.0),        # an: 120 K/h, dann Plateau (modulierend)
+            (20, -0.2),                 # aus
+            (4, 1.0),                   # Kurztakt
+            (30, -0.2),
+            (15, 1.0),                  # nach Mitternacht
+            (10, -0.2),
+        ]):
+            events += detector.add(timestamp, temperature)
+            assert detector.add(timestamp, 0.0) == []       # gleicher Zeitpunkt zählt nicht
+
+        assert [e['event'] for e in events] == ['start', 'stop'] * 3
+        runs = [e['run_time'] for e in events if e['event'] == 'stop']
+        assert [r // 60 for r in runs] == [15, 4, 15]       # Plateau beendet den Lauf nicht
+        assert [e['short_cycle'] for e in events if e['event'] == 'stop'] == [False, True, False]
+        assert events[2]['pause'] == pytest.approx(20 * 60, abs=90)
+
+        state = detector.state()
+        assert not state['running']
+        assert (state['starts_total'], state['starts_today'], state['starts_per_day']) == (3, 1, 2.0)
+        assert state['mean_run_time'] == pytest.approx(sum(runs) / 3)
+        assert state['short_cycles'] == 1 and state['short_cycle_ratio'] == pytest.approx(1 / 3)
+
+        with pytest.raises(ValueError):
+            BurnerDetector('28-kessel', start_rate=10, stop_rate=10)
+
+    def test_reader_writes_events_and_bridge_publishes_once(self, tmp_path, influxdb):
+        """Test Reader schreibt "burner"/"burner_event", Bridge sendet jedes Ereignis einmal"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb))
+        try:
+            sensor_id = reader.ds18b20_reader.sensor_ids[0]
+            reader.burner = detector = BurnerDetector(sensor_id, smoothing=60)
+            start = time.time() - 28 * 60     # Stop 3 Minuten vor jetzt (Bridge: letzte 5 Minuten)
+            for timestamp, temperature in flow_profile(start, [(10, -0.2), (15, 1.0), (5, -0.2)]):
+                result = detector.update({'temperatures': {sensor_id: temperature},
+                                          'acquired': {sensor_id: timestamp}}, timestamp)
+                if result['events']:
+                    reader.save_to_influxdb({'temperatures': {}, 'humidity': {}, 'burner': result})
+            assert reader.save_to_influxdb({'temperatures': {}, 'humidity': {}, 'burner': result})
+            events = [p for p in influxdb.points if p['measurement'] == 'burner_event']
+            assert [p['tags']['event'] for p in events] == ['start', 'stop']
+            assert events[1]['fields']['short_cycle'] is False
+
+            config = configparser.ConfigParser()
+            config.read(write_config(tmp_path, influxdb))
+            config['burner'] = {'sensor': sensor_id, 'mqtt': 'false'}
+            with open(tmp_path / 'bridge.ini', 'w') as f:
+                config.write(f)
+            bridge = Pi5MqttBridge(config_file=str(tmp_path / 'bridge.ini'))
+            bridge._burner_events_since = start
+            assert bridge.setup_influxdb()
+
+            # Ohne Broker landen die Nachrichten im Offline-Puffer (Ereignisse vollständig)
+            bridge.publish_sensor_data(bridge.get_latest_sensor_data())
+            drained = bridge.offline_queue.drain()
+            # Start liegt 18 Minuten zurück - Abfrage ab dem zuletzt gesendeten Ereignis, kein festes Fenster
+            assert [json.loads(m.payload)['event'] for m in drained if m.topic == 'pi5_heizung/burner/event'] == \
+                ['start', 'stop']
+            messages = {m.topic: json.loads(m.payload) for m in drained}
+            assert messages['pi5_heizung/burner/event']['run_time'] == pytest.approx(15 * 60, abs=90)
+            state = messages['pi5_heizung/burner/state']
+            assert state['running'] is False and state['starts_today'] == 1
+            assert state['mean_run_time'] == pytest.approx(15, abs=1.5)
+
+            bridge.publish_sensor_data(bridge.get_latest_sensor_data())
+            topics = [m.topic for m in bridge.offline_queue.drain()]
+            assert 'pi5_heizung/burner/event' not in topics and 'pi5_heizung/burner/state' in topics
+        finally:
+            reader.stop()
+
+    def test_reader_publishes_events_on_detection(self, tmp_path, influxdb):
+        """Test Reader sendet Ereignisse bei der Erkennung - auch mit Wendepunkt Minuten davor"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        overrides = {
+            'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 't'},
+            'burner': {'sensor': '28-kessel', 'smoothing': '60'}
+        }
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb), overrides=overrides, role='mqtt')
+        try:
+            assert reader.burner and reader.burner_publisher
+            assert broker.wait_until(lambda b: b.client_count == 1, 5)
+            # 30 min Abkühlung (6 K/h), 10 min Anstieg unter start_rate (20 K/h), dann 120 K/h
+            detected = None
+            for timestamp, temperature in flow_profile(time.time() - 45 * 60, [(30, -0.05), (10, 1 / 6), (5, 1.0)]):
+                sensor_data = {'temperatures': {'28-kessel': temperature}, 'humidity': {},
+                               'acquired': {'28-kessel': timestamp}}
+                reader.process_cycle(sensor_data, timestamp)
+                if sensor_data.get('burner', {}).get('events'):
+                    detected = timestamp
+                    break
+            assert detected is not None
+
+            assert broker.wait_until(lambda b: 't/burner/event' in b.messages, 5)
+            event = json.loads(broker.messages['t/burner/event'])
+            assert event['event'] == 'start'
+            assert detected - datetime.fromisoformat(event['time']).timestamp() > 5 * 60
+            assert broker.message_counts['t/burner/event'] == 1
+        finally:
+            reader.stop()
+            broker.stop()
+
+
+class TestPipeline:
+    """Tests für die Mehrprozess-Pipeline (pipeline.py): Ring im Shared Memory und Worker"""
+
+    def test_ring_readers_skip_overwritten_cycles(self):
+        """Test Leser holen Zyklen in Reihenfolge, überholte Zyklen zählen als verloren"""
+        ring = SampleRing.create(slots=4, slot_size=256)
+        try:
+            fast, slow = RingReader(ring, 0), RingReader(ring, 1)
+            for seq in range(1, 4):
+                assert ring.put({'seq': seq})
+            assert [fast.next()['seq'] for _ in range(3)] == [1, 2, 3]
+            assert fast.next() is None
+
+            for seq in range(4, 10):
+                assert ring.put({'seq': seq})
+            # Langsamer Leser liegt 9 Zyklen zurück, der Ring hält 4 → 5 verloren
+            assert [slow.next()['seq'] for _ in range(4)] == [6, 7, 8, 9]
+            assert slow.next() is None
+            assert ring.reader_state(1) == (9, 5)
+            assert ring.reader_state(0) == (3, 0)
+
+            # Zu große Zyklen werden nicht abgelegt, der Ring bleibt unverändert
+            assert ring.put({'data': 'x' * 300}) is False
+            assert ring.write_seq == 9 and ring.stats['oversize'] == 1
+        finally:
+            ring.release()
+
+    def test_storage_worker_writes_cycles_of_acquisition_process(self, tmp_path, influxdb):
+        """Test Reader-Prozess liest nur die Sensoren, der storage Worker schreibt alle Zyklen"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb), overrides={
+            'pipeline': {'enabled': 'true', 'workers': 'storage', 'slots': '16'}})
+        try:
+            assert reader.role == 'acquisition'
+            assert reader.influx_client is None and reader.filters is None
+            reader.start_pipeline()
+            cycles = [reader.read_all_sensors() for _ in range(3)]
+            assert reader.pipeline.cycles_written == 3
+        finally:
+            reader.stop()       # Worker schreibt den Rest aus dem Ring, dann wird er beendet
+
+        for sensor_id in reader.ds18b20_reader.sensor_ids:
+            points = [p for p in influxdb.points
+                      if p['measurement'] == 'temperature' and p['tags']['sensor_id'] == sensor_id]
+            assert [p['fields']['value'] for p in points] == \
+                pytest.approx([cycle['temperatures'][sensor_id] for cycle in cycles])
+        assert any(p['measurement'] == 'sensor_health' for p in influxdb.points)
+
+    def test_mqtt_sinks_run_in_mqtt_worker(self, tmp_path, influxdb):
+        """Test MQTT Ausgaben laufen im mqtt Worker und senden, während der storage Worker auf InfluxDB wartet"""
+        broker = MqttBrokerStandIn()
+        broker.start()
+        overrides = {
+            'mqtt': {'broker': broker.host, 'port': str(broker.port), 'topic_prefix': 't'},
+            'sink:influxdb': {'type': 'influxdb'},
+            'sink:mqtt': {'type': 'mqtt'}
+        }
+        config_file = write_config(tmp_path, influxdb)
+        acquisition = Pi5SensorReader(config_file=config_file, overrides=overrides, role='acquisition')
+        storage = Pi5SensorReader(config_file=config_file, overrides=overrides, role='storage')
+        mqtt = Pi5SensorReader(config_file=config_file, overrides=overrides, role='mqtt')
+        try:
+            assert [sink.name for sink in acquisition.sinks] == []
+            assert [sink.name for sink in storage.sinks] == ['influxdb']
+            assert [sink.name for sink in mqtt.sinks] == ['mqtt'] and mqtt.influx_client is None
+            assert broker.wait_until(lambda b: b.client_count == 1, 5)
+
+            influxdb.set_faults(stall=True, paths=[WRITE_PATH])
+            for _ in range(3):
+                # Zyklus wie aus dem Ring der Pipeline (JSON, je Worker eine Kopie)
+                sensor_data = acquisition.acquire_cycle()
+                record = json.dumps(dict(sensor_data, health=acquisition.sensor_health, cycle_time=time.time()))
+                storage.process_record(json.loads(record))
+                mqtt.process_record(json.loads(record))
+            assert broker.wait_until(lambda b: b.message_counts.get('t/reader/cycle') == 3, 5)
+            cycle = json.loads(broker.messages['t/reader/cycle'])
+            assert cycle['sensors']['dht22']['humidity'] == sensor_data['humidity']['dht22']
+            assert storage.sinks['influxdb'].stats['written'] == 0
+            influxdb.clear_faults()
+        finally:
+            for reader in (acquisition, storage, mqtt):
+                reader.stop()
+            broker.stop()
+        assert sum(point['measurement'] == 'temperature' for point in influxdb.points) == 3 * 3
+
+
+class BlockingSink(Sink):
+    """Ausgabe, die bis zur Freigabe hängt und die Stapel mitschreibt"""
+
+    def __init__(self, name, **options):
+        super().__init__(name, **options)
+        self.release = threading.Event()
+        self.batches = []
+
+    def write(self, items):
+        self.release.wait(5)
+        self.batches.append([sensor_data['n'] for sensor_data, _ in items])
+        return True
+
+
+class TestSinks:
+    """Tests für die Ausgaben mit eigenem Puffer je Ausgabe (sinks.py)"""
+
+    def test_batching_and_drop_policies(self):
+        """Test Stapel bis batch_size, drop = newest verwirft neue, oldest die ältesten Zyklen"""
+        newest = BlockingSink('newest', queue_size=2, batch_size=3, drop='newest')
+        oldest = BlockingSink('oldest', queue_size=2, batch_size=3, drop='oldest')
+        for sink in (newest, oldest):
+            assert sink.submit({'n': 0})
+            deadline = time.monotonic() + 5
+            while not sink._in_flight and time.monotonic() < deadline:
+                time.sleep(0.01)    # Zyklus 0 hängt im Schreibvorgang
+            accepted = [sink.submit({'n': n}) for n in range(1, 5)]
+            assert sink.stats['dropped'] == 2 and sink.queued == 3
+            sink.release.set()
+            assert sink.flush(5)
+            sink.close()
+            assert sink.summary()['written'] == 3 and sink.summary()['lag_max'] > 0
+
+        assert accepted == [True, True, True, True]     # oldest nimmt immer an
+        assert newest.batches == [[0], [1, 2]]
+        assert oldest.batches == [[0], [3, 4]]
+
+    def test_health_written_as_of_the_cycle(self, tmp_path, influxdb):
+        """Test Sensor-Health Punkte zeigen den Stand und die Zeit des Zyklus, nicht des Schreibens"""
+        reader = Pi5SensorReader(config_file=write_config(tmp_path, influxdb))
+        try:
+            influxdb.set_faults(stall=True, paths=[WRITE_PATH])
+            sensor_data = reader.read_all_sensors()
+            assert reader.submit_to_sinks(sensor_data)
+            health = {sensor_id: dict(values) for sensor_id, values in reader.sensor_health.items()}
+
+            # Nächste Zyklen ändern sensor_health, während der Zyklus noch im Puffer liegt
+            time.sleep(0.05)
+            reader.sensor_health['28-neu'] = {'available': False, 'consecutive_failures': 3}
+            for values in reader.sensor_health.values():
+                values['consecutive_failures'] += 1
+            influxdb.clear_faults()
+            assert reader.sinks['influxdb'].flush(5)
+        finally:
+            reader.stop()
+
+        points = [p for p in influxdb.points if p['measurement'] == 'sensor_health']
+        assert {p['tags']['sensor_id']: p['fields']['consecutive_failures'] for p in points} == \
+            {sensor_id: values['consecutive_failures'] for sensor_id, values in health.items()}
+        assert [p['time'] / 1e9 for p in points] == pytest.approx([sensor_data['cycle_time']] * len(health), abs=1e-6)
+
+    def test_slow_influxdb_does_not_hold_up_other_sinks(self, tmp_path, influxdb):
+        """Test Datei und UDP schreiben jeden Zyklus, während InfluxDB hängt - danach holt InfluxDB auf"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.settimeout(5)
+        config = configparser.ConfigParser()
+        config.read(write_config(tmp_path, influxdb))
+        config.read_dict({
+            'sink:influxdb': {'type': 'influxdb', 'queue_size': '10', 'batch_size': '10'},
+            'sink:archiv': {'type': 'file', 'path': str(tmp_path / 'cycles.ndjson')},
+            'sink:udp': {'type': 'udp', 'host': '127.0.0.1', 'port': str(listener.getsockname()[1])}
+        })
+        with open(tmp_path / 'sinks.ini', 'w') as f:
+            config.write(f)
+
+        reader = Pi5SensorReader(config_file=str(tmp_path / 'sinks.ini'))
+        try:
+            influxdb.set_faults(stall=True, paths=[WRITE_PATH])
+            cycles = []
+            for _ in range(4):
+                cycles.append(reader.read_all_sensors())
+                assert reader.submit_to_sinks(cycles[-1])
+            assert reader.sinks['archiv'].flush(2) and reader.sinks['udp'].flush(2)
+            assert reader.sinks['influxdb'].stats['written'] == 0
+
+            records = [json.loads(line) for line in (tmp_path / 'cycles.ndjson').read_text().splitlines()]
+            assert [record['sensors']['dht22']['humidity'] for record in records] == \
+                [cycle['humidity']['dht22'] for cycle in cycles]
+            packets = [listener.recv(65535).decode() for _ in range(reader.sinks['udp'].packets)]
+            lines = [line for packet in packets for line in packet.split('\n')]
+            assert sum(line.startswith('temperature,') for line in lines) == 4 * 3
+
+            influxdb.clear_faults()
+            assert reader.sinks['influxdb'].flush(5)
+            # Hängender Zyklus einzeln, die drei gepufferten als ein Stapel
+            summary = reader.get_sensor_status()['sinks']['influxdb']
+            assert (summary['written'], summary['batches'], summary['dropped']) == (4, 2, 0)
+            assert summary['lag_max'] >= summary['lag_mean'] > 0
+        finally:
+            reader.stop()
+            listener.close()
+        assert sum(point['measurement'] == 'temperature' for point in influxdb.points) == 4 * 3